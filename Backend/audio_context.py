@@ -0,0 +1,338 @@
+import contextlib
+import os
+import shutil
+import subprocess
+import threading
+import wave
+
+import numpy as np
+
+from Backend.audio_vad import select_speech
+
+
+TARGET_SAMPLE_RATE = 16000
+
+
+def _log(message: str):
+    try:
+        print(f"[audio_context] {message}")
+    except Exception:
+        pass
+
+
+def decode_timeout_sec():
+    try:
+        return max(1.0, float(os.getenv("AIREALCHECK_AUDIO_DECODE_TIMEOUT_SEC", "25")))
+    except Exception:
+        return 25.0
+
+
+def _candidate_windows_ffmpeg_paths(exe_name: str):
+    localapp = os.getenv("LOCALAPPDATA") or ""
+    programdata = os.getenv("PROGRAMDATA") or ""
+    candidates = [
+        os.path.join(localapp, "Microsoft", "WinGet", "Links", exe_name),
+        os.path.join(programdata, "chocolatey", "bin", exe_name),
+        os.path.join("C:\\", "ffmpeg", "bin", exe_name),
+        os.path.join("C:\\", "Program Files", "ffmpeg", "bin", exe_name),
+        os.path.join("C:\\", "Program Files (x86)", "ffmpeg", "bin", exe_name),
+    ]
+    return [p for p in candidates if p and os.path.exists(p)]
+
+
+def _powershell_get_command(exe_name: str):
+    try:
+        proc = subprocess.run(
+            [
+                "powershell",
+                "-NoProfile",
+                "-Command",
+                f"(Get-Command {exe_name} -ErrorAction SilentlyContinue).Source",
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=2,
+            check=False,
+        )
+    except Exception:
+        return ""
+    if proc.returncode != 0:
+        return ""
+    output = (proc.stdout.decode("utf-8", errors="ignore") or "").strip()
+    return output if output and os.path.exists(output) else ""
+
+
+def resolve_ffmpeg_path(exe_name: str):
+    env_path = (os.getenv("FFMPEG_PATH") or "").strip()
+    if env_path:
+        if os.path.isdir(env_path):
+            candidate = os.path.join(env_path, exe_name)
+            if os.path.exists(candidate):
+                return candidate
+        if os.path.exists(env_path):
+            return env_path
+    which_path = shutil.which(exe_name.replace(".exe", "")) or shutil.which(exe_name)
+    if which_path:
+        return which_path
+    ps_path = _powershell_get_command(exe_name)
+    if ps_path:
+        return ps_path
+    candidates = _candidate_windows_ffmpeg_paths(exe_name)
+    return candidates[0] if candidates else ""
+
+
+def ffmpeg_path():
+    return resolve_ffmpeg_path("ffmpeg.exe")
+
+
+def _format_cmd(cmd):
+    try:
+        return " ".join([f'"{c}"' if " " in str(c) else str(c) for c in cmd])
+    except Exception:
+        return "<unprintable>"
+
+
+def read_wav(path):
+    """(samples float32 mono, sample_rate, frames) aus einer PCM-WAV-Datei."""
+    with wave.open(path, "rb") as wf:
+        channels = wf.getnchannels()
+        sample_rate = wf.getframerate()
+        sample_width = wf.getsampwidth()
+        frames = wf.getnframes()
+        data = wf.readframes(frames)
+
+    if frames <= 0:
+        return None, sample_rate, 0
+
+    if sample_width == 1:
+        audio = np.frombuffer(data, dtype=np.uint8).astype(np.float32)
+        audio = (audio - 128.0) / 128.0
+    elif sample_width == 2:
+        audio = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+    elif sample_width == 4:
+        audio = np.frombuffer(data, dtype=np.int32).astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError("unsupported_sample_width")
+
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return audio, sample_rate, frames
+
+
+def pcm16_to_float32(raw):
+    """s16le-Rohdaten -> float32 in [-1, 1), identisch zu read_wav fuer 16-Bit-WAVs."""
+    usable = len(raw) - (len(raw) % 2)
+    return np.frombuffer(raw[:usable], dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def ffmpeg_audio_output_args(target, sample_rate=TARGET_SAMPLE_RATE):
+    """ffmpeg-Ausgabeoptionen fuer mono s16le mit sample_rate nach target (z.B. pipe:1)."""
+    return [
+        "-vn",
+        "-sn",
+        "-dn",
+        "-ac",
+        "1",
+        "-ar",
+        str(int(sample_rate)),
+        "-f",
+        "s16le",
+        "-acodec",
+        "pcm_s16le",
+        target,
+    ]
+
+
+def decode_audio_pipe(file_path, sample_rate=TARGET_SAMPLE_RATE, timeout_sec=None):
+    """
+    Dekodiert die Tonspur per ffmpeg-Pipe (mono, sample_rate, s16le) direkt in ein
+    float32-Array, ohne temporaere WAV-Datei. Liefert (samples|None, meta).
+    """
+    timeout_sec = decode_timeout_sec() if timeout_sec is None else timeout_sec
+    ffmpeg = ffmpeg_path()
+    if not ffmpeg or not os.path.exists(ffmpeg):
+        return None, {"note": "ffmpeg_not_installed", "stderr": ""}
+    if not os.access(ffmpeg, os.X_OK):
+        return None, {"note": "ffmpeg_not_executable", "stderr": ""}
+    if not os.path.exists(file_path):
+        return None, {"note": "file_missing", "stderr": ""}
+    try:
+        if os.path.getsize(file_path) <= 0:
+            return None, {"note": "file_size_0", "stderr": ""}
+    except Exception:
+        return None, {"note": "file_size_0", "stderr": ""}
+
+    cmd = [ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error", "-i", file_path]
+    cmd += ffmpeg_audio_output_args("pipe:1", sample_rate)
+    _log(f"ffmpeg_cmd={_format_cmd(cmd)}")
+    try:
+        proc = subprocess.run(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=timeout_sec,
+            check=False,
+        )
+    except subprocess.TimeoutExpired:
+        return None, {"note": "timeout", "stderr": ""}
+    except Exception:
+        return None, {"note": "ffmpeg_error", "stderr": ""}
+
+    stderr = (proc.stderr.decode("utf-8", errors="ignore") or "").strip()
+    if proc.returncode != 0:
+        note = "ffmpeg_extract_failed"
+        if stderr:
+            note = f"ffmpeg_extract_failed:{stderr[:160]}"
+        return None, {"note": note, "stderr": stderr}
+    samples = pcm16_to_float32(proc.stdout or b"")
+    if samples.size == 0:
+        return None, {"note": "ffmpeg_no_audio", "stderr": stderr}
+    return samples, {"note": "ok", "stderr": stderr, "method": "ffmpeg_pipe"}
+
+
+class AudioContext:
+    """
+    Einmal pro Request dekodiertes Audio, das alle Audio-Engines gemeinsam nutzen.
+    wav() liefert bei WAV-Dateien die Originalrate, pcm() immer mono float32 mit
+    TARGET_SAMPLE_RATE (16 kHz): direkt aus der WAV, aus einem vorab gelieferten
+    Audiostrom (prime, z.B. aus dem Video-Frame-Store) oder aus genau einem ffmpeg-Lauf.
+    Die Arrays sind schreibgeschuetzt und duerfen nicht veraendert werden.
+    """
+
+    def __init__(self, path: str, sample_rate=TARGET_SAMPLE_RATE, timeout_sec=None):
+        self.path = path
+        self.sample_rate = int(sample_rate)
+        self.timeout_sec = timeout_sec
+        self.decodes = 0
+        self._lock = threading.RLock()
+        self._cache = {}
+
+    def _get(self, key, factory):
+        if key in self._cache:
+            return self._cache[key]
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = factory()
+            return self._cache[key]
+
+    def _read_wav(self):
+        if not (self.path or "").lower().endswith(".wav"):
+            return None, None
+        try:
+            samples, sample_rate, _ = read_wav(self.path)
+        except Exception:
+            return None, None
+        if samples is None:
+            return None, None
+        samples.flags.writeable = False
+        return samples, sample_rate
+
+    def wav(self):
+        """(samples, sample_rate) der WAV-Datei in Originalrate oder (None, None)."""
+        return self._get("wav", self._read_wav)
+
+    def _decode_pcm(self):
+        samples, sample_rate = self.wav()
+        if samples is not None and sample_rate == self.sample_rate:
+            return samples, sample_rate, {"note": "ok", "method": "wav"}
+        samples, meta = decode_audio_pipe(self.path, self.sample_rate, self.timeout_sec)
+        self.decodes += 1
+        _log(f"decoded samples={0 if samples is None else samples.size} note={meta.get('note')}")
+        if samples is None:
+            return None, None, meta
+        samples.flags.writeable = False
+        return samples, self.sample_rate, meta
+
+    def pcm(self):
+        """(samples|None, sample_rate, meta) als mono float32 mit 16 kHz."""
+        return self._get("pcm", self._decode_pcm)
+
+    def _select_speech(self, kind):
+        samples, sample_rate = self.wav() if kind == "wav" else self.pcm()[:2]
+        if samples is None:
+            return None, sample_rate, None
+        selected, selection = select_speech(samples, sample_rate)
+        selected.flags.writeable = False
+        _log(
+            f"vad kind={kind} total_s={selection['total_s']} speech_s={selection['speech_s']} "
+            f"selected_s={selection['selected_s']} note={selection['note']}"
+        )
+        return selected, sample_rate, selection
+
+    def speech(self, kind="pcm"):
+        """
+        (samples, sample_rate, selection) nach VAD-Auswahl ueber pcm() bzw. wav(); einmal pro
+        Request berechnet, alle Engines sehen dieselben Abschnitte.
+        """
+        if kind == "wav" and self.wav()[1] == self.sample_rate:
+            kind = "pcm"
+        return self._get(("speech", kind), lambda: self._select_speech(kind))
+
+    def wants_pcm(self):
+        """True, solange noch niemand die 16-kHz-Samples dekodiert oder geliefert hat."""
+        return "pcm" not in self._cache
+
+    def prime(self, samples, meta=None):
+        """Uebernimmt bereits dekodierte 16-kHz-Samples (z.B. aus dem Video-Demux)."""
+        if samples is None or len(samples) == 0:
+            return False
+        samples = np.asarray(samples, dtype=np.float32)
+        samples.flags.writeable = False
+        with self._lock:
+            if "pcm" in self._cache:
+                return False
+            meta = dict(meta or {})
+            meta.setdefault("note", "ok")
+            self._cache["pcm"] = (samples, self.sample_rate, meta)
+        return True
+
+    def close(self):
+        with self._lock:
+            self._cache = {}
+
+
+_SCOPES_LOCK = threading.Lock()
+_SCOPES = {}
+
+
+def _scope_key(path: str) -> str:
+    return os.path.abspath(path or "")
+
+
+@contextlib.contextmanager
+def audio_context_scope(path: str):
+    """
+    Liefert den AudioContext fuer path. Verschachtelte Scopes (Server + Ensemble, auch aus
+    verschiedenen Threads) teilen sich dieselbe Instanz; der letzte Scope gibt die Samples frei.
+    """
+    key = _scope_key(path)
+    with _SCOPES_LOCK:
+        entry = _SCOPES.get(key)
+        if entry is None:
+            entry = [AudioContext(path), 0]
+            _SCOPES[key] = entry
+        entry[1] += 1
+    try:
+        yield entry[0]
+    finally:
+        close_context = False
+        with _SCOPES_LOCK:
+            entry[1] -= 1
+            if entry[1] <= 0 and _SCOPES.get(key) is entry:
+                _SCOPES.pop(key, None)
+                close_context = True
+        if close_context:
+            entry[0].close()
+
+
+def active_audio_context(path: str):
+    """AudioContext eines offenen Scopes fuer path oder None."""
+    with _SCOPES_LOCK:
+        entry = _SCOPES.get(_scope_key(path))
+    return entry[0] if entry is not None else None
+
+
+def get_audio_context(path: str):
+    """AudioContext des offenen Scopes fuer path; ausserhalb eines Scopes ein eigener (ungeteilt)."""
+    context = active_audio_context(path)
+    return context if context is not None else AudioContext(path)
@@ -0,0 +1,94 @@
+import os
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+
+def block_frames():
+    """Frames pro Block fuer FFT-Auswertungen; begrenzt den Speicher auch bei langen Dateien."""
+    try:
+        return max(1, int(os.getenv("AIREALCHECK_AUDIO_STFT_BLOCK_FRAMES", "4096")))
+    except Exception:
+        return 4096
+
+
+def frame_count(length, frame_size, hop):
+    """Anzahl Frames; kuerzere Signale ergeben einen (aufgefuellten) Frame."""
+    if length < frame_size:
+        return 1
+    return 1 + (length - frame_size) // hop
+
+
+def frame_matrix(samples, frame_size, hop):
+    """
+    (N, frame_size)-Sicht auf samples mit Frame-Start i * hop, ohne Kopie (as_strided, read-only).
+    Signale kuerzer als frame_size liefern einen mit Nullen aufgefuellten Frame (Kopie).
+    """
+    samples = np.ascontiguousarray(samples, dtype=np.float32)
+    frame_size = int(frame_size)
+    hop = max(1, int(hop))
+    if len(samples) < frame_size:
+        frame = np.zeros((1, frame_size), dtype=np.float32)
+        frame[0, : len(samples)] = samples
+        return frame
+    count = frame_count(len(samples), frame_size, hop)
+    stride = samples.strides[0]
+    return as_strided(samples, shape=(count, frame_size), strides=(hop * stride, stride), writeable=False)
+
+
+def iter_frame_blocks(frames, block_size=None):
+    """(Start, Block) ueber die Zeilen von frames in Bloecken von block_size Frames."""
+    block_size = block_frames() if block_size is None else max(1, int(block_size))
+    for start in range(0, frames.shape[0], block_size):
+        yield start, frames[start : start + block_size]
+
+
+def frame_rms(frames):
+    """RMS je Frame (float32), ohne (N, frame_size)-Zwischenarray der Quadrate."""
+    frames = np.asarray(frames, dtype=np.float32)
+    if frames.shape[0] == 0:
+        return np.zeros(0, dtype=np.float32)
+    return np.sqrt(np.einsum("ij,ij->i", frames, frames) / float(frames.shape[1])).astype(np.float32)
+
+
+def magnitude_spectrum(frames, window):
+    """|rfft(frames * window)| fuer alle Frames in einem Aufruf."""
+    return np.abs(np.fft.rfft(frames * window, axis=1))
+
+
+def spectral_centroid(magnitudes, freqs):
+    """Spektraler Schwerpunkt je Frame; NaN fuer Frames ohne Energie."""
+    mag_sum = magnitudes.sum(axis=1)
+    weighted = magnitudes.dot(freqs)
+    centroid = np.full(mag_sum.shape, np.nan, dtype=np.float64)
+    np.divide(weighted, mag_sum, out=centroid, where=mag_sum > 0)
+    return centroid
+
+
+def frame_features(samples, sample_rate, frame_size, hop, block_size=None):
+    """
+    Spektrales Frontend: RMS und spektraler Schwerpunkt (Hann-Fenster) fuer alle Frames.
+    Die FFT laeuft blockweise ueber die strided Frame-Matrix; es wird kein Frame ausgelassen.
+    """
+    frames = frame_matrix(samples, frame_size, hop)
+    window = np.hanning(frame_size).astype(np.float32)
+    freqs = np.fft.rfftfreq(frame_size, d=1.0 / float(sample_rate))
+    rms = np.empty(frames.shape[0], dtype=np.float32)
+    centroid = np.empty(frames.shape[0], dtype=np.float64)
+    for start, block in iter_frame_blocks(frames, block_size):
+        stop = start + block.shape[0]
+        rms[start:stop] = frame_rms(block)
+        centroid[start:stop] = spectral_centroid(magnitude_spectrum(block, window), freqs)
+    return {"rms": rms, "centroid": centroid, "frame_size": int(frame_size), "hop": int(hop)}
+
+
+def segment_starts(length, window, hop):
+    """Startpositionen fester Fenster (window, hop in Samples); das letzte endet buendig am Signalende."""
+    window = int(window)
+    hop = max(1, int(hop))
+    if length <= window:
+        return [0]
+    starts = list(range(0, length - window + 1, hop))
+    if starts[-1] + window < length:
+        starts.append(length - window)
+    return starts
@@ -0,0 +1,144 @@
+import os
+
+import numpy as np
+
+from Backend.audio_frames import frame_matrix, frame_rms, iter_frame_blocks
+
+
+def vad_enabled():
+    return os.getenv("AIREALCHECK_AUDIO_VAD", "false").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return float(default)
+
+
+def vad_budget_sec():
+    """Rechenbudget: so viele Sekunden Sprache sehen die Audio-Engines hoechstens."""
+    return max(1.0, _env_float("AIREALCHECK_AUDIO_VAD_BUDGET_SEC", 30.0))
+
+
+def vad_max_segment_sec():
+    """Lange Sprachabschnitte werden in Stuecke dieser Laenge geteilt und einzeln bewertet."""
+    return max(0.5, _env_float("AIREALCHECK_AUDIO_VAD_MAX_SEGMENT_SEC", 10.0))
+
+
+def frame_zcr(frames):
+    """Zero-Crossing-Rate je Frame, blockweise ueber die Frame-Matrix."""
+    zcr = np.empty(frames.shape[0], dtype=np.float32)
+    for start, block in iter_frame_blocks(frames):
+        signs = np.signbit(block)
+        zcr[start : start + block.shape[0]] = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+    return zcr
+
+
+def _runs(mask):
+    """(start, stop)-Paare zusammenhaengender True-Bereiche, stop exklusiv."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist()))
+
+
+def speech_mask(samples, sample_rate, frame_ms=30.0, hop_ms=10.0, margin_db=10.0, max_zcr=0.35):
+    """
+    Energie/ZCR-VAD: Sprache = Energie mindestens margin_db ueber dem Rauschboden
+    (10. Perzentil) und nicht rauschartig (ZCR unter max_zcr). Luecken unter 200 ms werden
+    geschlossen, Inseln unter 250 ms verworfen. Liefert (Maske, Energie in dB, Rauschboden, Frame, Hop).
+    """
+    frame_size = max(16, int(round(sample_rate * frame_ms / 1000.0)))
+    hop = max(1, int(round(sample_rate * hop_ms / 1000.0)))
+    frames = frame_matrix(samples, frame_size, hop)
+    energy_db = 20.0 * np.log10(frame_rms(frames).astype(np.float64) + 1e-10)
+    noise_floor = float(np.percentile(energy_db, 10))
+    threshold = max(noise_floor + margin_db, -55.0)
+    mask = (energy_db > threshold) & (frame_zcr(frames) < max_zcr)
+
+    max_gap = int(round(200.0 / hop_ms))
+    for start, stop in _runs(~mask):
+        if 0 < start and stop < len(mask) and stop - start < max_gap:
+            mask[start:stop] = True
+    min_run = int(round(250.0 / hop_ms))
+    for start, stop in _runs(mask):
+        if stop - start < min_run:
+            mask[start:stop] = False
+    return mask, energy_db, noise_floor, frame_size, hop
+
+
+def select_speech(samples, sample_rate, budget_sec=None, max_segment_sec=None, pad_ms=100.0):
+    """
+    Waehlt die staerksten Sprachabschnitte bis zum Budget und haengt sie in zeitlicher Reihenfolge
+    aneinander. Liefert (samples, selection); ohne erkannte Sprache das unveraenderte Signal.
+    """
+    budget_sec = vad_budget_sec() if budget_sec is None else float(budget_sec)
+    max_segment_sec = vad_max_segment_sec() if max_segment_sec is None else float(max_segment_sec)
+    total = len(samples)
+    selection = {
+        "total_s": round(total / float(sample_rate), 3) if sample_rate else 0.0,
+        "budget_s": round(budget_sec, 3),
+        "speech_s": 0.0,
+        "selected_s": 0.0,
+        "segments": [],
+        "note": "ok",
+    }
+    if total == 0 or not sample_rate:
+        selection["note"] = "empty"
+        return samples, selection
+
+    mask, energy_db, noise_floor, frame_size, hop = speech_mask(samples, sample_rate)
+    pad = int(round(sample_rate * pad_ms / 1000.0))
+    chunk_frames = max(1, int(round(max_segment_sec * sample_rate / float(hop))))
+    candidates = []
+    speech_samples = 0
+    for start, stop in _runs(mask):
+        speech_samples += min(total, (stop - 1) * hop + frame_size) - start * hop
+        for chunk_start in range(start, stop, chunk_frames):
+            chunk_stop = min(stop, chunk_start + chunk_frames)
+            score = float(np.mean(energy_db[chunk_start:chunk_stop]) - noise_floor)
+            lo = max(0, chunk_start * hop - (pad if chunk_start == start else 0))
+            hi = min(total, (chunk_stop - 1) * hop + frame_size + (pad if chunk_stop == stop else 0))
+            candidates.append((score, lo, hi))
+    selection["speech_s"] = round(speech_samples / float(sample_rate), 3)
+    if not candidates:
+        selection["note"] = "no_speech"
+        selection["selected_s"] = selection["total_s"]
+        return samples, selection
+
+    budget = int(round(budget_sec * sample_rate))
+    chosen = []
+    used = 0
+    for score, lo, hi in sorted(candidates, key=lambda c: c[0], reverse=True):
+        if used >= budget:
+            break
+        hi = min(hi, lo + budget - used)
+        chosen.append((lo, hi))
+        used += hi - lo
+    chosen.sort()
+    merged = []
+    for lo, hi in chosen:
+        if merged and lo <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+
+    selected = np.concatenate([samples[lo:hi] for lo, hi in merged])
+    selection["selected_s"] = round(len(selected) / float(sample_rate), 3)
+    selection["segments"] = [
+        [round(lo / float(sample_rate), 2), round(hi / float(sample_rate), 2)] for lo, hi in merged
+    ]
+    return selected, selection
+
+
+def selection_signals(selection):
+    """Signale fuer Benchmarks: Anteil der gerechneten Sekunden und gewaehlte Abschnitte."""
+    total = selection.get("total_s") or 0.0
+    ratio = (selection.get("selected_s") or 0.0) / total if total else 1.0
+    return [
+        {"name": "vad_total_s", "value": selection.get("total_s"), "type": "meta"},
+        {"name": "vad_speech_s", "value": selection.get("speech_s"), "type": "meta"},
+        {"name": "vad_selected_s", "value": selection.get("selected_s"), "type": "meta"},
+        {"name": "vad_compute_ratio", "value": round(ratio, 4), "type": "meta"},
+        {"name": "vad_segments", "value": selection.get("segments") or [], "type": "timeline"},
+        {"name": "vad_note", "value": selection.get("note"), "type": "meta"},
+    ]
@@ -4,6 +4,8 @@ import base64
 import requests
 from dotenv import load_dotenv
 from PIL import Image, ImageOps
+
+from Backend.engines.provider_http import provider_request
 try:
     import pillow_heif  # optional fÃ¼r HEIC/AVIF
     pillow_heif.register_heif_opener()
@@ -29,12 +31,6 @@ def _paid_apis_enabled():
     return os.getenv("AIREALCHECK_USE_PAID_APIS", "false").lower() in {"1", "true", "yes"}
 
 
-def _paid_api_timeouts():
-    connect = float(os.getenv("AIREALCHECK_PAID_API_CONNECT_TIMEOUT_SEC", "8"))
-    read = float(os.getenv("AIREALCHECK_PAID_API_READ_TIMEOUT_SEC", "45"))
-    return connect, read
-
-
 def _normalize_classes(classes):
     """Mappt unterschiedliche Bezeichner auf 'real'/'fake' und liefert Scores in [0, 100]."""
     real = None
@@ -166,7 +162,7 @@ def analyze_with_hive(file_path: str):
         nonlocal auth_error
         payload = {"model": model_name, "input": [{"image": v} for v in variants]}
         try:
-            r = requests.post(url, headers=headers, json=payload, timeout=_paid_api_timeouts())
+            r = provider_request("hive", "POST", url, headers=headers, json=payload)
         except requests.RequestException as e:
             return None, [f"{model_name}: {str(e)}"]
 
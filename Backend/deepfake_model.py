@@ -10,6 +10,8 @@ except Exception:
 import io
 import os
 import random
+import threading
+import time
 try:
     import numpy as np
 except Exception:
@@ -48,11 +50,30 @@ def determinism_enabled() -> bool:
 
 from PIL import Image, ImageOps
 
+try:
+    from Backend.image_context import get_image_context
+except Exception:
+    get_image_context = None
+
+from Backend.inference_server import InferenceUnavailable, infer, remote_inference_enabled
+
 
 def _local_preprocess_enabled() -> bool:
     return os.getenv("AIREALCHECK_IMAGE_LOCAL_PREPROCESS", "true").lower() in {"1", "true", "yes", "on"}
 
 
+def _batched_inference_enabled() -> bool:
+    return os.getenv("AIREALCHECK_XCEPTION_BATCHED", "true").lower() in {"1", "true", "yes", "on"}
+
+
+def _max_batch_size() -> int:
+    try:
+        value = int(os.getenv("AIREALCHECK_XCEPTION_MAX_BATCH", "32") or 32)
+    except Exception:
+        value = 32
+    return max(1, value)
+
+
 def _to_rgb(img: Image.Image) -> Image.Image:
     if img.mode == "RGB":
         return img
@@ -65,6 +86,8 @@ def _to_rgb(img: Image.Image) -> Image.Image:
 
 
 def _load_image(path: str) -> Image.Image:
+    if get_image_context is not None:
+        return _to_rgb(get_image_context(path).oriented_image.copy())
     with Image.open(path) as img:
         img = ImageOps.exif_transpose(img)
         img.load()
@@ -135,8 +158,26 @@ def _median(values):
     return (vals[mid - 1] + vals[mid]) / 2.0
 
 
+def _load_checked_state(model, state, weights_path=None):
+    """
+    Gewichte strikt laden: fehlende oder fremde Keys heissen falsche Datei oder Architektur,
+    und ein halb initialisiertes Modell wuerde still Zufallswerte liefern. Der Fehler landet
+    ueber get_detector() in detector_status()["error"].
+    """
+    if isinstance(state, dict) and state and all(str(k).startswith("module.") for k in state):
+        state = {str(k)[len("module."):]: v for k, v in state.items()}
+    result = model.load_state_dict(state, strict=False)
+    missing = list(getattr(result, "missing_keys", []) or [])
+    unexpected = list(getattr(result, "unexpected_keys", []) or [])
+    if missing or unexpected:
+        raise RuntimeError(
+            f"weights_mismatch path={weights_path} missing={len(missing)} {missing[:3]} "
+            f"unexpected={len(unexpected)} {unexpected[:3]}"
+        )
+
+
 class DeepFakeDetector:
-    def __init__(self):
+    def __init__(self, weights_path=None):
         # Modell laden (Xception - oft fuer Deepfake-Erkennung genutzt)
         if torch is None or timm is None or transforms is None:
             raise RuntimeError(
@@ -145,7 +186,14 @@ class DeepFakeDetector:
             )
 
         _enable_determinism()
-        self.model = timm.create_model('xception', pretrained=True, num_classes=2)
+        if weights_path:
+            self.model = timm.create_model('xception', pretrained=False, num_classes=2)
+            state = torch.load(weights_path, map_location="cpu")
+            if isinstance(state, dict) and isinstance(state.get("state_dict"), dict):
+                state = state["state_dict"]
+            _load_checked_state(self.model, state, weights_path)
+        else:
+            self.model = timm.create_model('xception', pretrained=True, num_classes=2)
         self.model.eval()
 
         # Transformationen fuer Eingabebilder (deterministic per crop)
@@ -154,7 +202,7 @@ class DeepFakeDetector:
             transforms.Normalize([0.5, 0.5, 0.5], [0.5, 0.5, 0.5])
         ])
 
-    def _random_crop(self, img, crop_size=224):
+    def _random_crop(self, img, crop_size=224, rng=None):
         width, height = img.size
         if width < crop_size or height < crop_size:
             scale = max(crop_size / max(1, width), crop_size / max(1, height))
@@ -164,27 +212,28 @@ class DeepFakeDetector:
             width, height = img.size
         if width == crop_size and height == crop_size:
             return img
-        left = random.randint(0, width - crop_size)
-        top = random.randint(0, height - crop_size)
+        rng = rng or random
+        left = rng.randint(0, width - crop_size)
+        top = rng.randint(0, height - crop_size)
         return img.crop((left, top, left + crop_size, top + crop_size))
 
-    def predict(self, image_input):
-        if isinstance(image_input, Image.Image):
-            img = _to_rgb(image_input)
-        else:
-            img = _load_image(image_input)
-        fake_probs = []
-        samples = 5
-        crop_size = 224
+    def _sample_crops(self, img, rng=None, samples=5, crop_size=224):
+        return [self._random_crop(img, crop_size=crop_size, rng=rng) for _ in range(samples)]
 
+    def _forward_fake_probs(self, crops, max_batch=1):
+        max_batch = max(1, int(max_batch or 1))
+        fake_probs = []
         with torch.no_grad():
-            for _ in range(samples):
-                crop = self._random_crop(img, crop_size=crop_size)
-                tensor = self.transform(crop).unsqueeze(0)
+            for offset in range(0, len(crops), max_batch):
+                chunk = crops[offset:offset + max_batch]
+                tensor = torch.stack([self.transform(crop) for crop in chunk], dim=0)
                 output = self.model(tensor)
-                probs = torch.softmax(output, dim=1)[0]
-                fake_probs.append(float(probs[1]))
+                probs = torch.softmax(output, dim=1)
+                fake_probs.extend(float(p) for p in probs[:, 1])
+        return fake_probs
 
+    @staticmethod
+    def _summarize(fake_probs, samples):
         if not fake_probs:
             raise RuntimeError("no_crops")
 
@@ -224,6 +273,226 @@ class DeepFakeDetector:
             result["warning"] = "high_variance"
         return result
 
+    def predict(self, image_input, rng=None):
+        if isinstance(image_input, Image.Image):
+            img = _to_rgb(image_input)
+        else:
+            img = _load_image(image_input)
+        samples = 5
+        crops = self._sample_crops(img, rng=rng, samples=samples)
+        fake_probs = self._forward_fake_probs(crops, max_batch=1)
+        return self._summarize(fake_probs, samples)
+
+    def predict_batch(self, images, rng=None, max_batch=32):
+        """
+        Wie predict() fuer mehrere Bilder, aber alle Crops aller Bilder in gemeinsamen
+        Forward-Passes (max. max_batch Crops pro Pass). Crops werden in derselben
+        Reihenfolge gezogen wie bei sequentiellen predict()-Aufrufen.
+        Liefert pro Bild ein Ergebnis-Dict oder None, falls das Bild nicht verarbeitet werden konnte.
+        """
+        samples = 5
+        crop_groups = []
+        for image_input in images:
+            try:
+                if isinstance(image_input, Image.Image):
+                    img = _to_rgb(image_input)
+                else:
+                    img = _load_image(image_input)
+                crop_groups.append(self._sample_crops(img, rng=rng, samples=samples))
+            except Exception:
+                crop_groups.append(None)
+
+        flat = [crop for group in crop_groups if group for crop in group]
+        if not flat:
+            return [None for _ in crop_groups]
+        fake_probs = self._forward_fake_probs(flat, max_batch=max_batch)
+
+        results = []
+        offset = 0
+        for group in crop_groups:
+            if not group:
+                results.append(None)
+                continue
+            probs = fake_probs[offset:offset + len(group)]
+            offset += len(group)
+            try:
+                results.append(self._summarize(probs, samples))
+            except Exception:
+                results.append(None)
+        return results
+
+
+# Prozessweites Modell-Registry: einmal pro Worker laden, bei geaenderter Gewichtsdatei neu laden.
+_DETECTOR_LOCK = threading.Lock()
+_DETECTOR_CACHE = {
+    "detector": None,
+    "weights_path": None,
+    "weights_mtime": None,
+    "load_ms": None,
+    "param_mb": None,
+    "rss_mb": None,
+    "loaded_at": None,
+    "loads": 0,
+    "error": None,
+}
+
+
+def _resolve_weights_path():
+    path = (os.getenv("AIREALCHECK_XCEPTION_WEIGHTS_PATH") or "").strip()
+    return path or None
+
+
+def _weights_mtime(path):
+    if not path:
+        return None
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def _process_rss_mb():
+    try:
+        with open("/proc/self/statm", "r", encoding="utf-8") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024.0 * 1024.0), 1)
+    except Exception:
+        pass
+    try:
+        import resource
+
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak_kb / 1024.0, 1)
+    except Exception:
+        return None
+
+
+def _param_mb(model):
+    try:
+        total = sum(p.numel() * p.element_size() for p in model.parameters())
+        total += sum(b.numel() * b.element_size() for b in model.buffers())
+        return round(total / (1024.0 * 1024.0), 1)
+    except Exception:
+        return None
+
+
+def _needs_reload(weights_path):
+    if _DETECTOR_CACHE["detector"] is None:
+        return True
+    if weights_path != _DETECTOR_CACHE["weights_path"]:
+        return True
+    if weights_path and _weights_mtime(weights_path) != _DETECTOR_CACHE["weights_mtime"]:
+        return True
+    return False
+
+
+def get_detector():
+    """
+    Liefert den residenten DeepFakeDetector dieses Prozesses.
+    Laedt das Modell beim ersten Aufruf (thread-safe) und erneut, wenn sich
+    AIREALCHECK_XCEPTION_WEIGHTS_PATH oder die mtime der Gewichtsdatei aendert.
+    """
+    weights_path = _resolve_weights_path()
+    if not _needs_reload(weights_path):
+        return _DETECTOR_CACHE["detector"]
+    with _DETECTOR_LOCK:
+        if not _needs_reload(weights_path):
+            return _DETECTOR_CACHE["detector"]
+        mtime = _weights_mtime(weights_path)
+        start = time.time()
+        try:
+            detector = DeepFakeDetector(weights_path=weights_path)
+        except Exception as exc:
+            _DETECTOR_CACHE["error"] = f"{type(exc).__name__}:{str(exc)[:160]}"
+            if _DETECTOR_CACHE["detector"] is not None:
+                print(f"[xception] reload failed, keeping previous model: {_DETECTOR_CACHE['error']}")
+                return _DETECTOR_CACHE["detector"]
+            raise
+        load_ms = int((time.time() - start) * 1000)
+        _DETECTOR_CACHE.update(
+            {
+                "detector": detector,
+                "weights_path": weights_path,
+                "weights_mtime": mtime,
+                "load_ms": load_ms,
+                "param_mb": _param_mb(getattr(detector, "model", None)),
+                "rss_mb": _process_rss_mb(),
+                "loaded_at": time.time(),
+                "loads": int(_DETECTOR_CACHE["loads"]) + 1,
+                "error": None,
+            }
+        )
+        print(
+            f"[xception] model loaded load_ms={load_ms} params_mb={_DETECTOR_CACHE['param_mb']} "
+            f"rss_mb={_DETECTOR_CACHE['rss_mb']} weights={weights_path or 'timm_pretrained'}"
+        )
+        return detector
+
+
+def warm_detector():
+    """Laedt das Modell vorab (z.B. beim Worker-Start); Fehler werden nur geloggt."""
+    try:
+        get_detector()
+        return True
+    except Exception as exc:
+        _DETECTOR_CACHE["error"] = f"{type(exc).__name__}:{str(exc)[:160]}"
+        print(f"[xception] warmup failed: {_DETECTOR_CACHE['error']}")
+        return False
+
+
+def detector_status():
+    return {
+        "loaded": _DETECTOR_CACHE["detector"] is not None,
+        "weights_path": _DETECTOR_CACHE["weights_path"],
+        "load_ms": _DETECTOR_CACHE["load_ms"],
+        "param_mb": _DETECTOR_CACHE["param_mb"],
+        "rss_mb": _DETECTOR_CACHE["rss_mb"],
+        "loaded_at": _DETECTOR_CACHE["loaded_at"],
+        "loads": _DETECTOR_CACHE["loads"],
+        "error": _DETECTOR_CACHE["error"],
+    }
+
+
+def reset_detector():
+    with _DETECTOR_LOCK:
+        _DETECTOR_CACHE.update({"detector": None, "weights_path": None, "weights_mtime": None})
+
+
+def serve_info():
+    """Inference-Server: Modell laden und Status melden."""
+    try:
+        get_detector()
+    except Exception as exc:
+        return {"available": False, "meta": {"reason": "model_load_failed", "error": f"{type(exc).__name__}:{str(exc)[:160]}"}}
+    return {"available": True, "meta": detector_status()}
+
+
+def serve_fake_probs(crops):
+    """Inference-Server: fake-Wahrscheinlichkeiten fuer uint8-Crops (HxWx3) aus mehreren Requests."""
+    detector = get_detector()
+    images = [Image.fromarray(np.asarray(crop, dtype=np.uint8)) for crop in crops]
+    return detector._forward_fake_probs(images, max_batch=_max_batch_size())
+
+
+class RemoteDeepFakeDetector(DeepFakeDetector):
+    """
+    Wie DeepFakeDetector (gleiche Crops, gleiche Auswertung), aber ohne lokales Modell:
+    die Forward-Passes laufen gebuendelt im Inference-Server. Ist der Server weg, rechnet
+    der residente lokale Detector.
+    """
+
+    def __init__(self):
+        self.model = None
+        self.transform = None
+
+    def _forward_fake_probs(self, crops, max_batch=1):
+        try:
+            probs = infer("xception", [np.asarray(_to_rgb(crop), dtype=np.uint8) for crop in crops])
+            return [float(p) for p in probs]
+        except InferenceUnavailable as exc:
+            print(f"[xception] inference server unavailable, running locally: {exc}")
+            return get_detector()._forward_fake_probs(crops, max_batch=max_batch)
+
 
 # Einzeltest (optional)
 if __name__ == "__main__":
@@ -240,7 +509,8 @@ def analyze_with_xception(file_path: str):
     Nutzt die DeepFakeDetector-Klasse, um ein Bild zu analysieren.
     """
     _enable_determinism()
-    detector = DeepFakeDetector()
+    detector = RemoteDeepFakeDetector() if remote_inference_enabled("xception") else get_detector()
+    rng = random.Random(42)
     print("[OK] Deepfake XceptionNet Model aktiv - starte Analyse...")
     base_img = _load_image(file_path)
     variants = _build_variants(base_img)
@@ -250,11 +520,22 @@ def analyze_with_xception(file_path: str):
     crop_stddevs = []
     warnings = []
 
-    for name, img in variants:
+    if _batched_inference_enabled():
         try:
-            res = detector.predict(img)
+            variant_results = detector.predict_batch(
+                [img for _name, img in variants], rng=rng, max_batch=_max_batch_size()
+            )
         except Exception:
-            continue
+            variant_results = [None for _ in variants]
+    else:
+        variant_results = []
+        for _name, img in variants:
+            try:
+                variant_results.append(detector.predict(img, rng=rng))
+            except Exception:
+                variant_results.append(None)
+
+    for (name, _img), res in zip(variants, variant_results):
         if not isinstance(res, dict):
             continue
         try:
@@ -271,7 +552,7 @@ def analyze_with_xception(file_path: str):
             pass
 
     if not variant_scores:
-        result = detector.predict(base_img)
+        result = detector.predict(base_img, rng=rng)
         result["details"] = ["Model: XceptionNet (pretrained DeepFake)"]
         return result
 
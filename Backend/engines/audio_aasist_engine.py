@@ -1,9 +1,5 @@
 import os
-import shutil
-import subprocess
-import tempfile
 import time
-import wave
 
 import numpy as np
 
@@ -11,15 +7,22 @@ try:
     from Backend.vendor.aasist import (
         load_aasist_model,
         predict_spoof_prob,
+        predict_spoof_probs,
         resolve_weights_path,
     )
     _VENDOR_IMPORT_ERROR = None
 except Exception as exc:
     load_aasist_model = None
     predict_spoof_prob = None
+    predict_spoof_probs = None
     resolve_weights_path = None
     _VENDOR_IMPORT_ERROR = str(exc)[:240]
 
+from Backend.audio_context import get_audio_context
+from Backend.audio_frames import segment_starts
+from Backend.audio_vad import selection_signals, vad_enabled
+from Backend.inference_server import InferenceUnavailable, RemoteModel, remote_model
+
 
 ENGINE_NAME = "audio_aasist"
 _BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -77,154 +80,6 @@ def _result(
     return payload
 
 
-def _candidate_windows_ffmpeg_paths(exe_name: str):
-    localapp = os.getenv("LOCALAPPDATA") or ""
-    programdata = os.getenv("PROGRAMDATA") or ""
-    candidates = [
-        os.path.join(localapp, "Microsoft", "WinGet", "Links", exe_name),
-        os.path.join(programdata, "chocolatey", "bin", exe_name),
-        os.path.join("C:\\", "ffmpeg", "bin", exe_name),
-        os.path.join("C:\\", "Program Files", "ffmpeg", "bin", exe_name),
-        os.path.join("C:\\", "Program Files (x86)", "ffmpeg", "bin", exe_name),
-    ]
-    return [p for p in candidates if p and os.path.exists(p)]
-
-
-def _powershell_get_command(exe_name: str):
-    try:
-        proc = subprocess.run(
-            [
-                "powershell",
-                "-NoProfile",
-                "-Command",
-                f"(Get-Command {exe_name} -ErrorAction SilentlyContinue).Source",
-            ],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            timeout=2,
-            check=False,
-        )
-    except Exception:
-        return ""
-    if proc.returncode != 0:
-        return ""
-    output = (proc.stdout.decode("utf-8", errors="ignore") or "").strip()
-    return output if output and os.path.exists(output) else ""
-
-
-def _resolve_ffmpeg_path(exe_name: str):
-    env_path = (os.getenv("FFMPEG_PATH") or "").strip()
-    if env_path:
-        if os.path.isdir(env_path):
-            candidate = os.path.join(env_path, exe_name)
-            if os.path.exists(candidate):
-                return candidate
-        if os.path.exists(env_path):
-            return env_path
-    which_path = shutil.which(exe_name.replace(".exe", "")) or shutil.which(exe_name)
-    if which_path:
-        return which_path
-    ps_path = _powershell_get_command(exe_name)
-    if ps_path:
-        return ps_path
-    candidates = _candidate_windows_ffmpeg_paths(exe_name)
-    return candidates[0] if candidates else ""
-
-
-def _ffmpeg_path():
-    return _resolve_ffmpeg_path("ffmpeg.exe")
-
-
-def _extract_audio_ffmpeg(file_path, sample_rate=16000, timeout_sec=25):
-    ffmpeg = _ffmpeg_path()
-    if not ffmpeg or not os.path.exists(ffmpeg):
-        return "", {"note": "ffmpeg_not_installed", "stderr": ""}
-    if not os.access(ffmpeg, os.X_OK):
-        return "", {"note": "ffmpeg_not_executable", "stderr": ""}
-    if not os.path.exists(file_path):
-        return "", {"note": "file_missing", "stderr": ""}
-    try:
-        if os.path.getsize(file_path) <= 0:
-            return "", {"note": "file_size_0", "stderr": ""}
-    except Exception:
-        return "", {"note": "file_size_0", "stderr": ""}
-
-    tmpdir = tempfile.mkdtemp(prefix="audio_aasist_extract_")
-    out_path = os.path.join(tmpdir, "audio.wav")
-    cmd = [
-        ffmpeg,
-        "-y",
-        "-i",
-        file_path,
-        "-vn",
-        "-ac",
-        "1",
-        "-ar",
-        str(sample_rate),
-        "-acodec",
-        "pcm_s16le",
-        out_path,
-    ]
-    try:
-        proc = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            timeout=timeout_sec,
-            check=False,
-        )
-    except subprocess.TimeoutExpired:
-        shutil.rmtree(tmpdir, ignore_errors=True)
-        return "", {"note": "timeout", "stderr": ""}
-    except Exception:
-        shutil.rmtree(tmpdir, ignore_errors=True)
-        return "", {"note": "ffmpeg_error", "stderr": ""}
-
-    stderr = (proc.stderr.decode("utf-8", errors="ignore") or "").strip()
-    if proc.returncode != 0 or not os.path.exists(out_path):
-        note = "ffmpeg_extract_failed"
-        if stderr:
-            note = f"ffmpeg_extract_failed:{stderr[:160]}"
-        shutil.rmtree(tmpdir, ignore_errors=True)
-        return "", {"note": note, "stderr": stderr}
-
-    try:
-        if os.path.getsize(out_path) <= 0:
-            shutil.rmtree(tmpdir, ignore_errors=True)
-            return "", {"note": "ffmpeg_no_audio", "stderr": stderr}
-    except Exception:
-        shutil.rmtree(tmpdir, ignore_errors=True)
-        return "", {"note": "ffmpeg_no_audio", "stderr": stderr}
-
-    return out_path, {"note": "ok", "stderr": stderr, "tmpdir": tmpdir}
-
-
-def _read_wav(path):
-    with wave.open(path, "rb") as wf:
-        channels = wf.getnchannels()
-        sample_rate = wf.getframerate()
-        sample_width = wf.getsampwidth()
-        frames = wf.getnframes()
-        data = wf.readframes(frames)
-
-    if frames <= 0:
-        return None, sample_rate, 0
-
-    if sample_width == 1:
-        audio = np.frombuffer(data, dtype=np.uint8).astype(np.float32)
-        audio = (audio - 128.0) / 128.0
-    elif sample_width == 2:
-        audio = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
-    elif sample_width == 4:
-        audio = np.frombuffer(data, dtype=np.int32).astype(np.float32) / 2147483648.0
-    else:
-        raise ValueError("unsupported_sample_width")
-
-    if channels > 1:
-        audio = audio.reshape(-1, channels).mean(axis=1)
-    return audio, sample_rate, frames
-
-
 def _build_signals(prob_spoof=None, duration_s=None, sample_rate_hz=16000, model_format=None):
     signals = [{"name": "model", "value": "AASIST", "type": "meta"}]
     if model_format:
@@ -290,6 +145,124 @@ def _load_model_cached():
     return _MODEL_CACHE["model"], _MODEL_CACHE["meta"]
 
 
+def _model_for_run():
+    """Modell im Inference-Server (falls aktiv und erreichbar), sonst das lokale."""
+    remote = remote_model("aasist")
+    if remote is not None:
+        return remote
+    return _load_model_cached()
+
+
+def _predict_batch(model, waves):
+    """(Spoof-Wahrscheinlichkeiten, Modell); nach einem Server-Ausfall ist das Modell das lokale."""
+    if isinstance(model, RemoteModel):
+        try:
+            return model.infer(waves), model
+        except InferenceUnavailable as exc:
+            print(f"[audio_aasist] inference server unavailable, running locally: {exc}")
+            model, meta = _load_model_cached()
+            if model is None:
+                raise RuntimeError(meta.get("reason") or "model_unavailable")
+    return predict_spoof_probs(model, waves), model
+
+
+def _predict(model, samples):
+    return _predict_batch(model, [samples])[0][0]
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return float(default)
+
+
+def _window_config(sample_rate=16000):
+    """
+    Fenster-Inferenz: Fenster/Hop in Samples, Batch-Groesse, Aggregation und Timeline-Laenge.
+    Standard ist aus (ein Durchlauf wie bisher), bis die Fenster-Scores neu kalibriert sind.
+    """
+    window_sec = max(0.0, _env_float("AIREALCHECK_AASIST_WINDOW_SEC", 0.0))
+    hop_sec = _env_float("AIREALCHECK_AASIST_WINDOW_HOP_SEC", window_sec / 2.0)
+    aggregate = (os.getenv("AIREALCHECK_AASIST_AGGREGATE") or "mean").strip().lower()
+    return {
+        "window": int(round(window_sec * sample_rate)),
+        "hop": max(1, int(round(max(0.1, hop_sec) * sample_rate))),
+        "batch_size": max(1, int(_env_float("AIREALCHECK_AASIST_BATCH_SIZE", 8))),
+        "aggregate": aggregate if aggregate in {"mean", "max", "topk"} else "mean",
+        "topk": max(1, int(_env_float("AIREALCHECK_AASIST_TOPK", 3))),
+        "timeline_max": max(1, int(_env_float("AIREALCHECK_AASIST_TIMELINE_MAX", 60))),
+        "sample_rate": int(sample_rate),
+    }
+
+
+def aggregate_segment_probs(probs, mode="mean", topk=3):
+    values = np.asarray(probs, dtype=np.float64)
+    if values.size == 0:
+        return None
+    if mode == "max":
+        return float(values.max())
+    if mode == "topk":
+        return float(np.sort(values)[-min(int(topk), values.size):].mean())
+    return float(values.mean())
+
+
+def _predict_windowed(model, samples, config):
+    """
+    Spoof-Wahrscheinlichkeit je Fenster (feste Laenge, ueberlappend); die Fenster laufen in
+    Batches von batch_size durch das Modell, der Speicher haengt nicht von der Dauer ab.
+    Liefert (aggregierte Wahrscheinlichkeit, Startpositionen, Wahrscheinlichkeiten je Fenster).
+    """
+    window = config["window"]
+    starts = segment_starts(len(samples), window, config["hop"])
+    probs = []
+    for offset in range(0, len(starts), config["batch_size"]):
+        waves = [samples[start : start + window] for start in starts[offset : offset + config["batch_size"]]]
+        batch_probs, model = _predict_batch(model, waves)
+        probs.extend(_clamp01(p) for p in batch_probs)
+    prob = aggregate_segment_probs(probs, config["aggregate"], config["topk"])
+    return prob, starts, probs
+
+
+def _segment_signals(config, starts, probs, total_samples):
+    """Fenster-Meta plus Timeline; lange Timelines werden auf timeline_max Abschnitte (Maximum) verdichtet."""
+    rate = float(config["sample_rate"])
+    window = config["window"]
+    timeline = []
+    for group in np.array_split(np.arange(len(starts)), min(len(starts), config["timeline_max"])):
+        if group.size == 0:
+            continue
+        timeline.append(
+            {
+                "start_s": round(starts[group[0]] / rate, 2),
+                "end_s": round(min(total_samples, starts[group[-1]] + window) / rate, 2),
+                "prob_spoof": round(max(probs[i] for i in group), 4),
+            }
+        )
+    return [
+        {"name": "segments", "value": len(starts), "type": "meta"},
+        {"name": "segment_window_s", "value": round(window / rate, 3), "type": "meta"},
+        {"name": "segment_hop_s", "value": round(config["hop"] / rate, 3), "type": "meta"},
+        {"name": "segment_aggregate", "value": config["aggregate"], "type": "meta"},
+        {"name": "prob_spoof_max", "value": round(max(probs), 4), "type": "score"},
+        {"name": "segment_timeline", "value": timeline, "type": "timeline"},
+    ]
+
+
+def serve_info():
+    """Inference-Server: Modell laden und Meta melden."""
+    model, meta = _load_model_cached()
+    return {"available": model is not None and callable(predict_spoof_probs), "meta": meta}
+
+
+def serve_spoof_probs(waves):
+    """Inference-Server: Spoof-Wahrscheinlichkeiten; gleich lange Signale teilen sich einen Forward-Pass."""
+    model, meta = _load_model_cached()
+    if model is None:
+        raise RuntimeError(meta.get("reason") or "model_unavailable")
+    return predict_spoof_probs(model, waves)
+
+
 def run_audio_aasist(file_path):
     start = time.time()
     weights_path = _weights_path()
@@ -317,177 +290,163 @@ def run_audio_aasist(file_path):
             warning=f"resolved_weights_path={weights_path}",
         )
 
-    tmp_dir = ""
-    try:
-        samples = None
-        sample_rate = None
-
-        if file_path.lower().endswith(".wav"):
-            try:
-                wav_samples, wav_sr, _ = _read_wav(file_path)
-                if wav_samples is not None and wav_sr == 16000:
-                    samples = wav_samples
-                    sample_rate = wav_sr
-            except Exception:
-                samples = None
-
-        if samples is None:
-            wav_path, meta = _extract_audio_ffmpeg(file_path, sample_rate=16000)
-            if not wav_path:
-                return _result(
-                    status="error",
-                    available=False,
-                    ai_likelihood=None,
-                    confidence=0.0,
-                    signals=[],
-                    notes=meta.get("note", "ffmpeg_extract_failed"),
-                    start_time=start,
-                )
-            tmp_dir = meta.get("tmpdir") or ""
-            try:
-                samples, sample_rate, _ = _read_wav(wav_path)
-            except Exception:
-                return _result(
-                    status="error",
-                    available=False,
-                    ai_likelihood=None,
-                    confidence=0.0,
-                    signals=[],
-                    notes="audio_decode_failed",
-                    start_time=start,
-                )
-
-        if samples is None or sample_rate is None or len(samples) == 0:
-            return _result(
-                status="error",
-                available=False,
-                ai_likelihood=None,
-                confidence=0.0,
-                signals=[],
-                notes="audio_decode_failed",
-                start_time=start,
-            )
+    context = get_audio_context(file_path)
+    samples, sample_rate, meta = context.pcm()
+    if samples is None:
+        return _result(
+            status="error",
+            available=False,
+            ai_likelihood=None,
+            confidence=0.0,
+            signals=[],
+            notes=meta.get("note", "ffmpeg_extract_failed"),
+            start_time=start,
+        )
 
-        duration_s = float(len(samples)) / float(sample_rate) if sample_rate else 0.0
-        warning = "short_audio" if duration_s < 2.0 else None
-
-        model, model_meta = _load_model_cached()
-        model_meta = model_meta if isinstance(model_meta, dict) else {}
-        model_format = model_meta.get("format")
-
-        if model is None:
-            reason = str(model_meta.get("reason") or "")
-            if reason == "weights_missing":
-                notes = f"weights_missing:{weights_path}"
-            elif reason in {"upstream_import_failed", "upstream_not_found", "model_constructor_missing", "vendor_import_failed"}:
-                notes = "upstream_import_failed"
-            elif reason in {"checkpoint_load_failed", "state_dict_load_failed", "state_dict_mismatch_no_compatible_keys"}:
-                notes = "checkpoint_load_failed"
-            else:
-                notes = "checkpoint_load_failed"
-
-            signals = _build_signals(
+    if samples is None or sample_rate is None or len(samples) == 0:
+        return _result(
+            status="error",
+            available=False,
+            ai_likelihood=None,
+            confidence=0.0,
+            signals=[],
+            notes="audio_decode_failed",
+            start_time=start,
+        )
+
+    # Optional nur die per VAD gewaehlten Sprachabschnitte (gemeinsam mit den anderen Audio-Engines).
+    vad_signals = []
+    if vad_enabled():
+        samples, sample_rate, selection = context.speech()
+        vad_signals = selection_signals(selection)
+
+    duration_s = float(len(samples)) / float(sample_rate) if sample_rate else 0.0
+    warning = "short_audio" if duration_s < 2.0 else None
+
+    model, model_meta = _model_for_run()
+    model_meta = model_meta if isinstance(model_meta, dict) else {}
+    model_format = model_meta.get("format")
+
+    if model is None:
+        reason = str(model_meta.get("reason") or "")
+        if reason == "weights_missing":
+            notes = f"weights_missing:{weights_path}"
+        elif reason in {"upstream_import_failed", "upstream_not_found", "model_constructor_missing", "vendor_import_failed"}:
+            notes = "upstream_import_failed"
+        elif reason in {"checkpoint_load_failed", "state_dict_load_failed", "state_dict_mismatch_no_compatible_keys"}:
+            notes = "checkpoint_load_failed"
+        else:
+            notes = "checkpoint_load_failed"
+
+        signals = _build_signals(
+            prob_spoof=None,
+            duration_s=duration_s,
+            sample_rate_hz=16000,
+            model_format=model_format,
+        )
+        reason_text = reason if reason else "model_not_loadable"
+        warning_parts = [reason_text]
+        if model_meta.get("error"):
+            warning_parts.append(str(model_meta.get("error")))
+        details = model_meta.get("details")
+        if isinstance(details, dict):
+            detail_reason = details.get("reason")
+            detail_errors = details.get("errors")
+            if detail_reason:
+                warning_parts.append(f"detail_reason={detail_reason}")
+            if isinstance(detail_errors, list) and detail_errors:
+                warning_parts.append("detail_errors=" + "|".join([str(e) for e in detail_errors[:2]]))
+        model_warning = _combine_warnings(*warning_parts)
+        sd_warn = _state_dict_warning(model_meta, prefix=model_warning)
+        if sd_warn:
+            model_warning = sd_warn
+        if warning:
+            model_warning = _combine_warnings(warning, model_warning)
+        return _result(
+            status="error",
+            available=False,
+            ai_likelihood=None,
+            confidence=0.0,
+            signals=signals,
+            notes=notes,
+            start_time=start,
+            warning=model_warning if model_warning else f"resolved_weights_path={weights_path}",
+        )
+
+    if not callable(predict_spoof_prob):
+        return _result(
+            status="error",
+            available=False,
+            ai_likelihood=None,
+            confidence=0.0,
+            signals=_build_signals(
                 prob_spoof=None,
                 duration_s=duration_s,
                 sample_rate_hz=16000,
                 model_format=model_format,
-            )
-            reason_text = reason if reason else "model_not_loadable"
-            warning_parts = [reason_text]
-            if model_meta.get("error"):
-                warning_parts.append(str(model_meta.get("error")))
-            details = model_meta.get("details")
-            if isinstance(details, dict):
-                detail_reason = details.get("reason")
-                detail_errors = details.get("errors")
-                if detail_reason:
-                    warning_parts.append(f"detail_reason={detail_reason}")
-                if isinstance(detail_errors, list) and detail_errors:
-                    warning_parts.append("detail_errors=" + "|".join([str(e) for e in detail_errors[:2]]))
-            model_warning = _combine_warnings(*warning_parts)
-            sd_warn = _state_dict_warning(model_meta, prefix=model_warning)
-            if sd_warn:
-                model_warning = sd_warn
-            if warning:
-                model_warning = _combine_warnings(warning, model_warning)
-            return _result(
-                status="error",
-                available=False,
-                ai_likelihood=None,
-                confidence=0.0,
-                signals=signals,
-                notes=notes,
-                start_time=start,
-                warning=model_warning if model_warning else f"resolved_weights_path={weights_path}",
-            )
-
-        if not callable(predict_spoof_prob):
-            return _result(
-                status="error",
-                available=False,
-                ai_likelihood=None,
-                confidence=0.0,
-                signals=_build_signals(
-                    prob_spoof=None,
-                    duration_s=duration_s,
-                    sample_rate_hz=16000,
-                    model_format=model_format,
-                ),
-                notes="upstream_import_failed",
-                start_time=start,
-            )
+            ),
+            notes="upstream_import_failed",
+            start_time=start,
+        )
 
-        try:
-            prob = _clamp01(predict_spoof_prob(model, samples.astype(np.float32)))
-        except Exception as exc:
-            infer_warning = str(exc)[:240]
-            if warning:
-                infer_warning = f"{warning};{infer_warning}"
-            return _result(
-                status="error",
-                available=False,
-                ai_likelihood=None,
-                confidence=0.0,
-                signals=_build_signals(
-                    prob_spoof=None,
-                    duration_s=duration_s,
-                    sample_rate_hz=16000,
-                    model_format=model_format,
-                ),
-                notes="inference_failed",
-                start_time=start,
-                warning=infer_warning,
+    window_config = _window_config(sample_rate)
+    windowed = 0 < window_config["window"] < len(samples)
+    segment_signals = []
+    try:
+        if windowed:
+            # Fenster sind Views auf den gemeinsamen Puffer; kopiert wird nur der jeweilige Batch.
+            prob, starts, segment_probs = _predict_windowed(
+                model, np.asarray(samples, dtype=np.float32), window_config
             )
-
-        confidence = min(0.95, 0.55 + abs(prob - 0.5))
-        if duration_s < 2.0:
-            confidence = min(confidence, 0.45)
-
-        success_warning = _state_dict_warning(model_meta)
+            prob = _clamp01(prob)
+            segment_signals = _segment_signals(window_config, starts, segment_probs, len(samples))
+        else:
+            prob = _clamp01(_predict(model, samples.astype(np.float32)))
+    except Exception as exc:
+        infer_warning = str(exc)[:240]
         if warning:
-            success_warning = _combine_warnings(warning, success_warning)
-
+            infer_warning = f"{warning};{infer_warning}"
         return _result(
-            status="ok",
-            available=True,
-            ai_likelihood=prob,
-            confidence=_clamp01(confidence),
+            status="error",
+            available=False,
+            ai_likelihood=None,
+            confidence=0.0,
             signals=_build_signals(
-                prob_spoof=prob,
+                prob_spoof=None,
                 duration_s=duration_s,
                 sample_rate_hz=16000,
                 model_format=model_format,
             ),
-            notes="aasist_upstream_ok",
+            notes="inference_failed",
             start_time=start,
-            warning=success_warning if success_warning else None,
+            warning=infer_warning,
+        )
+
+    confidence = min(0.95, 0.55 + abs(prob - 0.5))
+    if duration_s < 2.0:
+        confidence = min(confidence, 0.45)
+
+    success_warning = _state_dict_warning(model_meta)
+    if warning:
+        success_warning = _combine_warnings(warning, success_warning)
+
+    return _result(
+        status="ok",
+        available=True,
+        ai_likelihood=prob,
+        confidence=_clamp01(confidence),
+        signals=_build_signals(
+            prob_spoof=prob,
+            duration_s=duration_s,
+            sample_rate_hz=16000,
+            model_format=model_format,
         )
-    finally:
-        if tmp_dir:
-            try:
-                shutil.rmtree(tmp_dir, ignore_errors=True)
-            except Exception:
-                pass
+        + segment_signals
+        + vad_signals,
+        notes="aasist_upstream_ok;windowed" if windowed else "aasist_upstream_ok",
+        start_time=start,
+        warning=success_warning if success_warning else None,
+    )
 
 
 if __name__ == "__main__":
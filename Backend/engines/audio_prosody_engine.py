@@ -1,14 +1,16 @@
 import os
-import shutil
-import subprocess
-import tempfile
 import time
-import wave
 
 import numpy as np
 
+from Backend.audio_context import get_audio_context
+from Backend.audio_frames import frame_matrix, frame_rms, iter_frame_blocks
+from Backend.audio_vad import selection_signals, vad_enabled
+
 
 ENGINE_NAME = "audio_prosody"
+# Stimmhafte Frames pro FFT-Batch (bei 40 ms/16 kHz ca. 16 MB Autokorrelationen).
+_PITCH_BLOCK_FRAMES = 1024
 
 
 def _result(
@@ -37,165 +39,6 @@ def _result(
     return payload
 
 
-def _candidate_windows_ffmpeg_paths(exe_name: str):
-    localapp = os.getenv("LOCALAPPDATA") or ""
-    programdata = os.getenv("PROGRAMDATA") or ""
-    candidates = [
-        os.path.join(localapp, "Microsoft", "WinGet", "Links", exe_name),
-        os.path.join(programdata, "chocolatey", "bin", exe_name),
-        os.path.join("C:\\", "ffmpeg", "bin", exe_name),
-        os.path.join("C:\\", "Program Files", "ffmpeg", "bin", exe_name),
-        os.path.join("C:\\", "Program Files (x86)", "ffmpeg", "bin", exe_name),
-    ]
-    return [p for p in candidates if p and os.path.exists(p)]
-
-
-def _powershell_get_command(exe_name: str):
-    try:
-        proc = subprocess.run(
-            [
-                "powershell",
-                "-NoProfile",
-                "-Command",
-                f"(Get-Command {exe_name} -ErrorAction SilentlyContinue).Source",
-            ],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            timeout=2,
-            check=False,
-        )
-    except Exception:
-        return ""
-    if proc.returncode != 0:
-        return ""
-    output = (proc.stdout.decode("utf-8", errors="ignore") or "").strip()
-    return output if output and os.path.exists(output) else ""
-
-
-def _resolve_ffmpeg_path(exe_name: str):
-    env_path = (os.getenv("FFMPEG_PATH") or "").strip()
-    if env_path:
-        if os.path.isdir(env_path):
-            candidate = os.path.join(env_path, exe_name)
-            if os.path.exists(candidate):
-                return candidate
-        if os.path.exists(env_path):
-            return env_path
-    which_path = shutil.which(exe_name.replace(".exe", "")) or shutil.which(exe_name)
-    if which_path:
-        return which_path
-    ps_path = _powershell_get_command(exe_name)
-    if ps_path:
-        return ps_path
-    candidates = _candidate_windows_ffmpeg_paths(exe_name)
-    return candidates[0] if candidates else ""
-
-
-def _ffmpeg_path():
-    return _resolve_ffmpeg_path("ffmpeg.exe")
-
-
-def _extract_audio_ffmpeg(file_path, sample_rate=16000, timeout_sec=25):
-    ffmpeg = _ffmpeg_path()
-    if not ffmpeg or not os.path.exists(ffmpeg):
-        return "", {"note": "ffmpeg_not_installed", "stderr": ""}
-    if not os.access(ffmpeg, os.X_OK):
-        return "", {"note": "ffmpeg_not_executable", "stderr": ""}
-    if not os.path.exists(file_path):
-        return "", {"note": "file_missing", "stderr": ""}
-    try:
-        if os.path.getsize(file_path) <= 0:
-            return "", {"note": "file_size_0", "stderr": ""}
-    except Exception:
-        return "", {"note": "file_size_0", "stderr": ""}
-
-    tmpdir = tempfile.mkdtemp(prefix="audio_prosody_extract_")
-    out_path = os.path.join(tmpdir, "audio.wav")
-    cmd = [
-        ffmpeg,
-        "-y",
-        "-i",
-        file_path,
-        "-vn",
-        "-ac",
-        "1",
-        "-ar",
-        str(sample_rate),
-        "-acodec",
-        "pcm_s16le",
-        out_path,
-    ]
-    try:
-        proc = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            timeout=timeout_sec,
-            check=False,
-        )
-    except subprocess.TimeoutExpired:
-        shutil.rmtree(tmpdir, ignore_errors=True)
-        return "", {"note": "timeout", "stderr": ""}
-    except Exception:
-        shutil.rmtree(tmpdir, ignore_errors=True)
-        return "", {"note": "ffmpeg_error", "stderr": ""}
-
-    stderr = (proc.stderr.decode("utf-8", errors="ignore") or "").strip()
-    if proc.returncode != 0 or not os.path.exists(out_path):
-        note = "ffmpeg_extract_failed"
-        if stderr:
-            note = f"ffmpeg_extract_failed:{stderr[:160]}"
-        shutil.rmtree(tmpdir, ignore_errors=True)
-        return "", {"note": note, "stderr": stderr}
-
-    try:
-        if os.path.getsize(out_path) <= 0:
-            shutil.rmtree(tmpdir, ignore_errors=True)
-            return "", {"note": "ffmpeg_no_audio", "stderr": stderr}
-    except Exception:
-        shutil.rmtree(tmpdir, ignore_errors=True)
-        return "", {"note": "ffmpeg_no_audio", "stderr": stderr}
-
-    return out_path, {"note": "ok", "stderr": stderr, "tmpdir": tmpdir}
-
-
-def _read_wav(path):
-    with wave.open(path, "rb") as wf:
-        channels = wf.getnchannels()
-        sample_rate = wf.getframerate()
-        sample_width = wf.getsampwidth()
-        frames = wf.getnframes()
-        data = wf.readframes(frames)
-
-    if frames <= 0:
-        return None, sample_rate, 0
-
-    if sample_width == 1:
-        audio = np.frombuffer(data, dtype=np.uint8).astype(np.float32)
-        audio = (audio - 128.0) / 128.0
-    elif sample_width == 2:
-        audio = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
-    elif sample_width == 4:
-        audio = np.frombuffer(data, dtype=np.int32).astype(np.float32) / 2147483648.0
-    else:
-        raise ValueError("unsupported_sample_width")
-
-    if channels > 1:
-        audio = audio.reshape(-1, channels).mean(axis=1)
-    return audio, sample_rate, frames
-
-
-def _frame_iter(samples, frame_size, hop, step):
-    if len(samples) < frame_size:
-        frame = np.zeros(frame_size, dtype=np.float32)
-        if len(samples):
-            frame[: len(samples)] = samples
-        yield frame
-        return
-    for start in range(0, len(samples) - frame_size + 1, hop * step):
-        yield samples[start : start + frame_size]
-
-
 def _estimate_pitch_acf(frame, sample_rate, min_hz=60.0, max_hz=400.0, min_corr=0.3):
     if sample_rate <= 0:
         return None
@@ -226,6 +69,39 @@ def _estimate_pitch_acf(frame, sample_rate, min_hz=60.0, max_hz=400.0, min_corr=
     return float(sample_rate) / float(lag)
 
 
+def _estimate_pitch_batch(frames, sample_rate, min_hz=60.0, max_hz=400.0, min_corr=0.3):
+    """
+    Wie _estimate_pitch_acf fuer alle Zeilen von frames (M, N) auf einmal: Autokorrelation per
+    FFT (Wiener-Khinchin, |rfft|^2 -> irfft) und Peak-Suche ueber den Lag-Bereich als argmax.
+    Auffuellen auf N + max_lag genuegt, groessere Lags werden nicht gebraucht.
+    Liefert f0 in Hz je Frame, NaN wo kein Pitch gefunden wurde.
+    """
+    frames = np.asarray(frames, dtype=np.float32)
+    count, size = frames.shape if frames.ndim == 2 else (0, 0)
+    f0 = np.full(count, np.nan, dtype=np.float64)
+    if count == 0 or sample_rate <= 0:
+        return f0
+    min_lag = int(sample_rate / float(max_hz))
+    max_lag = min(int(sample_rate / float(min_hz)), size - 1)
+    if max_lag <= min_lag or min_lag <= 0:
+        return f0
+
+    centered = frames - frames.mean(axis=1, keepdims=True)
+    nonzero = np.any(centered, axis=1)
+    centered = centered * np.hanning(size).astype(np.float32)
+    nfft = 1 << int(size + max_lag - 1).bit_length()
+    spectrum = np.fft.rfft(centered.astype(np.float64), n=nfft, axis=1)
+    acf = np.fft.irfft(spectrum.real ** 2 + spectrum.imag ** 2, n=nfft, axis=1)[:, : max_lag + 1]
+    energy = acf[:, 0]
+    valid = nonzero & (energy > 0)
+    segment = acf[:, min_lag : max_lag + 1] / np.where(valid, energy, 1.0)[:, None]
+    peak_idx = np.argmax(segment, axis=1)
+    peak_val = segment[np.arange(count), peak_idx]
+    found = valid & (peak_val >= min_corr)
+    f0[found] = float(sample_rate) / (min_lag + peak_idx[found]).astype(np.float64)
+    return f0
+
+
 def _append_signal(signals, name, value, signal_type):
     if value is None:
         return
@@ -236,18 +112,12 @@ def _compute_prosody(samples, sample_rate):
     duration_s = float(len(samples)) / float(sample_rate) if sample_rate else 0.0
     frame_size = int(max(160, round(sample_rate * 0.04)))
     hop = int(max(80, round(sample_rate * 0.01)))
-    total_frames = 1 if len(samples) < frame_size else 1 + (len(samples) - frame_size) // hop
-    max_frames = int(os.getenv("AIREALCHECK_AUDIO_MAX_FRAMES", "2000"))
-    step = max(1, int(total_frames / max_frames)) if total_frames > max_frames else 1
-
-    rms_values = []
-    for frame in _frame_iter(samples, frame_size, hop, step):
-        rms_values.append(float(np.sqrt(np.mean(frame ** 2))))
-    frame_count = len(rms_values)
+    frames = frame_matrix(samples, frame_size, hop)
+    rms_array = frame_rms(frames)
+    frame_count = int(rms_array.shape[0])
     if frame_count == 0:
         return [], "low_voiced_or_pitch"
 
-    rms_array = np.array(rms_values, dtype=np.float32)
     rms_mean = float(np.mean(rms_array))
     rms_std = float(np.std(rms_array))
     rms_cv = float(rms_std / rms_mean) if rms_mean > 1e-9 else 0.0
@@ -258,15 +128,12 @@ def _compute_prosody(samples, sample_rate):
     voiced_count = int(np.sum(voiced_mask))
     voiced_ratio = float(voiced_count) / float(frame_count) if frame_count else 0.0
 
+    # Pitch nur fuer stimmhafte Frames, blockweise als Batch ueber die strided Frame-Matrix.
     f0_values = []
-    if voiced_count > 0:
-        idx = 0
-        for frame in _frame_iter(samples, frame_size, hop, step):
-            if voiced_mask[idx]:
-                f0 = _estimate_pitch_acf(frame, sample_rate)
-                if f0 is not None and 50.0 <= f0 <= 500.0:
-                    f0_values.append(float(f0))
-            idx += 1
+    voiced_idx = np.flatnonzero(voiced_mask)
+    for _, block in iter_frame_blocks(voiced_idx, _PITCH_BLOCK_FRAMES):
+        f0 = _estimate_pitch_batch(frames[block], sample_rate)
+        f0_values.extend(f0[(f0 >= 50.0) & (f0 <= 500.0)].tolist())
 
     f0_valid_frames = int(len(f0_values))
     min_voiced_frames = max(3, int(frame_count * 0.05))
@@ -315,45 +182,19 @@ def run_audio_prosody(file_path):
             start_time=start,
         )
 
-    tmp_dir = ""
     try:
-        samples = None
-        sample_rate = None
-
-        if file_path.lower().endswith(".wav"):
-            try:
-                wav_samples, wav_sr, _ = _read_wav(file_path)
-                if wav_samples is not None and wav_sr == 16000:
-                    samples = wav_samples
-                    sample_rate = wav_sr
-            except Exception:
-                samples = None
-
+        context = get_audio_context(file_path)
+        samples, sample_rate, meta = context.pcm()
         if samples is None:
-            wav_path, meta = _extract_audio_ffmpeg(file_path, sample_rate=16000)
-            if not wav_path:
-                return _result(
-                    status="error",
-                    available=False,
-                    ai_likelihood=None,
-                    confidence=0.0,
-                    signals=[],
-                    notes=meta.get("note", "ffmpeg_extract_failed"),
-                    start_time=start,
-                )
-            tmp_dir = meta.get("tmpdir") or ""
-            try:
-                samples, sample_rate, _ = _read_wav(wav_path)
-            except Exception:
-                return _result(
-                    status="error",
-                    available=False,
-                    ai_likelihood=None,
-                    confidence=0.0,
-                    signals=[],
-                    notes="audio_decode_failed",
-                    start_time=start,
-                )
+            return _result(
+                status="error",
+                available=False,
+                ai_likelihood=None,
+                confidence=0.0,
+                signals=[],
+                notes=meta.get("note", "ffmpeg_extract_failed"),
+                start_time=start,
+            )
 
         if samples is None or sample_rate is None or len(samples) == 0:
             return _result(
@@ -366,8 +207,14 @@ def run_audio_prosody(file_path):
                 start_time=start,
             )
 
+        selection = None
+        if vad_enabled():
+            samples, sample_rate, selection = context.speech()
+
         samples = samples.astype(np.float32, copy=False)
         signals, warning = _compute_prosody(samples, sample_rate)
+        if selection is not None:
+            signals.extend(selection_signals(selection))
         return _result(
             status="ok",
             available=True,
@@ -389,12 +236,6 @@ def run_audio_prosody(file_path):
             start_time=start,
             warning=str(exc)[:240],
         )
-    finally:
-        if tmp_dir:
-            try:
-                shutil.rmtree(tmp_dir, ignore_errors=True)
-            except Exception:
-                pass
 
 
 if __name__ == "__main__":
@@ -0,0 +1,206 @@
+import os
+import threading
+import time
+from collections import deque
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_BREAKERS_LOCK = threading.Lock()
+_BREAKERS = {}
+
+
+def _env_float(name, default):
+    try:
+        raw = os.getenv(name)
+        return float(raw) if raw not in {None, ""} else float(default)
+    except Exception:
+        return float(default)
+
+
+def _log(message: str):
+    try:
+        print(f"[breaker] {message}")
+    except Exception:
+        pass
+
+
+def breakers_enabled():
+    return (os.getenv("AIREALCHECK_BREAKER_ENABLED") or "true").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _percentile(sorted_vals, pct):
+    if not sorted_vals:
+        return None
+    idx = int(round((len(sorted_vals) - 1) * pct))
+    return sorted_vals[max(0, min(len(sorted_vals) - 1, idx))]
+
+
+class CircuitBreaker:
+    """
+    Circuit Breaker pro Provider (closed -> open -> half_open -> closed).
+    Oeffnet, wenn im gleitenden Fenster die Fehlerquote oder die p95-Latenz ueber der Schwelle liegt.
+    Nach open_sec laesst half_open einzelne Probe-Aufrufe durch; Erfolg schliesst, Fehler oeffnet erneut.
+    """
+
+    def __init__(
+        self,
+        name,
+        window=None,
+        min_calls=None,
+        failure_rate=None,
+        slow_p95_ms=None,
+        open_sec=None,
+        half_open_probes=None,
+        clock=None,
+    ):
+        self.name = name
+        self.window = max(1, int(_env_float("AIREALCHECK_BREAKER_WINDOW", 20) if window is None else window))
+        self.min_calls = max(1, int(_env_float("AIREALCHECK_BREAKER_MIN_CALLS", 5) if min_calls is None else min_calls))
+        self.failure_rate = (
+            _env_float("AIREALCHECK_BREAKER_FAILURE_RATE", 0.5) if failure_rate is None else float(failure_rate)
+        )
+        # 0 = keine Latenzschwelle.
+        self.slow_p95_ms = _env_float("AIREALCHECK_BREAKER_SLOW_P95_MS", 0) if slow_p95_ms is None else slow_p95_ms
+        self.open_sec = _env_float("AIREALCHECK_BREAKER_OPEN_SEC", 30) if open_sec is None else float(open_sec)
+        self.half_open_probes = max(
+            1, int(_env_float("AIREALCHECK_BREAKER_HALF_OPEN_PROBES", 1) if half_open_probes is None else half_open_probes)
+        )
+        self._clock = clock or time.time
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=self.window)
+        self._state = CLOSED
+        self._opened_at = None
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._trips = 0
+        self._rejected = 0
+        self._last_reason = None
+
+    def _maybe_half_open(self, now):
+        if self._state == OPEN and now - self._opened_at >= self.open_sec:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+            _log(f"provider={self.name} state=half_open")
+
+    def _trip(self, now, reason):
+        self._state = OPEN
+        self._opened_at = now
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._trips += 1
+        self._last_reason = reason
+        _log(f"provider={self.name} state=open reason={reason}")
+
+    def state(self):
+        with self._lock:
+            self._maybe_half_open(self._clock())
+            return self._state
+
+    def is_open(self):
+        """True, solange keine Aufrufe (auch keine Probes) erlaubt sind."""
+        with self._lock:
+            now = self._clock()
+            self._maybe_half_open(now)
+            if self._state == OPEN:
+                return True
+            return self._state == HALF_OPEN and self._probes_in_flight >= self.half_open_probes
+
+    def allow(self):
+        """Aufruf zulassen? Im half_open-Zustand zaehlt jeder zugelassene Aufruf als Probe."""
+        with self._lock:
+            now = self._clock()
+            self._maybe_half_open(now)
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return True
+            self._rejected += 1
+            return False
+
+    def record(self, success, latency_ms=None):
+        with self._lock:
+            now = self._clock()
+            if self._state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if not success:
+                    self._trip(now, "probe_failed")
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                    _log(f"provider={self.name} state=closed")
+                return
+            if self._state == OPEN:
+                # Nachzuegler von vor dem Oeffnen aendern den Zustand nicht.
+                return
+            self._outcomes.append((bool(success), float(latency_ms or 0.0)))
+            if len(self._outcomes) < self.min_calls:
+                return
+            failures = sum(1 for ok, _ in self._outcomes if not ok)
+            if failures / len(self._outcomes) >= self.failure_rate:
+                self._trip(now, "failure_rate")
+                return
+            if self.slow_p95_ms and self.slow_p95_ms > 0:
+                p95 = _percentile(sorted(lat for _, lat in self._outcomes), 0.95)
+                if p95 is not None and p95 >= self.slow_p95_ms:
+                    self._trip(now, "slow_p95")
+
+    def snapshot(self):
+        with self._lock:
+            now = self._clock()
+            self._maybe_half_open(now)
+            outcomes = list(self._outcomes)
+            failures = sum(1 for ok, _ in outcomes if not ok)
+            latencies = sorted(lat for _, lat in outcomes)
+            retry_in = None
+            if self._state == OPEN:
+                retry_in = round(max(0.0, self.open_sec - (now - self._opened_at)), 1)
+            return {
+                "state": self._state,
+                "window_calls": len(outcomes),
+                "failure_rate": round(failures / len(outcomes), 3) if outcomes else None,
+                "latency_ms_p95": _percentile(latencies, 0.95),
+                "trips": self._trips,
+                "rejected": self._rejected,
+                "last_trip_reason": self._last_reason,
+                "retry_in_sec": retry_in,
+            }
+
+
+def get_breaker(provider, **defaults):
+    """Breaker des Providers; defaults gelten nur beim ersten Anlegen."""
+    breaker = _BREAKERS.get(provider)
+    if breaker is not None:
+        return breaker
+    with _BREAKERS_LOCK:
+        breaker = _BREAKERS.get(provider)
+        if breaker is None:
+            breaker = CircuitBreaker(provider, **defaults)
+            _BREAKERS[provider] = breaker
+        return breaker
+
+
+def provider_circuit_open(provider):
+    """Schneller Check vor dem Aufruf: True, wenn der Provider gerade gesperrt ist."""
+    if not breakers_enabled():
+        return False
+    breaker = _BREAKERS.get(provider)
+    return breaker is not None and breaker.is_open()
+
+
+def breaker_states():
+    """Zustand aller bisher genutzten Breaker (fuer /health und /debug/paid)."""
+    with _BREAKERS_LOCK:
+        breakers = dict(_BREAKERS)
+    return {name: breaker.snapshot() for name, breaker in sorted(breakers.items())}
+
+
+def reset_breakers():
+    with _BREAKERS_LOCK:
+        _BREAKERS.clear()
@@ -0,0 +1,176 @@
+import hashlib
+import os
+import time
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+
+INDEX_SUFFIX = ".ivf.npz"
+INDEX_FORMAT_VERSION = 1
+
+
+def ann_index_path(embeddings_path: str) -> str:
+    """Standardpfad des IVF-Index neben der Embedding-Datei (clip_real_embeddings.ivf.npz)."""
+    return os.path.splitext(embeddings_path)[0] + INDEX_SUFFIX
+
+
+def _normalize_rows(arr):
+    arr = np.asarray(arr, dtype=np.float32)
+    norms = np.linalg.norm(arr, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return arr / norms
+
+
+def _assign(vectors, centroids, chunk_rows=65536):
+    labels = np.empty(vectors.shape[0], dtype=np.int64)
+    for start in range(0, vectors.shape[0], chunk_rows):
+        block = vectors[start:start + chunk_rows]
+        labels[start:start + chunk_rows] = np.argmax(block.dot(centroids.T), axis=1)
+    return labels
+
+
+def build_ivf_index(embeddings, n_lists=None, iterations=10, sample_size=50000, seed=0):
+    """
+    IVF-Index (sphaerisches k-means) fuer normierte Embeddings.
+    Liefert {"centroids", "offsets", "order"}: die Zeilen embeddings[order] liegen listenweise
+    hintereinander, Liste i umfasst die Positionen offsets[i]:offsets[i + 1].
+    """
+    if np is None:
+        raise RuntimeError("numpy_missing")
+    vectors = _normalize_rows(embeddings)
+    count = int(vectors.shape[0])
+    if n_lists is None or int(n_lists) <= 0:
+        n_lists = int(round(count ** 0.5))
+    n_lists = max(1, min(int(n_lists), count))
+    rng = np.random.default_rng(seed)
+    sample = vectors
+    if count > sample_size:
+        sample = vectors[rng.choice(count, size=sample_size, replace=False)]
+    centroids = sample[rng.choice(sample.shape[0], size=n_lists, replace=False)].copy()
+    for _ in range(max(1, int(iterations))):
+        labels = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        empty = np.bincount(labels, minlength=n_lists) == 0
+        # Leere Listen bekommen einen zufaelligen Punkt, statt zu verschwinden.
+        if empty.any():
+            sums[empty] = sample[rng.choice(sample.shape[0], size=int(empty.sum()))]
+        centroids = _normalize_rows(sums)
+    labels = _assign(vectors, centroids)
+    order = np.argsort(labels, kind="stable").astype(np.int64)
+    offsets = np.zeros(n_lists + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(labels, minlength=n_lists))
+    return {"centroids": centroids.astype(np.float32), "offsets": offsets, "order": order}
+
+
+def order_fingerprint(order) -> str:
+    """sha1 der Index-Reihenfolge; bindet eine in Index-Reihenfolge geschriebene .cemb an genau diesen Index."""
+    return hashlib.sha1(np.ascontiguousarray(order, dtype=np.int64).tobytes()).hexdigest()
+
+
+def save_ivf_index(path: str, index: dict, count: int, dim: int):
+    out_dir = os.path.dirname(path) or "."
+    os.makedirs(out_dir, exist_ok=True)
+    np.savez(
+        path,
+        centroids=index["centroids"],
+        offsets=index["offsets"],
+        order=index["order"],
+        count=np.int64(count),
+        dim=np.int64(dim),
+        version=np.int64(INDEX_FORMAT_VERSION),
+    )
+
+
+def load_ivf_index(path: str, count: int, dim: int):
+    """(IvfIndex, order) oder (None, Grund), wenn der Index fehlt oder nicht zu den Embeddings passt."""
+    if np is None:
+        return None, "numpy_missing"
+    if not path or not os.path.exists(path):
+        return None, "ann_index_missing"
+    try:
+        with np.load(path) as data:
+            if int(data["version"]) != INDEX_FORMAT_VERSION:
+                return None, "ann_index_version"
+            if int(data["count"]) != int(count) or int(data["dim"]) != int(dim):
+                return None, "ann_index_mismatch"
+            centroids = np.asarray(data["centroids"], dtype=np.float32)
+            offsets = np.asarray(data["offsets"], dtype=np.int64)
+            order = np.asarray(data["order"], dtype=np.int64)
+    except Exception as exc:
+        return None, f"ann_index_load_failed:{type(exc).__name__}"
+    if order.shape[0] != int(count) or offsets[-1] != int(count):
+        return None, "ann_index_mismatch"
+    return IvfIndex(centroids, offsets), order
+
+
+def exact_topk(embeddings, query, k):
+    """(Positionen, Similarities) der k aehnlichsten Zeilen, absteigend sortiert."""
+    sims = embeddings.dot(query)
+    if sims.size <= k:
+        idx = np.arange(sims.size)
+    else:
+        idx = np.argpartition(sims, -k)[-k:]
+    idx = idx[np.argsort(-sims[idx])]
+    return idx, sims[idx]
+
+
+class IvfIndex:
+    """
+    Sucht nur in den nprobe Listen, deren Zentroid der Anfrage am naechsten liegt.
+    Die Embeddings muessen in Index-Reihenfolge (embeddings[order]) vorliegen.
+    """
+
+    def __init__(self, centroids, offsets):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.n_lists = int(centroids.shape[0])
+
+    def search(self, embeddings, query, k, nprobe):
+        """(Positionen, Similarities) wie exact_topk; bei zu wenig Kandidaten exakt."""
+        nprobe = max(1, min(int(nprobe), self.n_lists))
+        if nprobe >= self.n_lists:
+            return exact_topk(embeddings, query, k)
+        centroid_sims = self.centroids.dot(query)
+        lists = np.argpartition(centroid_sims, -nprobe)[-nprobe:]
+        candidates = np.concatenate(
+            [np.arange(self.offsets[i], self.offsets[i + 1], dtype=np.int64) for i in lists]
+        )
+        if candidates.size < k:
+            return exact_topk(embeddings, query, k)
+        sims = embeddings[candidates].dot(query)
+        if sims.size > k:
+            top = np.argpartition(sims, -k)[-k:]
+        else:
+            top = np.arange(sims.size)
+        top = top[np.argsort(-sims[top])]
+        return candidates[top], sims[top]
+
+
+def measure_recall(embeddings, index, queries, k, nprobe):
+    """Recall@k des IVF-Index gegen exakte Suche plus mittlere Latenz beider Varianten (ms)."""
+    hits = 0
+    total = 0
+    exact_ms = 0.0
+    ann_ms = 0.0
+    for query in queries:
+        started = time.perf_counter()
+        exact_idx, _ = exact_topk(embeddings, query, k)
+        exact_ms += (time.perf_counter() - started) * 1000.0
+        started = time.perf_counter()
+        ann_idx, _ = index.search(embeddings, query, k, nprobe)
+        ann_ms += (time.perf_counter() - started) * 1000.0
+        hits += len(set(exact_idx.tolist()) & set(ann_idx.tolist()))
+        total += len(exact_idx)
+    n = max(1, len(queries))
+    return {
+        "recall_at_k": (hits / total) if total else None,
+        "k": int(k),
+        "nprobe": int(nprobe),
+        "queries": len(queries),
+        "exact_ms": exact_ms / n,
+        "ann_ms": ann_ms / n,
+    }
@@ -1,4 +1,6 @@
+import base64
 import os
+import threading
 import time
 
 try:
@@ -17,6 +19,17 @@ except Exception:
     Image = None
     ImageOps = None
 
+try:
+    from Backend.image_context import get_image_context
+except Exception:
+    get_image_context = None
+
+from Backend.engines.clip_ann import ann_index_path, load_ivf_index, order_fingerprint
+from Backend.engines.clip_quantized import QUANTIZED_SUFFIX, open_quantized_embeddings, quantized_path
+from Backend.engines.engine_cache import content_hash
+from Backend.inference_server import InferenceUnavailable, RemoteModel, remote_model
+from Backend.result_store import ResultStore
+
 open_clip = None
 openai_clip = None
 _CLIP_BACKEND = ""
@@ -45,6 +58,9 @@ if open_clip is None:
 ENGINE_NAME = "clip_detector"
 _MODEL_CACHE = {"attempted": False, "model": None, "preprocess": None, "meta": None}
 _EMBED_CACHE = {"entries": {}}
+_EMBED_STORE_LOCK = threading.Lock()
+_EMBED_STORE = {"path": None, "store": None}
+_EMBED_STORE_NAMESPACE = "clip_embedding"
 
 
 def _local_ml_enabled():
@@ -59,6 +75,79 @@ def _local_preprocess_enabled():
     return os.getenv("AIREALCHECK_IMAGE_LOCAL_PREPROCESS", "true").lower() in {"1", "true", "yes", "on"}
 
 
+def _ann_mode():
+    # auto: IVF-Index nutzen, wenn neben der Embedding-Datei einer liegt; exact: immer volle Suche.
+    mode = (os.getenv("AIREALCHECK_CLIP_ANN") or "auto").strip().lower()
+    return mode if mode in {"auto", "exact"} else "auto"
+
+
+def _ann_nprobe():
+    try:
+        return max(1, int(os.getenv("AIREALCHECK_CLIP_ANN_NPROBE", "8") or 8))
+    except Exception:
+        return 8
+
+
+def _quantized_mode():
+    # auto: eine aktuelle .cemb-Datei neben der Embedding-Datei bevorzugen (memmap); off: immer float32 laden.
+    mode = (os.getenv("AIREALCHECK_CLIP_QUANTIZED") or "auto").strip().lower()
+    return mode if mode in {"auto", "off"} else "auto"
+
+
+def _embedding_cache_enabled():
+    return os.getenv("AIREALCHECK_CLIP_EMBED_CACHE", "true").lower() in {"1", "true", "yes", "on"}
+
+
+def _embedding_store():
+    path = (os.getenv("AIREALCHECK_CLIP_EMBED_CACHE_PATH") or "").strip() or os.path.join(
+        "temp_upload", "clip_embeddings.sqlite3"
+    )
+    with _EMBED_STORE_LOCK:
+        if _EMBED_STORE["store"] is None or _EMBED_STORE["path"] != path:
+            _EMBED_STORE["store"] = ResultStore(
+                path,
+                ttl_sec=float(os.getenv("AIREALCHECK_CLIP_EMBED_CACHE_TTL_SEC", str(90 * 24 * 3600)) or 0),
+                max_bytes=int(float(os.getenv("AIREALCHECK_CLIP_EMBED_CACHE_MAX_MB", "256") or 256) * 1024 * 1024),
+                max_entries=int(os.getenv("AIREALCHECK_CLIP_EMBED_CACHE_MAX_ENTRIES", "200000") or 200000),
+            )
+            _EMBED_STORE["path"] = path
+        return _EMBED_STORE["store"]
+
+
+def _embedding_cache_version(meta):
+    # Embeddings haengen nur am Modell und an den Varianten, nicht an Referenzset oder Schwellen.
+    preprocess = "variants" if _local_preprocess_enabled() else "orig"
+    return f"{meta.get('backend', '')}:{meta.get('model', '')}:{meta.get('pretrained', '')}:{preprocess}"
+
+
+def _load_cached_embeddings(digest, meta):
+    """[(variant_name, embedding)] aus dem Embedding-Cache oder None."""
+    if not digest or not _embedding_cache_enabled():
+        return None
+    payload = _embedding_store().get(digest, namespace=_EMBED_STORE_NAMESPACE, config_version=_embedding_cache_version(meta))
+    if not isinstance(payload, dict) or not isinstance(payload.get("variants"), list):
+        return None
+    try:
+        return [
+            (name, np.frombuffer(base64.b64decode(raw), dtype=np.float32).copy())
+            for name, raw in payload["variants"]
+        ]
+    except Exception:
+        return None
+
+
+def _store_cached_embeddings(digest, meta, named_embeddings):
+    if not digest or not named_embeddings or not _embedding_cache_enabled():
+        return
+    payload = {
+        "variants": [
+            [name, base64.b64encode(np.ascontiguousarray(emb, dtype=np.float32).tobytes()).decode("ascii")]
+            for name, emb in named_embeddings
+        ]
+    }
+    _embedding_store().put(digest, payload, namespace=_EMBED_STORE_NAMESPACE, config_version=_embedding_cache_version(meta))
+
+
 def _clamp01(value):
     try:
         v = float(value)
@@ -108,6 +197,8 @@ def _resolve_embeddings_path():
 def _load_base_image(path: str):
     if Image is None:
         raise RuntimeError("pillow_missing")
+    if get_image_context is not None:
+        return get_image_context(path).oriented_rgb_image
     with Image.open(path) as img:
         if ImageOps is not None:
             img = ImageOps.exif_transpose(img)
@@ -195,6 +286,9 @@ def _load_embeddings_cached(path):
         return entry["embeddings"], entry["count"], entry["dim"], None
     if np is None:
         return None, 0, 0, "numpy_missing"
+    quantized = _quantized_source(path)
+    if quantized:
+        return _load_quantized_embeddings(path, quantized)
     if not os.path.exists(path):
         return None, 0, 0, f"embeddings_missing:{path}"
 
@@ -252,14 +346,88 @@ def _load_embeddings_cached(path):
     norms[norms == 0] = 1.0
     arr = arr / norms
 
+    ann_index = None
+    if _ann_mode() != "exact":
+        ann_index, order = load_ivf_index(ann_index_path(path), int(arr.shape[0]), int(arr.shape[1]))
+        if ann_index is not None:
+            # Top-k-Mittelwerte haengen nicht von der Zeilenreihenfolge ab; Index-Reihenfolge reicht auch fuer exakt.
+            arr = np.ascontiguousarray(arr[order])
+
     _EMBED_CACHE.setdefault("entries", {})[path] = {
         "embeddings": arr,
         "count": int(arr.shape[0]),
         "dim": int(arr.shape[1]),
+        "ann": ann_index,
     }
     return arr, int(arr.shape[0]), int(arr.shape[1]), None
 
 
+def _quantized_source(path):
+    """Pfad der zu ladenden .cemb-Datei oder None (dann klassisches float32-Format)."""
+    if path.lower().endswith(QUANTIZED_SUFFIX):
+        return path
+    if _quantized_mode() == "off":
+        return None
+    candidate = quantized_path(path)
+    if not os.path.exists(candidate):
+        return None
+    try:
+        # Veraltete .cemb (Quelle neuer) ignorieren.
+        if os.path.exists(path) and os.path.getmtime(path) > os.path.getmtime(candidate):
+            return None
+    except OSError:
+        return None
+    return candidate
+
+
+def _load_quantized_embeddings(path, source):
+    """
+    .cemb per np.memmap oeffnen: keine float32-Kopie pro Worker, die Seiten teilt der Page Cache.
+    Den IVF-Index gibt es nur, wenn die Zeilen schon beim Bauen in Index-Reihenfolge geschrieben wurden
+    und der Fingerprint im Header zur Reihenfolge des aktuellen Index passt; sonst exakte Suche.
+    """
+    if not os.path.exists(source):
+        return None, 0, 0, f"embeddings_missing:{source}"
+    try:
+        arr = open_quantized_embeddings(source)
+    except Exception as exc:
+        return None, 0, 0, f"embeddings_load_failed:{str(exc)[:160]}"
+    if arr.count <= 0 or arr.dim <= 0:
+        return None, 0, 0, "embeddings_invalid_shape"
+
+    ann_index = None
+    ann_note = None
+    if _ann_mode() != "exact" and arr.ann_ordered:
+        ann_index, order = load_ivf_index(ann_index_path(source), arr.count, arr.dim)
+        if ann_index is not None and order_fingerprint(order) != arr.ann_fingerprint:
+            # Index wurde neu gebaut (z.B. --ann-only), die .cemb-Zeilen stehen noch in alter Reihenfolge.
+            ann_index = None
+            ann_note = "ann_order_mismatch"
+            print(f"[clip_detector] ann index order does not match {source}; using exact search")
+
+    _EMBED_CACHE.setdefault("entries", {})[path] = {
+        "embeddings": arr,
+        "count": arr.count,
+        "dim": arr.dim,
+        "ann": ann_index,
+        "ann_note": ann_note,
+        "quantized": arr.dtype,
+    }
+    return arr, arr.count, arr.dim, None
+
+
+def _embeddings_format_cached(path):
+    entry = _EMBED_CACHE.get("entries", {}).get(path) or {}
+    return entry.get("quantized")
+
+
+def _ann_index_cached(path):
+    if not path or _ann_mode() == "exact":
+        return None
+    entry = _EMBED_CACHE.get("entries", {}).get(path) or {}
+    return entry.get("ann")
+
+
 def _load_model_cached():
     if _MODEL_CACHE["attempted"]:
         return _MODEL_CACHE["model"], _MODEL_CACHE["preprocess"], _MODEL_CACHE["meta"] or {}
@@ -307,17 +475,44 @@ def _load_model_cached():
     return model, preprocess, meta
 
 
-def _encode_image(model, preprocess, image_input, device):
+def _model_for_run():
+    """Modell im Inference-Server (falls aktiv und erreichbar), sonst das lokale."""
+    remote = remote_model("clip")
+    if remote is not None:
+        model, meta = remote
+        return model, None, meta
+    return _load_model_cached()
+
+
+def _image_array(image_input):
+    if isinstance(image_input, Image.Image):
+        return np.asarray(image_input.convert("RGB"), dtype=np.uint8)
+    with Image.open(image_input) as img:
+        return np.asarray(img.convert("RGB"), dtype=np.uint8)
+
+
+def _encode_images(model, preprocess, images, device):
+    """Alle Bilder in einem Forward-Pass kodieren; liefert ein (n, dim)-Array normierter Embeddings."""
     if Image is None:
         raise RuntimeError("pillow_missing")
+    if isinstance(model, RemoteModel):
+        try:
+            return np.asarray(model.infer([_image_array(img) for img in images]), dtype=np.float32)
+        except InferenceUnavailable as exc:
+            print(f"[clip_detector] inference server unavailable, running locally: {exc}")
+            model, preprocess, _meta = _load_model_cached()
+            if model is None or preprocess is None:
+                raise RuntimeError("model_unavailable")
     if torch is None:
         raise RuntimeError("torch_missing")
-    if isinstance(image_input, Image.Image):
-        image = image_input
-    else:
-        image = Image.open(image_input).convert("RGB")
-    image_input = preprocess(image).unsqueeze(0)
-    image_input = image_input.to(device)
+    tensors = []
+    for image_input in images:
+        if isinstance(image_input, Image.Image):
+            image = image_input
+        else:
+            image = Image.open(image_input).convert("RGB")
+        tensors.append(preprocess(image))
+    image_input = torch.stack(tensors, dim=0).to(device)
     with torch.no_grad():
         if hasattr(model, "encode_image"):
             features = model.encode_image(image_input)
@@ -328,7 +523,43 @@ def _encode_image(model, preprocess, image_input, device):
     if features.ndim == 1:
         features = features.unsqueeze(0)
     features = features / features.norm(dim=-1, keepdim=True)
-    return features[0].detach().cpu().numpy().astype(np.float32)
+    return features.detach().cpu().numpy().astype(np.float32)
+
+
+def serve_info():
+    """Inference-Server: Modell laden und Meta melden (fuer Cache-Version und Signale der Worker)."""
+    model, preprocess, meta = _load_model_cached()
+    return {"available": model is not None and preprocess is not None, "meta": meta}
+
+
+def serve_embeddings(images):
+    """Inference-Server: normierte Embeddings fuer uint8-Bilder (HxWx3) aus mehreren Requests."""
+    model, preprocess, meta = _load_model_cached()
+    if model is None or preprocess is None:
+        raise RuntimeError(meta.get("reason") or "model_unavailable")
+    pil_images = [Image.fromarray(np.asarray(img, dtype=np.uint8)) for img in images]
+    features = _encode_images(model, preprocess, pil_images, meta.get("device") or _resolve_device())
+    return list(features)
+
+
+def _encode_image(model, preprocess, image_input, device):
+    return _encode_images(model, preprocess, [image_input], device)[0]
+
+
+def _encode_variants(model, preprocess, variants, device):
+    """[(name, embedding)] fuer alle Varianten; faellt bei Fehlern auf Einzelkodierung zurueck."""
+    try:
+        features = _encode_images(model, preprocess, [img for _name, img in variants], device)
+        return [(name, features[idx]) for idx, (name, _img) in enumerate(variants)]
+    except Exception:
+        pass
+    encoded = []
+    for name, img in variants:
+        try:
+            encoded.append((name, _encode_image(model, preprocess, img, device)))
+        except Exception:
+            continue
+    return encoded
 
 
 def _score_from_similarity(similarity, sim_low, sim_high):
@@ -398,8 +629,8 @@ def run_clip_detector(file_path: str):
             start_time=start,
         )
 
-    model, preprocess, meta = _load_model_cached()
-    if model is None or preprocess is None:
+    model, preprocess, meta = _model_for_run()
+    if model is None or (preprocess is None and not isinstance(model, RemoteModel)):
         reason = meta.get("reason") or "model_unavailable"
         warning = meta.get("error") or ""
         signals = [f"backend:{meta.get('backend', '')}"] if meta.get("backend") else []
@@ -441,20 +672,33 @@ def run_clip_detector(file_path: str):
 
     device = meta.get("device") or _resolve_device()
     try:
-        base_img = _load_base_image(file_path)
-    except Exception as exc:
-        return _result(
-            status="error",
-            available=False,
-            ai_likelihood=None,
-            confidence=0.0,
-            signals=[],
-            notes="image_load_failed",
-            start_time=start,
-            warning=str(exc)[:240],
-        )
+        digest = content_hash(file_path) if _embedding_cache_enabled() else None
+    except Exception:
+        digest = None
+    named_embeddings = _load_cached_embeddings(digest, meta)
+    embed_cache_hit = named_embeddings is not None
+    if not embed_cache_hit:
+        try:
+            base_img = _load_base_image(file_path)
+        except Exception as exc:
+            return _result(
+                status="error",
+                available=False,
+                ai_likelihood=None,
+                confidence=0.0,
+                signals=[],
+                notes="image_load_failed",
+                start_time=start,
+                warning=str(exc)[:240],
+            )
+        variants = _build_variants(base_img)
+        named_embeddings = _encode_variants(model, preprocess, variants, device)
+        if len(named_embeddings) == len(variants):
+            _store_cached_embeddings(digest, meta, named_embeddings)
+        else:
+            # Teilmenge nicht cachen, sonst fehlen die Varianten bei jeder spaeteren Analyse.
+            print(f"[clip_detector] embed cache skipped: encoded {len(named_embeddings)}/{len(variants)} variants")
 
-    variants = _build_variants(base_img)
     topk = int(os.getenv("AIREALCHECK_CLIP_TOPK", "5") or 5)
     if topk <= 0:
         topk = 1
@@ -462,13 +706,7 @@ def run_clip_detector(file_path: str):
     sim_low = float(os.getenv("AIREALCHECK_CLIP_SIM_LOW", "0.18") or 0.18)
     sim_high = float(os.getenv("AIREALCHECK_CLIP_SIM_HIGH", "0.32") or 0.32)
 
-    def _score_embedding(image_emb):
-        if image_emb is None or image_emb.ndim != 1:
-            return None, None, None, None, None
-        if int(image_emb.shape[0]) != int(dim):
-            return None, None, None, None, None
-
-        real_similarities = embeddings.dot(image_emb)
+    def _score_embedding(real_similarities, ai_similarities):
         if real_similarities.size == 0:
             return None, None, None, None, None
 
@@ -483,21 +721,19 @@ def run_clip_detector(file_path: str):
         ai_prob_soft = None
         sim_ai_topk_mean = None
 
-        if ai_embeddings is not None and ai_embeddings.size > 0:
-            ai_similarities = ai_embeddings.dot(image_emb)
-            if ai_similarities.size > 0:
-                if ai_similarities.size <= topk:
-                    ai_top_sims = ai_similarities
-                else:
-                    idx = np.argpartition(ai_similarities, -topk)[-topk:]
-                    ai_top_sims = ai_similarities[idx]
-                sim_ai_topk_mean = float(np.mean(ai_top_sims))
-                ai_score = sim_ai_topk_mean - sim_real_topk_mean
-                ai_prob = _clamp01(0.5 + ai_score * 2.0)
-                ai_prob_soft = _clamp01(0.5 + (ai_prob - 0.5) * 0.70)
-                if abs(ai_score) >= 0.08:
-                    boost = min(0.10, (abs(ai_score) - 0.08) * 0.8)
-                    confidence = min(0.85, confidence + boost)
+        if ai_similarities is not None and ai_similarities.size > 0:
+            if ai_similarities.size <= topk:
+                ai_top_sims = ai_similarities
+            else:
+                idx = np.argpartition(ai_similarities, -topk)[-topk:]
+                ai_top_sims = ai_similarities[idx]
+            sim_ai_topk_mean = float(np.mean(ai_top_sims))
+            ai_score = sim_ai_topk_mean - sim_real_topk_mean
+            ai_prob = _clamp01(0.5 + ai_score * 2.0)
+            ai_prob_soft = _clamp01(0.5 + (ai_prob - 0.5) * 0.70)
+            if abs(ai_score) >= 0.08:
+                boost = min(0.10, (abs(ai_score) - 0.08) * 0.8)
+                confidence = min(0.85, confidence + boost)
 
         ai_prob_out = ai_prob_soft if ai_prob_soft is not None else ai_prob
         return ai_prob_out, confidence, sim_real_topk_mean, sim_ai_topk_mean, ai_prob_soft
@@ -508,12 +744,27 @@ def run_clip_detector(file_path: str):
     sim_ai_means = []
     soft_scores = []
 
-    for _name, img in variants:
-        try:
-            image_emb = _encode_image(model, preprocess, img, device)
-        except Exception:
-            continue
-        ai_score, conf, sim_real_mean, sim_ai_mean, ai_prob_soft = _score_embedding(image_emb)
+    real_index = _ann_index_cached(embeddings_path)
+    ai_index = _ann_index_cached(ai_embeddings_path) if ai_embeddings is not None else None
+    nprobe = _ann_nprobe()
+
+    def _top_similarities(matrix, index, variant_matrix):
+        # Exakt: alle Varianten in einer Matrixmultiplikation; IVF: nur Kandidaten der naechsten Listen.
+        if index is None:
+            return list(matrix.dot(variant_matrix).T)
+        return [index.search(matrix, variant_matrix[:, col], topk, nprobe)[1] for col in range(variant_matrix.shape[1])]
+
+    usable = [emb for _name, emb in named_embeddings if emb is not None and emb.ndim == 1 and int(emb.shape[0]) == int(dim)]
+    real_columns = []
+    ai_columns = []
+    if usable:
+        variant_matrix = np.stack(usable, axis=1)
+        real_columns = _top_similarities(embeddings, real_index, variant_matrix)
+        if ai_embeddings is not None and ai_embeddings.size > 0:
+            ai_columns = _top_similarities(ai_embeddings, ai_index, variant_matrix)
+    for col, real_similarities in enumerate(real_columns):
+        ai_similarities = ai_columns[col] if ai_columns else None
+        ai_score, conf, sim_real_mean, sim_ai_mean, ai_prob_soft = _score_embedding(real_similarities, ai_similarities)
         if ai_score is None:
             continue
         variant_scores.append(float(ai_score))
@@ -575,6 +826,16 @@ def run_clip_detector(file_path: str):
     signals.append(f"real_n:{count};ai_n:{ai_count}")
 
     notes = f"ok;variants={len(variant_scores)};variant_stddev={variant_stddev:.4f}"
+    if embed_cache_hit:
+        notes += ";embed_cache=hit"
+    if real_index is not None:
+        notes += f";search=ivf;nprobe={nprobe}"
+    quantized = _embeddings_format_cached(embeddings_path)
+    if quantized:
+        notes += f";store={quantized}"
+    ann_note = (_EMBED_CACHE.get("entries", {}).get(embeddings_path) or {}).get("ann_note")
+    if ann_note:
+        notes += f";{ann_note}"
 
     return _result(
         status="ok",
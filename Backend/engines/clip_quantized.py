@@ -0,0 +1,151 @@
+import json
+import os
+import struct
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+
+QUANTIZED_SUFFIX = ".cemb"
+_MAGIC = b"ARCEMB01"
+_ALIGN = 64
+_CHUNK_ROWS = 32768
+SUPPORTED_DTYPES = {"float16", "int8"}
+
+
+def quantized_path(embeddings_path: str) -> str:
+    """Standardpfad der quantisierten Datei neben der Embedding-Datei (clip_real_embeddings.cemb)."""
+    return os.path.splitext(embeddings_path)[0] + QUANTIZED_SUFFIX
+
+
+def write_quantized_embeddings(path: str, embeddings, dtype="int8", model=None, ann_ordered=False, ann_fingerprint=None):
+    """
+    Schreibt normierte Embeddings als Header + Rohzeilen:
+    8 Byte Magic, 4 Byte Header-Laenge, JSON-Header, dann (auf 64 Byte ausgerichtet)
+    die Zeilen als float16 bzw. int8 und bei int8 danach die float32-Skalen je Zeile.
+    ann_fingerprint (order_fingerprint des IVF-Index) haelt fest, fuer welche Reihenfolge die Zeilen stehen.
+    """
+    if np is None:
+        raise RuntimeError("numpy_missing")
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"unsupported_dtype:{dtype}")
+    arr = np.asarray(embeddings, dtype=np.float32)
+    if arr.ndim != 2 or arr.shape[0] <= 0:
+        raise ValueError("embeddings_invalid_shape")
+    norms = np.linalg.norm(arr, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    arr = arr / norms
+    count, dim = int(arr.shape[0]), int(arr.shape[1])
+
+    scales = None
+    if dtype == "int8":
+        scales = (np.abs(arr).max(axis=1) / 127.0).astype(np.float32)
+        scales[scales == 0] = 1.0
+        rows = np.clip(np.rint(arr / scales[:, None]), -127, 127).astype(np.int8)
+    else:
+        rows = arr.astype(np.float16)
+
+    header = {
+        "version": 1,
+        "dtype": dtype,
+        "count": count,
+        "dim": dim,
+        "model": model,
+        "ann_ordered": bool(ann_ordered),
+        "ann_order_sha1": ann_fingerprint if ann_ordered else None,
+    }
+    prefix = len(_MAGIC) + 4
+    raw = json.dumps(header).encode("utf-8")
+    data_offset = -(-(prefix + len(raw)) // _ALIGN) * _ALIGN
+    raw = raw.ljust(data_offset - prefix, b" ")
+
+    out_dir = os.path.dirname(path) or "."
+    os.makedirs(out_dir, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_MAGIC)
+        f.write(struct.pack("<I", len(raw)))
+        f.write(raw)
+        f.write(rows.tobytes())
+        if scales is not None:
+            f.write(scales.tobytes())
+    os.replace(tmp_path, path)
+    return header
+
+
+class QuantizedEmbeddings:
+    """
+    Read-only-Sicht auf eine .cemb-Datei per np.memmap; alle Worker teilen sich den Page Cache.
+    dot() rechnet blockweise direkt auf den quantisierten Zeilen (int8: Skalen erst nach dem Produkt).
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError("not_a_cemb_file")
+            (header_len,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(header_len).decode("utf-8"))
+        if header.get("version") != 1 or header.get("dtype") not in SUPPORTED_DTYPES:
+            raise ValueError("unsupported_cemb_header")
+        self.path = path
+        self.header = header
+        self.dtype = header["dtype"]
+        self.count = int(header["count"])
+        self.dim = int(header["dim"])
+        self.ann_ordered = bool(header.get("ann_ordered"))
+        self.ann_fingerprint = header.get("ann_order_sha1")
+        offset = len(_MAGIC) + 4 + header_len
+        row_dtype = np.int8 if self.dtype == "int8" else np.float16
+        self.rows = np.memmap(path, dtype=row_dtype, mode="r", offset=offset, shape=(self.count, self.dim))
+        self.scales = None
+        if self.dtype == "int8":
+            scales_offset = offset + self.count * self.dim
+            self.scales = np.memmap(path, dtype=np.float32, mode="r", offset=scales_offset, shape=(self.count,))
+
+    @property
+    def shape(self):
+        return (self.count, self.dim)
+
+    @property
+    def size(self):
+        return self.count * self.dim
+
+    @property
+    def ndim(self):
+        return 2
+
+    def __len__(self):
+        return self.count
+
+    def _dequantize(self, rows, scales):
+        block = np.asarray(rows, dtype=np.float32)
+        if scales is not None:
+            block = block * np.asarray(scales, dtype=np.float32)[:, None]
+        return block
+
+    def __getitem__(self, idx):
+        """Zeilen als float32 (fuer Kandidaten-Teilmengen, z.B. aus dem IVF-Index)."""
+        scales = self.scales[idx] if self.scales is not None else None
+        return self._dequantize(self.rows[idx], scales)
+
+    def dot(self, query):
+        """Wie ndarray.dot fuer query (dim,) oder (dim, n); liefert float32."""
+        query = np.asarray(query, dtype=np.float32)
+        out_shape = (self.count,) if query.ndim == 1 else (self.count, query.shape[1])
+        out = np.empty(out_shape, dtype=np.float32)
+        for start in range(0, self.count, _CHUNK_ROWS):
+            stop = min(self.count, start + _CHUNK_ROWS)
+            block = np.asarray(self.rows[start:stop], dtype=np.float32).dot(query)
+            if self.scales is not None:
+                scales = np.asarray(self.scales[start:stop])
+                block = block * (scales if query.ndim == 1 else scales[:, None])
+            out[start:stop] = block
+        return out
+
+
+def open_quantized_embeddings(path: str):
+    if np is None:
+        raise RuntimeError("numpy_missing")
+    return QuantizedEmbeddings(path)
@@ -0,0 +1,239 @@
+import hashlib
+import importlib.util
+import inspect
+import os
+import threading
+
+from Backend.result_store import ResultStore, config_fingerprint
+
+
+# Env-Stichworte je Engine: nur Aenderungen daran invalidieren die gespeicherten Ergebnisse.
+# Engines ohne Eintrag haengen an der gesamten Konfiguration.
+ENGINE_CONFIG_KEYWORDS = {
+    "hive": ("HIVE",),
+    "sightengine": ("SIGHTENGINE",),
+    "reality_defender": ("REALITY_DEFENDER",),
+    "sensity_image": ("SENSITY",),
+    "forensics": ("FORENSICS", "MAX_EDGE"),
+    "c2pa": ("C2PA",),
+    "watermark": ("WATERMARK",),
+    "xception": ("XCEPTION", "TTA", "USE_LOCAL_ML", "FORCE_FACE", "IMAGE_LOCAL_PREPROCESS", "MAX_EDGE"),
+    "clip_detector": ("CLIP",),
+    "video_forensics": ("VIDEO_SCAN", "VIDEO_MAX_SCAN", "VIDEO_STORE", "VIDEO_FRAME_EXTRACT"),
+    "video_frame_detectors": ("VIDEO", "SIGHTENGINE", "HIVE", "REALITY_DEFENDER", "USE_PAID_APIS"),
+    "reality_defender_video": ("REALITY_DEFENDER", "VIDEO_MAX"),
+    "video_temporal": ("VIDEO_TEMPORAL", "VIDEO_STORE", "VIDEO_FRAME_EXTRACT"),
+    "video_temporal_cnn": ("VIDEO_TEMPORAL_CNN", "VIDEO_STORE", "VIDEO_FRAME_EXTRACT"),
+    "audio_aasist": ("AASIST", "AUDIO_MAX"),
+    "audio_forensics": ("AUDIO_FORENSICS", "AUDIO_MAX"),
+    "audio_prosody": ("AUDIO_PROSODY", "AUDIO_MAX"),
+    "reality_defender_audio": ("REALITY_DEFENDER",),
+}
+
+# Module, deren Code das Ergebnis einer Engine mitbestimmt (ausser dem Modul der Engine-Funktion selbst).
+# Aenderungen daran invalidieren die gespeicherten Ergebnisse genauso wie Aenderungen an der Engine.
+ENGINE_CODE_MODULES = {
+    "hive": ("Backend.deepfake_api", "Backend.engines.provider_http"),
+    "sightengine": ("Backend.engines.provider_http",),
+    "reality_defender": ("Backend.engines.reality_defender_poller", "Backend.engines.provider_http"),
+    "sensity_image": ("Backend.engines.provider_http",),
+    "forensics": ("Backend.image_forensics", "Backend.image_context"),
+    "watermark": ("Backend.image_context",),
+    "xception": ("Backend.deepfake_model", "Backend.image_context"),
+    "clip_detector": ("Backend.engines.clip_ann", "Backend.engines.clip_quantized", "Backend.image_context"),
+    "video_forensics": ("Backend.image_forensics", "Backend.video_frame_store"),
+    "video_frame_detectors": (
+        "Backend.engines.sightengine_engine",
+        "Backend.engines.reality_defender_engine",
+        "Backend.engines.reality_defender_poller",
+        "Backend.engines.hive_engine",
+        "Backend.deepfake_api",
+        "Backend.engines.provider_http",
+        "Backend.video_frame_store",
+    ),
+    "reality_defender_video": (
+        "Backend.engines.reality_defender_engine",
+        "Backend.engines.reality_defender_poller",
+        "Backend.engines.provider_http",
+    ),
+    "reality_defender_audio": (
+        "Backend.engines.reality_defender_engine",
+        "Backend.engines.reality_defender_poller",
+        "Backend.engines.provider_http",
+    ),
+    "video_temporal": ("Backend.video_frame_store",),
+    "video_temporal_cnn": ("Backend.video_frame_store",),
+    "audio_aasist": ("Backend.vendor.aasist", "Backend.audio_context", "Backend.audio_frames", "Backend.audio_vad"),
+    "audio_forensics": ("Backend.audio_context", "Backend.audio_frames", "Backend.audio_vad"),
+    "audio_prosody": ("Backend.audio_context", "Backend.audio_frames", "Backend.audio_vad"),
+}
+
+_DEFAULT_PATH = os.path.join("temp_upload", "engine_cache.sqlite3")
+_DEFAULT_TTL_SEC = 30 * 24 * 3600
+
+_STORE_LOCK = threading.Lock()
+_STORE = {"path": None, "store": None}
+_HASH_LOCK = threading.Lock()
+_HASH_CACHE = {}
+_HASH_CACHE_MAX = 256
+_SOURCE_LOCK = threading.Lock()
+_SOURCE_DIGESTS = {}
+
+
+def _env_float(name, default):
+    try:
+        raw = os.getenv(name)
+        return float(raw) if raw not in {None, ""} else float(default)
+    except Exception:
+        return float(default)
+
+
+def engine_cache_enabled():
+    return (os.getenv("AIREALCHECK_ENGINE_CACHE") or "false").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _store_path():
+    return (os.getenv("AIREALCHECK_ENGINE_CACHE_PATH") or "").strip() or _DEFAULT_PATH
+
+
+def get_engine_store():
+    path = _store_path()
+    with _STORE_LOCK:
+        if _STORE["store"] is None or _STORE["path"] != path:
+            _STORE["store"] = ResultStore(
+                path,
+                ttl_sec=_env_float("AIREALCHECK_ENGINE_CACHE_TTL_SEC", _DEFAULT_TTL_SEC),
+                max_bytes=int(_env_float("AIREALCHECK_ENGINE_CACHE_MAX_MB", 512) * 1024 * 1024),
+                max_entries=int(_env_float("AIREALCHECK_ENGINE_CACHE_MAX_ENTRIES", 100000)),
+            )
+            _STORE["path"] = path
+        return _STORE["store"]
+
+
+def reset_engine_cache():
+    with _STORE_LOCK:
+        store = _STORE["store"]
+        _STORE["store"] = None
+        _STORE["path"] = None
+    if store is not None:
+        store.close()
+    with _HASH_LOCK:
+        _HASH_CACHE.clear()
+
+
+def content_hash(file_path):
+    """sha256 der Datei; pro (Pfad, mtime, Groesse) nur einmal berechnet."""
+    try:
+        st = os.stat(file_path)
+    except (OSError, TypeError):
+        return None
+    key = (os.path.abspath(file_path), st.st_mtime_ns, st.st_size)
+    with _HASH_LOCK:
+        cached = _HASH_CACHE.get(key)
+    if cached:
+        return cached
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _HASH_LOCK:
+        if len(_HASH_CACHE) >= _HASH_CACHE_MAX:
+            _HASH_CACHE.pop(next(iter(_HASH_CACHE)))
+        _HASH_CACHE[key] = digest
+    return digest
+
+
+def _source_digest(path):
+    """sha1 des Quelltexts; pro (Pfad, mtime, Groesse) nur einmal gelesen."""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    with _SOURCE_LOCK:
+        cached = _SOURCE_DIGESTS.get(key)
+    if cached:
+        return cached
+    with open(path, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()[:16]
+    with _SOURCE_LOCK:
+        _SOURCE_DIGESTS[key] = digest
+    return digest
+
+
+def _module_sources(module_name):
+    """Quelldateien eines Moduls ohne Import; bei Paketen alle .py-Dateien darunter."""
+    spec = importlib.util.find_spec(module_name)
+    if spec is None or not spec.origin or not spec.origin.endswith(".py"):
+        return []
+    if not spec.submodule_search_locations:
+        return [spec.origin]
+    sources = []
+    for root in spec.submodule_search_locations:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if d != "__pycache__")
+            sources.extend(os.path.join(dirpath, name) for name in sorted(filenames) if name.endswith(".py"))
+    return sources
+
+
+def _code_signature(fn, engine_name=None):
+    # Aenderungen am Engine-Code und an den Modulen aus ENGINE_CODE_MODULES zaehlen als neue Engine-Version.
+    try:
+        source = inspect.getsourcefile(fn)
+        signature = [os.path.basename(source), getattr(fn, "__qualname__", ""), _source_digest(source)]
+    except Exception:
+        return [getattr(fn, "__module__", ""), getattr(fn, "__qualname__", "")]
+    for module_name in ENGINE_CODE_MODULES.get(engine_name, ()):
+        try:
+            digests = [_source_digest(path) for path in _module_sources(module_name)]
+        except Exception as exc:
+            digests = [f"unavailable:{type(exc).__name__}"]
+        signature.append([module_name, digests])
+    return signature
+
+
+def engine_fingerprint(engine_name, fn):
+    return config_fingerprint(
+        extra={"engine": engine_name, "code": _code_signature(fn, engine_name)},
+        keywords=ENGINE_CONFIG_KEYWORDS.get(engine_name),
+    )
+
+
+def _cache_key(engine_name, fn, args):
+    # Nur Aufrufe der Form fn(file_path) sind inhaltsadressierbar.
+    if len(args) != 1 or not isinstance(args[0], str):
+        return None
+    try:
+        digest = content_hash(args[0])
+    except Exception:
+        return None
+    if not digest:
+        return None
+    return digest, engine_fingerprint(engine_name, fn)
+
+
+def is_cacheable(result):
+    # Ausfaelle (Timeout, Fehler, Provider down) nie speichern, sonst bleiben sie haengen.
+    return isinstance(result, dict) and result.get("status") == "ok" and bool(result.get("available"))
+
+
+def lookup_engine_result(engine_name, fn, args):
+    """(cached_result | None, key); key ist fuer store_engine_result() bei einem Miss."""
+    if not engine_cache_enabled():
+        return None, None
+    key = _cache_key(engine_name, fn, args)
+    if key is None:
+        return None, None
+    digest, version = key
+    cached = get_engine_store().get(digest, namespace=engine_name, config_version=version)
+    if not isinstance(cached, dict):
+        return None, key
+    cached["engine_cache"] = "hit"
+    return cached, key
+
+
+def store_engine_result(engine_name, key, result):
+    if key is None or not is_cacheable(result):
+        return False
+    digest, version = key
+    payload = dict(result)
+    payload.pop("engine_cache", None)
+    return get_engine_store().put(digest, payload, namespace=engine_name, config_version=version)
@@ -0,0 +1,328 @@
+import json
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures import wait as wait_futures
+
+from Backend.engines.engine_cache import lookup_engine_result, store_engine_result
+from Backend.engines.engine_utils import make_engine_result, safe_engine_call
+from Backend.engines.job_progress import bind_job_progress, job_binding
+from Backend.engines.provider_http import bind_call_deadline, call_deadline
+
+
+# Netzwerk-gebundene Provider brauchen laenger als lokale Engines; beides per JSON ueberschreibbar.
+DEFAULT_ENGINE_TIMEOUTS_SEC = {
+    "hive": 40.0,
+    "sightengine": 40.0,
+    "reality_defender": 60.0,
+    "sensity_image": 40.0,
+    "reality_defender_video": 90.0,
+    "reality_defender_audio": 90.0,
+    "video_frame_detectors": 120.0,
+}
+DEFAULT_TIMEOUT_SEC = 90.0
+
+_POOL_LOCK = threading.Lock()
+_POOLS = {"thread": None, "process": None}
+_CALL = threading.local()
+_INFLIGHT_LOCK = threading.Lock()
+_INFLIGHT = {}
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, str(default)) or default)
+    except Exception:
+        return default
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, str(default)) or default)
+    except Exception:
+        return default
+
+
+def executor_mode():
+    mode = (os.getenv("AIREALCHECK_ENGINE_EXECUTOR") or "sequential").strip().lower()
+    if mode in {"parallel", "threads", "thread"}:
+        return "parallel"
+    return "sequential"
+
+
+def _process_engines():
+    raw = (os.getenv("AIREALCHECK_ENGINE_PROCESS_POOL") or "").strip()
+    return {name.strip() for name in raw.split(",") if name.strip()}
+
+
+def _timeout_overrides():
+    raw = (os.getenv("AIREALCHECK_ENGINE_TIMEOUTS_JSON") or "").strip()
+    if not raw:
+        return {}
+    try:
+        payload = json.loads(raw)
+    except Exception:
+        return {}
+    if not isinstance(payload, dict):
+        return {}
+    overrides = {}
+    for name, value in payload.items():
+        try:
+            overrides[str(name)] = float(value)
+        except Exception:
+            continue
+    return overrides
+
+
+def resolve_engine_timeout(engine_name):
+    overrides = _timeout_overrides()
+    if engine_name in overrides:
+        return overrides[engine_name]
+    if engine_name in DEFAULT_ENGINE_TIMEOUTS_SEC:
+        return DEFAULT_ENGINE_TIMEOUTS_SEC[engine_name]
+    return _env_float("AIREALCHECK_ENGINE_TIMEOUT_SEC", DEFAULT_TIMEOUT_SEC)
+
+
+def engine_max_inflight():
+    """Hoechstens so viele Aufrufe je Engine gleichzeitig im Pool, auch abgebrochene, die noch laufen."""
+    return max(1, _env_int("AIREALCHECK_ENGINE_MAX_INFLIGHT", 4))
+
+
+def _reserve_slot(engine_name):
+    with _INFLIGHT_LOCK:
+        inflight = _INFLIGHT.get(engine_name, 0)
+        if inflight >= engine_max_inflight():
+            return False, inflight
+        _INFLIGHT[engine_name] = inflight + 1
+        return True, inflight + 1
+
+
+def _release_slot(engine_name):
+    with _INFLIGHT_LOCK:
+        inflight = _INFLIGHT.get(engine_name, 0) - 1
+        if inflight > 0:
+            _INFLIGHT[engine_name] = inflight
+        else:
+            _INFLIGHT.pop(engine_name, None)
+
+
+def inflight_counts():
+    with _INFLIGHT_LOCK:
+        return dict(_INFLIGHT)
+
+
+def _get_pool(kind):
+    pool = _POOLS.get(kind)
+    if pool is not None:
+        return pool
+    with _POOL_LOCK:
+        pool = _POOLS.get(kind)
+        if pool is not None:
+            return pool
+        if kind == "process":
+            workers = max(1, _env_int("AIREALCHECK_ENGINE_PROCESS_WORKERS", 2))
+            pool = ProcessPoolExecutor(max_workers=workers)
+        else:
+            workers = max(1, _env_int("AIREALCHECK_ENGINE_THREAD_WORKERS", 16))
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="engine")
+        _POOLS[kind] = pool
+        return pool
+
+
+def shutdown_pools(wait=False):
+    with _POOL_LOCK:
+        for kind in list(_POOLS.keys()):
+            pool = _POOLS.get(kind)
+            _POOLS[kind] = None
+            if pool is not None:
+                pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def _picklable(fn, args):
+    try:
+        pickle.dumps((fn, args))
+        return True
+    except Exception:
+        return False
+
+
+def timeout_placeholder(engine_name, timeout_sec, start_time=None, queued=False):
+    return make_engine_result(
+        engine=engine_name,
+        status="timeout",
+        notes=f"{'queue_timeout' if queued else 'timeout'}:{timeout_sec:.1f}s",
+        available=False,
+        ai_likelihood=None,
+        confidence=0.0,
+        signals=["timeout", "queued"] if queued else ["timeout"],
+        start_time=start_time,
+    )
+
+
+def saturated_placeholder(engine_name, inflight, start_time=None):
+    return make_engine_result(
+        engine=engine_name,
+        status="not_available",
+        notes=f"saturated:inflight={inflight}",
+        available=False,
+        ai_likelihood=None,
+        confidence=0.0,
+        signals=["engine_saturated"],
+        start_time=start_time,
+    )
+
+
+def late_result_handler():
+    """
+    deliver(result) fuer Engines, die ihr Ergebnis nach einem "processing"-Platzhalter
+    nachliefern (z.B. Reality Defender); None ausserhalb von run_engine_calls.
+    """
+    return getattr(_CALL, "late_result", None)
+
+
+def _deliver_late_result(engine_name, cache_key, patcher, result):
+    result = dict(result)
+    result["engine"] = engine_name
+    try:
+        store_engine_result(engine_name, cache_key, result)
+    except Exception as exc:
+        print(f"[engine_executor] late result not cached engine={engine_name}: {type(exc).__name__}")
+    if patcher is not None:
+        patcher(engine_name, result)
+
+
+def _bound_engine_call(engine_name, fn, args, cache_key, binding, timeout_sec=None, started=None):
+    """
+    safe_engine_call mit der Job-Bindung des aufrufenden Threads und einem Nachlieferungs-Callback.
+    Mit timeout_sec beginnt die Frist erst hier (nicht beim Einreihen) und gilt per
+    bind_call_deadline auch fuer die HTTP-Aufrufe der Engine.
+    """
+    began = time.time()
+    if started is not None:
+        started["at"] = began
+    previous = job_binding()
+    previous_late = getattr(_CALL, "late_result", None)
+    previous_deadline = call_deadline()
+    bind_job_progress(*binding)
+    _CALL.late_result = lambda result: _deliver_late_result(engine_name, cache_key, binding[1], result)
+    if timeout_sec is not None:
+        deadline = began + timeout_sec
+        bind_call_deadline(deadline if previous_deadline is None else min(deadline, previous_deadline))
+    try:
+        return safe_engine_call(engine_name, fn, *args)
+    finally:
+        _CALL.late_result = previous_late
+        bind_call_deadline(previous_deadline)
+        bind_job_progress(*previous)
+
+
+def _future_result(engine_name, future, start_time):
+    try:
+        return future.result()
+    except Exception as exc:
+        return make_engine_result(
+            engine=engine_name,
+            status="error",
+            notes=f"exception:{type(exc).__name__}:{str(exc)[:160]}",
+            available=False,
+            ai_likelihood=None,
+            confidence=0.0,
+            signals=["exception"],
+            start_time=start_time,
+        )
+
+
+def run_engine_calls(calls):
+    """
+    Fuehrt Engine-Aufrufe aus und liefert {engine_name: result}.
+    calls: Liste von (engine_name, fn, args). Jeder Aufruf laeuft ueber safe_engine_call.
+
+    AIREALCHECK_ENGINE_EXECUTOR=sequential (Default) ruft nacheinander auf.
+    AIREALCHECK_ENGINE_EXECUTOR=parallel verteilt die Aufrufe auf einen Thread-Pool
+    (Engines aus AIREALCHECK_ENGINE_PROCESS_POOL auf einen Prozess-Pool). Jede Engine hat
+    ein eigenes Timeout ab Beginn ihres Aufrufs, das auch ihre Provider-HTTP-Aufrufe kuerzt;
+    verspaetete Engines liefern einen "timeout"-Platzhalter, ihr Ergebnis wird verworfen.
+    Wer laenger als sein Timeout in der Pool-Warteschlange steht, wird abgebrochen
+    ("queue_timeout"). Je Engine laufen hoechstens AIREALCHECK_ENGINE_MAX_INFLIGHT Aufrufe
+    gleichzeitig; darueber hinaus kommt sofort ein "saturated"-Platzhalter, statt weitere
+    Arbeit hinter haengenden Threads einzureihen.
+
+    Mit AIREALCHECK_ENGINE_CACHE=true werden erfolgreiche Ergebnisse je (Engine,
+    Engine-Fingerprint, Datei-Hash) gespeichert; nur Engines ohne passenden Eintrag laufen.
+    Nachgelieferte Ergebnisse (late_result_handler) landen ebenfalls im Cache und im Job-Ergebnis.
+    """
+    results = {}
+    cache_keys = {}
+    pending = []
+    for engine_name, fn, args in calls:
+        cached, key = lookup_engine_result(engine_name, fn, args)
+        if cached is not None:
+            results[engine_name] = cached
+        else:
+            cache_keys[engine_name] = key
+            pending.append((engine_name, fn, args))
+
+    binding = job_binding()
+    if executor_mode() != "parallel":
+        for engine_name, fn, args in pending:
+            results[engine_name] = _bound_engine_call(engine_name, fn, args, cache_keys.get(engine_name), binding)
+            store_engine_result(engine_name, cache_keys.get(engine_name), results[engine_name])
+        return results
+
+    process_engines = _process_engines()
+    start = time.time()
+    waiting = {}
+    for engine_name, fn, args in pending:
+        timeout_sec = resolve_engine_timeout(engine_name)
+        reserved, inflight = _reserve_slot(engine_name)
+        if not reserved:
+            print(f"[engine_executor] engine={engine_name} saturated inflight={inflight}")
+            results[engine_name] = saturated_placeholder(engine_name, inflight, start_time=start)
+            continue
+        kind = "thread"
+        if engine_name in process_engines and _picklable(fn, args):
+            kind = "process"
+        started = {}
+        bound_args = (_bound_engine_call, engine_name, fn, args, cache_keys.get(engine_name), binding, timeout_sec, started)
+        try:
+            if kind == "process":
+                future = _get_pool(kind).submit(safe_engine_call, engine_name, fn, *args)
+            else:
+                future = _get_pool(kind).submit(*bound_args)
+        except Exception:
+            try:
+                future = _get_pool("thread").submit(*bound_args)
+            except Exception:
+                _release_slot(engine_name)
+                raise
+        # Der Slot bleibt belegt, bis der Aufruf wirklich endet, auch nach einem Timeout.
+        future.add_done_callback(lambda _future, name=engine_name: _release_slot(name))
+        waiting[future] = (engine_name, timeout_sec, started)
+
+    while waiting:
+        now = time.time()
+        next_due = now + 0.1
+        for future, (engine_name, timeout_sec, started) in list(waiting.items()):
+            if future.done():
+                del waiting[future]
+                results[engine_name] = _future_result(engine_name, future, start)
+                store_engine_result(engine_name, cache_keys.get(engine_name), results[engine_name])
+                continue
+            began = started.get("at")
+            if began is None and future.running():
+                # Prozess-Pool: Beginn erst beim Start im Pool sichtbar.
+                began = started.setdefault("at", now)
+            if began is not None:
+                if now >= began + timeout_sec:
+                    del waiting[future]
+                    results[engine_name] = timeout_placeholder(engine_name, timeout_sec, start_time=began)
+                else:
+                    next_due = min(next_due, began + timeout_sec)
+            elif now >= start + timeout_sec and future.cancel():
+                del waiting[future]
+                results[engine_name] = timeout_placeholder(engine_name, timeout_sec, start_time=start, queued=True)
+        if waiting:
+            wait_futures(list(waiting), timeout=max(0.01, next_due - time.time()), return_when=FIRST_COMPLETED)
+    return results
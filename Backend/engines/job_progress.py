@@ -0,0 +1,38 @@
+import threading
+
+
+_CURRENT = threading.local()
+
+
+def _log(message: str):
+    try:
+        print(f"[job_progress] {message}")
+    except Exception:
+        pass
+
+
+def bind_job_progress(reporter, result_patcher=None):
+    """
+    reporter(stage, progress) fuer den aktuellen Thread setzen (None loest die Bindung).
+    Die Job-Queue bindet ihn pro Job; Engines melden nur ueber report_job_progress und
+    kennen die Queue nicht. result_patcher(engine_name, result) arbeitet nachgelieferte
+    Engine-Ergebnisse in das Job-Ergebnis ein.
+    """
+    _CURRENT.reporter = reporter
+    _CURRENT.result_patcher = result_patcher
+
+
+def job_binding():
+    """(reporter, result_patcher) des aktuellen Threads, um sie an Pool-Threads weiterzugeben."""
+    return getattr(_CURRENT, "reporter", None), getattr(_CURRENT, "result_patcher", None)
+
+
+def report_job_progress(stage: str, **progress):
+    """Fortschritt des Jobs im aktuellen Worker-Thread melden; ausserhalb von Jobs ein No-op."""
+    reporter = getattr(_CURRENT, "reporter", None)
+    if reporter is None:
+        return
+    try:
+        reporter(stage, progress or None)
+    except Exception as exc:
+        _log(f"progress update failed stage={stage}: {type(exc).__name__}")
@@ -0,0 +1,312 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from Backend.engines.circuit_breaker import breakers_enabled, get_breaker
+
+
+# (connect, read) in Sekunden, falls weder provider-spezifisch noch global per Env gesetzt.
+DEFAULT_PROVIDER_TIMEOUTS = {
+    "sightengine": (8.0, 25.0),
+    "sensity": (8.0, 25.0),
+    "reality_defender": (8.0, 25.0),
+    "hive": (8.0, 45.0),
+}
+_FALLBACK_TIMEOUTS = (8.0, 25.0)
+
+# Statuscodes, bei denen der Provider die Anfrage sicher nicht verarbeitet hat.
+_RETRY_STATUSES = {429, 503}
+# Fuer idempotente Methoden duerfen auch Gateway-Fehler wiederholt werden.
+_RETRY_STATUSES_IDEMPOTENT = {429, 502, 503, 504}
+_IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+
+_SESSIONS_LOCK = threading.Lock()
+_SESSIONS = {}
+_METRICS_LOCK = threading.Lock()
+_METRICS = {}
+_LATENCY_WINDOW = 200
+_CALL = threading.local()
+
+
+def _env_float(name, default):
+    try:
+        raw = os.getenv(name)
+        return float(raw) if raw not in {None, ""} else float(default)
+    except Exception:
+        return float(default)
+
+
+def _env_int(name, default):
+    try:
+        raw = os.getenv(name)
+        return int(raw) if raw not in {None, ""} else int(default)
+    except Exception:
+        return int(default)
+
+
+def provider_timeouts(provider):
+    """(connect, read)-Timeouts: AIREALCHECK_<PROVIDER>_*_TIMEOUT_SEC > AIREALCHECK_PAID_API_* > Default."""
+    default_connect, default_read = DEFAULT_PROVIDER_TIMEOUTS.get(provider, _FALLBACK_TIMEOUTS)
+    prefix = f"AIREALCHECK_{provider.upper()}"
+    connect = _env_float(
+        f"{prefix}_CONNECT_TIMEOUT_SEC",
+        _env_float("AIREALCHECK_PAID_API_CONNECT_TIMEOUT_SEC", default_connect),
+    )
+    read = _env_float(
+        f"{prefix}_READ_TIMEOUT_SEC",
+        _env_float("AIREALCHECK_PAID_API_READ_TIMEOUT_SEC", default_read),
+    )
+    return connect, read
+
+
+def get_session(provider):
+    """Eine Session pro Provider; urllib3 haelt darin je Host einen Keep-alive-Pool."""
+    session = _SESSIONS.get(provider)
+    if session is not None:
+        return session
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(provider)
+        if session is None:
+            pool_size = max(1, _env_int("AIREALCHECK_PROVIDER_POOL_MAXSIZE", 16))
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_size, max_retries=0)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _SESSIONS[provider] = session
+        return session
+
+
+def reset_sessions():
+    with _SESSIONS_LOCK:
+        sessions = list(_SESSIONS.values())
+        _SESSIONS.clear()
+    for session in sessions:
+        try:
+            session.close()
+        except Exception:
+            pass
+
+
+def _record(provider, latency_ms, status_code=None, error=None, retried=False):
+    with _METRICS_LOCK:
+        entry = _METRICS.get(provider)
+        if entry is None:
+            entry = {
+                "requests": 0,
+                "errors": 0,
+                "retries": 0,
+                "status_counts": {},
+                "last_error": None,
+                "latencies_ms": deque(maxlen=_LATENCY_WINDOW),
+            }
+            _METRICS[provider] = entry
+        entry["requests"] += 1
+        if retried:
+            entry["retries"] += 1
+        entry["latencies_ms"].append(float(latency_ms))
+        if status_code is not None:
+            key = str(status_code)
+            entry["status_counts"][key] = entry["status_counts"].get(key, 0) + 1
+        if error is not None or (status_code is not None and status_code >= 400):
+            entry["errors"] += 1
+            entry["last_error"] = error or f"http_{status_code}"
+
+
+def _percentile(sorted_vals, pct):
+    if not sorted_vals:
+        return None
+    idx = int(round((len(sorted_vals) - 1) * pct))
+    return sorted_vals[max(0, min(len(sorted_vals) - 1, idx))]
+
+
+def provider_metrics():
+    """Snapshot der Latenz-/Fehler-Metriken je Provider (fuer /health)."""
+    with _METRICS_LOCK:
+        snapshot = {}
+        for provider, entry in _METRICS.items():
+            latencies = sorted(entry["latencies_ms"])
+            snapshot[provider] = {
+                "requests": entry["requests"],
+                "errors": entry["errors"],
+                "retries": entry["retries"],
+                "status_counts": dict(entry["status_counts"]),
+                "last_error": entry["last_error"],
+                "latency_ms_p50": _percentile(latencies, 0.5),
+                "latency_ms_p95": _percentile(latencies, 0.95),
+            }
+        return snapshot
+
+
+def reset_provider_metrics():
+    with _METRICS_LOCK:
+        _METRICS.clear()
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Provider ist per Circuit Breaker gesperrt; der Aufruf wurde gar nicht erst gestartet."""
+
+
+def _breaker(provider):
+    if not breakers_enabled():
+        return None
+    # Ohne explizite Schwelle gilt ein Provider als degradiert, wenn p95 nahe am Read-Timeout liegt.
+    slow_p95_ms = None
+    if os.getenv("AIREALCHECK_BREAKER_SLOW_P95_MS") in {None, ""}:
+        slow_p95_ms = provider_timeouts(provider)[1] * 1000.0 * 0.8
+    return get_breaker(provider, slow_p95_ms=slow_p95_ms)
+
+
+def _is_failure_status(status_code):
+    return status_code == 429 or status_code >= 500
+
+
+def _rewind(value):
+    """Datei-Objekte in data/files vor einem erneuten Versuch zurueckspulen."""
+    candidates = []
+    if isinstance(value, dict):
+        candidates = list(value.values())
+    elif hasattr(value, "seek"):
+        candidates = [value]
+    for item in candidates:
+        if isinstance(item, (tuple, list)) and len(item) >= 2:
+            item = item[1]
+        if hasattr(item, "seek"):
+            try:
+                item.seek(0)
+            except Exception:
+                pass
+
+
+def _should_retry_status(method, status_code):
+    if method in _IDEMPOTENT_METHODS:
+        return status_code in _RETRY_STATUSES_IDEMPOTENT
+    return status_code in _RETRY_STATUSES
+
+
+def _never_connected(exc):
+    """True, wenn keine Verbindung zustande kam (Connect-Timeout, DNS, refused): nichts wurde gesendet."""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    seen = set()
+    pending = [exc]
+    while pending:
+        current = pending.pop()
+        if current is None or id(current) in seen:
+            continue
+        seen.add(id(current))
+        if isinstance(current, NewConnectionError):
+            return True
+        # requests packt urllib3.MaxRetryError in args[0], dessen reason den eigentlichen Fehler traegt.
+        pending.extend([getattr(current, "reason", None), current.__cause__, current.__context__])
+        pending.extend(arg for arg in getattr(current, "args", ()) if isinstance(arg, BaseException))
+    return False
+
+
+def _should_retry_error(method, exc):
+    if method in _IDEMPOTENT_METHODS:
+        return isinstance(exc, (requests.ConnectionError, requests.Timeout))
+    # Abbruch oder ReadTimeout bei POST: der Provider hat die Anfrage evtl. schon verarbeitet (und berechnet).
+    return isinstance(exc, requests.ConnectionError) and _never_connected(exc)
+
+
+def _backoff_sec(attempt):
+    base = max(0.0, _env_float("AIREALCHECK_PROVIDER_RETRY_BACKOFF_SEC", 0.3))
+    return random.uniform(0.0, base * (2 ** attempt))
+
+
+def _retry_allowed(attempt, max_retries, delay, deadline):
+    if attempt >= max_retries:
+        return False
+    return deadline is None or time.time() + delay < deadline
+
+
+def bind_call_deadline(deadline):
+    """
+    Absolute Frist (time.time()) des laufenden Engine-Aufrufs fuer diesen Thread; None loest sie.
+    provider_request kuerzt Timeouts darauf und startet danach keinen Versuch mehr.
+    """
+    _CALL.deadline = deadline
+
+
+def call_deadline():
+    return getattr(_CALL, "deadline", None)
+
+
+def _effective_deadline(deadline):
+    bound = call_deadline()
+    if bound is None:
+        return deadline
+    return bound if deadline is None else min(deadline, bound)
+
+
+def _capped_timeout(timeout, deadline):
+    if deadline is None:
+        return timeout
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        raise requests.Timeout("engine_deadline_exceeded")
+    connect, read = timeout if isinstance(timeout, (tuple, list)) else (timeout, timeout)
+    return (min(connect, remaining), min(read, remaining))
+
+
+def provider_request(provider, method, url, *, timeout=None, deadline=None, max_retries=None, **kwargs):
+    """
+    HTTP-Aufruf ueber die gepoolte Provider-Session mit begrenzten Retries (Full Jitter).
+    Liefert die Response bzw. wirft die letzte requests-Exception wie requests.request.
+    timeout: (connect, read), Default aus provider_timeouts(provider).
+    deadline: absolute time.time(), nach der keine weiteren Versuche starten; eine per
+    bind_call_deadline gesetzte Engine-Frist gilt zusaetzlich und kuerzt auch die Timeouts.
+    Ist der Circuit Breaker des Providers offen, wird sofort CircuitOpenError geworfen.
+    """
+    deadline = _effective_deadline(deadline)
+    if deadline is not None and time.time() >= deadline:
+        # Eigene Frist abgelaufen: kein Versuch und kein Fehler fuer den Breaker des Providers.
+        raise requests.Timeout("engine_deadline_exceeded")
+    breaker = _breaker(provider)
+    if breaker is not None and not breaker.allow():
+        raise CircuitOpenError(f"circuit_open:{provider}")
+    started = time.time()
+    success = False
+    try:
+        resp = _request_with_retries(provider, method, url, timeout, deadline, max_retries, **kwargs)
+        success = not _is_failure_status(resp.status_code)
+        return resp
+    finally:
+        if breaker is not None:
+            breaker.record(success, (time.time() - started) * 1000.0)
+
+
+def _request_with_retries(provider, method, url, timeout, deadline, max_retries, **kwargs):
+    method = method.upper()
+    if timeout is None:
+        timeout = provider_timeouts(provider)
+    if max_retries is None:
+        max_retries = max(0, _env_int("AIREALCHECK_PROVIDER_MAX_RETRIES", 2))
+    session = get_session(provider)
+    attempt = 0
+    while True:
+        if attempt:
+            _rewind(kwargs.get("files"))
+            _rewind(kwargs.get("data"))
+        attempt_timeout = _capped_timeout(timeout, deadline)
+        started = time.time()
+        delay = _backoff_sec(attempt)
+        try:
+            resp = session.request(method, url, timeout=attempt_timeout, **kwargs)
+        except requests.RequestException as exc:
+            _record(provider, (time.time() - started) * 1000.0, error=type(exc).__name__, retried=attempt > 0)
+            if not _retry_allowed(attempt, max_retries, delay, deadline) or not _should_retry_error(method, exc):
+                raise
+        else:
+            _record(provider, (time.time() - started) * 1000.0, status_code=resp.status_code, retried=attempt > 0)
+            if not _retry_allowed(attempt, max_retries, delay, deadline) or not _should_retry_status(method, resp.status_code):
+                return resp
+            resp.close()
+        time.sleep(delay)
+        attempt += 1
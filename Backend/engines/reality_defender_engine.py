@@ -1,26 +1,39 @@
 import mimetypes
 import os
+import threading
 import time
 
-import requests
+from Backend.engines.engine_cache import content_hash
+from Backend.engines.engine_executor import late_result_handler
+from Backend.engines.job_progress import report_job_progress
+from Backend.engines.provider_http import provider_request, provider_timeouts
+from Backend.engines.reality_defender_poller import RealityDefenderPoller
 
 
-_BASE_URL = "https://api.prd.realitydefender.xyz"
+_DEFAULT_BASE_URL = "https://api.prd.realitydefender.xyz"
 _PRESIGNED_ENDPOINT = "/api/files/aws-presigned"
 _RESULT_ENDPOINT = "/api/media/users/{request_id}"
 _POLL_INTERVAL_SEC = 3.0
 _MAX_POLL_SECONDS = 90.0
 _TOTAL_TIMEOUT_SECONDS = 35.0
+_DEFAULT_POLLER_PATH = os.path.join("temp_upload", "rd_pending.sqlite3")
+# Transiente HTTP-Fehler beim Ergebnisabruf: der Poller versucht es spaeter erneut.
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
 
+_POLLER_LOCK = threading.Lock()
+_POLLER = {"poller": None, "pid": None, "path": None}
 
-def _paid_apis_enabled():
-    return os.getenv("AIREALCHECK_USE_PAID_APIS", "false").lower() in {"1", "true", "yes"}
+
+def _base_url():
+    return (os.getenv("REALITY_DEFENDER_BASE_URL") or "").strip().rstrip("/") or _DEFAULT_BASE_URL
 
 
-def _paid_api_timeouts():
-    connect = float(os.getenv("AIREALCHECK_PAID_API_CONNECT_TIMEOUT_SEC", "8"))
-    read = float(os.getenv("AIREALCHECK_PAID_API_READ_TIMEOUT_SEC", "25"))
-    return connect, read
+def async_poller_enabled():
+    return (os.getenv("AIREALCHECK_RD_ASYNC_POLLER") or "true").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _paid_apis_enabled():
+    return os.getenv("AIREALCHECK_USE_PAID_APIS", "false").lower() in {"1", "true", "yes"}
 
 
 def _debug_paid_enabled():
@@ -159,6 +172,18 @@ def _is_processing_status(status):
     return normalized in {"processing", "pending", "queued", "in_progress", "running"}
 
 
+def _pending_result():
+    return {
+        "engine": "reality_defender",
+        "status": "processing",
+        "available": False,
+        "ai_likelihood": None,
+        "confidence": 0.0,
+        "signals": ["processing", "pending_resumable"],
+        "notes": "Reality Defender verarbeitet noch",
+    }
+
+
 def _timeout_result():
     return {
         "engine": "reality_defender",
@@ -171,15 +196,190 @@ def _timeout_result():
     }
 
 
+def _build_result(status, final_score, reasons):
+    signals = []
+    if status:
+        signals.append(f"status:{status}")
+
+    for item in reasons:
+        if not isinstance(item, dict):
+            continue
+        code = (item.get("code") or "").strip()
+        message = (item.get("message") or "").strip()
+        if code and message:
+            signals.append(f"reason:{code}:{message}")
+        elif code:
+            signals.append(f"reason:{code}")
+        elif message:
+            signals.append(f"reason:{message}")
+
+    ai_likelihood = None
+    if final_score is not None:
+        try:
+            score = float(final_score)
+            if score < 0.0:
+                score = 0.0
+            if score > 100.0:
+                score = 100.0
+            ai_likelihood = score / 100.0
+        except Exception:
+            ai_likelihood = None
+
+    normalized_status = _normalize_status(status)
+    if _is_processing_status(status):
+        signals = ["processing"]
+        if status:
+            signals.append(f"status:{status}")
+        return {
+            "engine": "reality_defender",
+            "ai_likelihood": None,
+            "confidence": 0.0,
+            "signals": signals[:6],
+            "notes": "Reality Defender verarbeitet noch",
+            "available": True,
+            "status": "processing",
+        }
+
+    if ai_likelihood is None and normalized_status in {"not_applicable", "unable_to_evaluate"}:
+        return {
+            "engine": "reality_defender",
+            "ai_likelihood": None,
+            "confidence": 0.0,
+            "signals": signals[:6],
+            "notes": normalized_status or "not_available",
+            "available": True,
+            "status": normalized_status or "not_available",
+        }
+
+    if ai_likelihood is None:
+        return _not_available("error:RuntimeError")
+
+    confidence = max(ai_likelihood, 1.0 - ai_likelihood)
+    notes = "ok"
+    if isinstance(status, str) and status:
+        notes = status.lower()
+
+    return {
+        "engine": "reality_defender",
+        "ai_likelihood": ai_likelihood,
+        "confidence": confidence,
+        "signals": signals[:6],
+        "notes": notes,
+        "available": True,
+        "status": "ok",
+    }
+
+
 def _timeouts_for_deadline(deadline):
     remaining = deadline - time.time()
     if remaining <= 0:
         return None
     cap = max(0.1, remaining)
-    connect, read = _paid_api_timeouts()
+    connect, read = provider_timeouts("reality_defender")
     return (min(connect, cap), min(read, cap))
 
 
+def _retry_after(resp):
+    try:
+        return max(0.0, float(resp.headers.get("Retry-After")))
+    except Exception:
+        return None
+
+
+def _fetch_result(request_id):
+    """Ein Ergebnisabruf fuer den Poller: (state, result, retry_after)."""
+    api_key = (os.getenv("REALITY_DEFENDER_API_KEY") or "").strip()
+    if not api_key:
+        return "failed", _disabled_missing_key(), None
+    resp = provider_request(
+        "reality_defender",
+        "GET",
+        f"{_base_url()}{_RESULT_ENDPOINT.format(request_id=request_id)}",
+        headers={"X-API-KEY": api_key},
+        max_retries=0,
+    )
+    if resp.status_code in _RETRY_STATUSES:
+        return "retry", _http_note(resp.status_code, resp), _retry_after(resp)
+    if resp.status_code < 200 or resp.status_code >= 300:
+        return "failed", _not_available(_http_note(resp.status_code, resp)), None
+    try:
+        payload = resp.json()
+    except Exception as exc:
+        return "retry", f"error:{type(exc).__name__}", None
+    status, final_score, reasons = _extract_result(payload)
+    if final_score is None and _normalize_status(status) not in {"not_applicable", "unable_to_evaluate", "failed", "error"}:
+        return "pending", None, _retry_after(resp)
+    result = _build_result(status, final_score, reasons)
+    # Fehlerergebnisse nicht ueber content_hash wiederverwenden.
+    return ("failed" if result.get("status") == "error" else "done"), result, None
+
+
+def get_rd_poller():
+    """Prozessweiter Poller (pro Prozess eigener Thread, gemeinsame SQLite-Datei)."""
+    path = (os.getenv("AIREALCHECK_RD_POLLER_PATH") or "").strip() or _DEFAULT_POLLER_PATH
+    with _POLLER_LOCK:
+        poller = _POLLER["poller"]
+        if poller is None or _POLLER["pid"] != os.getpid() or _POLLER["path"] != path:
+            if poller is not None and _POLLER["pid"] == os.getpid():
+                poller.stop(timeout=0)
+            poller = RealityDefenderPoller(path, _fetch_result).start()
+            _POLLER.update({"poller": poller, "pid": os.getpid(), "path": path})
+        return poller
+
+
+def reset_rd_poller():
+    with _POLLER_LOCK:
+        poller = _POLLER["poller"]
+        _POLLER.update({"poller": None, "pid": None, "path": None})
+    if poller is not None:
+        poller.stop()
+
+
+def rd_poller_stats():
+    """Stats des laufenden Pollers (fuer /health); None, solange keiner gestartet wurde."""
+    poller = _POLLER["poller"]
+    if poller is None:
+        return None
+    try:
+        return poller.stats()
+    except Exception as exc:
+        return {"error": type(exc).__name__}
+
+
+def _mark_resumed(result):
+    result = dict(result)
+    result["signals"] = list(result.get("signals") or [])[:5] + ["resumed"]
+    return result
+
+
+def _late_result_callback(deliver, resumed):
+    def _on_finish(status, result):
+        if not isinstance(result, dict):
+            # Abgelaufen, ohne dass Reality Defender ein Ergebnis geliefert hat.
+            result = _timeout_result()
+        deliver(_mark_resumed(result) if resumed else result)
+
+    return _on_finish
+
+
+def _await_poller(request_id, digest, resumed=False):
+    """
+    Meldet den Request beim Poller an, ohne auf ihn zu warten: ein bereits fertiges Ergebnis kommt
+    direkt zurueck, sonst ein "processing"-Platzhalter. Das Endergebnis liefert der Poller-Thread
+    ueber late_result_handler() nach (Engine-Cache und Job-Ergebnis samt SSE-Update).
+    """
+    poller = get_rd_poller()
+    poller.submit(request_id, content_hash=digest)
+    result = poller.wait(request_id, 0)
+    if isinstance(result, dict):
+        return _mark_resumed(result) if resumed else result
+    deliver = late_result_handler()
+    if deliver is not None:
+        poller.on_finish(request_id, _late_result_callback(deliver, resumed))
+    report_job_progress("reality_defender_pending", request_id=request_id)
+    return _pending_result()
+
+
 def analyze_reality_defender(asset_path: str) -> dict:
     start_time = time.time()
     deadline = start_time + _TOTAL_TIMEOUT_SECONDS
@@ -197,6 +397,18 @@ def analyze_reality_defender(asset_path: str) -> dict:
             return _disabled_missing_key()
         _debug_paid_log(paid_enabled, creds_present, env_names, "request")
 
+        digest = None
+        if async_poller_enabled():
+            try:
+                digest = content_hash(asset_path)
+            except Exception:
+                digest = None
+            # Nur offene oder fertige, aber noch nicht abgeholte Requests; die Wiederverwendung
+            # abgeholter Ergebnisse uebernimmt der Engine-Cache.
+            existing = get_rd_poller().find(digest) if digest else None
+            if existing is not None:
+                return _await_poller(existing["request_id"], digest, resumed=True)
+
         headers = {"X-API-KEY": api_key, "Content-Type": "application/json"}
         file_name = os.path.basename(asset_path)
         file_size = None
@@ -219,11 +431,14 @@ def analyze_reality_defender(asset_path: str) -> dict:
             if isinstance(file_size, int):
                 payload["size"] = file_size
                 payload["fileSize"] = file_size
-            resp = requests.post(
-                f"{_BASE_URL}{_PRESIGNED_ENDPOINT}",
+            resp = provider_request(
+                "reality_defender",
+                "POST",
+                f"{_base_url()}{_PRESIGNED_ENDPOINT}",
                 headers=headers,
                 json=payload,
                 timeout=timeouts,
+                deadline=deadline,
             )
         except Exception as exc:
             return _not_available(f"error:{type(exc).__name__}")
@@ -302,11 +517,14 @@ def analyze_reality_defender(asset_path: str) -> dict:
                     return _timeout_result()
                 with open(asset_path, "rb") as f:
                     files = {"file": (os.path.basename(asset_path), f)}
-                    upload_resp = requests.post(
+                    upload_resp = provider_request(
+                        "reality_defender",
+                        "POST",
                         upload_url,
                         data=upload_fields,
                         files=files,
                         timeout=timeouts,
+                        deadline=deadline,
                     )
             except Exception as exc:
                 return _not_available(f"error:{type(exc).__name__}")
@@ -316,11 +534,14 @@ def analyze_reality_defender(asset_path: str) -> dict:
                 if timeouts is None:
                     return _timeout_result()
                 with open(asset_path, "rb") as f:
-                    upload_resp = requests.put(
+                    upload_resp = provider_request(
+                        "reality_defender",
+                        "PUT",
                         upload_url,
                         data=f,
                         headers={"Content-Type": mime_type},
                         timeout=timeouts,
+                        deadline=deadline,
                     )
             except Exception as exc:
                 return _not_available(f"error:{type(exc).__name__}")
@@ -341,6 +562,9 @@ def analyze_reality_defender(asset_path: str) -> dict:
         if not request_id:
             return _not_available("error:ValueError")
 
+        if async_poller_enabled():
+            return _await_poller(request_id, digest)
+
         poll_deadline = min(deadline, time.time() + _MAX_POLL_SECONDS)
         status = None
         final_score = None
@@ -351,10 +575,13 @@ def analyze_reality_defender(asset_path: str) -> dict:
                 timeouts = _timeouts_for_deadline(deadline)
                 if timeouts is None:
                     return _timeout_result()
-                result_resp = requests.get(
-                    f"{_BASE_URL}{_RESULT_ENDPOINT.format(request_id=request_id)}",
+                result_resp = provider_request(
+                    "reality_defender",
+                    "GET",
+                    f"{_base_url()}{_RESULT_ENDPOINT.format(request_id=request_id)}",
                     headers={"X-API-KEY": api_key},
                     timeout=timeouts,
+                    deadline=deadline,
                 )
             except Exception as exc:
                 return _not_available(f"error:{type(exc).__name__}")
@@ -386,78 +613,7 @@ def analyze_reality_defender(asset_path: str) -> dict:
 
         if time.time() >= deadline and final_score is None:
             return _timeout_result()
-
-        signals = []
-        if status:
-            signals.append(f"status:{status}")
-
-        for item in reasons:
-            if not isinstance(item, dict):
-                continue
-            code = (item.get("code") or "").strip()
-            message = (item.get("message") or "").strip()
-            if code and message:
-                signals.append(f"reason:{code}:{message}")
-            elif code:
-                signals.append(f"reason:{code}")
-            elif message:
-                signals.append(f"reason:{message}")
-
-        ai_likelihood = None
-        if final_score is not None:
-            try:
-                score = float(final_score)
-                if score < 0.0:
-                    score = 0.0
-                if score > 100.0:
-                    score = 100.0
-                ai_likelihood = score / 100.0
-            except Exception:
-                ai_likelihood = None
-
-        normalized_status = _normalize_status(status)
-        if _is_processing_status(status):
-            signals = ["processing"]
-            if status:
-                signals.append(f"status:{status}")
-            return {
-                "engine": "reality_defender",
-                "ai_likelihood": None,
-                "confidence": 0.0,
-                "signals": signals[:6],
-                "notes": "Reality Defender verarbeitet noch",
-                "available": True,
-                "status": "processing",
-            }
-
-        if ai_likelihood is None and normalized_status in {"not_applicable", "unable_to_evaluate"}:
-            return {
-                "engine": "reality_defender",
-                "ai_likelihood": None,
-                "confidence": 0.0,
-                "signals": signals[:6],
-                "notes": normalized_status or "not_available",
-                "available": True,
-                "status": normalized_status or "not_available",
-            }
-
-        if ai_likelihood is None:
-            return _not_available("error:RuntimeError")
-
-        confidence = max(ai_likelihood, 1.0 - ai_likelihood)
-        notes = "ok"
-        if isinstance(status, str) and status:
-            notes = status.lower()
-
-        return {
-            "engine": "reality_defender",
-            "ai_likelihood": ai_likelihood,
-            "confidence": confidence,
-            "signals": signals[:6],
-            "notes": notes,
-            "available": True,
-            "status": "ok",
-        }
+        return _build_result(status, final_score, reasons)
 
     try:
         return _run()
@@ -0,0 +1,373 @@
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from Backend.sqlite_db import SqliteDatabase
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rd_requests (
+    request_id TEXT PRIMARY KEY,
+    content_hash TEXT,
+    status TEXT NOT NULL,
+    result TEXT,
+    last_error TEXT,
+    polls INTEGER NOT NULL DEFAULT 0,
+    interval_sec REAL NOT NULL,
+    next_poll_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_rd_requests_hash ON rd_requests (content_hash, created_at);
+CREATE INDEX IF NOT EXISTS idx_rd_requests_status ON rd_requests (status, next_poll_at);
+"""
+
+# Endzustaende; danach wird ein Request nicht mehr gepollt. "delivered": ein Aufrufer hat das
+# Ergebnis abgeholt (danach uebernimmt der Engine-Cache die Wiederverwendung).
+FINAL_STATES = {"done", "failed", "delivered"}
+
+
+def _env_float(name, default):
+    try:
+        raw = os.getenv(name)
+        return float(raw) if raw not in {None, ""} else float(default)
+    except Exception:
+        return float(default)
+
+
+def _log(message: str):
+    try:
+        print(f"[rd_poller] {message}")
+    except Exception:
+        pass
+
+
+def _loads(raw):
+    if raw is None:
+        return None
+    try:
+        return json.loads(raw)
+    except Exception:
+        return None
+
+
+class RealityDefenderPoller:
+    """
+    Pollt alle offenen Reality-Defender-Requests eines Prozesses in einem Hintergrund-Thread.
+    Offene Request-IDs liegen in SQLite und werden nach einem Neustart weiter gepollt.
+    Aufrufer warten nicht: on_finish() meldet das Endergebnis per Callback aus dem Poller-Thread.
+    Ein fertiges Ergebnis, das niemand abgeholt hat, wird genau einmal an den naechsten
+    Aufruf mit demselben content_hash uebergeben; abgeholte, fehlgeschlagene und nie abgeholte
+    Eintraege entfernt prune() periodisch.
+
+    fetch(request_id) liefert (state, result, retry_after):
+      pending -> noch in Arbeit, retry -> voruebergehender Fehler (result = Notiz),
+      done/failed -> Endergebnis (result = Engine-Result-Dict).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fetch,
+        initial_sec=None,
+        max_sec=None,
+        factor=None,
+        pending_ttl_sec=None,
+        delivered_grace_sec=None,
+        prune_interval_sec=None,
+        clock=None,
+    ):
+        self.path = path
+        self.fetch = fetch
+        self.initial_sec = _env_float("AIREALCHECK_RD_POLL_INITIAL_SEC", 1.0) if initial_sec is None else initial_sec
+        self.max_sec = _env_float("AIREALCHECK_RD_POLL_MAX_SEC", 15.0) if max_sec is None else max_sec
+        self.factor = max(1.0, _env_float("AIREALCHECK_RD_POLL_FACTOR", 1.6) if factor is None else factor)
+        self.pending_ttl_sec = (
+            _env_float("AIREALCHECK_RD_PENDING_TTL_SEC", 1800) if pending_ttl_sec is None else pending_ttl_sec
+        )
+        # Gleichzeitige Warter auf denselben Request sehen das Ergebnis noch so lange nach der Abholung.
+        self.delivered_grace_sec = 60.0 if delivered_grace_sec is None else float(delivered_grace_sec)
+        self.prune_interval_sec = (
+            _env_float("AIREALCHECK_RD_PRUNE_SEC", 300) if prune_interval_sec is None else prune_interval_sec
+        )
+        self._clock = clock or time.time
+        self._last_prune = 0.0
+        self._db = SqliteDatabase(path, _SCHEMA, row_factory=sqlite3.Row)
+        self._heap_lock = threading.Lock()
+        self._heap = []
+        # request_id -> aktuell gueltiger Termin; aeltere Heap-Eintraege verfallen (lazy deletion).
+        self._scheduled = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._events_lock = threading.Lock()
+        self._events = {}
+        self._callbacks = {}
+
+    def _connect(self):
+        return self._db.connect()
+
+    def _transaction(self):
+        return self._db.transaction()
+
+    def _event(self, request_id):
+        with self._events_lock:
+            event = self._events.get(request_id)
+            if event is None:
+                event = threading.Event()
+                self._events[request_id] = event
+            return event
+
+    def _signal(self, request_id):
+        with self._events_lock:
+            event = self._events.pop(request_id, None)
+        if event is not None:
+            event.set()
+
+    def on_finish(self, request_id, callback):
+        """
+        callback(status, result) einmal aufrufen, sobald der Request einen Endzustand erreicht
+        (sofort, falls er schon fertig ist). Laeuft im Poller-Thread dieses Prozesses.
+        """
+        with self._events_lock:
+            self._callbacks.setdefault(request_id, []).append(callback)
+        entry = self.get(request_id)
+        if entry is not None and entry.get("status") in FINAL_STATES:
+            self._run_callbacks(request_id, entry.get("status"), entry.get("result"))
+
+    def _run_callbacks(self, request_id, status, result):
+        with self._events_lock:
+            callbacks = self._callbacks.pop(request_id, [])
+        for callback in callbacks:
+            try:
+                callback(status, result)
+            except Exception as exc:
+                _log(f"callback failed request={request_id}: {type(exc).__name__}: {exc}")
+
+    def _schedule(self, request_id, due_at):
+        with self._heap_lock:
+            heapq.heappush(self._heap, (float(due_at), request_id))
+            self._scheduled[request_id] = float(due_at)
+        self._wake.set()
+
+    def submit(self, request_id: str, content_hash=None):
+        """Request zum Pollen anmelden (idempotent); liefert die request_id."""
+        now = self._clock()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT status FROM rd_requests WHERE request_id = ?", (request_id,)).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO rd_requests (request_id, content_hash, status, interval_sec, next_poll_at, "
+                    "created_at, expires_at) VALUES (?, ?, 'pending', ?, ?, ?, ?)",
+                    (request_id, content_hash, self.initial_sec, now + self.initial_sec, now, now + self.pending_ttl_sec),
+                )
+        if row is None or row["status"] not in FINAL_STATES:
+            self._schedule(request_id, now + self.initial_sec)
+        return request_id
+
+    def get(self, request_id: str):
+        row = self._connect().execute("SELECT * FROM rd_requests WHERE request_id = ?", (request_id,)).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry["result"] = _loads(entry.get("result"))
+        return entry
+
+    def find(self, content_hash):
+        """Neuester offene oder fertige, noch nicht abgeholte Request fuer content_hash (oder None)."""
+        if not content_hash:
+            return None
+        row = self._connect().execute(
+            "SELECT * FROM rd_requests WHERE content_hash = ? AND status IN ('pending', 'done') "
+            "ORDER BY created_at DESC LIMIT 1",
+            (content_hash,),
+        ).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry["result"] = _loads(entry.get("result"))
+        return entry
+
+    def wait(self, request_id: str, timeout: float, db_poll_sec=0.5):
+        """
+        Wartet auf das Endergebnis (Result-Dict) oder liefert None nach timeout.
+        Der Request bleibt dann offen und wird im Hintergrund weiter gepollt; ein abgeholtes
+        Ergebnis gilt als "delivered" und wird von find() nicht mehr angeboten.
+        """
+        deadline = time.time() + max(0.0, float(timeout))
+        event = None
+        try:
+            while True:
+                entry = self.get(request_id)
+                if entry is not None and entry.get("status") in FINAL_STATES:
+                    if entry.get("status") == "done":
+                        self._mark_delivered(request_id)
+                    return entry.get("result")
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                if event is None:
+                    event = self._event(request_id)
+                # Fertigmeldungen aus anderen Prozessen sieht nur der DB-Check.
+                event.wait(min(remaining, db_poll_sec))
+        finally:
+            if event is not None:
+                with self._events_lock:
+                    if self._events.get(request_id) is event:
+                        self._events.pop(request_id, None)
+
+    def _mark_delivered(self, request_id):
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE rd_requests SET status = 'delivered', finished_at = ? WHERE request_id = ? AND status = 'done'",
+                (self._clock(), request_id),
+            )
+
+    def prune(self):
+        """Abgeholte/fehlgeschlagene Eintraege nach kurzer Karenz, nie abgeholte nach pending_ttl_sec loeschen."""
+        now = self._clock()
+        with self._transaction() as conn:
+            removed = conn.execute(
+                "DELETE FROM rd_requests WHERE "
+                "(status IN ('delivered', 'failed') AND finished_at < ?) OR (status = 'done' AND finished_at < ?)",
+                (now - self.delivered_grace_sec, now - self.pending_ttl_sec),
+            ).rowcount or 0
+        self._last_prune = now
+        if removed:
+            _log(f"pruned requests={removed}")
+        return removed
+
+    def _finish(self, request_id, status, result):
+        now = self._clock()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE rd_requests SET status = ?, result = ?, finished_at = ?, polls = polls + 1 "
+                "WHERE request_id = ?",
+                (status, json.dumps(result, ensure_ascii=False) if result is not None else None, now, request_id),
+            )
+        self._signal(request_id)
+        self._run_callbacks(request_id, status, result)
+
+    def _claim(self, request_id, now):
+        """Poll-Slot per next_poll_at reservieren, damit parallele Prozesse nicht doppelt pollen."""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT * FROM rd_requests WHERE request_id = ?", (request_id,)).fetchone()
+            if row is None or row["status"] in FINAL_STATES:
+                return None, None
+            if float(row["next_poll_at"]) > now:
+                return None, float(row["next_poll_at"])
+            lease = now + max(float(row["interval_sec"]), 30.0)
+            conn.execute("UPDATE rd_requests SET next_poll_at = ? WHERE request_id = ?", (lease, request_id))
+            return dict(row), None
+
+    def _reschedule(self, request_id, interval, retry_after=None, error=None):
+        now = self._clock()
+        next_interval = min(self.max_sec, max(self.initial_sec, float(interval) * self.factor))
+        delay = max(next_interval, float(retry_after or 0.0))
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE rd_requests SET interval_sec = ?, next_poll_at = ?, polls = polls + 1, last_error = ? "
+                "WHERE request_id = ?",
+                (next_interval, now + delay, error, request_id),
+            )
+        self._schedule(request_id, now + delay)
+
+    def poll_request(self, request_id: str):
+        """Einen faelligen Request pollen; liefert den neuen Status oder None, wenn nicht faellig."""
+        now = self._clock()
+        row, due_at = self._claim(request_id, now)
+        if row is None:
+            if due_at is not None:
+                self._schedule(request_id, due_at)
+            else:
+                # Von einem anderen Prozess abgeschlossen: lokale Warter und Callbacks bedienen.
+                self._signal(request_id)
+                entry = self.get(request_id)
+                if entry is not None:
+                    self._run_callbacks(request_id, entry.get("status"), entry.get("result"))
+            return None
+        if now >= float(row["expires_at"]):
+            self._finish(request_id, "failed", None)
+            _log(f"request={request_id} expired after {int(row['polls'])} polls")
+            return "failed"
+        try:
+            state, result, retry_after = self.fetch(request_id)
+        except Exception as exc:
+            state, result, retry_after = "retry", f"error:{type(exc).__name__}", None
+        if state in FINAL_STATES:
+            self._finish(request_id, state, result)
+            return state
+        error = result if state == "retry" else None
+        self._reschedule(request_id, row["interval_sec"], retry_after=retry_after, error=error)
+        return "pending"
+
+    def poll_due(self):
+        """Alle faelligen Requests einmal pollen; liefert die Anzahl der Polls."""
+        polled = 0
+        while True:
+            now = self._clock()
+            with self._heap_lock:
+                if not self._heap or self._heap[0][0] > now:
+                    return polled
+                due, request_id = heapq.heappop(self._heap)
+                if self._scheduled.get(request_id) != due:
+                    continue
+                del self._scheduled[request_id]
+            if self.poll_request(request_id) is not None:
+                polled += 1
+
+    def resume_pending(self):
+        """Offene Requests aus SQLite einplanen (nach Neustart des Workers)."""
+        rows = self._connect().execute(
+            "SELECT request_id, next_poll_at FROM rd_requests WHERE status = 'pending'"
+        ).fetchall()
+        for row in rows:
+            self._schedule(row["request_id"], float(row["next_poll_at"]))
+        if rows:
+            _log(f"resumed pending={len(rows)}")
+        return len(rows)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        try:
+            self.resume_pending()
+        except Exception as exc:
+            _log(f"resume failed: {type(exc).__name__}: {exc}")
+        self._thread = threading.Thread(target=self._loop, name="rd-poller", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_due()
+            except Exception as exc:
+                _log(f"poll failed: {type(exc).__name__}: {exc}")
+            if self._clock() - self._last_prune >= self.prune_interval_sec:
+                try:
+                    self.prune()
+                except Exception as exc:
+                    _log(f"prune failed: {type(exc).__name__}: {exc}")
+            with self._heap_lock:
+                wait_sec = self._heap[0][0] - self._clock() if self._heap else 5.0
+            self._wake.wait(max(0.01, min(wait_sec, 5.0)))
+            self._wake.clear()
+
+    def stats(self):
+        rows = self._connect().execute("SELECT status, COUNT(*) AS n FROM rd_requests GROUP BY status").fetchall()
+        with self._heap_lock:
+            scheduled = len(self._scheduled)
+        return {"requests": {row["status"]: int(row["n"]) for row in rows}, "scheduled": scheduled}
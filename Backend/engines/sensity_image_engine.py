@@ -1,9 +1,8 @@
 import os
 import time
 
-import requests
-
 from Backend.engines.engine_utils import make_engine_result
+from Backend.engines.provider_http import provider_request
 
 
 ENGINE_NAME = "sensity_image"
@@ -17,12 +16,6 @@ def _paid_apis_enabled() -> bool:
     return os.getenv("AIREALCHECK_USE_PAID_APIS", "false").lower() in {"1", "true", "yes"}
 
 
-def _paid_api_timeouts():
-    connect = float(os.getenv("AIREALCHECK_PAID_API_CONNECT_TIMEOUT_SEC", "8"))
-    read = float(os.getenv("AIREALCHECK_PAID_API_READ_TIMEOUT_SEC", "25"))
-    return connect, read
-
-
 def _api_key() -> str:
     return (os.getenv("SENSITY_API_KEY") or "").strip()
 
@@ -207,7 +200,7 @@ def analyze_sensity_image(file_path: str):
     try:
         with open(file_path, "rb") as f:
             files = {file_field: f}
-            resp = requests.post(url, files=files, headers=headers, timeout=_paid_api_timeouts())
+            resp = provider_request("sensity", "POST", url, files=files, headers=headers)
     except Exception as exc:
         return make_engine_result(
             engine=ENGINE_NAME,
@@ -1,7 +1,7 @@
 import os
 import time
 
-import requests
+from Backend.engines.provider_http import provider_request
 
 
 _API_URL = "https://api.sightengine.com/1.0/check.json"
@@ -11,12 +11,6 @@ def _paid_apis_enabled():
     return os.getenv("AIREALCHECK_USE_PAID_APIS", "false").lower() in {"1", "true", "yes"}
 
 
-def _paid_api_timeouts():
-    connect = float(os.getenv("AIREALCHECK_PAID_API_CONNECT_TIMEOUT_SEC", "8"))
-    read = float(os.getenv("AIREALCHECK_PAID_API_READ_TIMEOUT_SEC", "25"))
-    return connect, read
-
-
 def _debug_paid_enabled():
     return os.getenv("AIREALCHECK_DEBUG_PAID", "0").lower() in {"1", "true", "yes", "on"}
 
@@ -126,7 +120,7 @@ def run_sightengine(file_path: str):
                 "api_user": api_user,
                 "api_secret": api_secret,
             }
-            resp = requests.post(_API_URL, files=files, data=data, timeout=_paid_api_timeouts())
+            resp = provider_request("sightengine", "POST", _API_URL, files=files, data=data)
     except Exception as exc:
         return _error(f"error:{type(exc).__name__}")
 
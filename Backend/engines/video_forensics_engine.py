@@ -1,7 +1,10 @@
+import json
+import math
 import os
 import shutil
 import subprocess
 import tempfile
+import threading
 import time
 import traceback
 from statistics import mean, median
@@ -18,7 +21,9 @@ from Backend.image_forensics import (
     _sharpness_variance,
     _to_cv_gray,
 )
+from Backend.audio_context import TARGET_SAMPLE_RATE, ffmpeg_audio_output_args, pcm16_to_float32
 from Backend.engines.engine_utils import make_engine_result
+from Backend.video_frame_store import video_frame_store_scope
 
 
 def _not_available(notes="not_available", start_time=None):
@@ -139,12 +144,6 @@ def _downsample_gray(gray, max_width=320):
     return cv2.resize(gray, new_size, interpolation=cv2.INTER_AREA)
 
 
-def _hist_gray(gray, bins=32):
-    hist = cv2.calcHist([gray], [0], None, [bins], [0, 256])
-    cv2.normalize(hist, hist)
-    return hist
-
-
 def _blockiness_score(gray):
     h, w = gray.shape[:2]
     if h < 16 or w < 16:
@@ -583,6 +582,268 @@ def extract_video_frames(file_path, max_frames, scan_fps, timeout_sec, tmpdir=No
     return frame_items, meta
 
 
+def _probe_video_geometry(file_path, timeout_sec):
+    """
+    Breite/Hoehe nach Auto-Rotation und Dauer des ersten Videostreams (ffprobe, Fallback OpenCV);
+    has_audio ist nur per ffprobe bekannt (sonst None).
+    """
+    info = {"width": None, "height": None, "duration": None, "has_audio": None}
+    ffprobe = _ffprobe_path()
+    _log_ffprobe_path(ffprobe)
+    if ffprobe:
+        cmd = [
+            ffprobe,
+            "-v",
+            "error",
+            "-show_entries",
+            "stream=codec_type,width,height:stream_tags=rotate:stream_side_data=rotation:format=duration",
+            "-of",
+            "json",
+            file_path,
+        ]
+        try:
+            proc = subprocess.run(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                timeout=timeout_sec,
+                check=False,
+            )
+            payload = json.loads(proc.stdout.decode("utf-8", errors="ignore") or "{}")
+        except Exception:
+            payload = {}
+        streams = [s for s in payload.get("streams") or [] if isinstance(s, dict)]
+        video_streams = [s for s in streams if s.get("codec_type") == "video"]
+        stream = video_streams[0] if video_streams else {}
+        if streams:
+            info["has_audio"] = any(s.get("codec_type") == "audio" for s in streams)
+        try:
+            width = int(stream.get("width") or 0)
+            height = int(stream.get("height") or 0)
+        except Exception:
+            width = height = 0
+        rotation = 0.0
+        try:
+            rotation = float((stream.get("tags") or {}).get("rotate") or 0)
+            for side in stream.get("side_data_list") or []:
+                if "rotation" in side:
+                    rotation = float(side.get("rotation") or 0)
+        except Exception:
+            rotation = 0.0
+        if int(round(abs(rotation))) % 180 == 90:
+            width, height = height, width
+        if width > 0 and height > 0:
+            info["width"] = width
+            info["height"] = height
+        try:
+            duration = float((payload.get("format") or {}).get("duration") or 0)
+            info["duration"] = duration if duration > 0 else None
+        except Exception:
+            pass
+    if info["width"] is None:
+        cap = cv2.VideoCapture(file_path)
+        try:
+            if cap.isOpened():
+                width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
+                height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+                if width > 0 and height > 0:
+                    info["width"] = width
+                    info["height"] = height
+        finally:
+            cap.release()
+    if info["duration"] is None:
+        info["duration"] = _video_duration_sec(file_path)
+    return info
+
+
+def _pipe_target_size(width, height, max_width=0):
+    if max_width and width > max_width:
+        height = height * (float(max_width) / float(width))
+        width = max_width
+    width = max(2, int(width) // 2 * 2)
+    height = max(2, int(round(height)) // 2 * 2)
+    return width, height
+
+
+def _read_exact(stream, view):
+    filled = 0
+    total = len(view)
+    while filled < total:
+        got = stream.readinto(view[filled:])
+        if not got:
+            break
+        filled += got
+    return filled
+
+
+def extract_video_frame_array(file_path, max_frames, scan_fps, timeout_sec, max_width=0, audio_sink=None):
+    """
+    Dekodiert Frames per ffmpeg-Pipe (-f rawvideo -pix_fmt bgr24) direkt in ein
+    (N, H, W, 3)-uint8-Array, ohne JPEGs im Temp-Verzeichnis. Liefert (array|None, meta).
+    Mit audio_sink schreibt derselbe ffmpeg-Lauf die Tonspur (mono 16 kHz s16le) in eine
+    zweite Pipe; bei Erfolg wird audio_sink(samples, meta) aufgerufen (kein zweiter Demux).
+    """
+    ffmpeg = _ffmpeg_path()
+    _log_ffmpeg_path(ffmpeg)
+    if not ffmpeg or not os.path.exists(ffmpeg) or not os.access(ffmpeg, os.X_OK):
+        return None, {"note": "ffmpeg_not_installed", "ffmpeg_exit": None, "stderr": "", "method": "ffmpeg_pipe"}
+    if not os.path.exists(file_path):
+        return None, {"note": "file_missing", "ffmpeg_exit": None, "stderr": "", "method": "ffmpeg_pipe"}
+    try:
+        if os.path.getsize(file_path) <= 0:
+            return None, {"note": "file_size_0", "ffmpeg_exit": None, "stderr": "", "method": "ffmpeg_pipe"}
+    except Exception:
+        return None, {"note": "file_size_0", "ffmpeg_exit": None, "stderr": "", "method": "ffmpeg_pipe"}
+
+    start = time.time()
+    geometry = _probe_video_geometry(file_path, timeout_sec)
+    if not geometry.get("width") or not geometry.get("height"):
+        return None, {"note": "probe_failed", "ffmpeg_exit": None, "stderr": "", "method": "ffmpeg_pipe"}
+    width, height = _pipe_target_size(geometry["width"], geometry["height"], max_width)
+
+    vf_parts = []
+    if scan_fps and scan_fps > 0:
+        vf_parts.append(f"fps={scan_fps}")
+    vf_parts.append(f"scale={width}:{height}")
+    cmd = [
+        ffmpeg,
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-i",
+        file_path,
+        "-an",
+        "-sn",
+        "-dn",
+        "-vsync",
+        "0",
+        "-vf",
+        ",".join(vf_parts),
+        "-frames:v",
+        str(max_frames),
+        "-f",
+        "rawvideo",
+        "-pix_fmt",
+        "bgr24",
+        "pipe:1",
+    ]
+    # Zweite Ausgabe nur bei vorhandener Tonspur, sonst bricht ffmpeg den ganzen Lauf ab.
+    # pass_fds gibt es unter Windows nicht; dort dekodiert der AudioContext selbst.
+    audio_read_fd = audio_write_fd = None
+    if audio_sink is not None and geometry.get("has_audio") and os.name != "nt":
+        audio_read_fd, audio_write_fd = os.pipe()
+        cmd += ffmpeg_audio_output_args(f"pipe:{audio_write_fd}", TARGET_SAMPLE_RATE)
+    _log_debug(f"ffmpeg_pipe_cmd={_format_cmd(cmd)}")
+
+    # Puffer nach erwarteter Frame-Anzahl vorbelegen; waechst bei Bedarf.
+    capacity = max_frames
+    duration = geometry.get("duration")
+    if duration and scan_fps and scan_fps > 0:
+        capacity = min(max_frames, int(math.ceil(duration * scan_fps)) + 2)
+    capacity = max(1, capacity)
+    frames = np.empty((capacity, height, width, 3), dtype=np.uint8)
+
+    try:
+        if audio_write_fd is not None:
+            proc = subprocess.Popen(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, pass_fds=(audio_write_fd,)
+            )
+        else:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except Exception as exc:
+        _log_debug(f"ffmpeg_pipe_exit=error err={type(exc).__name__}")
+        for fd in (audio_read_fd, audio_write_fd):
+            if fd is not None:
+                os.close(fd)
+        return None, {"note": "ffmpeg_error", "ffmpeg_exit": None, "stderr": "", "method": "ffmpeg_pipe"}
+
+    stderr_chunks = []
+    stderr_thread = threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)
+    stderr_thread.start()
+    audio_chunks = []
+    audio_thread = None
+    if audio_read_fd is not None:
+        os.close(audio_write_fd)
+
+        def _read_audio():
+            with os.fdopen(audio_read_fd, "rb") as audio_pipe:
+                audio_chunks.append(audio_pipe.read())
+
+        audio_thread = threading.Thread(target=_read_audio, daemon=True)
+        audio_thread.start()
+    timed_out = threading.Event()
+
+    def _kill():
+        timed_out.set()
+        try:
+            proc.kill()
+        except Exception:
+            pass
+
+    remaining = max(0.1, timeout_sec - (time.time() - start))
+    timer = threading.Timer(remaining, _kill)
+    timer.start()
+    count = 0
+    try:
+        while count < max_frames:
+            if count >= frames.shape[0]:
+                grown = np.empty((min(max_frames, frames.shape[0] * 2), height, width, 3), dtype=np.uint8)
+                grown[:count] = frames[:count]
+                frames = grown
+            view = memoryview(frames[count]).cast("B")
+            if _read_exact(proc.stdout, view) < len(view):
+                break
+            count += 1
+    finally:
+        timer.cancel()
+        try:
+            proc.stdout.close()
+        except Exception:
+            pass
+        # Mit Tonspur laeuft ffmpeg nach dem letzten Frame weiter, bis das Audio fertig ist.
+        wait_sec = 5.0
+        if audio_thread is not None:
+            wait_sec = max(wait_sec, timeout_sec - (time.time() - start))
+        try:
+            proc.wait(timeout=wait_sec)
+        except Exception:
+            _kill()
+            proc.wait()
+        stderr_thread.join(timeout=1)
+        if audio_thread is not None:
+            audio_thread.join(timeout=1)
+
+    raw_stderr = stderr_chunks[0] if stderr_chunks else b""
+    stderr = _safe_stderr_snippet(raw_stderr.decode("utf-8", errors="ignore") if raw_stderr else "")
+    _log_debug(
+        f"ffmpeg_pipe_exit={proc.returncode} frames={count} size={width}x{height} "
+        f"timeout={str(timed_out.is_set()).lower()} stderr='{stderr}'"
+    )
+    meta = {
+        "ffmpeg_exit": proc.returncode,
+        "stderr": stderr,
+        "frames_extracted_count": count,
+        "method": "ffmpeg_pipe",
+    }
+    if audio_thread is not None and audio_chunks and proc.returncode == 0 and not timed_out.is_set():
+        samples = pcm16_to_float32(audio_chunks[0])
+        if samples.size:
+            audio_sink(samples, {"note": "ok", "method": "video_demux"})
+            meta["audio_demuxed"] = True
+    if count == 0:
+        if timed_out.is_set():
+            meta["note"] = "timeout"
+        elif proc.returncode not in (0, None):
+            meta["note"] = f"ffmpeg_extract_failed:{stderr}" if stderr else "ffmpeg_extract_failed"
+        else:
+            meta["note"] = "no_frames"
+        return None, meta
+    meta["note"] = "ok"
+    if timed_out.is_set():
+        meta["partial_timeout"] = True
+    return frames[:count], meta
+
+
 def _extract_frames_ffmpeg_fallback_in_dir(ffmpeg, file_path, max_frames, timeout_sec, frames_dir):
     _log_debug(f"ffmpeg_fallback_tmpdir={frames_dir}")
     out_pattern = os.path.join(frames_dir, "frame-%04d.jpg")
@@ -830,14 +1091,13 @@ def run_video_forensics(file_path: str):
     start = start_time
     base_tmp = tempfile.gettempdir()
     os.makedirs(base_tmp, exist_ok=True)
-    with tempfile.TemporaryDirectory(dir=base_tmp) as tmpdir:
-        frame_items, extract_meta = extract_video_frames(
-            file_path,
-            max_scan_frames,
-            scan_fps,
-            max_seconds,
-            tmpdir=tmpdir,
-        )
+    with tempfile.TemporaryDirectory(dir=base_tmp) as tmpdir, video_frame_store_scope(file_path) as store:
+        store.decode()
+        store_indices = store.resample_indices(scan_fps, max_scan_frames)
+        frame_items = store.items(store_indices)
+        extract_meta = dict(store.meta)
+        if frame_items:
+            extract_meta["frames_extracted_count"] = len(frame_items)
         if not frame_items:
             note = extract_meta.get("note") or "frame_extract_failed"
             frames_extracted_count = int(extract_meta.get("frames_extracted_count") or 0)
@@ -861,33 +1121,10 @@ def run_video_forensics(file_path: str):
                 return _no_frames_result(_safe_stderr_snippet(single_stderr), start_time=start_time)
 
         timed_out = False
-        scene_scores = []
-        motion_scores = []
-        prev_gray = None
-        prev_hist = None
-
-        for idx, item in enumerate(frame_items):
-            if time.time() - start > max_seconds:
-                timed_out = True
-                break
-
-            gray = cv2.cvtColor(item["frame"], cv2.COLOR_BGR2GRAY)
-            gray_small = _downsample_gray(gray)
-            hist = _hist_gray(gray_small)
-
-            if prev_gray is not None:
-                diff = cv2.absdiff(gray_small, prev_gray)
-                motion_score = float(np.mean(diff))
-                motion_scores.append((idx, motion_score))
-
-                scene_score = float(
-                    cv2.compareHist(prev_hist, hist, cv2.HISTCMP_CHISQR)
-                )
-                scene_scores.append((idx, scene_score))
-
-            prev_gray = gray_small
-            prev_hist = hist
-
+        if store_indices and len(frame_items) == len(store_indices):
+            motion_scores, scene_scores = store.transition_scores(store_indices)
+        else:
+            motion_scores, scene_scores = [], []
 
         extracted_count = int(extract_meta.get("frames_extracted_count") or len(frame_items))
         total_frames = len(frame_items)
@@ -1,7 +1,6 @@
 import os
-import subprocess
-import tempfile
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 from statistics import mean, median
 
@@ -21,13 +20,9 @@ except Exception:
 from Backend.engines.sightengine_engine import run_sightengine
 from Backend.engines.reality_defender_engine import analyze_reality_defender
 from Backend.engines.hive_engine import run_hive
-from Backend.engines.video_forensics_engine import (
-    _collect_frame_files,
-    _ffmpeg_path,
-    _format_cmd,
-    _safe_stderr_snippet,
-)
+from Backend.engines.circuit_breaker import provider_circuit_open
 from Backend.engines.engine_utils import make_engine_result, coerce_engine_result
+from Backend.video_frame_store import video_frame_store_scope
 
 
 def _log_debug(message: str):
@@ -52,6 +47,8 @@ def _reality_defender_status():
         return False, "disabled:paid_apis_off", "disabled"
     if not (os.getenv("REALITY_DEFENDER_API_KEY") or "").strip():
         return False, "not_available:missing_key", "not_available"
+    if provider_circuit_open("reality_defender"):
+        return False, "not_available:circuit_open", "not_available"
     return True, "ok", "ok"
 
 
@@ -65,6 +62,8 @@ def _hive_status():
     key_secret = (os.getenv("HIVE_API_SECRET") or "").strip()
     if not key and (not key_id or not key_secret):
         return False, "not_available:missing_key", "not_available"
+    if provider_circuit_open("hive"):
+        return False, "not_available:circuit_open", "not_available"
     return True, "ok", "ok"
 
 
@@ -75,6 +74,8 @@ def _sensity_status():
         return False, "disabled:paid_apis_off", "disabled"
     if not (os.getenv("SENSITY_API_KEY") or "").strip():
         return False, "not_available:missing_key", "not_available"
+    if provider_circuit_open("sensity"):
+        return False, "not_available:circuit_open", "not_available"
     return True, "ok", "ok"
 
 
@@ -94,6 +95,8 @@ def _sightengine_status():
         return False, "disabled:paid_apis_off", "disabled"
     if not _sightengine_creds_present():
         return False, "not_available:missing_key", "not_available"
+    if provider_circuit_open("sightengine"):
+        return False, "not_available:circuit_open", "not_available"
     return True, "ok", "ok"
 
 
@@ -278,34 +281,43 @@ def _quality_score(brightness, blur_value, blur_min):
     return (0.6 * brightness_score) + (0.4 * blur_score)
 
 
-def _analyze_frame_file(frame_path, idx, blur_enabled, dedup_enabled, use_phash, blur_min):
+def _load_frame_rgb(frame_source):
+    if isinstance(frame_source, np.ndarray):
+        if cv2 is not None:
+            return Image.fromarray(cv2.cvtColor(frame_source, cv2.COLOR_BGR2RGB))
+        return Image.fromarray(np.ascontiguousarray(frame_source[:, :, ::-1]))
+    with Image.open(frame_source) as img:
+        return img.convert("RGB")
+
+
+def _analyze_frame_file(frame_source, idx, blur_enabled, dedup_enabled, use_phash, blur_min):
+    """frame_source ist ein Dateipfad oder ein BGR-Frame aus dem VideoFrameStore."""
     try:
-        with Image.open(frame_path) as img:
-            img = img.convert("RGB")
-            gray = img.convert("L")
-            stat = ImageStat.Stat(gray)
-            brightness = float(stat.mean[0]) if stat.mean else None
-            gray_np = None
-            blur_value = None
-            if blur_enabled or (dedup_enabled and not use_phash):
-                gray_np = np.array(gray)
-            if blur_enabled and gray_np is not None:
-                blur_value = float(cv2.Laplacian(gray_np, cv2.CV_64F).var())
-            phash_value = imagehash.phash(img) if use_phash else None
-            mse_array = None
-            if dedup_enabled and not use_phash:
-                small = gray.resize((32, 32), Image.BILINEAR)
-                mse_array = np.array(small, dtype=np.float32)
-            quality = _quality_score(brightness, blur_value, blur_min)
-            return {
-                "index": idx,
-                "path": _p(frame_path),
-                "brightness": brightness,
-                "blur": blur_value,
-                "phash": phash_value,
-                "mse_array": mse_array,
-                "quality": quality,
-            }
+        img = _load_frame_rgb(frame_source)
+        gray = img.convert("L")
+        stat = ImageStat.Stat(gray)
+        brightness = float(stat.mean[0]) if stat.mean else None
+        gray_np = None
+        blur_value = None
+        if blur_enabled or (dedup_enabled and not use_phash):
+            gray_np = np.array(gray)
+        if blur_enabled and gray_np is not None:
+            blur_value = float(cv2.Laplacian(gray_np, cv2.CV_64F).var())
+        phash_value = imagehash.phash(img) if use_phash else None
+        mse_array = None
+        if dedup_enabled and not use_phash:
+            small = gray.resize((32, 32), Image.BILINEAR)
+            mse_array = np.array(small, dtype=np.float32)
+        quality = _quality_score(brightness, blur_value, blur_min)
+        return {
+            "index": idx,
+            "path": None if isinstance(frame_source, np.ndarray) else _p(frame_source),
+            "brightness": brightness,
+            "blur": blur_value,
+            "phash": phash_value,
+            "mse_array": mse_array,
+            "quality": quality,
+        }
     except Exception:
         return None
 
@@ -440,7 +452,8 @@ def _select_frames_for_scoring(frame_files, config):
             config.get("blur_min", 0.0),
         )
         if info:
-            info["path"] = _p(info.get("path"))
+            if info.get("path") is not None:
+                info["path"] = _p(info.get("path"))
             infos.append(info)
     filtered = _apply_quality_filters(
         infos,
@@ -590,35 +603,24 @@ def _collect_scoring_frames(engine_frames, engine_names):
 def extract_and_select_video_frames(file_path: str) -> dict:
     config = _resolve_frame_selection_config()
     scan_fps = _env_float("AIREALCHECK_VIDEO_DETECTOR_SCAN_FPS", _env_float("AIREALCHECK_VIDEO_SCAN_FPS", 1.5))
-    timeout_sec = _env_float(
-        "AIREALCHECK_VIDEO_DETECTOR_TIMEOUT_SEC",
-        _env_float("AIREALCHECK_VIDEO_FRAME_TIMEOUT_SEC", 20),
-    )
-    base_tmp = tempfile.gettempdir()
-    os.makedirs(base_tmp, exist_ok=True)
-    with tempfile.TemporaryDirectory(dir=base_tmp) as tmpdir:
-        frame_files, extract_meta = _extract_frames_to_dir(
-            file_path,
-            tmpdir,
-            config["extract_limit"],
-            scan_fps,
-            timeout_sec,
-        )
-        selected, meta, signals = _select_frames_for_scoring(frame_files, config)
+    with video_frame_store_scope(file_path) as store:
+        selected, meta, signals, extract_meta = _extract_master_frame_candidates(store, config, scan_fps)
         meta["signals"] = signals
         meta["note"] = extract_meta.get("note") if isinstance(extract_meta, dict) else None
         return meta
 
 
-def _extract_master_frame_candidates(file_path, tmpdir, selection_config, scan_fps, timeout_sec):
-    frame_files, extract_meta = _extract_frames_to_dir(
-        file_path,
-        tmpdir,
-        selection_config["extract_limit"],
-        scan_fps,
-        timeout_sec,
-    )
-    selected_infos, selection_meta, selection_signals = _select_frames_for_scoring(frame_files, selection_config)
+def _extract_master_frame_candidates(store, selection_config, scan_fps):
+    store.decode()
+    indices = store.resample_indices(scan_fps, selection_config["extract_limit"])
+    frames = [store.frames[idx] for idx in indices]
+    extract_meta = dict(store.meta)
+    extract_meta["frames_extracted_count"] = len(frames)
+    _log_debug(f"frames_from_store={len(frames)} store_frames={len(store)}")
+    selected_infos, selection_meta, selection_signals = _select_frames_for_scoring(frames, selection_config)
+    # Nur die ausgewaehlten Frames werden fuer die Provider-Uploads als JPEG geschrieben.
+    for info in selected_infos:
+        info["path"] = _p(store.frame_path(indices[info["index"]]))
     return selected_infos, selection_meta, selection_signals, extract_meta
 
 
@@ -665,6 +667,8 @@ def _provider_placeholder(engine, status, notes, signals=None, start_time=None):
             sigs.append("paid_apis_disabled")
         if "missing_key" in str(notes):
             sigs.append("missing_key")
+        if "circuit_open" in str(notes):
+            sigs.append("circuit_open")
         if status == "disabled":
             sigs.append("disabled")
     return make_engine_result(
@@ -793,61 +797,209 @@ def _safe_hive_result(frame_path):
         )
 
 
-def _apply_sightengine_scores(frame_infos, scores_by_path, sightengine_scores=None):
-    scored = 0
-    for info in frame_infos:
-        frame_path = _p(info.get("path"))
-        if not frame_path or frame_path not in scores_by_path:
-            continue
-        result = _safe_sightengine_result(frame_path)
-        if result.get("available") and isinstance(result.get("ai_likelihood"), (int, float)):
-            ai_value = float(result.get("ai_likelihood"))
-            scores_by_path[frame_path].append(ai_value)
-            if isinstance(sightengine_scores, list):
-                sightengine_scores.append(ai_value)
-            scored += 1
-    return scored
-
-
-def _apply_hive_scores(frame_infos, scores_by_path):
-    scored = 0
-    results = []
-    for info in frame_infos:
-        frame_path = _p(info.get("path"))
-        if not frame_path or frame_path not in scores_by_path:
-            continue
-        result = _safe_hive_result(frame_path)
-        results.append(result)
-        if result.get("available") and isinstance(result.get("ai_likelihood"), (int, float)):
-            scores_by_path[frame_path].append(float(result.get("ai_likelihood")))
-            scored += 1
-    return scored, results
+def _scoring_budget_sec():
+    return max(0.0, _env_float("AIREALCHECK_VIDEO_SCORING_BUDGET_SEC", 60))
+
+
+def _provider_concurrency(env_name, default):
+    return max(1, _env_int(env_name, default))
 
 
-def _apply_reality_defender_scores(frame_infos, scores_by_path, budget_sec):
-    scored = 0
-    results = []
+def _early_stop_config():
+    return {
+        "enabled": _env_bool("AIREALCHECK_VIDEO_EARLY_STOP", "true"),
+        "min_frames": max(2, _env_int("AIREALCHECK_VIDEO_EARLY_STOP_MIN_FRAMES", 4)),
+        "eps": max(0.0, _env_float("AIREALCHECK_VIDEO_EARLY_STOP_EPS", 0.02)),
+        "patience": max(1, _env_int("AIREALCHECK_VIDEO_EARLY_STOP_PATIENCE", 2)),
+    }
+
+
+def _aggregate_is_stable(history, config):
+    """True, wenn sich der Trimmed Mean in den letzten `patience` Ergebnissen kaum bewegt hat."""
+    patience = config["patience"]
+    if len(history) < max(config["min_frames"], patience + 1):
+        return False
+    recent = history[-(patience + 1):]
+    return all(abs(recent[i + 1] - recent[i]) <= config["eps"] for i in range(patience))
+
+
+def _score_frames_concurrently(jobs, trim_ratio, early_stop=None):
+    """
+    Bewertet Frames parallel bei mehreren Providern.
+    jobs: {provider: {"infos": [...], "fn": fn(frame_path), "workers": int, "budget_sec": float}}.
+    Jeder Provider hat einen eigenen Thread-Pool (Concurrency-Cap) und eine Deadline ab Start.
+    Liefert {provider: [[info, result, state], ...]} in Frame-Reihenfolge; state ist
+    "done", "timeout" (lief bei Deadline noch), "skipped" (Budget erschoepft, nie gestartet)
+    oder "early_stop" (abgebrochen, weil das Aggregat stabil war).
+    """
+    early_stop = early_stop or _early_stop_config()
     start = time.time()
-    for info in frame_infos:
-        frame_path = _p(info.get("path"))
-        if not frame_path or frame_path not in scores_by_path:
+    outcomes = {}
+    pools = {}
+    pending = {}
+    deadlines = {}
+    history = {}
+    scores = {}
+    for provider, job in jobs.items():
+        infos = list(job.get("infos") or [])
+        outcomes[provider] = [[info, None, "skipped"] for info in infos]
+        deadlines[provider] = start + max(0.0, float(job.get("budget_sec") or 0.0))
+        history[provider] = []
+        scores[provider] = []
+        if not infos or deadlines[provider] <= start:
             continue
-        try:
-            elapsed = time.time() - start
-            remaining = max(0.0, budget_sec - elapsed)
-            if remaining <= 0:
-                rd_engine_result = _rd_skipped_result("skipped")
+        pool = ThreadPoolExecutor(
+            max_workers=min(int(job.get("workers") or 1), len(infos)),
+            thread_name_prefix=f"score_{provider}",
+        )
+        pools[provider] = pool
+        for pos, info in enumerate(infos):
+            future = pool.submit(job["fn"], _p(info.get("path")))
+            pending[future] = (provider, pos)
+
+    def _cancel(provider_name, state_if_cancelled, state_if_running):
+        for future, (provider, pos) in list(pending.items()):
+            if provider != provider_name:
+                continue
+            if future.cancel():
+                pending.pop(future, None)
+                outcomes[provider][pos][2] = state_if_cancelled
+            elif state_if_running:
+                pending.pop(future, None)
+                outcomes[provider][pos][2] = state_if_running
+
+    try:
+        while pending:
+            now = time.time()
+            for provider in {p for p, _ in pending.values()}:
+                if now >= deadlines[provider]:
+                    _cancel(provider, "skipped", "timeout")
+            if not pending:
+                break
+            wait_sec = max(0.0, min(deadlines[p] for p, _ in pending.values()) - now)
+            done, _ = wait(list(pending), timeout=wait_sec, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider, pos = pending.pop(future, (None, None))
+                if provider is None:
+                    continue
+                try:
+                    result = future.result()
+                except Exception:
+                    result = None
+                outcomes[provider][pos][1] = result
+                outcomes[provider][pos][2] = "done"
+                if (
+                    isinstance(result, dict)
+                    and result.get("available")
+                    and isinstance(result.get("ai_likelihood"), (int, float))
+                ):
+                    scores[provider].append(float(result.get("ai_likelihood")))
+                    history[provider].append(_trimmed_mean(scores[provider], trim_ratio))
+                    if early_stop["enabled"] and _aggregate_is_stable(history[provider], early_stop):
+                        _cancel(provider, "early_stop", None)
+    finally:
+        for pool in pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+    for provider, items in outcomes.items():
+        states = [state for _, _, state in items]
+        _log_debug(
+            f"scoring provider={provider} done={states.count('done')} "
+            f"early_stop={states.count('early_stop')} timeout={states.count('timeout')} "
+            f"skipped={states.count('skipped')} elapsed_ms={int((time.time() - start) * 1000)}"
+        )
+    return outcomes
+
+
+def _apply_frame_scores(engine_frames, scores_by_path, providers, rd_budget_sec, trim_ratio):
+    """
+    Fuehrt das Scoring fuer alle aktiven Provider gleichzeitig aus und verteilt die
+    Ergebnisse wie bisher auf scores_by_path bzw. die Provider-Ergebnislisten.
+    """
+    budget_sec = _scoring_budget_sec()
+    jobs = {}
+    if "sightengine" in providers and engine_frames.get("sightengine"):
+        jobs["sightengine"] = {
+            "infos": engine_frames["sightengine"],
+            "fn": _safe_sightengine_result,
+            "workers": _provider_concurrency("AIREALCHECK_VIDEO_SIGHTENGINE_CONCURRENCY", 4),
+            "budget_sec": budget_sec,
+        }
+    if "hive" in providers and engine_frames.get("hive"):
+        jobs["hive"] = {
+            "infos": engine_frames["hive"],
+            "fn": _safe_hive_result,
+            "workers": _provider_concurrency("AIREALCHECK_VIDEO_HIVE_CONCURRENCY", 4),
+            "budget_sec": budget_sec,
+        }
+    if "reality_defender" in providers and engine_frames.get("reality_defender"):
+        jobs["reality_defender"] = {
+            "infos": engine_frames["reality_defender"],
+            "fn": lambda path: _run_reality_defender_with_budget(path, rd_budget_sec),
+            "workers": _provider_concurrency("AIREALCHECK_VIDEO_RD_CONCURRENCY", 2),
+            "budget_sec": min(budget_sec, rd_budget_sec),
+        }
+    for provider, job in jobs.items():
+        job["infos"] = [
+            info for info in job["infos"] if _p(info.get("path")) and _p(info.get("path")) in scores_by_path
+        ]
+
+    outcomes = _score_frames_concurrently(jobs, trim_ratio)
+
+    summary = {
+        "sightengine_scored": 0,
+        "sightengine_scores": [],
+        "hive_scored": 0,
+        "hive_results": [],
+        "rd_scored": 0,
+        "rd_results": [],
+        "early_stopped": [],
+        "timed_out": [],
+        "attempted_paths": set(),
+    }
+    for provider, items in outcomes.items():
+        states = {state for _, _, state in items}
+        if "early_stop" in states:
+            summary["early_stopped"].append(provider)
+        if "timeout" in states or "skipped" in states:
+            summary["timed_out"].append(provider)
+        for info, result, state in items:
+            frame_path = _p(info.get("path"))
+            if state != "early_stop":
+                summary["attempted_paths"].add(frame_path)
+            if provider == "reality_defender":
+                if state == "done":
+                    result = _normalize_rd_result(result)
+                elif state == "timeout":
+                    result = _rd_timeout_result()
+                elif state == "skipped":
+                    result = _rd_skipped_result("skipped")
+                else:
+                    continue
+                summary["rd_results"].append(result)
+            elif provider == "hive":
+                if state == "timeout":
+                    result = _provider_placeholder("hive_video", "timeout", "timeout", signals=["timeout"])
+                elif state != "done":
+                    continue
+                summary["hive_results"].append(result)
+            elif state != "done":
+                continue
+            if not (
+                isinstance(result, dict)
+                and result.get("available")
+                and isinstance(result.get("ai_likelihood"), (int, float))
+            ):
+                continue
+            ai_value = float(result.get("ai_likelihood"))
+            scores_by_path[frame_path].append(ai_value)
+            if provider == "sightengine":
+                summary["sightengine_scores"].append(ai_value)
+                summary["sightengine_scored"] += 1
+            elif provider == "hive":
+                summary["hive_scored"] += 1
             else:
-                rd_engine_result = _normalize_rd_result(
-                    _run_reality_defender_with_budget(frame_path, remaining)
-                )
-        except Exception:
-            rd_engine_result = _rd_skipped_result("error")
-        results.append(rd_engine_result)
-        if rd_engine_result.get("available") and isinstance(rd_engine_result.get("ai_likelihood"), (int, float)):
-            scores_by_path[frame_path].append(float(rd_engine_result.get("ai_likelihood")))
-            scored += 1
-    return scored, results
+                summary["rd_scored"] += 1
+    return summary
 
 
 def _aggregate_rd_results(results, trim_ratio):
@@ -896,62 +1048,6 @@ def _aggregate_hive_results(results, trim_ratio):
     return coerce_engine_result(base, "hive_video")
 
 
-def _extract_frames_to_dir(file_path, tmpdir, max_frames, scan_fps, timeout_sec):
-    ffmpeg = _ffmpeg_path()
-    if not ffmpeg or not os.path.exists(ffmpeg) or not os.access(ffmpeg, os.X_OK):
-        return [], {"note": "ffmpeg_not_installed", "stderr": ""}
-    out_pattern = os.path.join(tmpdir, "frame-%04d.jpg")
-    vf_parts = []
-    if scan_fps and scan_fps > 0:
-        vf_parts.append(f"fps={scan_fps}")
-    vf_parts.append("scale=trunc(iw/2)*2:trunc(ih/2)*2")
-    vf = ",".join(vf_parts)
-    cmd = [
-        ffmpeg,
-        "-hide_banner",
-        "-loglevel",
-        "error",
-        "-i",
-        file_path,
-        "-an",
-        "-sn",
-        "-dn",
-        "-vsync",
-        "0",
-        "-vf",
-        vf,
-        "-frames:v",
-        str(max_frames),
-        out_pattern,
-    ]
-    _log_debug(f"ffmpeg_cmd={_format_cmd(cmd)}")
-    try:
-        proc = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            timeout=timeout_sec,
-            check=False,
-        )
-    except subprocess.TimeoutExpired as exc:
-        stderr = _safe_stderr_snippet(exc.stderr.decode("utf-8", errors="ignore") if exc.stderr else "")
-        return [], {"note": "timeout", "stderr": stderr}
-    except Exception as exc:
-        return [], {"note": f"ffmpeg_error:{type(exc).__name__}", "stderr": ""}
-
-    stderr = _safe_stderr_snippet(proc.stderr.decode("utf-8", errors="ignore") if proc.stderr else "")
-    if proc.returncode != 0:
-        note = f"ffmpeg_extract_failed:{stderr}" if stderr else "ffmpeg_extract_failed"
-        return [], {"note": note, "stderr": stderr}
-
-    frames_dir = os.path.abspath(tmpdir)
-    frame_files = _collect_frame_files(frames_dir)
-    _log_debug(f"frames_dir={frames_dir}")
-    _log_debug(f"frames_pattern={out_pattern}")
-    _log_debug(f"frames_files_total={len(frame_files)}")
-    return frame_files, {"note": "ok", "stderr": stderr, "frames_extracted_count": len(frame_files)}
-
-
 def run_video_frame_detectors(file_path: str) -> dict:
     start = time.time()
     if not os.path.exists(file_path):
@@ -1057,10 +1153,6 @@ def run_video_frame_detectors(file_path: str) -> dict:
     ]
     selection_config = _ensure_master_frame_target(selection_config, frame_limits, active_engines)
     scan_fps = _env_float("AIREALCHECK_VIDEO_DETECTOR_SCAN_FPS", _env_float("AIREALCHECK_VIDEO_SCAN_FPS", 1.5))
-    timeout_sec = _env_float(
-        "AIREALCHECK_VIDEO_DETECTOR_TIMEOUT_SEC",
-        _env_float("AIREALCHECK_VIDEO_FRAME_TIMEOUT_SEC", 20),
-    )
     rd_budget_sec = _env_float(
         "AIREALCHECK_VIDEO_RD_BUDGET_SEC",
         _env_float("AIREALCHECK_VIDEO_RD_TIMEOUT_SEC", 25),
@@ -1072,16 +1164,11 @@ def run_video_frame_detectors(file_path: str) -> dict:
         trim_ratio = 0.45
     trim_label = f"{trim_ratio:g}"
 
-    base_tmp = tempfile.gettempdir()
-    os.makedirs(base_tmp, exist_ok=True)
-
-    with tempfile.TemporaryDirectory(dir=base_tmp) as tmpdir:
+    with video_frame_store_scope(file_path) as store:
         selected_infos, selection_meta, selection_signals, extract_meta = _extract_master_frame_candidates(
-            file_path,
-            tmpdir,
+            store,
             selection_config,
             scan_fps,
-            timeout_sec,
         )
         extracted_count = selection_meta.get("frames_extracted", 0)
         selected_count = selection_meta.get("frames_selected", 0)
@@ -1173,36 +1260,35 @@ def run_video_frame_detectors(file_path: str) -> dict:
 
         frame_scores = []
         failures = 0
-        sightengine_scored = 0
-        hive_scored = 0
-        rd_frames_scored = 0
-        rd_results = []
-        hive_results = []
+        early_stopped_frames = 0
         scores_by_path = {_p(info.get("path")): [] for info in scoring_infos if _p(info.get("path"))}
-        sightengine_scores = []
-
-        if use_sightengine and engine_frames.get("sightengine"):
-            sightengine_scored = _apply_sightengine_scores(
-                engine_frames["sightengine"], scores_by_path, sightengine_scores
-            )
-
-        if use_hive and engine_frames.get("hive"):
-            hive_scored, hive_results = _apply_hive_scores(engine_frames["hive"], scores_by_path)
 
-        if use_reality_defender and engine_frames.get("reality_defender"):
-            rd_frames_scored, rd_results = _apply_reality_defender_scores(
-                engine_frames["reality_defender"],
-                scores_by_path,
-                rd_budget_sec,
-            )
+        providers = set()
+        if use_sightengine:
+            providers.add("sightengine")
+        if use_hive:
+            providers.add("hive")
+        if use_reality_defender:
+            providers.add("reality_defender")
+        scoring = _apply_frame_scores(engine_frames, scores_by_path, providers, rd_budget_sec, trim_ratio)
+        sightengine_scored = scoring["sightengine_scored"]
+        sightengine_scores = scoring["sightengine_scores"]
+        hive_scored = scoring["hive_scored"]
+        hive_results = scoring["hive_results"]
+        rd_frames_scored = scoring["rd_scored"]
+        rd_results = scoring["rd_results"]
+        scoring_signals = [f"early_stop:{name}" for name in sorted(scoring["early_stopped"])]
+        scoring_signals.extend(f"scoring_budget_hit:{name}" for name in sorted(scoring["timed_out"]))
 
         for frame_info in scoring_infos:
             frame_path = _p(frame_info.get("path"))
             per_frame_scores = scores_by_path.get(frame_path) if frame_path else None
             if per_frame_scores:
                 frame_scores.append(median(per_frame_scores))
-            else:
+            elif frame_path in scoring["attempted_paths"]:
                 failures += 1
+            else:
+                early_stopped_frames += 1
 
         frames_scored = len(frame_scores)
         if frames_scored == 0:
@@ -1224,6 +1310,7 @@ def run_video_frame_detectors(file_path: str) -> dict:
                     f"agg:trimmed_mean;trim:{trim_label}",
                 ]
             )
+            signals.extend(scoring_signals)
             return make_engine_result(
                 engine="video_frame_detectors",
                 status="error",
@@ -1246,7 +1333,8 @@ def run_video_frame_detectors(file_path: str) -> dict:
         if video_ai is None:
             video_ai = median_ai
 
-        error_ratio = failures / float(scoring_count) if scoring_count else 1.0
+        attempted_count = scoring_count - early_stopped_frames
+        error_ratio = failures / float(attempted_count) if attempted_count else 1.0
         if frames_scored >= 10 and variance <= 0.1 and error_ratio <= 0.2:
             confidence_label = "high"
             confidence_value = 0.85
@@ -1297,6 +1385,7 @@ def run_video_frame_detectors(file_path: str) -> dict:
                 f"agg:trimmed_mean;trim:{trim_label}",
             ]
         )
+        signals.extend(scoring_signals)
 
         return make_engine_result(
             engine="video_frame_detectors",
@@ -29,8 +29,9 @@ except Exception as exc:
 else:
     _TV_IMPORT_ERROR = None
 
-from Backend.engines.video_forensics_engine import extract_video_frames
 from Backend.engines.engine_utils import make_engine_result
+from Backend.inference_server import InferenceUnavailable, RemoteModel, remote_model
+from Backend.video_frame_store import clip_window, video_frame_store_scope
 
 ENGINE_NAME = "video_temporal_cnn"
 _MODEL_CACHE = {"attempted": False, "model": None, "meta": None}
@@ -168,14 +169,6 @@ def _resolve_scan_fps():
     return max(0.0, value)
 
 
-def _resolve_timeout_sec():
-    try:
-        value = float(os.getenv("AIREALCHECK_VIDEO_TEMPORAL_CNN_TIMEOUT_SEC", "25"))
-    except Exception:
-        value = 25.0
-    return max(5.0, value)
-
-
 def _resolve_max_frames(target_frames):
     fallback = max(target_frames * 2, target_frames + 4)
     try:
@@ -333,6 +326,61 @@ def _load_model_cached():
     return model, meta
 
 
+def _model_for_run():
+    """Modell im Inference-Server (falls aktiv und erreichbar), sonst das lokale."""
+    remote = remote_model("temporal_cnn")
+    if remote is not None:
+        return remote
+    return _load_model_cached()
+
+
+def _output_tensor(output):
+    if isinstance(output, dict):
+        if "logits" in output:
+            output = output["logits"]
+        elif "output" in output:
+            output = output["output"]
+    if isinstance(output, (list, tuple)):
+        output = output[0]
+    return output
+
+
+def _forward(model, clip_tensor):
+    if isinstance(model, RemoteModel):
+        try:
+            rows = model.infer([clip_tensor[0].detach().cpu().numpy()])
+            return torch.from_numpy(np.asarray(rows[0], dtype=np.float32)).unsqueeze(0)
+        except InferenceUnavailable as exc:
+            print(f"[video_temporal_cnn] inference server unavailable, running locally: {exc}")
+            model, meta = _load_model_cached()
+            if model is None:
+                raise RuntimeError(meta.get("reason") or "model_unavailable")
+            clip_tensor = clip_tensor.to(meta.get("device") or _resolve_device())
+    with torch.no_grad():
+        return model(clip_tensor)
+
+
+def serve_info():
+    """Inference-Server: Modell laden und Meta melden."""
+    model, meta = _load_model_cached()
+    return {"available": model is not None, "meta": meta}
+
+
+def serve_logits(clips):
+    """Inference-Server: Logits pro Clip (C,T,H,W float32) in einem Forward-Pass."""
+    model, meta = _load_model_cached()
+    if model is None:
+        raise RuntimeError(meta.get("reason") or "model_unavailable")
+    batch = torch.from_numpy(np.stack([np.asarray(c, dtype=np.float32) for c in clips], axis=0))
+    batch = batch.to(meta.get("device") or _resolve_device())
+    with torch.no_grad():
+        output = _output_tensor(model(batch))
+    if output.ndim == 1:
+        # Wie im Einzelfall: ein 1D-Output bei einem Clip sind dessen Logits, sonst ein Logit pro Clip.
+        output = output.unsqueeze(0) if len(clips) == 1 else output.unsqueeze(1)
+    return list(output.detach().float().cpu().numpy())
+
+
 def _extract_frames_cv2(file_path, max_frames):
     if cv2 is None:
         return [], {"note": "opencv_missing", "frames_extracted_count": 0, "method": "cv2"}
@@ -356,15 +404,10 @@ def _extract_frames_cv2(file_path, max_frames):
 
 
 def _select_clip(frames, count, strategy):
-    if len(frames) < count:
+    window = clip_window(len(frames), count, strategy)
+    if window is None:
         return None
-    if strategy == "start":
-        start = 0
-    elif strategy == "end":
-        start = max(0, len(frames) - count)
-    else:
-        start = max(0, (len(frames) - count) // 2)
-    return frames[start : start + count]
+    return frames[window[0] : window[1]]
 
 
 def _prepare_clip(frames, size, mean, std):
@@ -452,7 +495,7 @@ def run_video_temporal_cnn(file_path: str):
             start_time=start,
         )
 
-    model, meta = _load_model_cached()
+    model, meta = _model_for_run()
     if model is None:
         reason = meta.get("reason") or "model_unavailable"
         status = "not_available" if reason in {"model_path_missing", "model_missing"} else "error"
@@ -478,9 +521,12 @@ def run_video_temporal_cnn(file_path: str):
     target_frames = _resolve_frame_count()
     max_frames = _resolve_max_frames(target_frames)
     scan_fps = _resolve_scan_fps()
-    timeout_sec = _resolve_timeout_sec()
 
-    frames, extract_meta = extract_video_frames(file_path, max_frames, scan_fps, timeout_sec)
+    with video_frame_store_scope(file_path) as store:
+        store.decode()
+        frames = [item["frame"] for item in store.items(store.resample_indices(scan_fps, max_frames))]
+        extract_meta = dict(store.meta)
+    extract_meta["frames_extracted_count"] = len(frames)
     extractor = extract_meta.get("method", "ffmpeg")
     if len(frames) < target_frames and cv2 is not None:
         cv2_frames, cv2_meta = _extract_frames_cv2(file_path, max_frames)
@@ -545,8 +591,7 @@ def run_video_temporal_cnn(file_path: str):
         pass
 
     try:
-        with torch.no_grad():
-            output = model(clip_tensor)
+        output = _forward(model, clip_tensor)
     except Exception as exc:
         return _result(
             status="error",
@@ -559,13 +604,7 @@ def run_video_temporal_cnn(file_path: str):
             warning=str(exc)[:240],
         )
 
-    if isinstance(output, dict):
-        if "logits" in output:
-            output = output["logits"]
-        elif "output" in output:
-            output = output["output"]
-    if isinstance(output, (list, tuple)):
-        output = output[0]
+    output = _output_tensor(output)
 
     if not torch.is_tensor(output):
         return _result(
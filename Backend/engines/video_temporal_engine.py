@@ -8,8 +8,8 @@ except Exception:
     cv2 = None
 import numpy as np
 
-from Backend.engines.video_forensics_engine import extract_video_frames
 from Backend.engines.engine_utils import make_engine_result
+from Backend.video_frame_store import video_frame_store_scope
 
 
 def _clamp01(value):
@@ -138,7 +138,12 @@ def run_video_temporal(file_path: str) -> dict:
         )
 
     start = time.time()
-    frames_raw, meta = extract_video_frames(file_path, max_frames, scan_fps, timeout_sec)
+    # Frames sind Views auf den gemeinsamen Store und bleiben auch nach dem Scope gueltig.
+    with video_frame_store_scope(file_path) as store:
+        store.decode()
+        frames_raw = store.items(store.resample_indices(scan_fps, max_frames))
+        meta = dict(store.meta)
+    meta["frames_extracted_count"] = len(frames_raw)
     extractor = meta.get("method", "ffmpeg")
     if not frames_raw:
         frames_raw, meta = _extract_frames_cv2(file_path, max_frames)
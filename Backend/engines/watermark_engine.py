@@ -1,7 +1,9 @@
 import os
 from typing import Dict, Iterable, List, Optional, Tuple
 
-from PIL import Image, ExifTags
+from PIL import ExifTags
+
+from Backend.image_context import get_image_context
 
 
 _AI_HINT_KEYWORDS = [
@@ -108,12 +110,8 @@ def _scan_pairs(pairs: Iterable[Tuple[str, str]]) -> Tuple[Optional[str], Option
     return None, None
 
 
-def _extract_exif_pairs(img: Image.Image) -> List[Tuple[str, str]]:
+def _extract_exif_pairs(exif) -> List[Tuple[str, str]]:
     pairs: List[Tuple[str, str]] = []
-    try:
-        exif = img.getexif()
-    except Exception:
-        exif = None
     if not exif:
         return pairs
     for tag_id, value in exif.items():
@@ -123,38 +121,14 @@ def _extract_exif_pairs(img: Image.Image) -> List[Tuple[str, str]]:
     return pairs
 
 
-def _extract_png_text_chunks(img: Image.Image) -> List[Tuple[str, str]]:
+def _extract_png_text_chunks(info: Dict) -> List[Tuple[str, str]]:
     pairs: List[Tuple[str, str]] = []
-    info = getattr(img, "info", {}) or {}
     for key, value in info.items():
         if isinstance(value, (str, bytes, bytearray)):
             pairs.append((f"png:{key}", value))
     return pairs
 
 
-def _extract_xmp_block(asset_path: str) -> Optional[str]:
-    try:
-        with open(asset_path, "rb") as f:
-            data = f.read()
-    except Exception:
-        return None
-    start = data.find(b"<x:xmpmeta")
-    if start == -1:
-        start = data.find(b"<xmpmeta")
-    if start == -1:
-        return None
-    end = data.find(b"</x:xmpmeta>", start)
-    if end == -1:
-        end = data.find(b"</xmpmeta>", start)
-    if end == -1:
-        end = start + 20000
-    snippet = data[start:end]
-    try:
-        return snippet.decode("utf-8", errors="ignore")
-    except Exception:
-        return None
-
-
 def _scan_xmp(xmp: str) -> Tuple[Optional[str], Optional[str]]:
     if not xmp:
         return None, None
@@ -173,22 +147,23 @@ def analyze_watermark(asset_path: str) -> Dict:
         return _make_result(signals=["not_available"], notes="not_available", available=False)
 
     signals: List[str] = []
+    ctx = get_image_context(asset_path)
     try:
-        with Image.open(asset_path) as img:
-            exif_pairs = _extract_exif_pairs(img)
-            key, kw = _scan_pairs(exif_pairs)
+        ctx.source  # kein lesbares Bild -> not_available
+        exif_pairs = _extract_exif_pairs(ctx.exif)
+        key, kw = _scan_pairs(exif_pairs)
+        if key and kw:
+            signals.append(f"metadata_ai_hint:{key}:{kw}")
+
+        if ctx.format == "PNG":
+            png_pairs = _extract_png_text_chunks(ctx.info)
+            key, kw = _scan_pairs(png_pairs)
             if key and kw:
                 signals.append(f"metadata_ai_hint:{key}:{kw}")
-
-            if img.format and img.format.upper() == "PNG":
-                png_pairs = _extract_png_text_chunks(img)
-                key, kw = _scan_pairs(png_pairs)
-                if key and kw:
-                    signals.append(f"metadata_ai_hint:{key}:{kw}")
     except Exception:
         return _make_result(signals=["not_available"], notes="not_available", available=False)
 
-    xmp = _extract_xmp_block(asset_path)
+    xmp = ctx.xmp
     key, kw = _scan_xmp(xmp or "")
     if key and kw:
         signals.append(f"metadata_ai_hint:{key}:{kw}")
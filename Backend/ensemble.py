@@ -14,7 +14,11 @@ from Backend.engines.sensity_image_engine import analyze_sensity_image
 from Backend.engines.audio_forensics_engine import run_audio_forensics
 from Backend.engines.audio_aasist_engine import run_audio_aasist
 from Backend.engines.audio_prosody_engine import run_audio_prosody
-from Backend.engines.engine_utils import safe_engine_call, make_engine_result
+from Backend.engines.engine_utils import make_engine_result
+from Backend.engines.engine_executor import run_engine_calls
+from Backend.engines.circuit_breaker import provider_circuit_open
+from Backend.audio_context import audio_context_scope
+from Backend.image_context import image_context_scope
 from Backend.runtime_thresholds import load_thresholds
 
 IMAGE_ENGINES = [
@@ -1613,26 +1617,33 @@ def run_audio_ensemble(file_path: str, enable_flags=None):
             "timing_ms": 0,
         }
 
-    if _flag("audio_aasist", "AIREALCHECK_ENABLE_AUDIO_AASIST"):
-        aasist_result = safe_engine_call("audio_aasist", run_audio_aasist, file_path)
-        if not isinstance(aasist_result, dict):
-            aasist_result = _error_placeholder("audio_aasist", "invalid_result")
-    else:
-        aasist_result = _not_available("audio_aasist", "disabled:AIREALCHECK_ENABLE_AUDIO_AASIST")
-
-    if _flag("audio_forensics", "AIREALCHECK_ENABLE_AUDIO_FORENSICS"):
-        forensics_result = safe_engine_call("audio_forensics", run_audio_forensics, file_path)
-        if not isinstance(forensics_result, dict):
-            forensics_result = _error_placeholder("audio_forensics", "invalid_result")
-    else:
-        forensics_result = _not_available("audio_forensics", "disabled:AIREALCHECK_ENABLE_AUDIO_FORENSICS")
-
-    if _flag("audio_prosody", "AIREALCHECK_ENABLE_AUDIO_PROSODY"):
-        prosody_result = safe_engine_call("audio_prosody", run_audio_prosody, file_path)
-        if not isinstance(prosody_result, dict):
-            prosody_result = _error_placeholder("audio_prosody", "invalid_result")
-    else:
-        prosody_result = _not_available("audio_prosody", "disabled:AIREALCHECK_ENABLE_AUDIO_PROSODY")
+    engine_calls = []
+    placeholders = {}
+    for engine_name, env_name, fn in (
+        ("audio_aasist", "AIREALCHECK_ENABLE_AUDIO_AASIST", run_audio_aasist),
+        ("audio_forensics", "AIREALCHECK_ENABLE_AUDIO_FORENSICS", run_audio_forensics),
+        ("audio_prosody", "AIREALCHECK_ENABLE_AUDIO_PROSODY", run_audio_prosody),
+    ):
+        if _flag(engine_name, env_name):
+            engine_calls.append((engine_name, fn, (file_path,)))
+        else:
+            placeholders[engine_name] = _not_available(engine_name, f"disabled:{env_name}")
+
+    # Ein gemeinsamer Audio-Puffer: die Datei wird fuer alle Audio-Engines nur einmal dekodiert.
+    with audio_context_scope(file_path):
+        called = run_engine_calls(engine_calls)
+
+    def _engine_result(engine_name):
+        if engine_name in placeholders:
+            return placeholders[engine_name]
+        result = called.get(engine_name)
+        if not isinstance(result, dict):
+            return _error_placeholder(engine_name, "invalid_result")
+        return result
+
+    aasist_result = _engine_result("audio_aasist")
+    forensics_result = _engine_result("audio_forensics")
+    prosody_result = _engine_result("audio_prosody")
     warnings = []
     if not aasist_result.get("available"):
         warnings.append("audio_aasist_unavailable")
@@ -1676,6 +1687,104 @@ def _compute_verdict(real, fake, confidence):
     return "uncertain"
 
 
+PAID_IMAGE_ENGINES = ("hive", "sightengine", "reality_defender", "sensity_image")
+_CONFIDENCE_RANK = {"low": 0, "medium": 1, "high": 2}
+
+
+def _cascade_enabled():
+    return os.getenv("AIREALCHECK_IMAGE_CASCADE", "false").lower() in {"1", "true", "yes", "on"}
+
+
+def _cascade_config():
+    def _float(name, default):
+        try:
+            return max(0.0, min(1.0, float(os.getenv(name, str(default)))))
+        except Exception:
+            return default
+
+    low = _float("AIREALCHECK_CASCADE_LOW", 0.2)
+    high = _float("AIREALCHECK_CASCADE_HIGH", 0.8)
+    if low > high:
+        low, high = high, low
+    min_conf = (os.getenv("AIREALCHECK_CASCADE_MIN_CONFIDENCE") or "medium").strip().lower()
+    if min_conf not in _CONFIDENCE_RANK:
+        min_conf = "medium"
+    trust_provenance = os.getenv("AIREALCHECK_CASCADE_TRUST_PROVENANCE", "true").lower() in {"1", "true", "yes", "on"}
+    return {"low": low, "high": high, "min_confidence": min_conf, "trust_provenance": trust_provenance}
+
+
+def _cascade_decision(partial, config):
+    """
+    Entscheidet nach den lokalen Engines, ob die bezahlten Provider noch noetig sind.
+    Liefert (skip_paid, reason, stage_info).
+    """
+    if config["trust_provenance"]:
+        for entry in partial:
+            signals = [str(s).strip().lower() for s in (entry.get("signals") or [])]
+            if entry.get("engine") == "c2pa" and "signature_verified" in signals:
+                return True, "c2pa_verified", {}
+            if entry.get("engine") == "watermark" and any(s.startswith("metadata_ai_hint:") for s in signals):
+                return True, "watermark_ai_hint", {}
+    final_ai = compute_final_score(partial, media_type="image")
+    if final_ai is None:
+        return False, "no_local_score", {"stage1_final_ai": None}
+    label, _reasons = compute_confidence(partial, final_ai, media_type="image")
+    stage = {"stage1_final_ai": round(float(final_ai), 4), "stage1_confidence": label}
+    if config["low"] < final_ai < config["high"]:
+        return False, "uncertain_band", stage
+    if _CONFIDENCE_RANK.get(label, 0) < _CONFIDENCE_RANK[config["min_confidence"]]:
+        return False, "low_confidence", stage
+    return True, "local_decisive", stage
+
+
+def _cascade_skipped(engine_name, reason):
+    return make_engine_result(
+        engine=engine_name,
+        status="skipped",
+        notes=f"skipped:cascade:{reason}",
+        available=False,
+        ai_likelihood=None,
+        confidence=0.0,
+        signals=["cascade_skipped"],
+        timing_ms=0,
+    )
+
+
+def _run_image_cascade(engine_calls):
+    """
+    Kaskade: erst die lokalen Engines, bezahlte Provider nur bei unsicherem Zwischenergebnis.
+    Liefert (called, cascade_info) wie run_engine_calls plus Entscheidungsprotokoll.
+    """
+    local_calls = [call for call in engine_calls if call[0] not in PAID_IMAGE_ENGINES]
+    paid_calls = [call for call in engine_calls if call[0] in PAID_IMAGE_ENGINES]
+    config = _cascade_config()
+    called = run_engine_calls(local_calls)
+    info = {
+        "enabled": True,
+        "band": [config["low"], config["high"]],
+        "min_confidence": config["min_confidence"],
+        "local_engines": [call[0] for call in local_calls],
+        "paid_engines": [call[0] for call in paid_calls],
+    }
+    if not paid_calls:
+        info.update({"decision": "no_paid_engines", "reason": "no_paid_engines"})
+        return called, info
+
+    partial = [_normalize_engine_result(called.get(name), name) for name in IMAGE_ENGINES]
+    skip_paid, reason, stage = _cascade_decision(partial, config)
+    info.update(stage)
+    info["reason"] = reason
+    if skip_paid:
+        for engine_name, _fn, _args in paid_calls:
+            called[engine_name] = _cascade_skipped(engine_name, reason)
+        info["decision"] = "skip_paid"
+    else:
+        called.update(run_engine_calls(paid_calls))
+        info["decision"] = "run_paid"
+    print(f"[cascade] decision={info['decision']} reason={reason} stage1={stage.get('stage1_final_ai')}")
+    return called, info
+
+
 def run_ensemble(file_path: str):
     use_hive = os.getenv("HIVE_ENABLED", "true").lower() in {"1", "true", "yes"}
     use_forensics = os.getenv("AIREALCHECK_IMAGE_FALLBACK", "true").lower() in {"1", "true", "yes"}
@@ -1722,6 +1831,18 @@ def run_ensemble(file_path: str):
             timing_ms=0,
         )
 
+    def _circuit_open(engine_name: str):
+        return make_engine_result(
+            engine=engine_name,
+            status="not_available",
+            notes="not_available:circuit_open",
+            available=False,
+            ai_likelihood=None,
+            confidence=0.0,
+            signals=["circuit_open"],
+            timing_ms=0,
+        )
+
     def _exception_placeholder(engine_name: str, note: str):
         return make_engine_result(
             engine=engine_name,
@@ -1775,9 +1896,13 @@ def run_ensemble(file_path: str):
             "reality_defender": {"attempted": bool(enable_rd_flag), "reason": rd_reason},
         }
 
+    cascade_info = None
+
     def _attach_debug_paid(payload):
         if debug_paid is not None and isinstance(payload, dict):
             payload["debug_paid"] = debug_paid
+        if cascade_info is not None and isinstance(payload, dict):
+            payload["cascade"] = cascade_info
         return payload
 
     def _build_engine_results():
@@ -1797,10 +1922,13 @@ def run_ensemble(file_path: str):
         return raw_list, normalized_list
 
     try:
+        engine_calls = []
         if not enable_hive:
             hive_result = _disabled_engine("hive")
+        elif use_hive and provider_circuit_open("hive"):
+            hive_result = _circuit_open("hive")
         elif use_hive:
-            hive_result = safe_engine_call("hive", run_hive, file_path)
+            engine_calls.append(("hive", run_hive, (file_path,)))
         else:
             hive_result = make_engine_result(
                 engine="hive",
@@ -1812,10 +1940,10 @@ def run_ensemble(file_path: str):
                 signals=["disabled"],
                 timing_ms=0,
             )
-        forensics_result = (
-            safe_engine_call("forensics", run_forensics, file_path)
-            if use_forensics
-            else make_engine_result(
+        if use_forensics:
+            engine_calls.append(("forensics", run_forensics, (file_path,)))
+        else:
+            forensics_result = make_engine_result(
                 engine="forensics",
                 status="disabled",
                 notes="disabled:forensics_off",
@@ -1825,29 +1953,49 @@ def run_ensemble(file_path: str):
                 signals=["disabled"],
                 timing_ms=0,
             )
-        )
-        c2pa_result = safe_engine_call("c2pa", analyze_c2pa, file_path)
-        watermark_result = safe_engine_call("watermark", analyze_watermark, file_path)
+        engine_calls.append(("c2pa", analyze_c2pa, (file_path,)))
+        engine_calls.append(("watermark", analyze_watermark, (file_path,)))
         if not enable_sightengine_flag:
             sightengine_result = _disabled_engine("sightengine")
         elif not paid_enabled:
             sightengine_result = _disabled_paid("sightengine")
+        elif provider_circuit_open("sightengine"):
+            sightengine_result = _circuit_open("sightengine")
         else:
-            sightengine_result = safe_engine_call("sightengine", run_sightengine, file_path)
+            engine_calls.append(("sightengine", run_sightengine, (file_path,)))
         if not enable_rd_flag:
             reality_defender_result = _disabled_engine("reality_defender")
         elif not paid_enabled:
             reality_defender_result = _disabled_paid("reality_defender")
+        elif provider_circuit_open("reality_defender"):
+            reality_defender_result = _circuit_open("reality_defender")
         else:
-            reality_defender_result = safe_engine_call("reality_defender", analyze_reality_defender, file_path)
+            engine_calls.append(("reality_defender", analyze_reality_defender, (file_path,)))
         if not enable_sensity_flag:
             sensity_image_result = _disabled_engine("sensity_image")
         elif not paid_enabled:
             sensity_image_result = _disabled_paid("sensity_image")
+        elif provider_circuit_open("sensity"):
+            sensity_image_result = _circuit_open("sensity_image")
         else:
-            sensity_image_result = safe_engine_call("sensity_image", analyze_sensity_image, file_path)
-        xception_result = safe_engine_call("xception", run_xception, file_path)
-        clip_detector_result = safe_engine_call("clip_detector", run_clip_detector, file_path)
+            engine_calls.append(("sensity_image", analyze_sensity_image, (file_path,)))
+        engine_calls.append(("xception", run_xception, (file_path,)))
+        engine_calls.append(("clip_detector", run_clip_detector, (file_path,)))
+
+        with image_context_scope(file_path):
+            if _cascade_enabled():
+                called, cascade_info = _run_image_cascade(engine_calls)
+            else:
+                called = run_engine_calls(engine_calls)
+        hive_result = called.get("hive", hive_result)
+        forensics_result = called.get("forensics", forensics_result)
+        c2pa_result = called.get("c2pa", c2pa_result)
+        watermark_result = called.get("watermark", watermark_result)
+        sightengine_result = called.get("sightengine", sightengine_result)
+        reality_defender_result = called.get("reality_defender", reality_defender_result)
+        sensity_image_result = called.get("sensity_image", sensity_image_result)
+        xception_result = called.get("xception", xception_result)
+        clip_detector_result = called.get("clip_detector", clip_detector_result)
 
         engine_results_raw_list, normalized = _build_engine_results()
 
@@ -0,0 +1,204 @@
+import contextlib
+import io
+import os
+import threading
+
+import numpy as np
+from PIL import Image, ImageOps
+
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+try:
+    import pillow_heif  # HEIF/HEIC/AVIF Support for Pillow
+
+    pillow_heif.register_heif_opener()
+except Exception:
+    pass
+
+
+class ImageContext:
+    """
+    Einmal pro Request dekodiertes Bild, das alle Bild-Engines gemeinsam nutzen.
+    Alle Felder werden lazy beim ersten Zugriff erzeugt und danach gecacht.
+    Die gelieferten PIL-Bilder/Arrays sind geteilt und duerfen nicht veraendert werden.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._cache = {}
+
+    def _get(self, key, factory):
+        if key in self._cache:
+            return self._cache[key]
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = factory()
+            return self._cache[key]
+
+    @property
+    def raw_bytes(self) -> bytes:
+        def _read():
+            with open(self.path, "rb") as f:
+                return f.read()
+
+        return self._get("raw_bytes", _read)
+
+    @property
+    def source(self) -> Image.Image:
+        """Erster Frame im Originalmodus, vollstaendig geladen (ohne EXIF-Rotation)."""
+
+        def _open():
+            img = Image.open(io.BytesIO(self.raw_bytes))
+            try:
+                if getattr(img, "is_animated", False):
+                    img.seek(0)
+            except Exception:
+                pass
+            img.load()
+            return img
+
+        return self._get("source", _open)
+
+    @property
+    def format(self):
+        def _format():
+            try:
+                return (self.source.format or "").upper() or None
+            except Exception:
+                return None
+
+        return self._get("format", _format)
+
+    @property
+    def rgb_image(self) -> Image.Image:
+        """RGB ohne EXIF-Rotation; Fallback ueber OpenCV, falls Pillow das Format nicht kennt."""
+
+        def _rgb():
+            try:
+                return self.source.convert("RGB")
+            except Exception:
+                if cv2 is None:
+                    raise
+                data = np.frombuffer(self.raw_bytes, dtype=np.uint8)
+                bgr = cv2.imdecode(data, cv2.IMREAD_COLOR)
+                if bgr is None:
+                    raise ValueError("OpenCV konnte das Bild nicht laden")
+                return Image.fromarray(cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB))
+
+        return self._get("rgb_image", _rgb)
+
+    @property
+    def oriented_image(self) -> Image.Image:
+        """EXIF-rotiertes Bild im Originalmodus (Alpha bleibt erhalten)."""
+
+        def _oriented():
+            img = ImageOps.exif_transpose(self.source)
+            img.load()
+            return img
+
+        return self._get("oriented_image", _oriented)
+
+    @property
+    def oriented_rgb_image(self) -> Image.Image:
+        def _oriented_rgb():
+            img = self.oriented_image
+            return img if img.mode == "RGB" else img.convert("RGB")
+
+        return self._get("oriented_rgb_image", _oriented_rgb)
+
+    @property
+    def rgb_array(self) -> np.ndarray:
+        return self._get("rgb_array", lambda: np.asarray(self.rgb_image))
+
+    @property
+    def gray(self) -> np.ndarray:
+        def _gray():
+            if cv2 is not None:
+                return cv2.cvtColor(self.rgb_array, cv2.COLOR_RGB2GRAY)
+            return np.asarray(self.rgb_image.convert("L"))
+
+        return self._get("gray", _gray)
+
+    @property
+    def exif(self):
+        def _exif():
+            try:
+                return self.source.getexif()
+            except Exception:
+                return None
+
+        return self._get("exif", _exif)
+
+    @property
+    def info(self) -> dict:
+        def _info():
+            try:
+                return dict(getattr(self.source, "info", {}) or {})
+            except Exception:
+                return {}
+
+        return self._get("info", _info)
+
+    @property
+    def xmp(self):
+        def _xmp():
+            data = self.raw_bytes
+            start = data.find(b"<x:xmpmeta")
+            if start == -1:
+                start = data.find(b"<xmpmeta")
+            if start == -1:
+                return None
+            end = data.find(b"</x:xmpmeta>", start)
+            if end == -1:
+                end = data.find(b"</xmpmeta>", start)
+            if end == -1:
+                end = start + 20000
+            try:
+                return data[start:end].decode("utf-8", errors="ignore")
+            except Exception:
+                return None
+
+        return self._get("xmp", _xmp)
+
+
+_SCOPES_LOCK = threading.Lock()
+_SCOPES = {}
+
+
+def _scope_key(path: str) -> str:
+    return os.path.abspath(path or "")
+
+
+@contextlib.contextmanager
+def image_context_scope(path: str):
+    """
+    Registriert einen ImageContext fuer die Dauer eines Requests, sodass alle Engines,
+    die get_image_context(path) aufrufen, dieselbe dekodierte Instanz erhalten.
+    """
+    key = _scope_key(path)
+    with _SCOPES_LOCK:
+        entry = _SCOPES.get(key)
+        if entry is None:
+            entry = [ImageContext(path), 0]
+            _SCOPES[key] = entry
+        entry[1] += 1
+    try:
+        yield entry[0]
+    finally:
+        with _SCOPES_LOCK:
+            entry[1] -= 1
+            if entry[1] <= 0 and _SCOPES.get(key) is entry:
+                _SCOPES.pop(key, None)
+
+
+def get_image_context(path: str) -> ImageContext:
+    """Liefert den Request-Kontext fuer path oder (ausserhalb eines Scopes) einen neuen."""
+    with _SCOPES_LOCK:
+        entry = _SCOPES.get(_scope_key(path))
+    if entry is not None:
+        return entry[0]
+    return ImageContext(path)
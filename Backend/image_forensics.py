@@ -5,6 +5,8 @@ import cv2
 import io
 import os
 import imagehash
+
+from Backend.image_context import get_image_context
 try:
     import pillow_heif  # HEIF/HEIC/AVIF Support for Pillow
     pillow_heif.register_heif_opener()
@@ -113,32 +115,10 @@ def analyze_image(file_path: str):
     """
     assert os.path.exists(file_path), "Datei existiert nicht"
 
-    # Robust laden: Pillow (mit HEIF/AVIF wenn verfügbar), Fallback über OpenCV
-    def _open_image_robust(path: str) -> Image.Image:
-        try:
-            img0 = Image.open(path)
-            # Bei animierten Formaten (GIF/WEBP) den ersten Frame nehmen
-            try:
-                if getattr(img0, "is_animated", False):
-                    img0.seek(0)
-            except Exception:
-                pass
-            return img0.convert("RGB")
-        except Exception:
-            # Fallback via OpenCV -> PIL
-            try:
-                with open(path, "rb") as f:
-                    data = np.frombuffer(f.read(), dtype=np.uint8)
-                bgr = cv2.imdecode(data, cv2.IMREAD_COLOR)
-                if bgr is None:
-                    raise ValueError("OpenCV konnte das Bild nicht laden")
-                rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
-                return Image.fromarray(rgb)
-            except Exception as e:
-                raise e
-
-    img = _open_image_robust(file_path)
-    gray = _to_cv_gray(img)
+    # Einmal pro Request dekodiert (Pillow mit HEIF/AVIF, Fallback ueber OpenCV)
+    ctx = get_image_context(file_path)
+    img = ctx.rgb_image
+    gray = ctx.gray
 
     # 1) ELA
     ela_mean, ela_max = _ela_score(img)
@@ -0,0 +1,549 @@
+import argparse
+import os
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import Client, Listener
+
+from Backend.runtime import is_production
+
+
+DEFAULT_MODELS = ("xception", "clip", "aasist", "temporal_cnn")
+
+_CLIENT_LOCAL = threading.local()
+_CLIENT_STATS_LOCK = threading.Lock()
+_CLIENT_STATS = {"calls": 0, "items": 0, "failures": 0, "last_error": None}
+_INFO_LOCK = threading.Lock()
+_INFO_CACHE = {}
+
+
+def _env_float(name, default):
+    try:
+        raw = os.getenv(name)
+        return float(raw) if raw not in {None, ""} else float(default)
+    except Exception:
+        return float(default)
+
+
+def _log(message: str):
+    try:
+        print(f"[inference_server] {message}")
+    except Exception:
+        pass
+
+
+def _percentile(sorted_vals, pct):
+    if not sorted_vals:
+        return None
+    idx = int(round((len(sorted_vals) - 1) * pct))
+    return sorted_vals[max(0, min(len(sorted_vals) - 1, idx))]
+
+
+def remote_inference_enabled(model=None):
+    """True, wenn Forward-Passes (fuer model) an den Inference-Server gehen sollen."""
+    if (os.getenv("AIREALCHECK_INFER_SERVER") or "false").strip().lower() not in {"1", "true", "yes", "on"}:
+        return False
+    if model is None:
+        return True
+    raw = (os.getenv("AIREALCHECK_INFER_MODELS") or ",".join(DEFAULT_MODELS)).strip().lower()
+    return model in {part.strip() for part in raw.split(",") if part.strip()}
+
+
+def infer_max_wait_ms(model):
+    """
+    Wartefrist pro Request fuer model (AIREALCHECK_INFER_MAX_WAIT_MS_<MODEL>); None = Server-Default.
+    Latenzkritische Engines verkuerzen so ihr Batch-Fenster, ohne die anderen Modelle zu aendern.
+    """
+    raw = (os.getenv(f"AIREALCHECK_INFER_MAX_WAIT_MS_{str(model).upper()}") or "").strip()
+    if not raw:
+        return None
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        return None
+
+
+def server_address():
+    address = (os.getenv("AIREALCHECK_INFER_SOCKET") or "").strip()
+    if address:
+        return address
+    if os.name == "nt":
+        return r"\\.\pipe\airealcheck-inference"
+    return os.path.join("temp_upload", "inference.sock")
+
+
+_DEV_AUTHKEY = "airealcheck-inference"
+
+
+def _authkey():
+    """
+    Gemeinsamer Schluessel fuer Server und Worker. In Produktion Pflicht: ohne ihn koennte jeder lokale
+    Prozess mit Zugriff auf den Socket gepickelte Nachrichten senden; nur dev/test nutzen einen festen Default.
+    """
+    key = (os.getenv("AIREALCHECK_INFER_AUTHKEY") or "").strip()
+    if key:
+        return key.encode("utf-8")
+    if is_production():
+        raise RuntimeError("AIREALCHECK_INFER_AUTHKEY must be set to a secret value in production.")
+    return _DEV_AUTHKEY.encode("utf-8")
+
+
+class InferenceUnavailable(RuntimeError):
+    """Server nicht erreichbar, Timeout oder Fehler im Server; Aufrufer rechnen dann lokal."""
+
+
+class _Pending:
+    __slots__ = ("item", "key", "enqueued_at", "deadline", "event", "result", "error")
+
+    def __init__(self, item, key, max_wait_sec):
+        self.item = item
+        self.key = key
+        self.enqueued_at = time.time()
+        self.deadline = self.enqueued_at + max_wait_sec
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    Sammelt Items eines Modells aus allen Verbindungen und rechnet sie in gemeinsamen Batches.
+    Ein Batch startet, sobald max_batch Items gleicher Form vorliegen oder die kuerzeste
+    Wartefrist (max_wait_ms pro Request) der wartenden Items abgelaufen ist.
+    batch_fn(items) liefert eine Liste mit einem Ergebnis pro Item.
+    """
+
+    def __init__(self, name, batch_fn, max_batch=None, max_wait_ms=None, group_by_shape=True):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch = max(1, int(_env_float("AIREALCHECK_INFER_MAX_BATCH", 32) if max_batch is None else max_batch))
+        self.max_wait_ms = _env_float("AIREALCHECK_INFER_MAX_WAIT_MS", 10) if max_wait_ms is None else float(max_wait_ms)
+        self.group_by_shape = bool(group_by_shape)
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._stop = False
+        self._thread = None
+        self._max_depth = 0
+        self._batches = 0
+        self._items = 0
+        self._errors = 0
+        self._samples = deque(maxlen=500)
+
+    def _key(self, item):
+        if not self.group_by_shape:
+            return None
+        return (tuple(getattr(item, "shape", ()) or ()), str(getattr(item, "dtype", "")))
+
+    def submit(self, item, max_wait_ms=None):
+        wait_ms = self.max_wait_ms if max_wait_ms is None else max(0.0, float(max_wait_ms))
+        pending = _Pending(item, self._key(item), wait_ms / 1000.0)
+        with self._cond:
+            self._queue.append(pending)
+            self._max_depth = max(self._max_depth, len(self._queue))
+            self._cond.notify()
+        return pending
+
+    def _take_batch(self):
+        """Wartet auf einen faelligen Batch (Items mit dem Key des aeltesten Items, FIFO)."""
+        with self._cond:
+            while True:
+                while not self._queue and not self._stop:
+                    self._cond.wait()
+                if self._stop:
+                    return []
+                key = self._queue[0].key
+                matching = [p for p in self._queue if p.key == key][: self.max_batch]
+                remaining = min(p.deadline for p in matching) - time.time()
+                if len(matching) >= self.max_batch or remaining <= 0:
+                    taken = set(id(p) for p in matching)
+                    self._queue = deque(p for p in self._queue if id(p) not in taken)
+                    return matching
+                self._cond.wait(remaining)
+
+    def run_once(self):
+        batch = self._take_batch()
+        if not batch:
+            return 0
+        started = time.time()
+        try:
+            results = list(self.batch_fn([p.item for p in batch]))
+            if len(results) != len(batch):
+                raise RuntimeError(f"batch_result_mismatch:{len(results)}!={len(batch)}")
+            for pending, result in zip(batch, results):
+                pending.result = result
+        except Exception as exc:
+            error = f"{type(exc).__name__}:{str(exc)[:200]}"
+            for pending in batch:
+                pending.error = error
+            with self._cond:
+                self._errors += 1
+            _log(f"model={self.name} batch={len(batch)} failed: {error}")
+        infer_ms = (time.time() - started) * 1000.0
+        with self._cond:
+            self._batches += 1
+            self._items += len(batch)
+            for pending in batch:
+                self._samples.append(((started - pending.enqueued_at) * 1000.0, infer_ms, len(batch)))
+        for pending in batch:
+            pending.event.set()
+        return len(batch)
+
+    def _loop(self):
+        while not self._stop:
+            self.run_once()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop = False
+            self._thread = threading.Thread(target=self._loop, name=f"batcher-{self.name}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self):
+        with self._cond:
+            samples = list(self._samples)
+            waits = sorted(s[0] for s in samples)
+            infers = sorted(s[1] for s in samples)
+            return {
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self._max_depth,
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": round(self._items / self._batches, 2) if self._batches else None,
+                "errors": self._errors,
+                "queue_wait_ms_p50": _percentile(waits, 0.5),
+                "queue_wait_ms_p95": _percentile(waits, 0.95),
+                "infer_ms_p95": _percentile(infers, 0.95),
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait_ms,
+            }
+
+
+class InferenceServer:
+    """
+    Lokaler Modell-Server: haelt jedes Modell einmal und bedient alle Web-Worker ueber einen
+    Unix-Socket (multiprocessing.connection, mit authkey; Nachrichten werden gepickelt).
+    handlers: name -> {"batch": fn(items) -> results, "info": fn() -> dict, "group_by_shape": bool}
+    Nachrichten: {"op": "infer", "model", "items", "max_wait_ms"} | {"op": "info", "model"} | {"op": "stats"}.
+    """
+
+    def __init__(self, handlers, address=None, authkey=None, max_batch=None, max_wait_ms=None):
+        self.address = address or server_address()
+        self.authkey = authkey or _authkey()
+        self.handlers = handlers
+        self.batchers = {
+            name: MicroBatcher(
+                name,
+                spec["batch"],
+                max_batch=max_batch,
+                max_wait_ms=max_wait_ms,
+                group_by_shape=spec.get("group_by_shape", True),
+            )
+            for name, spec in handlers.items()
+        }
+        self._listener = None
+        self._closed = threading.Event()
+        self._connections = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Socket oeffnen und Batcher starten (ohne Accept-Loop)."""
+        if isinstance(self.address, str) and not self.address.startswith("\\\\"):
+            os.makedirs(os.path.dirname(os.path.abspath(self.address)), exist_ok=True)
+            if os.path.exists(self.address):
+                # Verwaister Socket eines beendeten Servers.
+                os.unlink(self.address)
+        self._listener = Listener(self.address, authkey=self.authkey)
+        if isinstance(self.address, str) and not self.address.startswith("\\\\"):
+            # Nur der Besitzer (Server und Web-Worker laufen unter demselben Benutzer) darf verbinden.
+            os.chmod(self.address, 0o600)
+        for batcher in self.batchers.values():
+            batcher.start()
+        _log(f"listening address={self.address} models={','.join(sorted(self.batchers))}")
+        return self
+
+    def serve_forever(self):
+        if self._listener is None:
+            self.start()
+        while not self._closed.is_set():
+            try:
+                conn = self._listener.accept()
+            except Exception as exc:
+                if self._closed.is_set():
+                    break
+                _log(f"accept failed: {type(exc).__name__}: {exc}")
+                continue
+            threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def serve_in_thread(self):
+        self.start()
+        thread = threading.Thread(target=self.serve_forever, name="inference-server", daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        self._closed.set()
+        for batcher in self.batchers.values():
+            batcher.stop()
+        if self._listener is not None:
+            try:
+                self._listener.close()
+            except Exception:
+                pass
+            self._listener = None
+
+    def _serve_connection(self, conn):
+        with self._lock:
+            self._connections += 1
+        try:
+            while not self._closed.is_set():
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    break
+                try:
+                    reply = self._dispatch(message)
+                except Exception as exc:
+                    reply = {"ok": False, "error": f"{type(exc).__name__}:{str(exc)[:200]}"}
+                conn.send(reply)
+        finally:
+            with self._lock:
+                self._connections -= 1
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _dispatch(self, message):
+        op = message.get("op")
+        if op == "stats":
+            return {"ok": True, "stats": self.stats()}
+        name = message.get("model")
+        if name not in self.handlers:
+            return {"ok": False, "error": f"unknown_model:{name}"}
+        if op == "info":
+            return {"ok": True, "info": self.handlers[name]["info"]()}
+        if op != "infer":
+            return {"ok": False, "error": f"unknown_op:{op}"}
+        batcher = self.batchers[name]
+        pending = [batcher.submit(item, message.get("max_wait_ms")) for item in message.get("items") or []]
+        for item in pending:
+            item.event.wait()
+        errors = [p.error for p in pending if p.error]
+        if errors:
+            return {"ok": False, "error": errors[0]}
+        return {"ok": True, "results": [p.result for p in pending]}
+
+    def stats(self):
+        with self._lock:
+            connections = self._connections
+        return {
+            "address": self.address,
+            "connections": connections,
+            "models": {name: batcher.stats() for name, batcher in sorted(self.batchers.items())},
+        }
+
+
+def default_handlers(models=None):
+    """Handler fuer xception, CLIP, AASIST und Temporal-CNN; die Modelle laden beim ersten Zugriff."""
+    from Backend import deepfake_model
+    from Backend.engines import audio_aasist_engine, clip_detector_engine, video_temporal_cnn_engine
+
+    handlers = {
+        "xception": {"batch": deepfake_model.serve_fake_probs, "info": deepfake_model.serve_info},
+        "clip": {
+            "batch": clip_detector_engine.serve_embeddings,
+            "info": clip_detector_engine.serve_info,
+            # Bilder werden erst im Server auf die Modellgroesse gebracht.
+            "group_by_shape": False,
+        },
+        "aasist": {"batch": audio_aasist_engine.serve_spoof_probs, "info": audio_aasist_engine.serve_info},
+        "temporal_cnn": {"batch": video_temporal_cnn_engine.serve_logits, "info": video_temporal_cnn_engine.serve_info},
+    }
+    if models:
+        handlers = {name: spec for name, spec in handlers.items() if name in models}
+    return handlers
+
+
+# --- Client (in den Web-Workern) ---
+
+
+def _connection():
+    """(Verbindung, wiederverwendet?) dieses Threads; nach fork() wird neu verbunden."""
+    conn = getattr(_CLIENT_LOCAL, "conn", None)
+    if conn is not None and getattr(_CLIENT_LOCAL, "pid", None) == os.getpid():
+        return conn, True
+    address = server_address()
+    if isinstance(address, str) and not address.startswith("\\\\") and not os.path.exists(address):
+        raise InferenceUnavailable("socket_missing")
+    try:
+        authkey = _authkey()
+    except RuntimeError as exc:
+        raise InferenceUnavailable(f"authkey_missing:{exc}") from exc
+    conn = Client(address, authkey=authkey)
+    _CLIENT_LOCAL.conn = conn
+    _CLIENT_LOCAL.pid = os.getpid()
+    return conn, False
+
+
+def _drop_connection():
+    conn = getattr(_CLIENT_LOCAL, "conn", None)
+    _CLIENT_LOCAL.conn = None
+    # Server weg oder neu gestartet: Modell-Infos beim naechsten Aufruf neu holen.
+    _clear_info_cache()
+    if conn is not None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def _record(items, error=None):
+    with _CLIENT_STATS_LOCK:
+        _CLIENT_STATS["calls"] += 1
+        _CLIENT_STATS["items"] += int(items)
+        if error:
+            _CLIENT_STATS["failures"] += 1
+            _CLIENT_STATS["last_error"] = error
+
+
+def _request(message, timeout=None):
+    timeout = _env_float("AIREALCHECK_INFER_TIMEOUT_SEC", 30) if timeout is None else float(timeout)
+    while True:
+        reused = False
+        try:
+            conn, reused = _connection()
+            conn.send(message)
+            if not conn.poll(timeout):
+                # Antwort kaeme spaeter und wuerde die Verbindung verschieben.
+                _drop_connection()
+                raise InferenceUnavailable("timeout")
+            reply = conn.recv()
+            break
+        except InferenceUnavailable:
+            raise
+        except Exception as exc:
+            _drop_connection()
+            # Alte Verbindung zu einem neu gestarteten Server: einmal frisch verbinden.
+            if reused:
+                continue
+            raise InferenceUnavailable(f"{type(exc).__name__}:{str(exc)[:160]}") from exc
+    if not reply.get("ok"):
+        raise InferenceUnavailable(str(reply.get("error") or "server_error"))
+    return reply
+
+
+def infer(model, items, max_wait_ms=None, timeout=None):
+    """Ergebnisse (ein Eintrag pro Item) vom Server; wirft InferenceUnavailable."""
+    items = list(items)
+    if max_wait_ms is None:
+        max_wait_ms = infer_max_wait_ms(model)
+    try:
+        reply = _request({"op": "infer", "model": model, "items": items, "max_wait_ms": max_wait_ms}, timeout)
+    except InferenceUnavailable as exc:
+        _record(len(items), error=str(exc))
+        raise
+    _record(len(items))
+    return reply["results"]
+
+
+class RemoteModel:
+    """Stellvertreter fuer ein Modell im Inference-Server; meta ist die Modell-Meta des Servers."""
+
+    def __init__(self, name, meta=None):
+        self.name = name
+        self.meta = meta or {}
+
+    def infer(self, items, max_wait_ms=None):
+        return infer(self.name, items, max_wait_ms=max_wait_ms)
+
+
+def _clear_info_cache():
+    with _INFO_LOCK:
+        _INFO_CACHE.clear()
+
+
+def _model_info(name, timeout=None):
+    """
+    info-Antwort des Servers fuer name, pro Prozess und Server-Adresse kurz gecacht
+    (AIREALCHECK_INFER_INFO_TTL_SEC, 0 = aus): sonst kostet jeder Engine-Aufruf einen Roundtrip.
+    """
+    ttl = _env_float("AIREALCHECK_INFER_INFO_TTL_SEC", 30)
+    key = (os.getpid(), server_address(), name)
+    now = time.monotonic()
+    if ttl > 0:
+        with _INFO_LOCK:
+            cached = _INFO_CACHE.get(key)
+        if cached is not None and now - cached[0] < ttl:
+            return cached[1]
+    info = _request({"op": "info", "model": name}, timeout)["info"] or {}
+    if ttl > 0:
+        with _INFO_LOCK:
+            _INFO_CACHE[key] = (now, info)
+    return info
+
+
+def remote_model(name, timeout=None):
+    """
+    (RemoteModel, meta), wenn der Server das Modell bereitstellt; (None, meta), wenn er es nicht laden kann;
+    None, wenn der Server fuer name aus ist oder nicht antwortet (dann lokal laden).
+    """
+    if not remote_inference_enabled(name):
+        return None
+    try:
+        info = _model_info(name, timeout)
+    except InferenceUnavailable as exc:
+        _record(0, error=str(exc))
+        return None
+    meta = info.get("meta") if isinstance(info.get("meta"), dict) else {}
+    if not info.get("available"):
+        return None, meta
+    return RemoteModel(name, meta), meta
+
+
+def inference_stats(timeout=1.0):
+    """Client-Zaehler dieses Prozesses plus Server-Metriken (fuer /health)."""
+    with _CLIENT_STATS_LOCK:
+        client = dict(_CLIENT_STATS)
+    payload = {"enabled": remote_inference_enabled(), "address": server_address(), "client": client}
+    if payload["enabled"]:
+        try:
+            payload["server"] = _request({"op": "stats"}, timeout)["stats"]
+        except InferenceUnavailable as exc:
+            payload["server"] = {"error": str(exc)}
+    return payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared micro-batching inference server for local models.")
+    parser.add_argument("--address", default=None, help="Unix socket path (default AIREALCHECK_INFER_SOCKET).")
+    parser.add_argument("--models", default=None, help="Comma separated models (default AIREALCHECK_INFER_MODELS).")
+    parser.add_argument("--no-warmup", action="store_true", help="Load models on first request instead of at start.")
+    args = parser.parse_args()
+
+    raw = args.models or os.getenv("AIREALCHECK_INFER_MODELS") or ",".join(DEFAULT_MODELS)
+    models = [part.strip() for part in raw.split(",") if part.strip()]
+    server = InferenceServer(default_handlers(models), address=args.address)
+    if not args.no_warmup:
+        for name, spec in server.handlers.items():
+            info = spec["info"]()
+            _log(f"model={name} available={bool(info.get('available'))} reason={(info.get('meta') or {}).get('reason')}")
+    server.start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import hashlib
+import os
+import tempfile
+
+
+DEFAULT_CHUNK_BYTES = 1024 * 1024
+DEFAULT_HEAD_BYTES = 64 * 1024
+
+
+class IngestError(Exception):
+    def __init__(self, code: str, message: str, status: int = 400):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.status = status
+
+
+def _env_int(name, default):
+    try:
+        raw = os.getenv(name)
+        return int(raw) if raw not in {None, ""} else int(default)
+    except Exception:
+        return int(default)
+
+
+def looks_like_image_magic(header: bytes) -> bool:
+    if not header:
+        return False
+    if header.startswith(b"\xFF\xD8\xFF"):
+        return True  # JPEG
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return True  # PNG
+    if header.startswith(b"GIF87a") or header.startswith(b"GIF89a"):
+        return True  # GIF
+    if header.startswith(b"BM"):
+        return True  # BMP
+    if header.startswith(b"\x00\x00\x01\x00"):
+        return True  # ICO
+    if header.startswith(b"II*\x00") or header.startswith(b"MM\x00*"):
+        return True  # TIFF
+    if header.startswith(b"II+\x00") or header.startswith(b"MM\x00+"):
+        return True  # BigTIFF
+    if header.startswith(b"RIFF") and len(header) >= 12 and header[8:12] == b"WEBP":
+        return True  # WebP
+    if header.startswith(b"\x00\x00\x00\x0cjP  \r\n\x87\n"):
+        return True  # JP2
+    if header.startswith(b"\xFF\x4F\xFF\x51"):
+        return True  # J2K codestream
+    if len(header) >= 12 and header[4:8] == b"ftyp":
+        brand = header[8:12]
+        if brand in {b"heic", b"heix", b"hevc", b"hevx", b"mif1", b"msf1", b"heif", b"avif", b"avis"}:
+            return True
+    return False
+
+
+def sniff_media_kind(header: bytes):
+    """Grobe Einordnung anhand der Magic Bytes: image | video | audio | None (unklar)."""
+    if not header:
+        return None
+    if looks_like_image_magic(header):
+        return "image"
+    if len(header) >= 12 and header[4:8] == b"ftyp":
+        brand = header[8:12]
+        if brand in {b"M4A ", b"M4B ", b"M4P "}:
+            return "audio"
+        return "video"  # mp4/mov/3gp/m4v
+    if header.startswith(b"\x1A\x45\xDF\xA3"):
+        return "video"  # Matroska/WebM
+    if header.startswith(b"RIFF") and len(header) >= 12:
+        if header[8:12] == b"AVI ":
+            return "video"
+        if header[8:12] == b"WAVE":
+            return "audio"
+    if header.startswith(b"\x00\x00\x01\xBA") or header.startswith(b"\x00\x00\x01\xB3"):
+        return "video"  # MPEG-PS
+    if header.startswith(b"ID3") or header.startswith(b"fLaC"):
+        return "audio"
+    if len(header) >= 2 and header[0] == 0xFF and (header[1] & 0xE0) == 0xE0:
+        return "audio"  # MPEG-Audio-Frame
+    if header.startswith(b"OggS"):
+        # Ogg kann Theora-Video oder Vorbis/Opus-Audio enthalten.
+        return "video" if b"theora" in header[:128] else "audio"
+    return None
+
+
+def upload_chunk_bytes():
+    return max(64 * 1024, _env_int("AIREALCHECK_UPLOAD_CHUNK_BYTES", DEFAULT_CHUNK_BYTES))
+
+
+def ingest_stream(stream, filename: str, dest_dir: str, max_bytes=None, head_bytes=DEFAULT_HEAD_BYTES):
+    """
+    Schreibt einen Upload-Stream in einem Durchgang auf eine eindeutige Datei in dest_dir und
+    berechnet dabei sha256, Groesse und die ersten head_bytes fuer die Typerkennung.
+    Liefert ein Dict (path, filename, sha256, size, head, sniffed); wirft IngestError.
+    """
+    filename = os.path.basename(filename or "") or "upload"
+    _, ext = os.path.splitext(filename)
+    os.makedirs(dest_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix="upload_", suffix=ext.lower()[:16], dir=dest_dir)
+    chunk_bytes = upload_chunk_bytes()
+    digest = hashlib.sha256()
+    head = bytearray()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb", buffering=chunk_bytes) as out:
+            while True:
+                chunk = stream.read(chunk_bytes)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise IngestError("file_too_large", "Datei zu gross", 413)
+                digest.update(chunk)
+                if len(head) < head_bytes:
+                    head.extend(chunk[: head_bytes - len(head)])
+                out.write(chunk)
+        if size == 0:
+            raise IngestError("file_empty", "Datei ist leer", 400)
+    except BaseException:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        raise
+    head = bytes(head)
+    return {
+        "path": path,
+        "filename": filename,
+        "sha256": digest.hexdigest(),
+        "size": size,
+        "head": head,
+        "sniffed": sniff_media_kind(head),
+    }
+
+
+def ingest_upload(file_storage, dest_dir: str, max_bytes=None, head_bytes=DEFAULT_HEAD_BYTES):
+    """ingest_stream fuer ein werkzeug FileStorage (liest dessen Stream direkt)."""
+    return ingest_stream(
+        file_storage.stream,
+        getattr(file_storage, "filename", None),
+        dest_dir,
+        max_bytes=max_bytes,
+        head_bytes=head_bytes,
+    )
@@ -0,0 +1,391 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+from Backend.engines.job_progress import bind_job_progress
+from Backend.sqlite_db import SqliteDatabase
+
+
+# Terminale Job-Status; danach aendert sich ein Job nicht mehr.
+FINAL_STATUSES = {"done", "failed"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    user_id INTEGER,
+    payload TEXT NOT NULL,
+    stage TEXT,
+    progress TEXT,
+    result TEXT,
+    http_status INTEGER,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at);
+"""
+
+def _env_float(name, default):
+    try:
+        raw = os.getenv(name)
+        return float(raw) if raw not in {None, ""} else float(default)
+    except Exception:
+        return float(default)
+
+
+def _log(message: str):
+    try:
+        print(f"[jobs] {message}")
+    except Exception:
+        pass
+
+
+def job_worker_count():
+    return max(0, int(_env_float("AIREALCHECK_JOB_WORKERS", 2)))
+
+
+def job_stale_sec():
+    """Laufende Jobs ohne Heartbeat (z.B. abgestuerzter Worker) werden danach neu eingereiht."""
+    return max(30.0, _env_float("AIREALCHECK_JOB_STALE_SEC", 900))
+
+
+def job_heartbeat_sec():
+    """So oft frischen Worker updated_at ihrer laufenden Jobs auf; deutlich unter job_stale_sec."""
+    return max(1.0, min(_env_float("AIREALCHECK_JOB_HEARTBEAT_SEC", 30), job_stale_sec() / 3.0))
+
+
+def job_requeue_sec():
+    """So oft prueft die Worker-Schleife auf haengende Jobs anderer (toter) Worker."""
+    return max(1.0, _env_float("AIREALCHECK_JOB_REQUEUE_SEC", 60))
+
+
+def job_max_attempts():
+    return max(1, int(_env_float("AIREALCHECK_JOB_MAX_ATTEMPTS", 2)))
+
+
+def _loads(raw):
+    if raw is None:
+        return None
+    try:
+        return json.loads(raw)
+    except Exception:
+        return None
+
+
+class JobQueue:
+    """
+    Dauerhafte Job-Queue in SQLite (WAL), gemeinsam fuer alle gunicorn-Worker.
+    claim() vergibt einen Job atomar per BEGIN IMMEDIATE an genau einen Worker.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = SqliteDatabase(path, _SCHEMA, row_factory=sqlite3.Row)
+
+    def _connect(self):
+        return self._db.connect()
+
+    def _transaction(self):
+        return self._db.transaction()
+
+    def submit(self, kind: str, payload: dict, user_id=None, job_id=None):
+        job_id = job_id or str(uuid.uuid4())
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, user_id, payload, stage, created_at, updated_at) "
+                "VALUES (?, ?, 'queued', ?, ?, 'queued', ?, ?)",
+                (job_id, kind, user_id, json.dumps(payload, ensure_ascii=False), now, now),
+            )
+        return job_id
+
+    def claim(self, worker: str):
+        """Naechster wartender Job (aeltester zuerst) oder None."""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at ASC LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', stage = 'running', worker = ?, attempts = attempts + 1, "
+                "started_at = ?, updated_at = ? WHERE id = ?",
+                (worker, now, now, row["id"]),
+            )
+        return self.get(row["id"])
+
+    def update_progress(self, job_id: str, stage: str, progress=None):
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET stage = ?, progress = ?, updated_at = ? WHERE id = ? AND status = 'running'",
+                (stage, json.dumps(progress, ensure_ascii=False) if progress is not None else None, now, job_id),
+            )
+
+    def finish(self, job_id: str, status: str, result=None, http_status=None, error=None, worker=None):
+        """
+        Job abschliessen; liefert False, wenn nichts geschrieben wurde. Mit worker nur, solange der
+        Job noch bei diesem Worker laeuft (nach requeue_stale gehoert er einem anderen).
+        """
+        now = time.time()
+        sql = (
+            "UPDATE jobs SET status = ?, stage = ?, result = ?, http_status = ?, error = ?, "
+            "finished_at = ?, updated_at = ? WHERE id = ?"
+        )
+        params = [
+            status,
+            status,
+            json.dumps(result, ensure_ascii=False) if result is not None else None,
+            http_status,
+            error,
+            now,
+            now,
+            job_id,
+        ]
+        if worker is not None:
+            sql += " AND worker = ? AND status = 'running'"
+            params.append(worker)
+        with self._transaction() as conn:
+            updated = conn.execute(sql, params).rowcount
+        return bool(updated)
+
+    def heartbeat(self, jobs):
+        """updated_at laufender Jobs auffrischen; jobs: {job_id: worker}. Liefert die Anzahl."""
+        if not jobs:
+            return 0
+        now = time.time()
+        with self._transaction() as conn:
+            return sum(
+                conn.execute(
+                    "UPDATE jobs SET updated_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                    (now, job_id, worker),
+                ).rowcount
+                for job_id, worker in jobs.items()
+            )
+
+    def patch_result(self, job_id: str, patch):
+        """
+        patch(result) aendert das Ergebnis eines fertigen Jobs in place und liefert True bei einer
+        Aenderung; das neue updated_at weckt offene SSE-Streams.
+        """
+        with self._transaction() as conn:
+            row = conn.execute("SELECT status, result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row["status"] not in FINAL_STATUSES:
+                return False
+            result = _loads(row["result"])
+            if not isinstance(result, dict) or not patch(result):
+                return False
+            conn.execute(
+                "UPDATE jobs SET result = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(result, ensure_ascii=False), time.time(), job_id),
+            )
+        return True
+
+    def requeue_stale(self, stale_sec=None, max_attempts=None):
+        """Haengende Jobs neu einreihen bzw. nach max_attempts als failed markieren."""
+        stale_sec = job_stale_sec() if stale_sec is None else float(stale_sec)
+        max_attempts = job_max_attempts() if max_attempts is None else int(max_attempts)
+        cutoff = time.time() - stale_sec
+        now = time.time()
+        with self._transaction() as conn:
+            failed = conn.execute(
+                "UPDATE jobs SET status = 'failed', stage = 'failed', error = 'worker_lost', "
+                "finished_at = ?, updated_at = ? WHERE status = 'running' AND updated_at < ? AND attempts >= ?",
+                (now, now, cutoff, max_attempts),
+            ).rowcount
+            requeued = conn.execute(
+                "UPDATE jobs SET status = 'queued', stage = 'queued', worker = NULL, updated_at = ? "
+                "WHERE status = 'running' AND updated_at < ?",
+                (now, cutoff),
+            ).rowcount
+        if failed or requeued:
+            _log(f"stale jobs requeued={requeued} failed={failed}")
+        return requeued, failed
+
+    def get(self, job_id: str):
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = _loads(job.get("payload")) or {}
+        job["progress"] = _loads(job.get("progress"))
+        job["result"] = _loads(job.get("result"))
+        return job
+
+    def counts(self):
+        rows = self._connect().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: int(row["n"]) for row in rows}
+
+
+class JobWorkerPool:
+    """
+    Lokale Worker-Threads, die Jobs aus der Queue ziehen und handler(job) ausfuehren.
+    handler liefert (result_dict, http_status); status ist done bei < 400, sonst failed.
+    late_result(job_result, engine_name, engine_result) arbeitet nachgelieferte Engine-Ergebnisse
+    in das Job-Ergebnis ein; vor dem Abschluss des Jobs werden sie gesammelt, danach direkt gepatcht.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handler,
+        workers=None,
+        poll_sec=None,
+        late_result=None,
+        heartbeat_sec=None,
+        requeue_sec=None,
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.late_result = late_result
+        self.workers = job_worker_count() if workers is None else max(0, int(workers))
+        self.poll_sec = _env_float("AIREALCHECK_JOB_POLL_SEC", 1.0) if poll_sec is None else float(poll_sec)
+        self.heartbeat_sec = job_heartbeat_sec() if heartbeat_sec is None else float(heartbeat_sec)
+        self.requeue_sec = job_requeue_sec() if requeue_sec is None else float(requeue_sec)
+        self._last_requeue = 0.0
+        # job_id -> worker der gerade laufenden Jobs dieses Prozesses (fuer den Heartbeat).
+        self._running = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._late_lock = threading.Lock()
+        self._late = {}
+
+    def start(self):
+        with self._lock:
+            if self._threads or self.workers <= 0:
+                return self
+            self._requeue_stale()
+            for idx in range(self.workers):
+                thread = threading.Thread(
+                    target=self._loop,
+                    args=(f"{os.getpid()}-{idx}",),
+                    name=f"job-worker-{idx}",
+                    daemon=True,
+                )
+                thread.start()
+                self._threads.append(thread)
+            thread = threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+            _log(f"started workers={self.workers}")
+        return self
+
+    def _requeue_stale(self):
+        self._last_requeue = time.time()
+        try:
+            self.queue.requeue_stale()
+        except Exception as exc:
+            _log(f"requeue failed: {type(exc).__name__}: {exc}")
+
+    def _maybe_requeue(self):
+        # Ein Worker pro Intervall; die anderen ziehen weiter Jobs.
+        with self._lock:
+            if time.time() - self._last_requeue < self.requeue_sec:
+                return
+            self._last_requeue = time.time()
+        self._requeue_stale()
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.heartbeat_sec):
+            with self._lock:
+                running = dict(self._running)
+            try:
+                self.queue.heartbeat(running)
+            except Exception as exc:
+                _log(f"heartbeat failed: {type(exc).__name__}: {exc}")
+
+    def notify(self):
+        self._wake.set()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        with self._lock:
+            threads = list(self._threads)
+            self._threads = []
+        for thread in threads:
+            thread.join(timeout)
+
+    def _loop(self, worker: str):
+        while not self._stop.is_set():
+            self._maybe_requeue()
+            try:
+                job = self.queue.claim(worker)
+            except Exception as exc:
+                _log(f"claim failed: {type(exc).__name__}: {exc}")
+                job = None
+            if job is None:
+                self._wake.wait(self.poll_sec)
+                self._wake.clear()
+                continue
+            self.run_job(job)
+
+    def _patch_result(self, job_id, engine_name, result):
+        if self.late_result is None:
+            return
+        with self._late_lock:
+            stash = self._late.get(job_id)
+            if stash is not None:
+                stash.append((engine_name, result))
+                return
+        patched = self.queue.patch_result(job_id, lambda job_result: self.late_result(job_result, engine_name, result))
+        _log(f"job={job_id} late result engine={engine_name} patched={patched}")
+
+    def _finish(self, job_id, status, result=None, **kwargs):
+        with self._late_lock:
+            for engine_name, engine_result in self._late.pop(job_id, None) or []:
+                if isinstance(result, dict):
+                    self.late_result(result, engine_name, engine_result)
+            finished = self.queue.finish(job_id, status, result=result, **kwargs)
+        if not finished:
+            _log(f"job={job_id} result dropped: job was requeued to another worker")
+        return finished
+
+    def run_job(self, job):
+        job_id = job["id"]
+        worker = job.get("worker")
+        with self._lock:
+            self._running[job_id] = worker
+        with self._late_lock:
+            self._late[job_id] = []
+        bind_job_progress(
+            lambda stage, progress: self.queue.update_progress(job_id, stage, progress),
+            lambda engine_name, result: self._patch_result(job_id, engine_name, result),
+        )
+        started = time.time()
+        try:
+            result, http_status = self.handler(job)
+            status = "done" if int(http_status or 200) < 400 else "failed"
+            self._finish(job_id, status, result=result, http_status=int(http_status or 200), worker=worker)
+        except Exception as exc:
+            if os.getenv("AIREALCHECK_DEBUG", "0").lower() in {"1", "true", "yes", "on"}:
+                traceback.print_exc()
+            error = f"{type(exc).__name__}: {str(exc)[:200]}"
+            self._finish(
+                job_id,
+                "failed",
+                result={"ok": False, "error": "job_failed"},
+                http_status=500,
+                error=error,
+                worker=worker,
+            )
+        finally:
+            bind_job_progress(None)
+            with self._late_lock:
+                self._late.pop(job_id, None)
+            with self._lock:
+                self._running.pop(job_id, None)
+        _log(f"job={job_id} kind={job.get('kind')} finished in {int((time.time() - started) * 1000)}ms")
@@ -14,6 +14,7 @@ from Backend.runtime import is_production
 
 JWT_SECRET = os.getenv("AIREALCHECK_JWT_SECRET", "dev_change_me")
 ACCESS_TOKEN_MINUTES = int(os.getenv("AIREALCHECK_ACCESS_TOKEN_MINUTES", "15") or 15)
+JOB_EVENTS_TOKEN_SEC = int(os.getenv("AIREALCHECK_JOB_EVENTS_TOKEN_SEC", "60") or 60)
 ADMIN_ALLOWED = os.getenv("AIREALCHECK_ALLOW_ADMIN", "false").lower() in {"1", "true", "yes", "on"}
 
 _RATE_BUCKET = {}
@@ -63,6 +64,65 @@ def parse_auth_header():
     return auth.split(" ", 1)[1].strip()
 
 
+def user_id_from_token(token):
+    """User-ID aus einem gueltigen Access-Token oder None (ohne DB-Zugriff)."""
+    if not token:
+        return None
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+    except Exception:
+        return None
+    if payload.get("typ") not in (None, "access"):
+        return None
+    try:
+        return int(payload.get("sub"))
+    except (TypeError, ValueError):
+        return None
+
+
+def create_job_events_token(user_id, job_id) -> str:
+    """
+    Kurzlebiges Token nur fuer den SSE-Stream eines Jobs (EventSource kann keine Header setzen).
+    Es taugt nicht als Access-Token und gilt nur zum Oeffnen des Streams fuer genau diesen Job.
+    """
+    exp = dt.datetime.utcnow() + dt.timedelta(seconds=JOB_EVENTS_TOKEN_SEC)
+    payload = {"sub": str(user_id), "typ": "job_events", "job": str(job_id), "exp": exp}
+    token = jwt.encode(payload, JWT_SECRET, algorithm="HS256")
+    if isinstance(token, bytes):
+        token = token.decode("utf-8")
+    return token
+
+
+def user_id_from_job_events_token(token, job_id):
+    """User-ID aus einem gueltigen Job-Events-Token fuer job_id oder None (ohne DB-Zugriff)."""
+    if not token:
+        return None
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+    except Exception:
+        return None
+    if payload.get("typ") != "job_events" or payload.get("job") != str(job_id):
+        return None
+    try:
+        return int(payload.get("sub"))
+    except (TypeError, ValueError):
+        return None
+
+
+def load_active_user(user_id):
+    """(User, None) oder (None, Fehlerantwort), wenn der User fehlt oder gesperrt ist."""
+    db = get_session()
+    try:
+        user = db.query(User).get(int(user_id))
+    finally:
+        db.close()
+    if not user:
+        return None, _error("user_not_found", 404)
+    if bool(getattr(user, "is_banned", False)):
+        return None, _error("user_banned", 403)
+    return user, None
+
+
 def require_auth(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
@@ -80,15 +140,9 @@ def require_auth(fn):
         user_id = payload.get("sub")
         if not user_id:
             return _error("invalid_token", 401)
-        db = get_session()
-        try:
-            user = db.query(User).get(int(user_id))
-        finally:
-            db.close()
-        if not user:
-            return _error("user_not_found", 404)
-        if bool(getattr(user, "is_banned", False)):
-            return _error("user_banned", 403)
+        user, error = load_active_user(user_id)
+        if error:
+            return error
         g.current_user_id = user.id
         g.current_user_role = user.role
         g.current_user_email_verified = bool(user.email_verified)
@@ -310,3 +310,20 @@ def build_public_result_v1(raw_payload, analysis_id=None, media_type=None, creat
         "summary": summary,
         "details": details,
     }
+
+
+def apply_late_engine_result(public_payload, engine_result):
+    """
+    Ersetzt in details.engines den Eintrag einer nachgelieferten Engine (z.B. Reality Defender
+    nach "processing"). Das Gesamturteil bleibt unveraendert; liefert True bei einer Aenderung.
+    """
+    item = _normalize_engine_entry(engine_result)
+    details = public_payload.get("details") if isinstance(public_payload, dict) else None
+    engines = details.get("engines") if isinstance(details, dict) else None
+    if item is None or not isinstance(engines, list):
+        return False
+    for idx, entry in enumerate(engines):
+        if isinstance(entry, dict) and entry.get("engine") == item["engine"]:
+            engines[idx] = item
+            return True
+    return False
@@ -0,0 +1,389 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from Backend.sqlite_db import SqliteDatabase
+
+
+# Bei Aenderungen am Payload-Format hochzaehlen; alte Eintraege gelten dann als veraltet.
+RESULT_SCHEMA_VERSION = 1
+
+_DEFAULT_TTL_SEC = 7 * 24 * 3600
+_DEFAULT_MAX_MB = 256.0
+_DEFAULT_MAX_ENTRIES = 20000
+_DEFAULT_TOUCH_SEC = 300.0
+_DEFAULT_COUNTER_FLUSH_SEC = 30.0
+
+# Env-Variablen, die das Ergebnis nicht beeinflussen (Betrieb, Secrets, Cache selbst).
+_FINGERPRINT_SKIP_FRAGMENTS = (
+    "SECRET",
+    "PASSWORD",
+    "TOKEN",
+    "API_KEY",
+    "API_USER",
+    "_CACHE",
+    "TIMEOUT",
+    "WORKERS",
+    "EXECUTOR",
+    "POOL",
+    "RETRY",
+    "RETRIES",
+    "DEBUG",
+    "_LOG",
+    "SMTP",
+    "EMAIL",
+    "ADMIN",
+    "CORS",
+    "RATE_LIMIT",
+)
+_FINGERPRINT_PREFIXES = ("AIREALCHECK_", "HIVE_", "SENSITY_", "REALITY_DEFENDER_")
+# Env-Werte mit diesen Endungen sind Gewichte/Konfigurationsdateien; mtime+size fliessen ein.
+_WEIGHT_FILE_EXTS = (".pth", ".pt", ".jit", ".onnx", ".bin", ".safetensors", ".npy", ".npz", ".json")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    namespace TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    config_version TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, content_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_results_accessed ON results (accessed_at);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def _env_float(name, default):
+    try:
+        raw = os.getenv(name)
+        return float(raw) if raw not in {None, ""} else float(default)
+    except Exception:
+        return float(default)
+
+
+def _log(message: str):
+    try:
+        print(f"[result_store] {message}")
+    except Exception:
+        pass
+
+
+def result_cache_ttl_sec():
+    return max(0.0, _env_float("AIREALCHECK_RESULT_CACHE_TTL_SEC", _DEFAULT_TTL_SEC))
+
+
+def result_cache_max_bytes():
+    return int(max(0.0, _env_float("AIREALCHECK_RESULT_CACHE_MAX_MB", _DEFAULT_MAX_MB)) * 1024 * 1024)
+
+
+def result_cache_max_entries():
+    return int(max(0.0, _env_float("AIREALCHECK_RESULT_CACHE_MAX_ENTRIES", _DEFAULT_MAX_ENTRIES)))
+
+
+def result_cache_touch_sec():
+    """accessed_at (LRU) wird beim Lesen nur aktualisiert, wenn es aelter als dieser Wert ist."""
+    return max(0.0, _env_float("AIREALCHECK_RESULT_CACHE_TOUCH_SEC", _DEFAULT_TOUCH_SEC))
+
+
+def result_cache_counter_flush_sec():
+    return max(0.0, _env_float("AIREALCHECK_RESULT_CACHE_COUNTER_FLUSH_SEC", _DEFAULT_COUNTER_FLUSH_SEC))
+
+
+def _fingerprint_env_items(environ=None, keywords=None):
+    environ = os.environ if environ is None else environ
+    items = []
+    for key in sorted(environ):
+        if not key.startswith(_FINGERPRINT_PREFIXES):
+            continue
+        upper = key.upper()
+        if any(fragment in upper for fragment in _FINGERPRINT_SKIP_FRAGMENTS):
+            continue
+        if keywords is not None and not any(keyword in upper for keyword in keywords):
+            continue
+        items.append((key, str(environ.get(key) or "")))
+    return items
+
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [int(st.st_mtime), int(st.st_size)]
+
+
+def config_fingerprint(extra=None, environ=None, keywords=None):
+    """
+    Kurzer Hash ueber Engine-/Gewichts-Konfiguration: relevante Env-Variablen, mtime+size
+    referenzierter Gewichtsdateien, RESULT_SCHEMA_VERSION und extra (z.B. Engine-Versionen).
+    Aendert sich etwas davon, sind die gespeicherten Ergebnisse automatisch veraltet.
+    keywords beschraenkt die Env-Variablen auf Namen, die eines der Stichworte enthalten.
+    """
+    env_items = _fingerprint_env_items(environ, keywords)
+    files = {}
+    for _key, value in env_items:
+        candidate = value.strip()
+        if candidate.lower().endswith(_WEIGHT_FILE_EXTS):
+            files[candidate] = _file_signature(candidate)
+    material = {
+        "schema": RESULT_SCHEMA_VERSION,
+        "env": env_items,
+        "files": files,
+        "extra": extra,
+    }
+    raw = json.dumps(material, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+class ResultStore:
+    """
+    Inhaltsadressierter Ergebnis-Cache (sha256 der Datei) in SQLite.
+    WAL + busy_timeout erlauben parallele Zugriffe aus mehreren gunicorn-Workern; jeder
+    Schreibvorgang ist eine eigene Transaktion. Eintraege verfallen nach TTL, bei Ueberschreiten
+    von Groesse/Anzahl werden die am laengsten nicht gelesenen zuerst entfernt (LRU, mit der
+    Aufloesung von touch_sec). Ein Eintrag zaehlt nur als Treffer, wenn seine config_version zur
+    aktuellen passt. get() ist ein reiner Lesezugriff; geschrieben wird nur beim Entfernen
+    veralteter Eintraege, beim seltenen Auffrischen von accessed_at und beim periodischen
+    Uebertragen der Zaehler, die jeder Prozess zunaechst lokal sammelt.
+    """
+
+    def __init__(self, path: str, ttl_sec=None, max_bytes=None, max_entries=None, touch_sec=None):
+        self.path = path
+        self._ttl_sec = ttl_sec
+        self._max_bytes = max_bytes
+        self._max_entries = max_entries
+        self._touch_sec = touch_sec
+        self._db = SqliteDatabase(path, _SCHEMA)
+        self._counter_lock = threading.Lock()
+        self._pending = {}
+        self._last_flush = time.time()
+
+    @property
+    def ttl_sec(self):
+        return float(self._ttl_sec) if self._ttl_sec is not None else result_cache_ttl_sec()
+
+    @property
+    def max_bytes(self):
+        return int(self._max_bytes) if self._max_bytes is not None else result_cache_max_bytes()
+
+    @property
+    def max_entries(self):
+        return int(self._max_entries) if self._max_entries is not None else result_cache_max_entries()
+
+    @property
+    def touch_sec(self):
+        return float(self._touch_sec) if self._touch_sec is not None else result_cache_touch_sec()
+
+    def _connect(self):
+        return self._db.connect()
+
+    def _transaction(self):
+        return self._db.transaction()
+
+    @staticmethod
+    def _bump(conn, name, amount=1):
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, int(amount)),
+        )
+
+    def _count(self, name, amount=1):
+        with self._counter_lock:
+            self._pending[name] = self._pending.get(name, 0) + int(amount)
+
+    def _take_pending(self):
+        with self._counter_lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.time()
+        return pending
+
+    def _restore_pending(self, pending):
+        with self._counter_lock:
+            for name, amount in pending.items():
+                self._pending[name] = self._pending.get(name, 0) + amount
+
+    def _write_pending(self, conn):
+        pending = self._take_pending()
+        try:
+            for name, amount in pending.items():
+                self._bump(conn, name, amount)
+        except Exception:
+            self._restore_pending(pending)
+            raise
+        return pending
+
+    def flush_counters(self, force=False):
+        """Lokal gesammelte Zaehler in die gemeinsame Tabelle schreiben (hoechstens alle paar Sekunden)."""
+        with self._counter_lock:
+            if not self._pending:
+                return
+            if not force and time.time() - self._last_flush < result_cache_counter_flush_sec():
+                return
+        pending = {}
+        try:
+            with self._transaction() as conn:
+                pending = self._write_pending(conn)
+        except Exception as exc:
+            self._restore_pending(pending)
+            _log(f"counter flush failed: {type(exc).__name__}: {exc}")
+
+    def get(self, content_hash: str, namespace: str = "result", config_version=None):
+        """Payload-Dict oder None (Miss, abgelaufen oder veraltete Konfiguration)."""
+        if not content_hash:
+            return None
+        version = config_version if config_version is not None else config_fingerprint()
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT config_version, payload, created_at, accessed_at FROM results "
+                "WHERE namespace = ? AND content_hash = ?",
+                (namespace, content_hash),
+            ).fetchone()
+            outcome = "miss"
+            payload = None
+            if row is not None:
+                stored_version, raw, created_at, accessed_at = row
+                ttl = self.ttl_sec
+                if stored_version != version:
+                    outcome = "stale"
+                elif ttl > 0 and now - float(created_at) > ttl:
+                    outcome = "expired"
+                else:
+                    try:
+                        payload = json.loads(raw)
+                        outcome = "hit"
+                    except Exception:
+                        outcome = "corrupt"
+                if outcome == "hit":
+                    touch_before = now - self.touch_sec
+                    if float(accessed_at) < touch_before:
+                        conn.execute(
+                            "UPDATE results SET accessed_at = ? "
+                            "WHERE namespace = ? AND content_hash = ? AND accessed_at < ?",
+                            (now, namespace, content_hash, touch_before),
+                        )
+                else:
+                    # Nur genau diesen Eintrag entfernen, nicht einen inzwischen neu geschriebenen.
+                    conn.execute(
+                        "DELETE FROM results WHERE namespace = ? AND content_hash = ? AND created_at = ?",
+                        (namespace, content_hash, created_at),
+                    )
+            self._count("hits" if outcome == "hit" else "misses")
+            if outcome in {"stale", "expired"}:
+                self._count(f"{outcome}_evictions")
+        except Exception as exc:
+            _log(f"get failed: {type(exc).__name__}: {exc}")
+            return None
+        self.flush_counters()
+        return payload
+
+    def put(self, content_hash: str, payload, namespace: str = "result", config_version=None):
+        """Speichert payload atomar (Upsert) und raeumt danach per TTL/LRU auf."""
+        if not content_hash:
+            return False
+        version = config_version if config_version is not None else config_fingerprint()
+        try:
+            raw = json.dumps(payload, ensure_ascii=False)
+        except Exception as exc:
+            _log(f"put skipped (not serialisable): {type(exc).__name__}")
+            return False
+        now = time.time()
+        pending = {}
+        try:
+            with self._transaction() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO results "
+                    "(namespace, content_hash, config_version, payload, size_bytes, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (namespace, content_hash, version, raw, len(raw.encode("utf-8")), now, now),
+                )
+                self._bump(conn, "writes")
+                self._evict(conn, now)
+                # Die Schreibtransaktion laeuft ohnehin: lokale Zaehler gleich mitnehmen.
+                pending = self._write_pending(conn)
+            return True
+        except Exception as exc:
+            self._restore_pending(pending)
+            _log(f"put failed: {type(exc).__name__}: {exc}")
+            return False
+
+    def delete(self, content_hash: str, namespace: str = "result"):
+        try:
+            with self._transaction() as conn:
+                conn.execute(
+                    "DELETE FROM results WHERE namespace = ? AND content_hash = ?",
+                    (namespace, content_hash),
+                )
+        except Exception as exc:
+            _log(f"delete failed: {type(exc).__name__}: {exc}")
+
+    def _evict(self, conn, now):
+        evicted = 0
+        ttl = self.ttl_sec
+        if ttl > 0:
+            evicted += conn.execute("DELETE FROM results WHERE created_at < ?", (now - ttl,)).rowcount or 0
+        max_bytes = self.max_bytes
+        max_entries = self.max_entries
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM results").fetchone()
+        if (max_entries <= 0 or count <= max_entries) and (max_bytes <= 0 or total <= max_bytes):
+            if evicted:
+                self._bump(conn, "ttl_evictions", evicted)
+            return
+        victims = []
+        for namespace, content_hash, size in conn.execute(
+            "SELECT namespace, content_hash, size_bytes FROM results ORDER BY accessed_at ASC"
+        ).fetchall():
+            if (max_entries <= 0 or count <= max_entries) and (max_bytes <= 0 or total <= max_bytes):
+                break
+            victims.append((namespace, content_hash))
+            count -= 1
+            total -= int(size or 0)
+        conn.executemany("DELETE FROM results WHERE namespace = ? AND content_hash = ?", victims)
+        if evicted:
+            self._bump(conn, "ttl_evictions", evicted)
+        if victims:
+            self._bump(conn, "lru_evictions", len(victims))
+
+    def stats(self):
+        """Zaehler (uebertragene aller Worker plus die lokal gesammelten) und Fuellstand, z.B. fuer /health."""
+        try:
+            conn = self._connect()
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+            count, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM results"
+            ).fetchone()
+        except Exception as exc:
+            return {"available": False, "error": f"{type(exc).__name__}: {exc}"}
+        with self._counter_lock:
+            for name, amount in self._pending.items():
+                counters[name] = int(counters.get(name, 0)) + amount
+        hits = int(counters.get("hits", 0))
+        misses = int(counters.get("misses", 0))
+        lookups = hits + misses
+        return {
+            "available": True,
+            "entries": int(count),
+            "size_bytes": int(total),
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": (hits / lookups) if lookups else None,
+            "writes": int(counters.get("writes", 0)),
+            "stale_evictions": int(counters.get("stale_evictions", 0)),
+            "expired_evictions": int(counters.get("expired_evictions", 0)),
+            "ttl_evictions": int(counters.get("ttl_evictions", 0)),
+            "lru_evictions": int(counters.get("lru_evictions", 0)),
+        }
+
+    def close(self):
+        self.flush_counters(force=True)
+        self._db.close()
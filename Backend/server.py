@@ -1,7 +1,8 @@
-from flask import Flask, request, jsonify, g, make_response
+from flask import Flask, request, jsonify, g, make_response, Response
 
 from flask_cors import CORS
 
+import contextlib
 import os
 import sys
 import hashlib
@@ -9,6 +10,7 @@ import datetime as dt
 import json
 import shutil
 import subprocess
+import threading
 import time
 import uuid
 from typing import Tuple
@@ -84,7 +86,7 @@ _log_env_summary()
 
 
 from Backend.ensemble import run_ensemble, build_standard_result, run_audio_ensemble
-from Backend.public_result import build_public_result_v1, is_public_result
+from Backend.public_result import apply_late_engine_result, build_public_result_v1, is_public_result
 from Backend.engines.video_forensics_engine import run_video_forensics, log_ffmpeg_diagnostics
 from Backend.engines.video_frame_detectors_engine import run_video_frame_detectors
 from Backend.engines.reality_defender_video_engine import analyze_reality_defender_video
@@ -93,7 +95,21 @@ from Backend.engines.video_temporal_engine import run_video_temporal
 from Backend.engines.video_temporal_cnn_engine import run_video_temporal_cnn
 from Backend.video_url_fetcher import fetch_video_from_url, VideoUrlError
 from Backend.video_validation import validate_video_input
-from Backend.engines.engine_utils import make_engine_result, safe_engine_call
+from Backend.video_frame_store import video_frame_store_scope
+from Backend.audio_context import audio_context_scope
+from Backend.engines.engine_utils import make_engine_result
+from Backend.engines.engine_executor import run_engine_calls
+from Backend.engines.provider_http import provider_metrics
+from Backend.engines.circuit_breaker import breaker_states
+from Backend.engines.reality_defender_engine import rd_poller_stats
+from Backend.result_store import ResultStore, config_fingerprint
+from Backend.single_flight import SingleFlight, single_flight_enabled
+from Backend.ingest import IngestError, ingest_upload, looks_like_image_magic
+from Backend.jobs import FINAL_STATUSES, JobQueue, JobWorkerPool
+from Backend.engines.job_progress import report_job_progress
+from Backend.runtime import is_test
+from Backend.deepfake_model import warm_detector, detector_status
+from Backend.inference_server import inference_stats, remote_inference_enabled
 
 from Backend.db import init_db, get_session, using_sqlite, engine
 
@@ -117,7 +133,17 @@ from Backend.analyses import bp_analyses
 
 from Backend.admin import bp_admin, bp_api_admin
 
-from Backend.middleware import require_email_verified, require_admin, _error, rate_limit
+from Backend.middleware import (
+    require_email_verified,
+    require_admin,
+    _error,
+    rate_limit,
+    parse_auth_header,
+    user_id_from_token,
+    create_job_events_token,
+    user_id_from_job_events_token,
+    load_active_user,
+)
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -136,6 +162,13 @@ print("LOADED SERVER.PY FROM:", __file__)
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB Upload-Limit
 log_ffmpeg_diagnostics()
+if (
+    _env_flag("AIREALCHECK_WARM_MODELS", "false")
+    and _env_flag("AIREALCHECK_USE_LOCAL_ML", "true")
+    and not remote_inference_enabled("xception")
+):
+    # Mit Inference-Server haelt nur dieser das Modell.
+    warm_detector()
 
 
 # Restrictive CORS per requirements
@@ -189,43 +222,13 @@ ALLOWED_AUDIO_EXTS = {
     ".wav", ".mp3", ".m4a", ".ogg", ".flac"
 }
 
-CACHE_PATH = os.path.join(UPLOAD_DIR, "results_cache.json")
-_RESULT_CACHE = {}
-
-
-def _load_cache():
-
-    global _RESULT_CACHE
-
-    try:
-
-        if os.path.exists(CACHE_PATH):
-
-            with open(CACHE_PATH, "r", encoding="utf-8") as f:
-
-                _RESULT_CACHE = json.load(f)
-
-    except Exception:
-
-        _RESULT_CACHE = {}
-
-
-
-def _save_cache():
-
-    try:
-
-        with open(CACHE_PATH, "w", encoding="utf-8") as f:
-
-            json.dump(_RESULT_CACHE, f, ensure_ascii=False)
-
-    except Exception:
-
-        pass
-
-
-
-_load_cache()
+CACHE_PATH = (os.getenv("AIREALCHECK_RESULT_CACHE_PATH") or "").strip() or os.path.join(
+    UPLOAD_DIR, "results_cache.sqlite3"
+)
+_RESULT_STORE = ResultStore(CACHE_PATH)
+_SINGLE_FLIGHT = SingleFlight(
+    (os.getenv("AIREALCHECK_SINGLE_FLIGHT_PATH") or "").strip() or os.path.join(UPLOAD_DIR, "single_flight.sqlite3")
+)
 
 
 
@@ -380,36 +383,6 @@ def _is_audio_ext(filename: str) -> bool:
     return ext in ALLOWED_AUDIO_EXTS
 
 
-def _looks_like_image_magic(header: bytes) -> bool:
-    if not header:
-        return False
-    if header.startswith(b"\xFF\xD8\xFF"):
-        return True  # JPEG
-    if header.startswith(b"\x89PNG\r\n\x1a\n"):
-        return True  # PNG
-    if header.startswith(b"GIF87a") or header.startswith(b"GIF89a"):
-        return True  # GIF
-    if header.startswith(b"BM"):
-        return True  # BMP
-    if header.startswith(b"\x00\x00\x01\x00"):
-        return True  # ICO
-    if header.startswith(b"II*\x00") or header.startswith(b"MM\x00*"):
-        return True  # TIFF
-    if header.startswith(b"II+\x00") or header.startswith(b"MM\x00+"):
-        return True  # BigTIFF
-    if header.startswith(b"RIFF") and len(header) >= 12 and header[8:12] == b"WEBP":
-        return True  # WebP
-    if header.startswith(b"\x00\x00\x00\x0cjP  \r\n\x87\n"):
-        return True  # JP2
-    if header.startswith(b"\xFF\x4F\xFF\x51"):
-        return True  # J2K codestream
-    if len(header) >= 12 and header[4:8] == b"ftyp":
-        brand = header[8:12]
-        if brand in {b"heic", b"heix", b"hevc", b"hevx", b"mif1", b"msf1", b"heif", b"avif", b"avis"}:
-            return True
-    return False
-
-
 def _ffprobe_stream_types(ffprobe_path: str, file_path: str):
     cmd = [
         ffprobe_path,
@@ -451,7 +424,17 @@ def _resolve_ffprobe_path():
     return shutil.which("ffprobe") or shutil.which("ffprobe.exe") or ""
 
 
-def detect_media_type(file_path: str):
+def _max_upload_bytes():
+    raw = (os.getenv("AIREALCHECK_MAX_UPLOAD_MB") or "").strip()
+    try:
+        if raw and float(raw) > 0:
+            return int(float(raw) * 1024 * 1024)
+    except Exception:
+        pass
+    return app.config.get("MAX_CONTENT_LENGTH")
+
+
+def detect_media_type(file_path: str, header: bytes = None):
     status = {
         "method": None,
         "ffprobe": "not_available",
@@ -470,6 +453,12 @@ def detect_media_type(file_path: str):
     except Exception:
         status["notes"].append("file_stat_error")
 
+    # Kopfbytes aus dem Ingest: Magic-Treffer ergibt ohnehin "image", PIL muss dann nicht lesen.
+    if header and looks_like_image_magic(header):
+        status["magic"] = "ok"
+        status["method"] = "magic"
+        return "image", status
+
     try:
         from PIL import Image
     except Exception:
@@ -491,7 +480,7 @@ def detect_media_type(file_path: str):
     try:
         with open(file_path, "rb") as f:
             header = f.read(64)
-        if _looks_like_image_magic(header):
+        if looks_like_image_magic(header):
             status["magic"] = "ok"
             status["method"] = "magic"
             return "image", status
@@ -563,6 +552,22 @@ def _sha256_of_file(path: str) -> str:
 
 
 
+def _deduplicated(kind, file_path, file_hash, compute, variant=None):
+    """
+    Gleichzeitige Analysen derselben Datei (gleicher Medientyp, gleiche Engine-Konfiguration)
+    teilen sich eine Berechnung; Wartende bekommen eine Kopie des Ergebnisses.
+    """
+    if not single_flight_enabled():
+        return compute()
+    if not file_hash:
+        file_hash = _sha256_of_file(file_path)
+    key = f"{kind}:{file_hash}:{config_fingerprint(extra=variant)}"
+    result, role = _SINGLE_FLIGHT.run(key, compute)
+    if role != "leader":
+        print(f"[single_flight] kind={kind} role={role} hash={file_hash[:12]}")
+    return result
+
+
 def _legacy_shaping_enabled() -> bool:
     return (
         os.getenv("AIREALCHECK_ENABLE_LEGACY_SHAPING", "false").lower() in {"1", "true", "yes"}
@@ -630,7 +635,17 @@ def _apply_score_shaping(real: float, fake: float) -> Tuple[float, float]:
 
 def health():
 
-    return jsonify({"ok": True})
+    return jsonify(
+        {
+            "ok": True,
+            "models": {"xception": detector_status()},
+            "providers": provider_metrics(),
+            "circuit_breakers": breaker_states(),
+            "reality_defender_poller": rd_poller_stats(),
+            "inference_server": inference_stats(),
+            "result_cache": _RESULT_STORE.stats(),
+        }
+    )
 
 
 @app.get("/debug/env")
@@ -702,6 +717,7 @@ def debug_email_test():
 @app.get("/debug/paid")
 def debug_paid():
     paid_enabled = _paid_apis_enabled()
+    breakers = breaker_states()
     return jsonify(
         {
             "cwd": os.getcwd(),
@@ -716,12 +732,15 @@ def debug_paid():
                     "SIGHTENGINE_API_SECRET",
                     "SIGHTENGINE_API_KEY",
                 ],
+                "circuit_breaker": breakers.get("sightengine", {"state": "closed"}),
             },
             "reality_defender": {
                 "paid_apis_enabled": paid_enabled,
                 "creds_present": _reality_defender_creds_present(),
                 "env_names_checked": ["AIREALCHECK_USE_PAID_APIS", "REALITY_DEFENDER_API_KEY"],
+                "circuit_breaker": breakers.get("reality_defender", {"state": "closed"}),
             },
+            "circuit_breakers": breakers,
         }
     )
 
@@ -740,7 +759,7 @@ def _apply_no_cache_headers(resp):
     return resp
 
 
-def _create_analysis_record(user_id: int, media_type: str):
+def _create_analysis_record(user_id: int, media_type: str, status: str = "running"):
     analysis_id = str(uuid.uuid4())
     charge_key = uuid.uuid4().hex
     now = dt.datetime.utcnow()
@@ -749,7 +768,7 @@ def _create_analysis_record(user_id: int, media_type: str):
         row = Analysis(
             id=analysis_id,
             user_id=int(user_id),
-            status="running",
+            status=status,
             media_type=media_type,
             charge_idempotency_key=charge_key,
             started_at=now,
@@ -801,6 +820,24 @@ def _finalize_analysis(
         db.close()
 
 
+def _set_analysis_status(analysis_id: str, status: str):
+    db = get_session()
+    try:
+        row = db.query(Analysis).get(str(analysis_id))
+        if not row:
+            return
+        row.status = status
+        if status == "running":
+            row.started_at = dt.datetime.utcnow()
+        db.add(row)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
 
 
 
@@ -819,17 +856,17 @@ def _run_analysis(file_storage, media_type="image", user_ctx=None, charge_credit
         ), 400
 
 
-    filename = os.path.basename(file_storage.filename)
-
-    dst_path = os.path.join(UPLOAD_DIR, filename)
-
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    # Ein Durchgang: eindeutige Zieldatei, sha256, Groessenlimit und Kopfbytes fuer die Typerkennung.
+    try:
+        ingest = ingest_upload(file_storage, UPLOAD_DIR, max_bytes=_max_upload_bytes())
+    except IngestError as e:
+        return jsonify({"ok": False, "error": e.code, "details": [e.message], "media_type_detected": "unknown"}), e.status
 
-    file_storage.save(dst_path)
+    dst_path = ingest["path"]
 
     try:
 
-        return _run_analysis_path(dst_path, filename, media_type, user_ctx, charge_credit)
+        return _run_analysis_path(dst_path, ingest["filename"], media_type, user_ctx, charge_credit, ingest=ingest)
 
     finally:
 
@@ -847,13 +884,22 @@ def _run_analysis(file_storage, media_type="image", user_ctx=None, charge_credit
 
 
 
-def _run_analysis_path(file_path, filename, media_type="image", user_ctx=None, charge_credit=False):
+def _run_analysis_path(
+    file_path,
+    filename,
+    media_type="image",
+    user_ctx=None,
+    charge_credit=False,
+    analysis_id=None,
+    created_at=None,
+    ingest=None,
+):
 
     result = None
 
     source_used = None
 
-    file_hash = None
+    file_hash = (ingest or {}).get("sha256")
 
     use_cache = False
 
@@ -867,14 +913,17 @@ def _run_analysis_path(file_path, filename, media_type="image", user_ctx=None, c
     idempotency_key = None
 
     force = (request.args.get("force") or request.form.get("force") or "").lower() in {"1", "true", "yes", "force"}
-    analysis_id = None
-    created_at = dt.datetime.utcnow()
+    # analysis_id/created_at kommen bei Jobs aus dem Submit (Analyse-Record steht auf "queued").
+    created_at = created_at or dt.datetime.utcnow()
     created_at_iso = created_at.isoformat() + "Z"
     if user_ctx:
         user_id = int(user_ctx.get("id", 0))
-        analysis_id, _, created_at = _create_analysis_record(user_id, media_type)
-        created_at_iso = created_at.isoformat() + "Z"
-    else:
+        if analysis_id:
+            _set_analysis_status(analysis_id, "running")
+        else:
+            analysis_id, _, created_at = _create_analysis_record(user_id, media_type)
+            created_at_iso = created_at.isoformat() + "Z"
+    elif not analysis_id:
         analysis_id = str(uuid.uuid4())
 
     IDEMPOTENCY_BUCKET_SEC = 600
@@ -964,6 +1013,7 @@ def _run_analysis_path(file_path, filename, media_type="image", user_ctx=None, c
 
     def _finalize_success(raw_payload, source=None, public_payload=None):
         nonlocal credit_spent, credits_left
+        report_job_progress("finalizing")
         if not isinstance(raw_payload, dict):
             raw_payload = {}
         if public_payload is None:
@@ -1055,7 +1105,10 @@ def _run_analysis_path(file_path, filename, media_type="image", user_ctx=None, c
 
     try:
 
-        media_type_detected, detection_meta = detect_media_type(file_path)
+        media_type_detected, detection_meta = detect_media_type(file_path, header=(ingest or {}).get("head"))
+        if ingest and isinstance(detection_meta, dict):
+            detection_meta["sniffed"] = ingest.get("sniffed")
+        report_job_progress("analyzing", media_type_detected=media_type_detected)
 
         if media_type_detected == "image" and media_type == "image":
             # Cache-Hit?
@@ -1066,18 +1119,20 @@ def _run_analysis_path(file_path, filename, media_type="image", user_ctx=None, c
 
             use_cache = (os.getenv("AIREALCHECK_CACHE", "false").lower() in {"1", "true", "yes"})
 
-            file_hash = _sha256_of_file(file_path)
+            if not file_hash:
+                file_hash = _sha256_of_file(file_path)
             if user_ctx and charge_credit:
                 idempotency_key = _resolve_idempotency_key(file_hash)
 
-            if use_cache and (not force) and file_hash in _RESULT_CACHE:
+            cached = _RESULT_STORE.get(file_hash, namespace="image") if use_cache and (not force) else None
+
+            if isinstance(cached, dict):
 
-                cached = dict(_RESULT_CACHE[file_hash])
                 cached_is_public = is_public_result(cached)
 
                 if (not cached_is_public) and ("ai_likelihood" not in cached or "engine_results" not in cached):
 
-                    _RESULT_CACHE.pop(file_hash, None)
+                    _RESULT_STORE.delete(file_hash, namespace="image")
 
                 else:
 
@@ -1119,7 +1174,7 @@ def _run_analysis_path(file_path, filename, media_type="image", user_ctx=None, c
 
             # Standard: Ensemble-Auswertung (Hive + Forensics)
 
-            result = run_ensemble(file_path)
+            result = _deduplicated("image", file_path, file_hash, lambda: run_ensemble(file_path))
 
             source_used = result.get("primary_source")
 
@@ -1146,13 +1201,37 @@ def _run_analysis_path(file_path, filename, media_type="image", user_ctx=None, c
             if user_ctx and charge_credit:
                 idempotency_key = _resolve_idempotency_key()
 
-            video_forensics = safe_engine_call("video_forensics", run_video_forensics, file_path)
-            video_detectors = safe_engine_call("video_frame_detectors", run_video_frame_detectors, file_path)
-            reality_defender_video = safe_engine_call(
-                "reality_defender_video", analyze_reality_defender_video, file_path
-            )
-            video_temporal_cnn = safe_engine_call("video_temporal_cnn", run_video_temporal_cnn, file_path)
-            video_temporal = safe_engine_call("video_temporal", run_video_temporal, file_path)
+            audio_from_video = os.getenv("AIREALCHECK_ENABLE_AUDIO_FROM_VIDEO", "false").lower() in {"1", "true", "yes"}
+
+            def _run_video_engines():
+                # Ein gemeinsamer Frame-Store: das Video wird fuer alle Engines nur einmal dekodiert.
+                # Mit Audio aus dem Video haelt ein Audio-Scope die Tonspur aus demselben
+                # ffmpeg-Lauf fuer die Audio-Engines fest (kein zweiter Demux).
+                audio_scope = audio_context_scope(file_path) if audio_from_video else contextlib.nullcontext()
+                with audio_scope:
+                    with video_frame_store_scope(file_path):
+                        called = run_engine_calls(
+                            [
+                                ("video_forensics", run_video_forensics, (file_path,)),
+                                ("video_frame_detectors", run_video_frame_detectors, (file_path,)),
+                                ("reality_defender_video", analyze_reality_defender_video, (file_path,)),
+                                ("video_temporal_cnn", run_video_temporal_cnn, (file_path,)),
+                                ("video_temporal", run_video_temporal, (file_path,)),
+                            ]
+                        )
+                    if audio_from_video:
+                        try:
+                            called["audio_bundle"] = run_audio_ensemble(file_path, enable_flags=_audio_enable_flags())
+                        except Exception as exc:
+                            called["audio_error"] = f"exception:{type(exc).__name__}"
+                return called
+
+            video_called = _deduplicated("video", file_path, file_hash, _run_video_engines)
+            video_forensics = video_called["video_forensics"]
+            video_detectors = video_called["video_frame_detectors"]
+            reality_defender_video = video_called["reality_defender_video"]
+            video_temporal_cnn = video_called["video_temporal_cnn"]
+            video_temporal = video_called["video_temporal"]
 
             extra_engines = []
             if isinstance(video_detectors, dict):
@@ -1167,20 +1246,17 @@ def _run_analysis_path(file_path, filename, media_type="image", user_ctx=None, c
             engine_results_raw.extend(
                 [reality_defender_video, video_temporal_cnn, video_temporal, video_forensics]
             )
-            audio_from_video = os.getenv("AIREALCHECK_ENABLE_AUDIO_FROM_VIDEO", "false").lower() in {"1", "true", "yes"}
             if audio_from_video:
-                audio_flags = _audio_enable_flags()
-                try:
-                    audio_bundle = run_audio_ensemble(file_path, enable_flags=audio_flags)
-                    extra_audio = audio_bundle.get("engine_results_raw") if isinstance(audio_bundle, dict) else None
-                    if isinstance(extra_audio, list):
-                        engine_results_raw.extend([e for e in extra_audio if isinstance(e, dict)])
-                except Exception as exc:
+                audio_bundle = video_called.get("audio_bundle")
+                extra_audio = audio_bundle.get("engine_results_raw") if isinstance(audio_bundle, dict) else None
+                if isinstance(extra_audio, list):
+                    engine_results_raw.extend([e for e in extra_audio if isinstance(e, dict)])
+                elif video_called.get("audio_error"):
                     engine_results_raw.append(
                         make_engine_result(
                             engine="audio_forensics",
                             status="error",
-                            notes=f"exception:{type(exc).__name__}",
+                            notes=video_called.get("audio_error"),
                             available=False,
                             ai_likelihood=None,
                             confidence=0.0,
@@ -1260,16 +1336,23 @@ def _run_analysis_path(file_path, filename, media_type="image", user_ctx=None, c
                 idempotency_key = _resolve_idempotency_key()
 
             audio_flags = _audio_enable_flags()
-            audio_bundle = run_audio_ensemble(file_path, enable_flags=audio_flags)
+            audio_bundle = _deduplicated(
+                "audio",
+                file_path,
+                file_hash,
+                lambda: run_audio_ensemble(file_path, enable_flags=audio_flags),
+                variant=audio_flags,
+            )
             audio_primary_source = "audio_aasist"
             if isinstance(audio_bundle, dict):
                 audio_primary_source = audio_bundle.get("primary_source") or audio_primary_source
             engine_results_raw = audio_bundle.get("engine_results_raw") if isinstance(audio_bundle, dict) else []
             if not isinstance(engine_results_raw, list):
                 engine_results_raw = []
-            reality_defender_audio = safe_engine_call(
-                "reality_defender_audio", analyze_reality_defender_audio, file_path
-            )
+            # Ueber den Executor, damit ein spaeteres Reality-Defender-Ergebnis Cache und Job erreicht.
+            reality_defender_audio = run_engine_calls(
+                [("reality_defender_audio", analyze_reality_defender_audio, (file_path,))]
+            )["reality_defender_audio"]
             engine_results_raw.append(reality_defender_audio)
 
             standard_payload = build_standard_result(
@@ -1442,15 +1525,13 @@ def _run_analysis_path(file_path, filename, media_type="image", user_ctx=None, c
 
 
 
-        # Cache speichern
+        # Cache speichern (nicht, solange eine Engine wie Reality Defender noch "processing" meldet)
 
         try:
 
-            if use_cache:
-
-                _RESULT_CACHE[file_hash] = raw_payload
+            if use_cache and not _processing_engines(raw_payload):
 
-                _save_cache()
+                _RESULT_STORE.put(file_hash, raw_payload, namespace="image")
 
         except Exception:
 
@@ -1487,6 +1568,9 @@ def analyze():
     finally:
         db.close()
 
+    if _async_requested():
+        return _submit_upload_job(file, media_type, user_ctx, charge_credit=True)
+
     resp = _run_analysis(file, media_type, user_ctx, charge_credit=True)
 
     if isinstance(resp, tuple):
@@ -1546,6 +1630,9 @@ def analyze_guest():
 
     # Analyse ohne Credit-Abzug
 
+    if _async_requested():
+        return _submit_upload_job(file, media_type, None, charge_credit=False, as_guest=True)
+
     resp = _run_analysis(file, media_type, user_ctx, charge_credit=False)
 
 
@@ -1612,6 +1699,8 @@ def analyze_video_url():
         user_ctx = {"id": user.id, "is_premium": bool(user.is_premium)}
     finally:
         db.close()
+    if _async_requested():
+        return _submit_video_url_job(user_ctx, charge_credit=True, as_guest=False)
     resp = _handle_video_url_request(user_ctx, charge_credit=True, as_guest=False)
     if isinstance(resp, tuple):
         resp_obj, status = resp
@@ -1627,6 +1716,8 @@ def analyze_video_url_guest():
         return _error("guest_disabled", 403)
     if not rate_limit(f"guest_analyze:{_client_ip()}", limit=10, window_sec=600):
         return _error("rate_limited", 429)
+    if _async_requested():
+        return _submit_video_url_job(None, charge_credit=False, as_guest=True)
     resp = _handle_video_url_request(None, charge_credit=False, as_guest=True)
     if isinstance(resp, tuple):
         resp_obj, status = resp
@@ -1636,7 +1727,7 @@ def analyze_video_url_guest():
     return _apply_no_cache_headers(resp_final)
 
 
-def _handle_video_url_request(user_ctx, charge_credit=False, as_guest=False):
+def _handle_video_url_request(user_ctx, charge_credit=False, as_guest=False, analysis_id=None, created_at=None):
     data = request.get_json(silent=True) or request.form or {}
     url = (data.get("url") or data.get("video_url") or "").strip()
     if not url:
@@ -1657,7 +1748,15 @@ def _handle_video_url_request(user_ctx, charge_credit=False, as_guest=False):
 
     filename = os.path.basename(path)
     try:
-        resp = _run_analysis_path(path, filename, media_type="video", user_ctx=user_ctx, charge_credit=charge_credit)
+        resp = _run_analysis_path(
+            path,
+            filename,
+            media_type="video",
+            user_ctx=user_ctx,
+            charge_credit=charge_credit,
+            analysis_id=analysis_id,
+            created_at=created_at,
+        )
         if isinstance(resp, tuple):
             resp_obj, status = resp
         else:
@@ -1691,6 +1790,310 @@ def _handle_video_url_request(user_ctx, charge_credit=False, as_guest=False):
 
 
 
+JOBS_PATH = (os.getenv("AIREALCHECK_JOBS_PATH") or "").strip() or os.path.join(UPLOAD_DIR, "jobs.sqlite3")
+JOB_SPOOL_DIR = os.path.join(UPLOAD_DIR, "jobs")
+_JOB_QUEUE = JobQueue(JOBS_PATH)
+_JOB_POOL = {"pool": None, "pid": None}
+_JOB_POOL_LOCK = threading.Lock()
+
+
+def _processing_engines(payload):
+    """Engines, deren Ergebnis noch nachgeliefert wird (status "processing"), aus Roh- oder Public-Payload."""
+    if not isinstance(payload, dict):
+        return []
+    entries = payload.get("engine_results")
+    if not isinstance(entries, list):
+        details = payload.get("details")
+        entries = details.get("engines") if isinstance(details, dict) else None
+    return [
+        e.get("engine") for e in entries or [] if isinstance(e, dict) and e.get("status") == "processing"
+    ]
+
+
+def _apply_late_job_result(job_result, engine_name, engine_result):
+    return apply_late_engine_result(job_result, engine_result)
+
+
+def _async_requested():
+    raw = request.args.get("async") or request.form.get("async")
+    if raw is None and request.is_json:
+        raw = (request.get_json(silent=True) or {}).get("async")
+    return str(raw or "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _ensure_job_workers():
+    # Pro Prozess eigene Worker (gunicorn --preload forkt erst nach dem Import).
+    with _JOB_POOL_LOCK:
+        pool = _JOB_POOL["pool"]
+        if pool is None or _JOB_POOL["pid"] != os.getpid():
+            pool = JobWorkerPool(_JOB_QUEUE, _run_analysis_job, late_result=_apply_late_job_result).start()
+            _JOB_POOL["pool"] = pool
+            _JOB_POOL["pid"] = os.getpid()
+        return pool
+
+
+def _start_job_workers():
+    # Mit dem ersten Request starten, damit liegengebliebene Jobs weiterlaufen.
+    _ensure_job_workers()
+
+
+if not is_test():
+    app.before_request(_start_job_workers)
+
+
+def _job_events_url(job_id, user_id=None):
+    url = f"/jobs/{job_id}/events"
+    if user_id is not None:
+        # Kurzlebig und nur fuer diesen Job; nach Ablauf liefert GET /jobs/<id> eine neue URL.
+        url += f"?token={create_job_events_token(user_id, job_id)}"
+    return url
+
+
+def _job_created_response(job_id, analysis_id, user_id=None):
+    payload = {
+        "ok": True,
+        "job_id": job_id,
+        "analysis_id": analysis_id,
+        "status": "queued",
+        "status_url": f"/jobs/{job_id}",
+        "events_url": _job_events_url(job_id, user_id),
+    }
+    return _apply_no_cache_headers(make_response(jsonify(payload), 202))
+
+
+def _enqueue_analysis_job(job_id, kind, media_type, user_ctx, charge_credit, as_guest, extra):
+    analysis_id = job_id
+    created_at = dt.datetime.utcnow()
+    if user_ctx:
+        analysis_id, _, created_at = _create_analysis_record(int(user_ctx["id"]), media_type, status="queued")
+    force = (request.args.get("force") or request.form.get("force") or "").lower() in {"1", "true", "yes", "force"}
+    payload = {
+        "media_type": media_type,
+        "user_ctx": user_ctx,
+        "charge_credit": bool(charge_credit),
+        "as_guest": bool(as_guest),
+        "analysis_id": analysis_id,
+        "created_at": created_at.isoformat(),
+        "force": force,
+        "idempotency_key": request.headers.get("Idempotency-Key"),
+    }
+    payload.update(extra)
+    user_id = int(user_ctx["id"]) if user_ctx else None
+    _JOB_QUEUE.submit(kind, payload, user_id=user_id, job_id=job_id)
+    _ensure_job_workers().notify()
+    return _job_created_response(job_id, analysis_id, int(user_ctx["id"]) if user_ctx else None)
+
+
+def _submit_upload_job(file_storage, media_type, user_ctx, charge_credit=False, as_guest=False):
+    if not file_storage or not getattr(file_storage, "filename", None):
+        return jsonify(
+            {
+                "ok": False,
+                "error": "no_file",
+                "details": ["Keine Datei hochgeladen"],
+                "media_type_detected": "unknown",
+            }
+        ), 400
+    job_id = str(uuid.uuid4())
+    spool_dir = os.path.join(JOB_SPOOL_DIR, job_id)
+    try:
+        ingest = ingest_upload(file_storage, spool_dir, max_bytes=_max_upload_bytes())
+    except IngestError as e:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+        return jsonify({"ok": False, "error": e.code, "details": [e.message], "media_type_detected": "unknown"}), e.status
+    extra = {"file_path": ingest["path"], "filename": ingest["filename"], "sha256": ingest["sha256"]}
+    return _enqueue_analysis_job(job_id, "upload", media_type, user_ctx, charge_credit, as_guest, extra)
+
+
+def _submit_video_url_job(user_ctx, charge_credit=False, as_guest=False):
+    data = request.get_json(silent=True) or request.form or {}
+    url = (data.get("url") or data.get("video_url") or "").strip()
+    if not url:
+        return jsonify(
+            {"ok": False, "error": "url_missing", "details": ["URL fehlt"], "media_type_detected": "unknown"}
+        ), 400
+    job_id = str(uuid.uuid4())
+    return _enqueue_analysis_job(job_id, "video_url", "video", user_ctx, charge_credit, as_guest, {"url": url})
+
+
+def _analysis_response_json(resp, as_guest=False):
+    if isinstance(resp, tuple):
+        resp_obj, status = resp
+    else:
+        resp_obj, status = resp, 200
+    if hasattr(resp_obj, "get_json"):
+        resp_obj = resp_obj.get_json()
+    if not isinstance(resp_obj, dict):
+        return {"ok": False, "error": "invalid_response", "media_type_detected": "unknown"}, 500
+    if as_guest:
+        usage = resp_obj.get("usage") if isinstance(resp_obj.get("usage"), dict) else {}
+        usage.update({"source": "guest", "credit_spent": False, "credits_left": None})
+        resp_obj["usage"] = usage
+    resp_obj.setdefault("media_type_detected", "unknown")
+    return resp_obj, int(status or 200)
+
+
+def _fail_unfinished_analysis(analysis_id, payload):
+    db = get_session()
+    try:
+        row = db.query(Analysis).get(str(analysis_id))
+        unfinished = bool(row) and row.status in {"queued", "running"}
+    finally:
+        db.close()
+    if unfinished:
+        _finalize_analysis(analysis_id, "failed", result_json=payload, raw_result_json=payload)
+
+
+def _run_analysis_job(job):
+    """Worker-Handler: fuehrt die Analyse mit den beim Submit festgehaltenen Request-Daten aus."""
+    payload = job.get("payload") or {}
+    user_ctx = payload.get("user_ctx")
+    as_guest = bool(payload.get("as_guest"))
+    analysis_id = payload.get("analysis_id")
+    created_at = None
+    if payload.get("created_at"):
+        created_at = dt.datetime.fromisoformat(payload["created_at"])
+    headers = {}
+    if payload.get("idempotency_key"):
+        headers["Idempotency-Key"] = payload["idempotency_key"]
+    query = {"force": "1"} if payload.get("force") else {}
+    body = {"url": payload.get("url")} if job.get("kind") == "video_url" else None
+    with app.test_request_context(
+        f"/jobs/{job['id']}", method="POST", headers=headers, query_string=query, json=body
+    ):
+        if job.get("kind") == "video_url":
+            resp = _handle_video_url_request(
+                user_ctx,
+                charge_credit=bool(payload.get("charge_credit")),
+                as_guest=as_guest,
+                analysis_id=analysis_id,
+                created_at=created_at,
+            )
+        else:
+            file_path = payload.get("file_path") or ""
+            try:
+                if not file_path or not os.path.exists(file_path):
+                    resp = jsonify({"ok": False, "error": "job_file_missing", "media_type_detected": "unknown"}), 410
+                else:
+                    resp = _run_analysis_path(
+                        file_path,
+                        payload.get("filename") or os.path.basename(file_path),
+                        payload.get("media_type") or "image",
+                        user_ctx,
+                        bool(payload.get("charge_credit")),
+                        analysis_id=analysis_id,
+                        created_at=created_at,
+                        ingest={"sha256": payload.get("sha256")},
+                    )
+            finally:
+                if file_path:
+                    shutil.rmtree(os.path.dirname(file_path), ignore_errors=True)
+        result, status = _analysis_response_json(resp, as_guest=as_guest)
+    if user_ctx and analysis_id and status >= 400:
+        _fail_unfinished_analysis(analysis_id, result)
+    return result, status
+
+
+def _job_view(job):
+    payload = job.get("payload") or {}
+    view = {
+        "job_id": job["id"],
+        "kind": job.get("kind"),
+        "status": job.get("status"),
+        "stage": job.get("stage"),
+        "progress": job.get("progress"),
+        "analysis_id": payload.get("analysis_id"),
+        "media_type": payload.get("media_type"),
+        "attempts": job.get("attempts"),
+        "created_at": job.get("created_at"),
+        "updated_at": job.get("updated_at"),
+        "finished_at": job.get("finished_at"),
+    }
+    if job.get("status") in FINAL_STATUSES:
+        view["http_status"] = job.get("http_status")
+        view["result"] = job.get("result")
+        view["error"] = job.get("error")
+        view["pending_engines"] = _processing_engines(job.get("result"))
+    return view
+
+
+def _load_job_for_request(job_id, allow_events_token=False):
+    job = _JOB_QUEUE.get(str(job_id))
+    if job is None:
+        return None, _error("not_found", 404)
+    if job.get("user_id") is not None:
+        user_id = user_id_from_token(parse_auth_header())
+        if user_id is None and allow_events_token:
+            # EventSource kann keine Header setzen: job-gebundenes Kurzzeit-Token statt Access-Token in der URL.
+            user_id = user_id_from_job_events_token((request.args.get("token") or "").strip(), job["id"])
+        if user_id is None:
+            return None, _error("auth_required", 401)
+        if user_id != int(job["user_id"]):
+            return None, _error("forbidden", 403)
+        _user, error = load_active_user(user_id)
+        if error:
+            return None, error
+    return job, None
+
+
+@app.get("/jobs/<job_id>")
+def get_job(job_id):
+    job, error = _load_job_for_request(job_id)
+    if error:
+        return error
+    view = _job_view(job)
+    if job.get("status") not in FINAL_STATUSES:
+        view["events_url"] = _job_events_url(job["id"], job.get("user_id"))
+    return _apply_no_cache_headers(make_response(jsonify({"ok": True, "job": view})))
+
+
+@app.get("/jobs/<job_id>/events")
+def job_events(job_id):
+    job, error = _load_job_for_request(job_id, allow_events_token=True)
+    if error:
+        return error
+    poll_sec = max(0.05, float(os.getenv("AIREALCHECK_JOB_SSE_POLL_SEC", "0.5") or 0.5))
+    # Kurze Streams binden keinen Worker-Thread lange; danach weiter per GET /jobs/<id> (primaerer Weg).
+    max_sec = max(1.0, float(os.getenv("AIREALCHECK_JOB_SSE_MAX_SEC", "120") or 120))
+
+    def _stream():
+        current = job
+        last_state = None
+        last_send = time.time()
+        deadline = time.time() + max_sec
+        sent_result = False
+        while True:
+            final = current.get("status") in FINAL_STATUSES
+            state = (
+                current.get("status"),
+                current.get("stage"),
+                json.dumps(current.get("progress"), sort_keys=True),
+                current.get("updated_at") if final else None,
+            )
+            if state != last_state:
+                # Nach dem Ergebnis folgen "update"-Events, bis nachgelieferte Engines fertig sind.
+                event = ("update" if sent_result else "result") if final else "progress"
+                view = _job_view(current)
+                yield f"event: {event}\ndata: {json.dumps(view, ensure_ascii=False)}\n\n"
+                last_state = state
+                last_send = time.time()
+                sent_result = sent_result or final
+                if final and not view.get("pending_engines"):
+                    return
+            elif time.time() - last_send > 15:
+                yield ": keep-alive\n\n"
+                last_send = time.time()
+            if time.time() > deadline:
+                yield "event: timeout\ndata: {}\n\n"
+                return
+            time.sleep(poll_sec)
+            current = _JOB_QUEUE.get(job["id"]) or current
+
+    resp = Response(_stream(), mimetype="text/event-stream")
+    resp.headers["X-Accel-Buffering"] = "no"
+    return _apply_no_cache_headers(resp)
+
+
 if __name__ == "__main__":
 
     app.run(host="127.0.0.1", port=5001, debug=True)
@@ -0,0 +1,160 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+from Backend.sqlite_db import SqliteDatabase
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS flights (
+    key TEXT PRIMARY KEY,
+    token TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS flight_results (
+    token TEXT PRIMARY KEY,
+    ok INTEGER NOT NULL,
+    payload TEXT,
+    finished_at REAL NOT NULL
+);
+"""
+
+
+def _env_float(name, default):
+    try:
+        raw = os.getenv(name)
+        return float(raw) if raw not in {None, ""} else float(default)
+    except Exception:
+        return float(default)
+
+
+def _log(message: str):
+    try:
+        print(f"[single_flight] {message}")
+    except Exception:
+        pass
+
+
+def single_flight_enabled():
+    return (os.getenv("AIREALCHECK_SINGLE_FLIGHT") or "true").strip().lower() in {"1", "true", "yes", "on"}
+
+
+class SingleFlight:
+    """
+    Dedupliziert gleichzeitige identische Berechnungen ueber Prozesse hinweg.
+    Der erste Aufrufer (Leader) haelt einen Lease in SQLite und legt sein Ergebnis ab;
+    alle weiteren warten darauf und bekommen eine eigene Kopie (JSON-Roundtrip).
+    Stirbt der Leader, laeuft sein Lease ab und ein Wartender rechnet selbst.
+    """
+
+    def __init__(self, path: str, lease_sec=None, wait_sec=None, poll_sec=None, result_ttl_sec=None):
+        self.path = path
+        self.lease_sec = _env_float("AIREALCHECK_SINGLE_FLIGHT_LEASE_SEC", 300) if lease_sec is None else lease_sec
+        self.wait_sec = _env_float("AIREALCHECK_SINGLE_FLIGHT_WAIT_SEC", 300) if wait_sec is None else wait_sec
+        self.poll_sec = _env_float("AIREALCHECK_SINGLE_FLIGHT_POLL_SEC", 0.2) if poll_sec is None else poll_sec
+        self.result_ttl_sec = 60.0 if result_ttl_sec is None else float(result_ttl_sec)
+        self._db = SqliteDatabase(path, _SCHEMA)
+        # Leader im selben Prozess wecken ihre Wartenden sofort statt erst beim naechsten Poll.
+        # Eintraege gibt es nur fuer lokale Leader; _publish entfernt sie wieder.
+        self._events_lock = threading.Lock()
+        self._events = {}
+
+    def _connect(self):
+        return self._db.connect()
+
+    def _transaction(self):
+        return self._db.transaction()
+
+    def _leader_event(self, token):
+        """Event des Leaders mit diesem Token, falls er in diesem Prozess laeuft, sonst None."""
+        with self._events_lock:
+            return self._events.get(token)
+
+    def _acquire(self, key):
+        """(True, eigenes Token) als Leader oder (False, Token des laufenden Leaders)."""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT token, expires_at FROM flights WHERE key = ?", (key,)).fetchone()
+            if row is not None and float(row[1]) > now:
+                return False, row[0]
+            token = uuid.uuid4().hex
+            conn.execute(
+                "INSERT OR REPLACE INTO flights (key, token, started_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, token, now, now + self.lease_sec),
+            )
+        with self._events_lock:
+            self._events[token] = threading.Event()
+        return True, token
+
+    def _publish(self, key, token, ok, payload):
+        now = time.time()
+        try:
+            with self._transaction() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO flight_results (token, ok, payload, finished_at) VALUES (?, ?, ?, ?)",
+                    (token, 1 if ok else 0, payload, now),
+                )
+                conn.execute("DELETE FROM flights WHERE key = ? AND token = ?", (key, token))
+                conn.execute("DELETE FROM flight_results WHERE finished_at < ?", (now - self.result_ttl_sec,))
+        finally:
+            with self._events_lock:
+                event = self._events.pop(token, None)
+            if event is not None:
+                event.set()
+
+    def _await(self, key, token):
+        """Ergebnis des Leaders (als neues Objekt) oder None, wenn selbst gerechnet werden muss."""
+        deadline = time.time() + self.wait_sec
+        # Leader in einem anderen Prozess: nur DB-Polling, ohne Eintrag in self._events.
+        event = self._leader_event(token) or threading.Event()
+        conn = self._connect()
+        while time.time() < deadline:
+            row = conn.execute("SELECT ok, payload FROM flight_results WHERE token = ?", (token,)).fetchone()
+            if row is not None:
+                return json.loads(row[1]) if row[0] else None
+            lease = conn.execute("SELECT token, expires_at FROM flights WHERE key = ?", (key,)).fetchone()
+            if lease is None or lease[0] != token or float(lease[1]) < time.time():
+                # Leader weg ohne Ergebnis (abgestuerzt/Lease abgelaufen).
+                row = conn.execute("SELECT ok, payload FROM flight_results WHERE token = ?", (token,)).fetchone()
+                return json.loads(row[1]) if row is not None and row[0] else None
+            event.wait(self.poll_sec)
+        return None
+
+    def run(self, key, compute):
+        """
+        Fuehrt compute() fuer key hoechstens einmal gleichzeitig aus.
+        Liefert (result, role) mit role leader | follower | fallback.
+        """
+        try:
+            leader, token = self._acquire(key)
+        except Exception as exc:
+            _log(f"acquire failed: {type(exc).__name__}: {exc}")
+            return compute(), "fallback"
+        if not leader:
+            try:
+                shared = self._await(key, token)
+            except Exception as exc:
+                _log(f"wait failed: {type(exc).__name__}: {exc}")
+                shared = None
+            if shared is not None:
+                return shared, "follower"
+            return compute(), "fallback"
+
+        ok, payload = False, None
+        try:
+            result = compute()
+            try:
+                payload = json.dumps(result, ensure_ascii=False)
+                ok = True
+            except (TypeError, ValueError):
+                # Nicht serialisierbar: Wartende rechnen dann selbst.
+                ok = False
+            return result, "leader"
+        finally:
+            try:
+                self._publish(key, token, ok, payload)
+            except Exception as exc:
+                _log(f"publish failed: {type(exc).__name__}: {exc}")
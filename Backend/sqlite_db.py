@@ -0,0 +1,63 @@
+import contextlib
+import os
+import sqlite3
+import threading
+
+
+class SqliteDatabase:
+    """
+    Gemeinsame SQLite-Anbindung fuer die prozessuebergreifenden Stores (Ergebnis-Cache, Jobs,
+    Single-Flight, RD-Poller): eine Verbindung pro Thread, nach fork() (gunicorn --preload) neu,
+    WAL + busy_timeout + synchronous=NORMAL; das Schema wird beim ersten Verbinden angelegt.
+    transaction() ist eine BEGIN-IMMEDIATE-Transaktion mit Rollback bei Fehlern.
+    """
+
+    def __init__(self, path: str, schema: str, row_factory=None):
+        self.path = path
+        self.schema = schema
+        self.row_factory = row_factory
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def connect(self):
+        # Verbindungen nicht ueber Threads oder fork() hinweg teilen.
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and getattr(self._local, "pid", None) == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        if self.row_factory is not None:
+            conn.row_factory = self.row_factory
+        conn.execute("PRAGMA busy_timeout=30000")
+        with self._init_lock:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(self.schema)
+                self._initialized = True
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @contextlib.contextmanager
+    def transaction(self):
+        conn = self.connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+
+    def close(self):
+        """Verbindung des aktuellen Threads schliessen."""
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
@@ -0,0 +1,65 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    routes = {}
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _drain(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _dispatch(self):
+        self.body = self._drain()
+        route = self.routes.get(self.command)
+        reply = route(self) if route is not None else (405, {})
+        if reply is None:
+            # Anfrage gelesen, Verbindung ohne Antwort geschlossen.
+            self.close_connection = True
+            return
+        self._send(*reply)
+
+    do_GET = _dispatch
+    do_POST = _dispatch
+    do_PUT = _dispatch
+
+    def log_message(self, *_args):
+        pass
+
+
+@pytest.fixture
+def http_stub():
+    """
+    Startet lokale JSON-Stub-Server: http_stub({"POST": route, ...}) -> Basis-URL.
+    route(request) bekommt den Handler (request.body, request.path, request.base_url) und
+    liefert (status, payload) oder None, um die Verbindung ohne Antwort zu schliessen.
+    """
+    servers = []
+
+    def start(routes):
+        handler = type("_Handler", (_StubHandler,), {"routes": dict(routes)})
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
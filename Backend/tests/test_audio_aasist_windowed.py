@@ -0,0 +1,97 @@
+import wave
+
+import numpy as np
+import pytest
+import torch
+
+import Backend.engines.audio_aasist_engine as aasist_engine
+from Backend.audio_frames import segment_starts
+
+
+class _EnergyModel(torch.nn.Module):
+    """Spoof-Logit waechst mit der Energie des Fensters; merkt sich die Batch-Groessen."""
+
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def forward(self, x):
+        if x.dim() != 2:
+            raise RuntimeError("expected [B, T]")
+        self.batches.append(int(x.shape[0]))
+        energy = x.abs().mean(dim=1)
+        return torch.stack([energy * 20.0, torch.zeros_like(energy)], dim=1)
+
+
+def _write_wav(path, samples):
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(16000)
+        wf.writeframes((np.clip(samples, -1, 1) * 32767).astype(np.int16).tobytes())
+
+
+@pytest.fixture
+def energy_model(monkeypatch, tmp_path):
+    weights = tmp_path / "aasist.pth"
+    weights.write_bytes(b"x")
+    model = _EnergyModel()
+    monkeypatch.setattr(aasist_engine, "_weights_path", lambda: str(weights))
+    monkeypatch.setattr(aasist_engine, "_model_for_run", lambda: (model, {"format": "fake"}))
+    monkeypatch.setenv("AIREALCHECK_INFER_SERVER", "false")
+    return model
+
+
+def test_segment_starts_cover_tail():
+    assert segment_starts(176000, 64000, 32000) == [0, 32000, 64000, 96000, 112000]
+    assert segment_starts(50000, 64000, 32000) == [0]
+
+
+def test_long_audio_runs_in_overlapping_batches(energy_model, monkeypatch, tmp_path):
+    rng = np.random.default_rng(0)
+    samples = np.concatenate([rng.normal(size=96000) * 0.01, rng.normal(size=80000) * 0.3])
+    _write_wav(tmp_path / "long.wav", samples)
+    monkeypatch.setenv("AIREALCHECK_AASIST_WINDOW_SEC", "4")
+    monkeypatch.setenv("AIREALCHECK_AASIST_WINDOW_HOP_SEC", "2")
+    monkeypatch.setenv("AIREALCHECK_AASIST_BATCH_SIZE", "3")
+    monkeypatch.setenv("AIREALCHECK_AASIST_AGGREGATE", "max")
+
+    result = aasist_engine.run_audio_aasist(str(tmp_path / "long.wav"))
+
+    assert result["status"] == "ok" and result["notes"] == "aasist_upstream_ok;windowed"
+    assert energy_model.batches == [3, 2]
+    signals = {s["name"]: s["value"] for s in result["signals"]}
+    timeline = signals["segment_timeline"]
+    assert signals["segments"] == 5 and len(timeline) == 5
+    assert timeline[0]["start_s"] == 0.0 and timeline[-1]["end_s"] == 11.0
+    assert timeline[0]["prob_spoof"] < 0.6 < timeline[-1]["prob_spoof"]
+    assert result["ai_likelihood"] == pytest.approx(signals["prob_spoof_max"], abs=1e-4)
+
+
+def test_timeline_is_compacted_and_short_audio_stays_single_pass(energy_model, monkeypatch, tmp_path):
+    _write_wav(tmp_path / "long.wav", np.random.default_rng(1).normal(size=16000 * 30) * 0.1)
+    _write_wav(tmp_path / "short.wav", np.random.default_rng(2).normal(size=16000 * 3) * 0.1)
+    monkeypatch.setenv("AIREALCHECK_AASIST_WINDOW_SEC", "2")
+    monkeypatch.setenv("AIREALCHECK_AASIST_TIMELINE_MAX", "4")
+    monkeypatch.setenv("AIREALCHECK_AASIST_AGGREGATE", "topk")
+
+    long_result = aasist_engine.run_audio_aasist(str(tmp_path / "long.wav"))
+    signals = {s["name"]: s["value"] for s in long_result["signals"]}
+    assert signals["segments"] == 29 and len(signals["segment_timeline"]) == 4
+    assert max(energy_model.batches) == 8
+
+    monkeypatch.setenv("AIREALCHECK_AASIST_WINDOW_SEC", "4")
+    short_result = aasist_engine.run_audio_aasist(str(tmp_path / "short.wav"))
+    assert short_result["notes"] == "aasist_upstream_ok"
+    assert "segment_timeline" not in {s["name"] for s in short_result["signals"]}
+
+    # Ohne Konfiguration bleibt auch langes Audio beim einzelnen Durchlauf.
+    monkeypatch.delenv("AIREALCHECK_AASIST_WINDOW_SEC")
+    assert aasist_engine.run_audio_aasist(str(tmp_path / "long.wav"))["notes"] == "aasist_upstream_ok"
+
+
+def test_aggregate_modes():
+    probs = [0.1, 0.9, 0.5, 0.7]
+    assert aasist_engine.aggregate_segment_probs(probs, "mean") == pytest.approx(0.55)
+    assert aasist_engine.aggregate_segment_probs(probs, "max") == pytest.approx(0.9)
+    assert aasist_engine.aggregate_segment_probs(probs, "topk", topk=2) == pytest.approx(0.8)
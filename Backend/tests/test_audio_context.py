@@ -0,0 +1,128 @@
+import math
+import stat
+import sys
+import wave
+
+import numpy as np
+
+import Backend.audio_context as audio_context
+import Backend.engines.video_forensics_engine as video_forensics_engine
+from Backend.ensemble import run_audio_ensemble
+from Backend.video_frame_store import VideoFrameStore
+
+
+_FAKE_FFMPEG = """#!{python}
+import math
+import os
+import struct
+import sys
+
+args = sys.argv[1:]
+with open({calls!r}, "a") as f:
+    f.write(" ".join(args) + "\\n")
+if "-vf" in args:
+    vf = args[args.index("-vf") + 1]
+    width, height = [int(v) for v in vf.split("scale=")[1].split(":")]
+    for idx in range(3):
+        sys.stdout.buffer.write(bytes([idx * 30]) * (width * height * 3))
+    sys.stdout.buffer.flush()
+if "s16le" in args:
+    pcm = b"".join(
+        struct.pack("<h", int(8000 * math.sin(2 * math.pi * 220 * i / 16000.0))) for i in range(48000)
+    )
+    target = args[-1]
+    if target == "pipe:1":
+        sys.stdout.buffer.write(pcm)
+    else:
+        fd = int(target.split(":")[1])
+        view = memoryview(pcm)
+        while view:
+            view = view[os.write(fd, view):]
+"""
+
+
+def _fake_ffmpeg(monkeypatch, tmp_path):
+    calls = tmp_path / "calls.txt"
+    calls.write_text("")
+    ffmpeg = tmp_path / "ffmpeg"
+    ffmpeg.write_text(_FAKE_FFMPEG.format(python=sys.executable, calls=str(calls)))
+    ffmpeg.chmod(ffmpeg.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("FFMPEG_PATH", str(ffmpeg))
+    return ffmpeg, calls
+
+
+def _write_wav(path, sample_rate, seconds=1.0):
+    t = np.arange(int(sample_rate * seconds)) / float(sample_rate)
+    data = (np.sin(2 * math.pi * 220 * t) * 8000).astype(np.int16)
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(data.tobytes())
+
+
+def test_wav_at_target_rate_needs_no_ffmpeg(monkeypatch, tmp_path):
+    monkeypatch.setenv("FFMPEG_PATH", str(tmp_path / "missing"))
+    path = tmp_path / "voice.wav"
+    _write_wav(path, 16000)
+
+    ctx = audio_context.AudioContext(str(path))
+    samples, sample_rate, meta = ctx.pcm()
+
+    assert sample_rate == 16000 and meta["method"] == "wav" and samples.size == 16000
+    assert ctx.wav()[0] is samples and not samples.flags.writeable
+    assert ctx.decodes == 0
+
+
+def test_ensemble_decodes_compressed_audio_once(monkeypatch, tmp_path):
+    _, calls = _fake_ffmpeg(monkeypatch, tmp_path)
+    path = tmp_path / "voice.mp3"
+    path.write_bytes(b"\x00" * 64)
+    flags = {"audio_aasist": False, "audio_forensics": True, "audio_prosody": True}
+
+    bundle = run_audio_ensemble(str(path), enable_flags=flags)
+
+    results = {r["engine"]: r for r in bundle["engine_results_raw"]}
+    assert results["audio_forensics"]["status"] == "ok"
+    assert results["audio_forensics"]["notes"].startswith("ffmpeg_decode")
+    assert "sample_rate_hz=16000" in results["audio_forensics"]["signals"][0]
+    assert results["audio_prosody"]["status"] == "ok"
+    lines = calls.read_text().splitlines()
+    assert len(lines) == 1 and lines[0].endswith("pipe:1")
+
+
+def test_pipe_decode_reports_missing_ffmpeg(monkeypatch, tmp_path):
+    monkeypatch.setenv("FFMPEG_PATH", str(tmp_path / "missing"))
+    monkeypatch.setattr(audio_context.shutil, "which", lambda *_a, **_k: None)
+    monkeypatch.setattr(audio_context, "_powershell_get_command", lambda *_a: "")
+    path = tmp_path / "voice.mp3"
+    path.write_bytes(b"\x00" * 64)
+
+    samples, _, meta = audio_context.AudioContext(str(path)).pcm()
+
+    assert samples is None and meta["note"] == "ffmpeg_not_installed"
+
+
+def test_video_decode_primes_audio_in_same_ffmpeg_run(monkeypatch, tmp_path):
+    ffmpeg, calls = _fake_ffmpeg(monkeypatch, tmp_path)
+    video = tmp_path / "clip.mp4"
+    video.write_bytes(b"\x00" * 64)
+    monkeypatch.setattr(video_forensics_engine, "_ffmpeg_path", lambda: str(ffmpeg))
+    monkeypatch.setattr(
+        video_forensics_engine,
+        "_probe_video_geometry",
+        lambda *_a, **_k: {"width": 64, "height": 48, "duration": 1.5, "has_audio": True},
+    )
+
+    with audio_context.audio_context_scope(str(video)) as ctx:
+        store = VideoFrameStore(str(video), scan_fps=2.0, max_frames=10).decode()
+        try:
+            assert store.frames.shape == (3, 48, 64, 3)
+            assert store.meta.get("audio_demuxed") is True
+        finally:
+            store.close()
+        samples, sample_rate, meta = audio_context.get_audio_context(str(video)).pcm()
+
+    assert meta["method"] == "video_demux" and sample_rate == 16000
+    assert samples.shape == (48000,) and ctx.decodes == 0
+    assert len(calls.read_text().splitlines()) == 1
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from Backend.audio_frames import frame_count, frame_features, frame_matrix
+from Backend.engines.audio_forensics_engine import _compute_metrics
+
+
+def _loop_features(samples, sample_rate, frame_size, hop):
+    """Referenz: die fruehere Frame-Schleife ohne Dezimierung."""
+    window = np.hanning(frame_size).astype(np.float32)
+    freqs = np.fft.rfftfreq(frame_size, d=1.0 / float(sample_rate))
+    rms, centroid = [], []
+    for start in range(0, len(samples) - frame_size + 1, hop):
+        frame = samples[start : start + frame_size]
+        rms.append(float(np.sqrt(np.mean(frame ** 2))))
+        mag = np.abs(np.fft.rfft(frame * window))
+        centroid.append(float(np.sum(freqs * mag) / np.sum(mag)) if np.sum(mag) > 0 else np.nan)
+    return np.array(rms), np.array(centroid)
+
+
+def test_frame_matrix_is_a_strided_view():
+    samples = np.arange(1000, dtype=np.float32)
+    frames = frame_matrix(samples, 256, 128)
+
+    assert frames.shape == (frame_count(1000, 256, 128), 256) == (6, 256)
+    assert np.shares_memory(frames, samples) and not frames.flags.writeable
+    assert frames[3, 0] == 384 and frames[5, -1] == 895
+
+    short = frame_matrix(samples[:100], 256, 128)
+    assert short.shape == (1, 256) and short[0, 99] == 99 and short[0, 100] == 0
+
+
+def test_features_match_frame_loop_across_blocks():
+    rng = np.random.default_rng(0)
+    samples = (rng.normal(size=40000) * 0.2).astype(np.float32)
+    samples[8000:16000] = 0.0
+
+    features = frame_features(samples, 16000, 512, 256, block_size=7)
+    rms, centroid = _loop_features(samples, 16000, 512, 256)
+
+    np.testing.assert_allclose(features["rms"], rms, rtol=1e-5, atol=1e-7)
+    np.testing.assert_allclose(features["centroid"], centroid, rtol=1e-5)
+    assert np.isnan(features["centroid"]).sum() == np.isnan(centroid).sum() > 0
+
+
+def test_long_audio_is_not_decimated(monkeypatch):
+    monkeypatch.setenv("AIREALCHECK_AUDIO_MAX_FRAMES", "10")
+    t = np.arange(16000 * 30) / 16000.0
+    samples = (0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+    metrics = _compute_metrics(samples, 16000)
+
+    assert metrics["frames_analyzed"] == frame_count(len(samples), 512, 256)
+    assert metrics["spectral_centroid"] == pytest.approx(440.0, rel=0.05)
+    assert metrics["silence_ratio"] == 0.0
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from Backend.audio_frames import frame_matrix
+from Backend.engines.audio_prosody_engine import _compute_prosody, _estimate_pitch_acf, _estimate_pitch_batch
+from scripts.bench_prosody_pitch import run, synthetic_voice
+
+
+def test_batched_pitch_matches_per_frame_tracker():
+    samples = synthetic_voice(4.0)
+    samples[16000:24000] = 0.0
+    samples[32000:40000] = np.random.default_rng(1).normal(size=8000).astype(np.float32)
+    frames = frame_matrix(samples, 640, 160)
+
+    batch = _estimate_pitch_batch(frames, 16000)
+    loop = np.array([np.nan if v is None else v for v in (_estimate_pitch_acf(f, 16000) for f in frames)])
+
+    assert np.array_equal(np.isnan(batch), np.isnan(loop))
+    assert np.isnan(loop).sum() > 0
+    np.testing.assert_allclose(batch[~np.isnan(batch)], loop[~np.isnan(loop)], rtol=1e-6)
+
+
+def test_prosody_signals_track_synthetic_pitch():
+    signals, warning = _compute_prosody(synthetic_voice(6.0), 16000)
+
+    values = {s["name"]: s["value"] for s in signals}
+    assert warning is None
+    assert values["f0_median_hz"] == pytest.approx(150.0, abs=15.0)
+    assert values["f0_valid_frames"] >= 100
+    assert "jitter_approx" in values and "jitter_cv" in values
+
+
+def test_micro_benchmark_reports_agreement():
+    report = run(2.0, repeats=1)
+    assert report["frames"] == 197
+    assert report["max_abs_diff_hz"] == pytest.approx(0.0, abs=1e-6)
+    assert report["mismatched_detections"] == 0
@@ -0,0 +1,78 @@
+import wave
+
+import numpy as np
+import pytest
+
+import Backend.audio_context as audio_context
+from Backend.audio_vad import select_speech, speech_mask
+from Backend.ensemble import run_audio_ensemble
+
+
+def _speechlike(seconds, amplitude, sample_rate=16000, f0=140.0):
+    """Harmonischer Ton mit Silbenrhythmus (4 Hz Amplitudenmodulation)."""
+    t = np.arange(int(seconds * sample_rate)) / float(sample_rate)
+    envelope = 0.6 + 0.4 * np.sin(2 * np.pi * 4.0 * t)
+    tone = np.sin(2 * np.pi * f0 * t) + 0.4 * np.sin(2 * np.pi * 2 * f0 * t)
+    return amplitude * envelope * tone
+
+
+def _recording(sample_rate=16000):
+    rng = np.random.default_rng(0)
+    signal = rng.normal(size=20 * sample_rate) * 0.001
+    for start, seconds, amplitude in ((2, 3, 0.3), (9, 1, 0.05), (14, 4, 0.5)):
+        lo = start * sample_rate
+        signal[lo : lo + int(seconds * sample_rate)] += _speechlike(seconds, amplitude)
+    return signal.astype(np.float32)
+
+
+def test_speech_mask_finds_bursts():
+    mask, _, _, _, hop = speech_mask(_recording(), 16000)
+    assert mask[int(3.0 * 16000 / hop)] and mask[int(16.0 * 16000 / hop)]
+    assert not mask[int(7.0 * 16000 / hop)] and not mask[int(19.5 * 16000 / hop)]
+
+
+def test_selection_prefers_strongest_speech_within_budget():
+    selected, selection = select_speech(_recording(), 16000, budget_sec=5.0, max_segment_sec=2.0)
+
+    assert selection["note"] == "ok"
+    assert selection["speech_s"] == pytest.approx(8.0, abs=0.6)
+    assert len(selected) <= 5 * 16000 and selection["selected_s"] == pytest.approx(5.0, abs=0.05)
+    starts = [seg[0] for seg in selection["segments"]]
+    assert starts == sorted(starts)
+    # Die leise Sekunde bei 9 s faellt dem Budget zum Opfer, der laute Block bei 14 s nicht.
+    assert all(not (8.5 < lo < 10.5) for lo, _ in selection["segments"])
+    assert any(13.5 < lo < 16.0 for lo, _ in selection["segments"])
+
+
+def test_silence_keeps_full_signal():
+    silence = np.zeros(16000 * 3, dtype=np.float32)
+    selected, selection = select_speech(silence, 16000, budget_sec=1.0)
+    assert selection["note"] == "no_speech" and selected is silence
+
+
+def test_engines_share_one_selection(monkeypatch, tmp_path):
+    path = tmp_path / "talk.wav"
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(16000)
+        wf.writeframes((_recording() * 32767).astype(np.int16).tobytes())
+    monkeypatch.setenv("AIREALCHECK_AUDIO_VAD", "on")
+    monkeypatch.setenv("AIREALCHECK_AUDIO_VAD_BUDGET_SEC", "6")
+    calls = []
+    real_select = audio_context.select_speech
+    monkeypatch.setattr(audio_context, "select_speech", lambda *a, **k: calls.append(1) or real_select(*a, **k))
+
+    bundle = run_audio_ensemble(
+        str(path), enable_flags={"audio_aasist": False, "audio_forensics": True, "audio_prosody": True}
+    )
+
+    results = {r["engine"]: r for r in bundle["engine_results_raw"]}
+    prosody = {s["name"]: s["value"] for s in results["audio_prosody"]["signals"]}
+    assert prosody["vad_selected_s"] == pytest.approx(6.0, abs=0.05)
+    assert prosody["vad_compute_ratio"] == pytest.approx(0.3, abs=0.01)
+    assert prosody["duration_s"] == pytest.approx(6.0, abs=0.05)
+    forensics = {s["name"]: s["value"] for s in results["audio_forensics"]["signals"] if isinstance(s, dict)}
+    assert forensics["vad_selected_s"] == prosody["vad_selected_s"]
+    assert forensics["vad_compute_ratio"] == prosody["vad_compute_ratio"]
+    assert len(calls) == 1
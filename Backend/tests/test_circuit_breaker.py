@@ -0,0 +1,116 @@
+import pytest
+
+from Backend.engines import circuit_breaker, provider_http
+from Backend.engines.circuit_breaker import CircuitBreaker
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _breaker(clock, **kwargs):
+    params = {"window": 10, "min_calls": 4, "failure_rate": 0.5, "slow_p95_ms": 0, "open_sec": 30, "clock": clock}
+    params.update(kwargs)
+    return CircuitBreaker("test", **params)
+
+
+def test_breaker_opens_on_failure_rate_and_recovers_after_probe():
+    clock = _Clock()
+    breaker = _breaker(clock)
+    for ok in (True, False, False, True):
+        assert breaker.allow()
+        breaker.record(ok, 10)
+    assert breaker.state() == "open"
+    assert breaker.allow() is False
+
+    clock.now += 31
+    assert breaker.state() == "half_open"
+    assert breaker.allow() is True
+    # Nur eine Probe gleichzeitig.
+    assert breaker.allow() is False
+    breaker.record(True, 10)
+    assert breaker.state() == "closed"
+    assert breaker.snapshot()["trips"] == 1
+
+
+def test_breaker_reopens_when_probe_fails():
+    clock = _Clock()
+    breaker = _breaker(clock)
+    for _ in range(4):
+        breaker.record(False, 10)
+    clock.now += 31
+    assert breaker.allow()
+    breaker.record(False, 10)
+    assert breaker.state() == "open"
+    assert breaker.snapshot()["last_trip_reason"] == "probe_failed"
+
+
+def test_breaker_opens_on_slow_p95():
+    clock = _Clock()
+    breaker = _breaker(clock, slow_p95_ms=1000)
+    for _ in range(3):
+        breaker.record(True, 50)
+    breaker.record(True, 5000)
+    assert breaker.state() == "open"
+    assert breaker.snapshot()["last_trip_reason"] == "slow_p95"
+
+
+@pytest.fixture
+def failing_server(monkeypatch, http_stub):
+    state = {"hits": 0}
+
+    def fail(_request):
+        state["hits"] += 1
+        return 500, {"status": "failure"}
+
+    monkeypatch.setenv("AIREALCHECK_BREAKER_MIN_CALLS", "3")
+    monkeypatch.setenv("AIREALCHECK_BREAKER_OPEN_SEC", "60")
+    url = http_stub({"POST": fail})
+    provider_http.reset_sessions()
+    circuit_breaker.reset_breakers()
+    yield url, state
+    provider_http.reset_sessions()
+    circuit_breaker.reset_breakers()
+
+
+def test_open_breaker_short_circuits_provider_requests(failing_server):
+    url, state = failing_server
+    for _ in range(3):
+        resp = provider_http.provider_request("sightengine", "POST", f"{url}/check", max_retries=0)
+        assert resp.status_code == 500
+    assert circuit_breaker.provider_circuit_open("sightengine")
+
+    with pytest.raises(provider_http.CircuitOpenError):
+        provider_http.provider_request("sightengine", "POST", f"{url}/check", max_retries=0)
+    assert state["hits"] == 3
+    snapshot = circuit_breaker.breaker_states()["sightengine"]
+    assert snapshot["state"] == "open"
+    assert snapshot["rejected"] == 1
+
+
+def test_ensemble_marks_open_provider_not_available(failing_server, monkeypatch, tmp_path):
+    import Backend.ensemble as ensemble
+
+    url, _state = failing_server
+    for _ in range(3):
+        provider_http.provider_request("sightengine", "POST", f"{url}/check", max_retries=0)
+
+    monkeypatch.setenv("AIREALCHECK_USE_PAID_APIS", "true")
+    monkeypatch.setenv("AIREALCHECK_ENABLE_SIGHTENGINE_IMAGE", "true")
+
+    def _unexpected(_path):
+        raise AssertionError("sightengine must not be called while the circuit is open")
+
+    monkeypatch.setattr(ensemble, "run_sightengine", _unexpected)
+    image_path = tmp_path / "image.jpg"
+    image_path.write_bytes(b"test")
+
+    result = ensemble.run_ensemble(str(image_path))
+
+    entry = next(item for item in result["engine_results_raw"] if item.get("engine") == "sightengine")
+    assert entry["status"] == "not_available"
+    assert entry["notes"] == "not_available:circuit_open"
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+
+import Backend.engines.clip_detector_engine as clip_engine
+from Backend.engines.clip_ann import (
+    ann_index_path,
+    build_ivf_index,
+    exact_topk,
+    load_ivf_index,
+    measure_recall,
+    save_ivf_index,
+)
+
+
+def _clustered(rows, dim=32, clusters=40, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    data = centers[rng.integers(0, clusters, rows)] + rng.normal(scale=0.3, size=(rows, dim))
+    data = data.astype(np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+
+def test_ivf_recall_against_exact_topk(tmp_path):
+    data = _clustered(5000)
+    index = build_ivf_index(data, n_lists=64)
+    path = str(tmp_path / "emb.ivf.npz")
+    save_ivf_index(path, index, data.shape[0], data.shape[1])
+    ivf, order = load_ivf_index(path, data.shape[0], data.shape[1])
+    ordered = data[order]
+
+    report = measure_recall(ordered, ivf, ordered[:100], k=5, nprobe=8)
+    assert report["recall_at_k"] >= 0.9
+
+    # Alle Listen abfragen entspricht exakter Suche.
+    idx, sims = ivf.search(ordered, ordered[7], 5, nprobe=64)
+    exact_idx, exact_sims = exact_topk(ordered, ordered[7], 5)
+    assert idx.tolist() == exact_idx.tolist()
+    np.testing.assert_allclose(sims, exact_sims)
+
+
+def test_mismatched_index_is_ignored(tmp_path):
+    data = _clustered(200)
+    path = str(tmp_path / "emb.ivf.npz")
+    save_ivf_index(path, build_ivf_index(data, n_lists=8), data.shape[0], data.shape[1])
+
+    ivf, reason = load_ivf_index(path, data.shape[0] + 1, data.shape[1])
+    assert ivf is None and reason == "ann_index_mismatch"
+
+
+class _FakeClip:
+    def encode_image(self, batch):
+        return batch.flatten(1)[:, :32] + 0.1
+
+
+def _preprocess(img):
+    arr = np.asarray(img.resize((4, 4)), dtype=np.float32) / 255.0
+    return torch.from_numpy(arr).permute(2, 0, 1).contiguous()
+
+
+def _run(monkeypatch, tmp_path, mode):
+    monkeypatch.setenv("AIREALCHECK_CLIP_ANN", mode)
+    monkeypatch.setattr(clip_engine, "_EMBED_CACHE", {"entries": {}})
+    return clip_engine.run_clip_detector(str(tmp_path / "image.png"))
+
+
+def test_detector_uses_ivf_index_next_to_embeddings(monkeypatch, tmp_path):
+    data = _clustered(3000)
+    emb_path = tmp_path / "real.npz"
+    np.savez(emb_path, embeddings=data)
+    save_ivf_index(ann_index_path(str(emb_path)), build_ivf_index(data, n_lists=16), data.shape[0], data.shape[1])
+    rng = np.random.default_rng(3)
+    Image.fromarray(rng.integers(0, 255, (32, 32, 3), dtype=np.uint8)).save(tmp_path / "image.png")
+    monkeypatch.setenv("AIREALCHECK_ENABLE_CLIP_DETECTOR", "true")
+    monkeypatch.setenv("AIREALCHECK_CLIP_EMBEDDINGS_PATH", str(emb_path))
+    monkeypatch.setenv("AIREALCHECK_CLIP_EMBED_CACHE", "false")
+    monkeypatch.setenv("AIREALCHECK_CLIP_ANN_NPROBE", "16")
+    meta = {"backend": "fake", "model": "fake-32", "pretrained": "none", "device": "cpu"}
+    monkeypatch.setattr(clip_engine, "_load_model_cached", lambda: (_FakeClip(), _preprocess, meta))
+
+    exact = _run(monkeypatch, tmp_path, "exact")
+    ann = _run(monkeypatch, tmp_path, "auto")
+
+    assert "search=ivf" not in exact["notes"]
+    assert "search=ivf;nprobe=16" in ann["notes"]
+    assert ann["ai_likelihood"] == pytest.approx(exact["ai_likelihood"], abs=1e-4)
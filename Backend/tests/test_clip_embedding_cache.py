@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+
+import Backend.engines.clip_detector_engine as clip_engine
+
+
+class _FakeClip:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def encode_image(self, batch):
+        self.batch_sizes.append(int(batch.shape[0]))
+        return batch.flatten(1)[:, :8] + 0.1
+
+
+def _preprocess(img):
+    arr = np.asarray(img.resize((4, 4)), dtype=np.float32) / 255.0
+    return torch.from_numpy(arr).permute(2, 0, 1).contiguous()
+
+
+@pytest.fixture
+def clip_setup(monkeypatch, tmp_path):
+    rng = np.random.default_rng(0)
+    np.save(tmp_path / "real.npy", rng.random((20, 8)).astype(np.float32))
+    monkeypatch.setenv("AIREALCHECK_ENABLE_CLIP_DETECTOR", "true")
+    monkeypatch.setenv("AIREALCHECK_CLIP_EMBEDDINGS_PATH", str(tmp_path / "real.npy"))
+    monkeypatch.setenv("AIREALCHECK_CLIP_EMBED_CACHE_PATH", str(tmp_path / "clip_cache.sqlite3"))
+    monkeypatch.setattr(clip_engine, "_EMBED_CACHE", {"entries": {}})
+    monkeypatch.setattr(clip_engine, "_EMBED_STORE", {"path": None, "store": None})
+    model = _FakeClip()
+    meta = {"backend": "fake", "model": "fake-8", "pretrained": "none", "device": "cpu"}
+    monkeypatch.setattr(clip_engine, "_load_model_cached", lambda: (model, _preprocess, meta))
+    image_path = tmp_path / "image.png"
+    Image.fromarray(rng.integers(0, 255, (32, 32, 3), dtype=np.uint8)).save(image_path)
+    return model, str(image_path)
+
+
+def test_variants_are_encoded_in_one_batch(clip_setup):
+    model, image_path = clip_setup
+
+    result = clip_engine.run_clip_detector(image_path)
+
+    assert result["status"] == "ok"
+    assert len(model.batch_sizes) == 1
+    assert model.batch_sizes[0] == int(result["notes"].split("variants=")[1].split(";")[0])
+
+
+def test_embedding_cache_skips_encoder_on_reanalysis(clip_setup):
+    model, image_path = clip_setup
+
+    first = clip_engine.run_clip_detector(image_path)
+    second = clip_engine.run_clip_detector(image_path)
+
+    assert len(model.batch_sizes) == 1
+    assert "embed_cache=hit" in second["notes"]
+    assert second["ai_likelihood"] == pytest.approx(first["ai_likelihood"])
+
+
+def test_batched_encoding_matches_single_encoding():
+    model = _FakeClip()
+    rng = np.random.default_rng(1)
+    images = [Image.fromarray(rng.integers(0, 255, (16, 16, 3), dtype=np.uint8)) for _ in range(3)]
+
+    batched = clip_engine._encode_images(model, _preprocess, images, "cpu")
+    single = np.stack([clip_engine._encode_image(model, _preprocess, img, "cpu") for img in images])
+
+    assert batched.shape == (3, 8)
+    np.testing.assert_allclose(batched, single, rtol=1e-6)
+
+
+def test_partial_variant_set_is_not_cached(clip_setup, monkeypatch):
+    model, image_path = clip_setup
+    encode_image = clip_engine._encode_image
+    encode_images = clip_engine._encode_images
+    calls = []
+
+    def _flaky_batch(model_, preprocess, images, device):
+        if len(images) > 1:
+            raise RuntimeError("batch_failed")
+        return encode_images(model_, preprocess, images, device)
+
+    def _flaky_single(model_, preprocess, img, device):
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("variant_failed")
+        return encode_image(model_, preprocess, img, device)
+
+    monkeypatch.setenv("AIREALCHECK_IMAGE_LOCAL_PREPROCESS", "true")
+    monkeypatch.setattr(clip_engine, "_encode_images", _flaky_batch)
+    monkeypatch.setattr(clip_engine, "_encode_image", _flaky_single)
+    partial = clip_engine.run_clip_detector(image_path)
+    assert partial["status"] == "ok" and "variants=2;" in partial["notes"]
+
+    monkeypatch.setattr(clip_engine, "_encode_image", encode_image)
+    full = clip_engine.run_clip_detector(image_path)
+    assert "embed_cache=hit" not in full["notes"]
+    assert "embed_cache=hit" in clip_engine.run_clip_detector(image_path)["notes"]
@@ -0,0 +1,114 @@
+import os
+
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+
+import Backend.engines.clip_detector_engine as clip_engine
+from Backend.engines.clip_ann import ann_index_path, build_ivf_index, order_fingerprint, save_ivf_index
+from Backend.engines.clip_quantized import open_quantized_embeddings, quantized_path, write_quantized_embeddings
+
+
+def _normalized(rows, dim=32, seed=0):
+    data = np.random.default_rng(seed).normal(size=(rows, dim)).astype(np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("dtype,tol", [("float16", 2e-3), ("int8", 2e-2)])
+def test_quantized_dot_matches_float32(tmp_path, dtype, tol):
+    data = _normalized(500)
+    path = str(tmp_path / "emb.cemb")
+    write_quantized_embeddings(path, data, dtype=dtype, model="fake")
+
+    emb = open_quantized_embeddings(path)
+    assert isinstance(emb.rows, np.memmap)
+    assert emb.shape == data.shape and emb.header["model"] == "fake"
+    queries = data[:4].T
+    np.testing.assert_allclose(emb.dot(queries), data.dot(queries), atol=tol)
+    np.testing.assert_allclose(emb.dot(data[0]), data.dot(data[0]), atol=tol)
+    np.testing.assert_allclose(emb[np.array([3, 9])], data[[3, 9]], atol=tol)
+
+
+def test_rejects_foreign_file(tmp_path):
+    path = tmp_path / "emb.cemb"
+    path.write_bytes(b"not an embedding file")
+    with pytest.raises(ValueError):
+        open_quantized_embeddings(str(path))
+
+
+class _FakeClip:
+    def encode_image(self, batch):
+        return batch.flatten(1)[:, :32] + 0.1
+
+
+def _preprocess(img):
+    arr = np.asarray(img.resize((4, 4)), dtype=np.float32) / 255.0
+    return torch.from_numpy(arr).permute(2, 0, 1).contiguous()
+
+
+def _run(monkeypatch, tmp_path, quantized):
+    monkeypatch.setenv("AIREALCHECK_CLIP_QUANTIZED", quantized)
+    monkeypatch.setattr(clip_engine, "_EMBED_CACHE", {"entries": {}})
+    return clip_engine.run_clip_detector(str(tmp_path / "image.png"))
+
+
+def test_detector_prefers_quantized_file_with_ann_order(monkeypatch, tmp_path):
+    data = _normalized(2000)
+    emb_path = tmp_path / "real.npz"
+    np.savez(emb_path, embeddings=data)
+    index = build_ivf_index(data, n_lists=16)
+    save_ivf_index(ann_index_path(str(emb_path)), index, data.shape[0], data.shape[1])
+    cemb = quantized_path(str(emb_path))
+    write_quantized_embeddings(
+        cemb, data[index["order"]], dtype="int8", ann_ordered=True, ann_fingerprint=order_fingerprint(index["order"])
+    )
+    os.utime(emb_path, (1, 1))
+    Image.fromarray(np.random.default_rng(3).integers(0, 255, (32, 32, 3), dtype=np.uint8)).save(
+        tmp_path / "image.png"
+    )
+    monkeypatch.setenv("AIREALCHECK_ENABLE_CLIP_DETECTOR", "true")
+    monkeypatch.setenv("AIREALCHECK_CLIP_EMBEDDINGS_PATH", str(emb_path))
+    monkeypatch.setenv("AIREALCHECK_CLIP_EMBED_CACHE", "false")
+    monkeypatch.setenv("AIREALCHECK_CLIP_ANN", "auto")
+    monkeypatch.setenv("AIREALCHECK_CLIP_ANN_NPROBE", "16")
+    meta = {"backend": "fake", "model": "fake-32", "pretrained": "none", "device": "cpu"}
+    monkeypatch.setattr(clip_engine, "_load_model_cached", lambda: (_FakeClip(), _preprocess, meta))
+
+    plain = _run(monkeypatch, tmp_path, "off")
+    quantized = _run(monkeypatch, tmp_path, "auto")
+
+    assert "store=" not in plain["notes"]
+    assert "store=int8" in quantized["notes"] and "search=ivf" in quantized["notes"]
+    assert quantized["ai_likelihood"] == pytest.approx(plain["ai_likelihood"], abs=1.0)
+
+    # Index neu gebaut (wie --ann-only), .cemb noch in alter Reihenfolge: exakte Suche statt falscher Treffer.
+    rebuilt = build_ivf_index(data, n_lists=9, seed=1)
+    save_ivf_index(ann_index_path(str(emb_path)), rebuilt, data.shape[0], data.shape[1])
+    stale = _run(monkeypatch, tmp_path, "auto")
+    assert "search=ivf" not in stale["notes"] and "ann_order_mismatch" in stale["notes"]
+    assert stale["ai_likelihood"] == pytest.approx(plain["ai_likelihood"], abs=1.0)
+
+    # Quelle neuer als die .cemb-Datei: wieder float32.
+    os.utime(cemb, (1, 1))
+    os.utime(emb_path, None)
+    assert "store=" not in _run(monkeypatch, tmp_path, "auto")["notes"]
+
+
+def test_refresh_quantized_follows_new_index(tmp_path):
+    from scripts.build_clip_embeddings import refresh_quantized
+
+    data = _normalized(300)
+    emb_path = str(tmp_path / "real.npz")
+    np.savez(emb_path, embeddings=data)
+    assert refresh_quantized(emb_path) is None
+
+    write_quantized_embeddings(quantized_path(emb_path), data, dtype="float16")
+    index = build_ivf_index(data, n_lists=4)
+    save_ivf_index(ann_index_path(emb_path), index, data.shape[0], data.shape[1])
+    refresh_quantized(emb_path)
+
+    emb = open_quantized_embeddings(quantized_path(emb_path))
+    assert emb.dtype == "float16" and emb.ann_ordered
+    assert emb.ann_fingerprint == order_fingerprint(index["order"])
+    np.testing.assert_allclose(emb[np.arange(5)], data[index["order"][:5]], atol=2e-3)
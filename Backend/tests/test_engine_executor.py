@@ -0,0 +1,188 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from Backend.engines import provider_http
+from Backend.engines.engine_executor import inflight_counts, run_engine_calls, shutdown_pools
+
+
+def _sleepy(engine_name, delay):
+    def _run(_path):
+        time.sleep(delay)
+        return {"engine": engine_name, "available": True, "ai_likelihood": 50.0, "confidence": 0.5}
+
+    return _run
+
+
+def test_sequential_is_default(monkeypatch):
+    monkeypatch.delenv("AIREALCHECK_ENGINE_EXECUTOR", raising=False)
+    order = []
+
+    def _track(name):
+        def _run(_path):
+            order.append(name)
+            return {"engine": name, "available": True}
+
+        return _run
+
+    results = run_engine_calls([("a", _track("a"), ("x",)), ("b", _track("b"), ("x",))])
+    assert order == ["a", "b"]
+    assert results["a"]["status"] == "ok"
+
+
+def test_parallel_runs_engines_concurrently(monkeypatch):
+    monkeypatch.setenv("AIREALCHECK_ENGINE_EXECUTOR", "parallel")
+    calls = [(f"engine_{i}", _sleepy(f"engine_{i}", 0.3), ("x",)) for i in range(4)]
+
+    start = time.time()
+    results = run_engine_calls(calls)
+    elapsed = time.time() - start
+
+    assert elapsed < 1.0
+    assert all(results[f"engine_{i}"]["available"] for i in range(4))
+
+
+def test_parallel_late_engine_yields_timeout(monkeypatch):
+    monkeypatch.setenv("AIREALCHECK_ENGINE_EXECUTOR", "parallel")
+    monkeypatch.setenv("AIREALCHECK_ENGINE_TIMEOUTS_JSON", '{"slow": 0.1}')
+
+    def _boom(_path):
+        raise RuntimeError("boom")
+
+    start = time.time()
+    results = run_engine_calls(
+        [("slow", _sleepy("slow", 1.0), ("x",)), ("fast", _sleepy("fast", 0.0), ("x",)), ("boom", _boom, ("x",))]
+    )
+    elapsed = time.time() - start
+
+    assert elapsed < 0.8
+    assert results["slow"]["status"] == "timeout"
+    assert results["slow"]["available"] is False
+    assert results["fast"]["status"] == "ok"
+    assert results["boom"]["status"] == "error"
+
+
+def test_deadline_starts_when_the_worker_picks_up_the_call(monkeypatch):
+    monkeypatch.setenv("AIREALCHECK_ENGINE_EXECUTOR", "parallel")
+    monkeypatch.setenv("AIREALCHECK_ENGINE_THREAD_WORKERS", "1")
+    monkeypatch.setenv("AIREALCHECK_ENGINE_TIMEOUTS_JSON", '{"first": 0.5, "second": 0.5}')
+    shutdown_pools()
+    try:
+        results = run_engine_calls(
+            [("first", _sleepy("first", 0.3), ("x",)), ("second", _sleepy("second", 0.3), ("x",))]
+        )
+    finally:
+        shutdown_pools(wait=True)
+
+    # "second" wartet 0.3 s in der Queue; das zaehlt nicht gegen sein Timeout.
+    assert results["first"]["status"] == "ok"
+    assert results["second"]["status"] == "ok"
+
+
+def test_hung_engine_is_capped_instead_of_queued(monkeypatch):
+    monkeypatch.setenv("AIREALCHECK_ENGINE_EXECUTOR", "parallel")
+    monkeypatch.setenv("AIREALCHECK_ENGINE_MAX_INFLIGHT", "1")
+    monkeypatch.setenv("AIREALCHECK_ENGINE_TIMEOUTS_JSON", '{"hung": 0.1}')
+    release = threading.Event()
+
+    def _hung(_path):
+        release.wait(5.0)
+        return {"engine": "hung", "available": True}
+
+    try:
+        first = run_engine_calls([("hung", _hung, ("x",))])["hung"]
+        start = time.time()
+        second = run_engine_calls([("hung", _hung, ("x",))])["hung"]
+        assert time.time() - start < 0.1
+    finally:
+        release.set()
+
+    assert first["status"] == "timeout"
+    assert second["status"] == "not_available" and second["signals"] == ["engine_saturated"]
+    for _ in range(50):
+        if "hung" not in inflight_counts():
+            break
+        time.sleep(0.02)
+    assert "hung" not in inflight_counts()
+
+
+def test_engine_deadline_bounds_provider_requests(monkeypatch):
+    def _no_request(*_args, **_kwargs):
+        raise AssertionError("request after deadline")
+
+    monkeypatch.setattr(provider_http.get_session("sightengine"), "request", _no_request)
+    provider_http.bind_call_deadline(time.time() - 1.0)
+    try:
+        with pytest.raises(requests.Timeout):
+            provider_http.provider_request("sightengine", "GET", "http://127.0.0.1:9/check")
+    finally:
+        provider_http.bind_call_deadline(None)
+        provider_http.reset_sessions()
+
+
+def test_engine_cache_reruns_only_changed_engines(monkeypatch, tmp_path):
+    from Backend.engines import engine_cache
+
+    monkeypatch.delenv("AIREALCHECK_ENGINE_EXECUTOR", raising=False)
+    monkeypatch.setenv("AIREALCHECK_ENGINE_CACHE", "true")
+    monkeypatch.setenv("AIREALCHECK_ENGINE_CACHE_PATH", str(tmp_path / "engines.sqlite3"))
+    engine_cache.reset_engine_cache()
+    media = tmp_path / "img.png"
+    media.write_bytes(b"pixels")
+    runs = []
+
+    def _engine(name, available=True):
+        def _run(_path):
+            runs.append(name)
+            return {"engine": name, "available": available, "ai_likelihood": 40.0}
+
+        return _run
+
+    calls = [
+        ("xception", _engine("xception"), (str(media),)),
+        ("clip_detector", _engine("clip_detector"), (str(media),)),
+        ("hive", _engine("hive", available=False), (str(media),)),
+    ]
+    try:
+        run_engine_calls(calls)
+        monkeypatch.setenv("AIREALCHECK_CLIP_TOPK", "9")
+        results = run_engine_calls(calls)
+    finally:
+        engine_cache.reset_engine_cache()
+
+    # xception aus dem Cache; clip hat neue Konfiguration, hive war nicht verfuegbar.
+    assert runs == ["xception", "clip_detector", "hive", "clip_detector", "hive"]
+    assert results["xception"]["engine_cache"] == "hit"
+    assert "engine_cache" not in results["clip_detector"]
+
+
+def test_engine_fingerprint_covers_dependent_modules(monkeypatch, tmp_path):
+    from Backend.engines import engine_cache
+
+    dep = tmp_path / "fake_scoring_dep.py"
+    dep.write_text("SCALE = 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setitem(engine_cache.ENGINE_CODE_MODULES, "xception", ("fake_scoring_dep",))
+
+    def _run(_path):
+        return {}
+
+    base = engine_cache.engine_fingerprint("xception", _run)
+    assert engine_cache.engine_fingerprint("xception", _run) == base
+    dep.write_text("SCALE = 2  # neue Gewichtung\n")
+    assert engine_cache.engine_fingerprint("xception", _run) != base
+
+    signature = engine_cache._code_signature(_run, "clip_detector")
+    modules = [entry[0] for entry in signature[3:]]
+    assert "Backend.engines.clip_ann" in modules and "Backend.engines.clip_quantized" in modules
+    assert all(entry[1] and not str(entry[1][0]).startswith("unavailable") for entry in signature[3:])
+
+    for engine_name in ("reality_defender", "reality_defender_video", "reality_defender_audio"):
+        modules = engine_cache.ENGINE_CODE_MODULES[engine_name]
+        assert "Backend.engines.reality_defender_poller" in modules
+        assert "Backend.engines.provider_http" in modules
+    for engine_name, modules in engine_cache.ENGINE_CODE_MODULES.items():
+        for module_name in modules:
+            assert engine_cache._module_sources(module_name), (engine_name, module_name)
@@ -0,0 +1,131 @@
+from Backend.engines.engine_utils import make_engine_result
+import Backend.ensemble as ensemble
+
+
+PAID = ("sightengine", "reality_defender")
+
+
+def _result(engine_name, ai, confidence=0.9, signals=None):
+    return make_engine_result(
+        engine=engine_name,
+        status="ok",
+        notes="ok",
+        available=True,
+        ai_likelihood=ai,
+        confidence=confidence,
+        signals=signals or [],
+        timing_ms=1,
+    )
+
+
+def _unavailable(engine_name):
+    return make_engine_result(
+        engine=engine_name,
+        status="not_available",
+        notes="not_available",
+        available=False,
+        ai_likelihood=None,
+        confidence=0.0,
+        signals=[],
+        timing_ms=0,
+    )
+
+
+def _setup(monkeypatch, local_ai, c2pa_signals=None):
+    monkeypatch.setenv("AIREALCHECK_IMAGE_CASCADE", "true")
+    monkeypatch.setenv("AIREALCHECK_USE_PAID_APIS", "true")
+    monkeypatch.setenv("AIREALCHECK_ENABLE_HIVE_IMAGE", "false")
+    monkeypatch.setenv("AIREALCHECK_ENABLE_SIGHTENGINE_IMAGE", "true")
+    monkeypatch.setenv("AIREALCHECK_ENABLE_REALITY_DEFENDER_IMAGE", "true")
+    monkeypatch.setenv("AIREALCHECK_ENABLE_SENSITY_IMAGE", "false")
+    monkeypatch.setenv("AIREALCHECK_IMAGE_FALLBACK", "false")
+    monkeypatch.setenv("AIREALCHECK_CASCADE_MIN_CONFIDENCE", "low")
+    calls = []
+
+    def _engine(name, ai):
+        def _run(_path):
+            calls.append(name)
+            return _result(name, ai) if ai is not None else _unavailable(name)
+
+        return _run
+
+    monkeypatch.setattr(ensemble, "run_xception", _engine("xception", local_ai))
+    monkeypatch.setattr(ensemble, "run_clip_detector", _engine("clip_detector", local_ai))
+    monkeypatch.setattr(ensemble, "analyze_watermark", _engine("watermark", None))
+
+    def _c2pa(_path):
+        calls.append("c2pa")
+        return make_engine_result(
+            engine="c2pa",
+            status="ok",
+            notes="ok",
+            available=True,
+            ai_likelihood=None,
+            confidence=0.0,
+            signals=c2pa_signals or [],
+            timing_ms=0,
+        )
+
+    monkeypatch.setattr(ensemble, "analyze_c2pa", _c2pa)
+    monkeypatch.setattr(ensemble, "run_sightengine", _engine("sightengine", 0.5))
+    monkeypatch.setattr(ensemble, "analyze_reality_defender", _engine("reality_defender", 0.5))
+    return calls
+
+
+def _engine_entry(result, name):
+    for item in result.get("engine_results_raw") or []:
+        if isinstance(item, dict) and item.get("engine") == name:
+            return item
+    return None
+
+
+def test_cascade_skips_paid_engines_when_local_is_decisive(monkeypatch, tmp_path):
+    calls = _setup(monkeypatch, local_ai=0.02)
+    image_path = tmp_path / "image.jpg"
+    image_path.write_bytes(b"test")
+
+    result = ensemble.run_ensemble(str(image_path))
+
+    assert not set(PAID) & set(calls)
+    assert result["cascade"]["decision"] == "skip_paid"
+    assert result["cascade"]["reason"] == "local_decisive"
+    for name in PAID:
+        entry = _engine_entry(result, name)
+        assert entry["status"] == "skipped"
+        assert entry["notes"] == "skipped:cascade:local_decisive"
+
+
+def test_cascade_runs_paid_engines_in_uncertain_band(monkeypatch, tmp_path):
+    calls = _setup(monkeypatch, local_ai=0.5)
+    image_path = tmp_path / "image.jpg"
+    image_path.write_bytes(b"test")
+
+    result = ensemble.run_ensemble(str(image_path))
+
+    assert set(PAID) <= set(calls)
+    assert result["cascade"]["decision"] == "run_paid"
+    assert result["cascade"]["reason"] == "uncertain_band"
+    assert _engine_entry(result, "sightengine")["status"] == "ok"
+
+
+def test_cascade_trusts_verified_provenance(monkeypatch, tmp_path):
+    calls = _setup(monkeypatch, local_ai=0.5, c2pa_signals=["signature_verified"])
+    image_path = tmp_path / "image.jpg"
+    image_path.write_bytes(b"test")
+
+    result = ensemble.run_ensemble(str(image_path))
+
+    assert not set(PAID) & set(calls)
+    assert result["cascade"]["reason"] == "c2pa_verified"
+
+
+def test_cascade_disabled_by_default(monkeypatch, tmp_path):
+    calls = _setup(monkeypatch, local_ai=0.02)
+    monkeypatch.delenv("AIREALCHECK_IMAGE_CASCADE")
+    image_path = tmp_path / "image.jpg"
+    image_path.write_bytes(b"test")
+
+    result = ensemble.run_ensemble(str(image_path))
+
+    assert set(PAID) <= set(calls)
+    assert "cascade" not in result
@@ -0,0 +1,58 @@
+from PIL import Image, PngImagePlugin
+
+import Backend.image_context as image_context
+from Backend.engines.watermark_engine import analyze_watermark
+from Backend.image_forensics import analyze_image
+
+
+def _write_png(path, text=None):
+    img = Image.effect_noise((96, 80), 30).convert("RGB")
+    meta = None
+    if text:
+        meta = PngImagePlugin.PngInfo()
+        meta.add_text("parameters", text)
+    img.save(path, format="PNG", pnginfo=meta)
+
+
+def test_scope_shares_one_decode(monkeypatch, tmp_path):
+    path = tmp_path / "img.png"
+    _write_png(path)
+    original = path.read_bytes()
+    opens = []
+    real_open = image_context.Image.open
+
+    def _counting_open(fp, *args, **kwargs):
+        if str(fp) == str(path) or (hasattr(fp, "getvalue") and fp.getvalue() == original):
+            opens.append(fp)
+        return real_open(fp, *args, **kwargs)
+
+    monkeypatch.setattr(image_context.Image, "open", _counting_open)
+
+    with image_context.image_context_scope(str(path)) as ctx:
+        assert image_context.get_image_context(str(path)) is ctx
+        analyze_image(str(path))
+        analyze_watermark(str(path))
+        assert ctx.gray.shape == (80, 96)
+        assert ctx.rgb_array.shape == (80, 96, 3)
+
+    assert len(opens) == 1
+    assert image_context.get_image_context(str(path)) is not ctx
+
+
+def test_watermark_reads_png_text_from_context(tmp_path):
+    path = tmp_path / "gen.png"
+    _write_png(path, text="Steps: 20, Model: sdxl")
+
+    result = analyze_watermark(str(path))
+
+    assert result["available"] is True
+    assert any("sdxl" in s for s in result["signals"])
+
+
+def test_watermark_not_available_for_non_image(tmp_path):
+    path = tmp_path / "broken.png"
+    path.write_bytes(b"not an image")
+
+    result = analyze_watermark(str(path))
+
+    assert result["available"] is False
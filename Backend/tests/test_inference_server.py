@@ -0,0 +1,202 @@
+import os
+import stat
+import threading
+import time
+
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+
+import Backend.engines.clip_detector_engine as clip_engine
+import Backend.inference_server as inference_server
+from Backend.inference_server import InferenceServer, InferenceUnavailable, MicroBatcher
+from Backend.vendor.aasist import predict_spoof_prob, predict_spoof_probs
+
+
+def _submit_all(batcher, items, max_wait_ms=None):
+    pending = [batcher.submit(item, max_wait_ms) for item in items]
+    for p in pending:
+        assert p.event.wait(5)
+    return pending
+
+
+def test_batcher_collects_items_within_wait_window():
+    sizes = []
+
+    def batch_fn(items):
+        sizes.append(len(items))
+        return [float(x.sum()) * 2 for x in items]
+
+    batcher = MicroBatcher("fake", batch_fn, max_batch=8, max_wait_ms=1000).start()
+    try:
+        pending = _submit_all(batcher, [np.full(3, i, dtype=np.float32) for i in range(8)])
+    finally:
+        batcher.stop()
+
+    assert sizes == [8]
+    assert [p.result for p in pending] == [i * 6.0 for i in range(8)]
+    stats = batcher.stats()
+    assert stats["batches"] == 1 and stats["max_queue_depth"] == 8 and stats["queue_depth"] == 0
+
+
+def test_batcher_groups_by_shape_and_honours_request_wait():
+    sizes = []
+    batcher = MicroBatcher("fake", lambda items: sizes.append(len(items)) or [0] * len(items), max_batch=8, max_wait_ms=5000)
+    batcher.start()
+    try:
+        items = [np.zeros(2), np.zeros(3), np.zeros(2)]
+        # Kurze Wartefrist pro Request: kein Warten auf einen vollen Batch.
+        _submit_all(batcher, items, max_wait_ms=0)
+    finally:
+        batcher.stop()
+    assert sorted(sizes) == [1, 2]
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    monkeypatch.setenv("AIREALCHECK_INFER_SERVER", "true")
+    monkeypatch.setenv("AIREALCHECK_INFER_SOCKET", str(tmp_path / "infer.sock"))
+    monkeypatch.setenv("AIREALCHECK_INFER_MODELS", "sum,broken,clip")
+    monkeypatch.setattr(inference_server, "_CLIENT_LOCAL", threading.local())
+    started = []
+
+    def _start(handlers, **kwargs):
+        srv = InferenceServer(handlers, **kwargs)
+        srv.serve_in_thread()
+        started.append(srv)
+        return srv
+
+    yield _start
+    for srv in started:
+        srv.close()
+
+
+def _sum_handler(sizes):
+    def batch_fn(items):
+        sizes.append(len(items))
+        return [float(np.asarray(x).sum()) for x in items]
+
+    return {"batch": batch_fn, "info": lambda: {"available": True, "meta": {"model": "sum"}}}
+
+
+def test_server_batches_requests_from_concurrent_clients(server):
+    sizes = []
+    srv = server({"sum": _sum_handler(sizes)}, max_batch=16, max_wait_ms=200)
+    results = {}
+
+    def worker(i):
+        results[i] = inference_server.infer("sum", [np.full(4, i, dtype=np.float32)])[0]
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(12)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+
+    assert results == {i: 4.0 * i for i in range(12)}
+    assert max(sizes) > 1
+    stats = inference_server.inference_stats()["server"]["models"]["sum"]
+    assert stats["items"] == 12 and stats["batches"] == len(sizes) and stats["max_queue_depth"] > 1
+    assert srv.stats()["connections"] >= 1
+
+    model, meta = inference_server.remote_model("sum")
+    assert meta == {"model": "sum"} and model.infer([np.ones(2)]) == [2.0]
+
+
+def test_per_model_max_wait_and_cached_model_info(server, monkeypatch):
+    infos = []
+    handler = _sum_handler([])
+    handler["info"] = lambda: infos.append(1) or {"available": True, "meta": {"model": "sum"}}
+    server({"sum": handler}, max_wait_ms=5000)
+
+    # Ohne eigenes Fenster wuerde das einzelne Item die 5 s des Servers abwarten.
+    monkeypatch.setenv("AIREALCHECK_INFER_MAX_WAIT_MS_SUM", "0")
+    assert inference_server.infer_max_wait_ms("sum") == 0.0
+    assert inference_server.infer_max_wait_ms("clip") is None
+    started = time.monotonic()
+    model, _meta = inference_server.remote_model("sum")
+    assert model.infer([np.ones(3)]) == [3.0]
+    assert time.monotonic() - started < 2
+
+    for _ in range(3):
+        assert inference_server.remote_model("sum")[1] == {"model": "sum"}
+    assert len(infos) == 1
+
+    monkeypatch.setenv("AIREALCHECK_INFER_INFO_TTL_SEC", "0")
+    inference_server.remote_model("sum")
+    assert len(infos) == 2
+
+
+def test_server_errors_and_missing_server_raise_unavailable(server, monkeypatch, tmp_path):
+    def broken(items):
+        raise ValueError("boom")
+
+    server({"broken": {"batch": broken, "info": lambda: {"available": False, "meta": {"reason": "x"}}}}, max_wait_ms=0)
+    with pytest.raises(InferenceUnavailable, match="boom"):
+        inference_server.infer("broken", [np.zeros(1)])
+    assert inference_server.remote_model("broken") == (None, {"reason": "x"})
+
+    monkeypatch.setenv("AIREALCHECK_INFER_SOCKET", str(tmp_path / "missing.sock"))
+    monkeypatch.setattr(inference_server, "_CLIENT_LOCAL", threading.local())
+    assert inference_server.remote_model("broken") is None
+    with pytest.raises(InferenceUnavailable):
+        inference_server.infer("broken", [np.zeros(1)])
+
+
+def test_authkey_is_required_in_production(server, monkeypatch):
+    srv = server({"sum": _sum_handler([])}, max_wait_ms=0)
+    assert stat.S_IMODE(os.stat(srv.address).st_mode) == 0o600
+
+    monkeypatch.delenv("AIREALCHECK_INFER_AUTHKEY", raising=False)
+    monkeypatch.setenv("AIREALCHECK_ENV", "production")
+    monkeypatch.setattr(inference_server, "_CLIENT_LOCAL", threading.local())
+    with pytest.raises(RuntimeError, match="AIREALCHECK_INFER_AUTHKEY"):
+        InferenceServer({"sum": _sum_handler([])})
+    with pytest.raises(InferenceUnavailable, match="authkey_missing"):
+        inference_server.infer("sum", [np.ones(2)])
+
+    monkeypatch.setenv("AIREALCHECK_INFER_AUTHKEY", "s3cret")
+    assert inference_server._authkey() == b"s3cret"
+
+
+def test_aasist_batched_prediction_matches_single():
+    torch.manual_seed(0)
+    model = torch.nn.Sequential(torch.nn.Linear(800, 2))
+    waves = [np.random.default_rng(i).normal(size=800).astype(np.float32) for i in range(3)]
+    batched = predict_spoof_probs(model, waves)
+    single = [predict_spoof_prob(model, w) for w in waves]
+    assert batched == pytest.approx(single, abs=1e-5)
+
+
+class _FakeClip:
+    def encode_image(self, batch):
+        return batch.flatten(1)[:, :32] + 0.1
+
+
+def _preprocess(img):
+    arr = np.asarray(img.resize((4, 4)), dtype=np.float32) / 255.0
+    return torch.from_numpy(arr).permute(2, 0, 1).contiguous()
+
+
+def test_clip_detector_uses_inference_server(server, monkeypatch, tmp_path):
+    data = np.random.default_rng(0).normal(size=(200, 32)).astype(np.float32)
+    np.savez(tmp_path / "real.npz", embeddings=data)
+    Image.fromarray(np.random.default_rng(3).integers(0, 255, (32, 32, 3), dtype=np.uint8)).save(
+        tmp_path / "image.png"
+    )
+    monkeypatch.setenv("AIREALCHECK_ENABLE_CLIP_DETECTOR", "true")
+    monkeypatch.setenv("AIREALCHECK_CLIP_EMBEDDINGS_PATH", str(tmp_path / "real.npz"))
+    monkeypatch.setenv("AIREALCHECK_CLIP_EMBED_CACHE", "false")
+    meta = {"backend": "fake", "model": "fake-32", "pretrained": "none", "device": "cpu"}
+    monkeypatch.setattr(clip_engine, "_load_model_cached", lambda: (_FakeClip(), _preprocess, meta))
+    monkeypatch.setattr(clip_engine, "_EMBED_CACHE", {"entries": {}})
+    srv = server(inference_server.default_handlers(["clip"]), max_wait_ms=5)
+
+    remote = clip_engine.run_clip_detector(str(tmp_path / "image.png"))
+    monkeypatch.setenv("AIREALCHECK_INFER_SERVER", "false")
+    local = clip_engine.run_clip_detector(str(tmp_path / "image.png"))
+
+    assert remote["status"] == "ok" and local["status"] == "ok"
+    assert remote["ai_likelihood"] == pytest.approx(local["ai_likelihood"], abs=1e-4)
+    assert srv.stats()["models"]["clip"]["items"] >= 1
@@ -0,0 +1,53 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+from Backend.ingest import IngestError, ingest_stream, sniff_media_kind
+
+
+def test_ingest_hashes_and_sniffs_in_one_pass(tmp_path, monkeypatch):
+    monkeypatch.setenv("AIREALCHECK_UPLOAD_CHUNK_BYTES", str(64 * 1024))
+    data = b"\x89PNG\r\n\x1a\n" + os.urandom(300 * 1024)
+
+    first = ingest_stream(io.BytesIO(data), "../photo.PNG", str(tmp_path), head_bytes=1024)
+    second = ingest_stream(io.BytesIO(data), "photo.PNG", str(tmp_path), head_bytes=1024)
+
+    assert first["sha256"] == hashlib.sha256(data).hexdigest()
+    assert first["size"] == len(data)
+    assert first["head"] == data[:1024]
+    assert first["sniffed"] == "image"
+    assert first["filename"] == "photo.PNG"
+    # Gleicher Dateiname, trotzdem getrennte Dateien.
+    assert first["path"] != second["path"]
+    assert first["path"].endswith(".png")
+    with open(first["path"], "rb") as f:
+        assert f.read() == data
+
+
+def test_ingest_enforces_size_limit_and_cleans_up(tmp_path):
+    with pytest.raises(IngestError) as exc:
+        ingest_stream(io.BytesIO(b"x" * 5000), "big.mp4", str(tmp_path), max_bytes=4096)
+    assert exc.value.status == 413
+    assert os.listdir(tmp_path) == []
+
+    with pytest.raises(IngestError) as exc:
+        ingest_stream(io.BytesIO(b""), "empty.jpg", str(tmp_path))
+    assert exc.value.code == "file_empty"
+
+
+@pytest.mark.parametrize(
+    "header,expected",
+    [
+        (b"\xff\xd8\xff\xe0", "image"),
+        (b"\x00\x00\x00\x18ftypmp42", "video"),
+        (b"\x00\x00\x00\x18ftypM4A ", "audio"),
+        (b"\x1a\x45\xdf\xa3", "video"),
+        (b"RIFF\x00\x00\x00\x00WAVEfmt ", "audio"),
+        (b"ID3\x04", "audio"),
+        (b"hello", None),
+    ],
+)
+def test_sniff_media_kind(header, expected):
+    assert sniff_media_kind(header) == expected
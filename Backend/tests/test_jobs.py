@@ -0,0 +1,229 @@
+import hashlib
+import io
+import json
+import threading
+import time
+
+from flask import jsonify
+
+from Backend.engines.job_progress import job_binding, report_job_progress
+import Backend.jobs as jobs_module
+from Backend.jobs import JobQueue, JobWorkerPool
+from Backend.public_result import apply_late_engine_result
+
+
+def test_claim_hands_each_job_to_one_worker(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    ids = [queue.submit("upload", {"n": idx}) for idx in range(20)]
+    claimed = []
+    lock = threading.Lock()
+
+    def _worker(name):
+        while True:
+            job = queue.claim(name)
+            if job is None:
+                return
+            with lock:
+                claimed.append(job["id"])
+
+    threads = [threading.Thread(target=_worker, args=(f"w{idx}",)) for idx in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert sorted(claimed) == sorted(ids)
+    assert queue.counts() == {"running": 20}
+
+
+def test_stale_running_jobs_are_requeued_then_failed(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.submit("upload", {})
+    queue.claim("w0")
+
+    assert queue.requeue_stale(stale_sec=-1, max_attempts=2) == (1, 0)
+    assert queue.get(job_id)["status"] == "queued"
+    queue.claim("w1")
+    assert queue.requeue_stale(stale_sec=-1, max_attempts=2) == (0, 1)
+    job = queue.get(job_id)
+    assert job["status"] == "failed"
+    assert job["error"] == "worker_lost"
+
+
+def test_requeued_job_is_finished_only_by_its_current_worker(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.submit("upload", {})
+    queue.claim("w0")
+    queue.requeue_stale(stale_sec=-1, max_attempts=3)
+    queue.claim("w1")
+
+    assert queue.finish(job_id, "done", result={"by": "w0"}, http_status=200, worker="w0") is False
+    assert queue.finish(job_id, "done", result={"by": "w1"}, http_status=200, worker="w1") is True
+    assert queue.finish(job_id, "failed", result={"by": "w1"}, http_status=500, worker="w1") is False
+    job = queue.get(job_id)
+    assert job["status"] == "done" and job["result"] == {"by": "w1"}
+
+
+def test_heartbeat_keeps_live_jobs_and_loop_requeues_dead_ones(tmp_path, monkeypatch):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    dead_id = queue.submit("upload", {"n": 1})
+    queue.claim("dead-worker")
+    live_id = queue.submit("upload", {"n": 2})
+    queue.claim("live-worker")
+    time.sleep(0.3)
+
+    assert queue.heartbeat({live_id: "live-worker", dead_id: "someone-else"}) == 1
+    assert queue.requeue_stale(stale_sec=0.2) == (1, 0)
+    assert queue.get(live_id)["status"] == "running"
+
+    # live-worker stirbt jetzt; ohne Neustart reiht die Worker-Schleife den Job periodisch neu ein.
+    monkeypatch.setattr(jobs_module, "job_stale_sec", lambda: 0.2)
+    pool = JobWorkerPool(queue, lambda job: ({"n": job["payload"]["n"]}, 200), workers=1, poll_sec=0.05, requeue_sec=0.1)
+    pool.start()
+    try:
+        for _ in range(100):
+            if queue.get(live_id)["status"] == "done":
+                break
+            time.sleep(0.05)
+    finally:
+        pool.stop()
+    assert queue.get(dead_id)["result"] == {"n": 1}
+    assert queue.get(live_id)["result"] == {"n": 2}
+    assert queue.get(live_id)["attempts"] == 2
+
+
+def test_worker_pool_reports_progress_and_result(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    stages = []
+
+    def _handler(job):
+        report_job_progress("analyzing", media_type_detected="image")
+        stages.append(queue.get(job["id"])["stage"])
+        return {"ok": True, "n": job["payload"]["n"]}, 200
+
+    job_id = queue.submit("upload", {"n": 7})
+    pool = JobWorkerPool(queue, _handler, workers=1, poll_sec=0.05)
+    pool.run_job(queue.claim("w0"))
+
+    job = queue.get(job_id)
+    assert stages == ["analyzing"]
+    assert job["status"] == "done"
+    assert job["result"] == {"ok": True, "n": 7}
+    assert job["progress"] == {"media_type_detected": "image"}
+
+
+def test_late_engine_results_are_merged_into_the_job_result(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    patchers = []
+
+    def _late(job_result, _engine_name, engine_result):
+        return apply_late_engine_result(job_result, engine_result)
+
+    def _handler(job):
+        patcher = job_binding()[1]
+        patchers.append(patcher)
+        # Vor dem Abschluss gesammelt und beim finish() eingearbeitet.
+        patcher("reality_defender", {"engine": "reality_defender", "status": "ok", "available": True})
+        engines = [{"engine": "reality_defender", "status": "processing"}, {"engine": "hive", "status": "processing"}]
+        return {"ok": True, "details": {"engines": engines}}, 200
+
+    job_id = queue.submit("upload", {})
+    JobWorkerPool(queue, _handler, workers=1, late_result=_late).run_job(queue.claim("w0"))
+
+    job = queue.get(job_id)
+    assert [e["status"] for e in job["result"]["details"]["engines"]] == ["ok", "processing"]
+
+    patchers[0]("hive", {"engine": "hive", "status": "ok", "available": True})
+    patched = queue.get(job_id)
+    assert [e["status"] for e in patched["result"]["details"]["engines"]] == ["ok", "ok"]
+    assert patched["updated_at"] >= job["updated_at"]
+
+
+def test_async_guest_upload_returns_job_and_streams_result(tmp_path, monkeypatch):
+    import Backend.server as server
+
+    monkeypatch.setenv("AIREALCHECK_ENABLE_GUEST_ANALYZE", "true")
+    monkeypatch.setenv("AIREALCHECK_JOB_SSE_POLL_SEC", "0.05")
+    monkeypatch.setattr(server, "_JOB_QUEUE", JobQueue(str(tmp_path / "jobs.sqlite3")))
+    monkeypatch.setattr(server, "JOB_SPOOL_DIR", str(tmp_path / "spool"))
+    monkeypatch.setattr(server, "_JOB_POOL", {"pool": None, "pid": None})
+    seen = {}
+
+    def _fake_run(file_path, filename, media_type, user_ctx, charge_credit, analysis_id=None, created_at=None, ingest=None):
+        with open(file_path, "rb") as f:
+            seen["bytes"] = f.read()
+        seen["analysis_id"] = analysis_id
+        seen["sha256"] = ingest["sha256"]
+        return jsonify({"ok": True, "analysis_id": analysis_id, "usage": {"credit_spent": True}})
+
+    monkeypatch.setattr(server, "_run_analysis_path", _fake_run)
+
+    try:
+        with server.app.test_client() as client:
+            res = client.post(
+                "/analyze/guest?async=1",
+                data={"file": (io.BytesIO(b"image-bytes"), "upload.png"), "type": "image"},
+                content_type="multipart/form-data",
+            )
+            assert res.status_code == 202
+            created = res.get_json()
+            stream = client.get(created["events_url"]).get_data(as_text=True)
+            status = client.get(created["status_url"]).get_json()
+    finally:
+        server._JOB_POOL["pool"].stop()
+
+    events = [block for block in stream.split("\n\n") if block.startswith("event: ")]
+    assert events[-1].startswith("event: result")
+    final = json.loads(events[-1].split("data: ", 1)[1])
+    assert final["status"] == "done"
+    assert final["result"]["usage"] == {"credit_spent": False, "source": "guest", "credits_left": None}
+    assert seen == {
+        "bytes": b"image-bytes",
+        "analysis_id": created["analysis_id"],
+        "sha256": hashlib.sha256(b"image-bytes").hexdigest(),
+    }
+    assert status["job"]["status"] == "done"
+    assert not (tmp_path / "spool" / created["job_id"]).exists()
+
+
+def test_job_access_uses_scoped_events_token_and_ban_check(tmp_path, monkeypatch):
+    import types
+
+    import Backend.server as server
+    from Backend.middleware import _error, create_access_token, create_job_events_token
+
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(server, "_JOB_QUEUE", queue)
+    banned = set()
+
+    def _load_active_user(user_id):
+        if user_id in banned:
+            return None, _error("user_banned", 403)
+        return types.SimpleNamespace(id=user_id), None
+
+    monkeypatch.setattr(server, "load_active_user", _load_active_user)
+    job_id = queue.submit("upload", {}, user_id=5)
+    other_id = queue.submit("upload", {}, user_id=5)
+    access = create_access_token(types.SimpleNamespace(id=5, role="user"))
+
+    with server.app.test_client() as client:
+        assert client.get(f"/jobs/{job_id}").status_code == 401
+        res = client.get(f"/jobs/{job_id}", headers={"Authorization": f"Bearer {access}"})
+        events_url = res.get_json()["job"]["events_url"]
+        assert res.status_code == 200 and "?token=" in events_url
+        # Access-Token in der URL und Tokens anderer Jobs reichen fuer den Stream nicht.
+        assert client.get(f"/jobs/{job_id}/events?access_token={access}").status_code == 401
+        assert client.get(f"/jobs/{job_id}/events?token={access}").status_code == 401
+        wrong_job = create_job_events_token(5, other_id)
+        assert client.get(f"/jobs/{job_id}/events?token={wrong_job}").status_code == 401
+        # Der Job-Token gilt nicht als Access-Token fuer andere Endpunkte.
+        scoped = events_url.split("token=", 1)[1]
+        assert client.get(f"/jobs/{job_id}", headers={"Authorization": f"Bearer {scoped}"}).status_code == 401
+
+        queue.finish(job_id, "done", result={"ok": True}, http_status=200)
+        stream = client.get(events_url).get_data(as_text=True)
+        assert stream.startswith("event: result")
+
+        banned.add(5)
+        assert client.get(events_url).status_code == 403
+        assert client.get(f"/jobs/{job_id}", headers={"Authorization": f"Bearer {access}"}).status_code == 403
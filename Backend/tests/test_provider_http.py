@@ -0,0 +1,92 @@
+import socket
+
+import pytest
+
+from Backend.engines import circuit_breaker, provider_http
+
+
+@pytest.fixture
+def stub_server(http_stub):
+    state = {"statuses": [], "peers": set(), "bodies": []}
+
+    def reply(request):
+        state["bodies"].append(request.body)
+        state["peers"].add(request.client_address[1])
+        status = state["statuses"].pop(0) if state["statuses"] else 200
+        return None if status == "drop" else (status, {"status": "success"})
+
+    url = http_stub({"GET": reply, "POST": reply})
+    provider_http.reset_sessions()
+    provider_http.reset_provider_metrics()
+    circuit_breaker.reset_breakers()
+    yield url, state
+    provider_http.reset_sessions()
+
+
+def test_connections_are_reused_across_calls(stub_server):
+    url, state = stub_server
+    for _ in range(5):
+        resp = provider_http.provider_request("sightengine", "GET", f"{url}/check")
+        assert resp.status_code == 200
+
+    assert len(state["peers"]) == 1
+    metrics = provider_http.provider_metrics()["sightengine"]
+    assert metrics["requests"] == 5
+    assert metrics["errors"] == 0
+    assert metrics["latency_ms_p50"] is not None
+
+
+def test_retry_rewinds_upload_and_records_metrics(stub_server, tmp_path, monkeypatch):
+    url, state = stub_server
+    monkeypatch.setenv("AIREALCHECK_PROVIDER_RETRY_BACKOFF_SEC", "0.01")
+    state["statuses"] = [503, 200]
+    frame = tmp_path / "frame.jpg"
+    frame.write_bytes(b"frame-bytes")
+
+    with open(frame, "rb") as f:
+        resp = provider_http.provider_request("hive", "POST", f"{url}/task", files={"media": f})
+
+    assert resp.status_code == 200
+    assert all(b"frame-bytes" in body for body in state["bodies"])
+    metrics = provider_http.provider_metrics()["hive"]
+    assert metrics["requests"] == 2
+    assert metrics["retries"] == 1
+    assert metrics["status_counts"] == {"503": 1, "200": 1}
+
+
+def test_post_is_not_retried_on_server_error(stub_server):
+    url, state = stub_server
+    state["statuses"] = [500, 200]
+
+    resp = provider_http.provider_request("sensity", "POST", f"{url}/analyze", json={})
+
+    assert resp.status_code == 500
+    assert provider_http.provider_metrics()["sensity"]["errors"] == 1
+
+
+def test_post_retries_only_when_never_connected(stub_server, monkeypatch):
+    url, state = stub_server
+    monkeypatch.setenv("AIREALCHECK_PROVIDER_RETRY_BACKOFF_SEC", "0.01")
+    state["statuses"] = ["drop", 200]
+    with pytest.raises(provider_http.requests.ConnectionError):
+        provider_http.provider_request("sensity", "POST", f"{url}/analyze", json={})
+    assert len(state["bodies"]) == 1
+
+    state["statuses"] = ["drop", 200]
+    assert provider_http.provider_request("sensity", "GET", f"{url}/result").status_code == 200
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        closed_port = sock.getsockname()[1]
+    with pytest.raises(provider_http.requests.ConnectionError):
+        provider_http.provider_request("hive", "POST", f"http://127.0.0.1:{closed_port}/task", json={}, max_retries=2)
+    assert provider_http.provider_metrics()["hive"]["retries"] == 2
+
+
+def test_provider_timeouts_prefer_provider_env(monkeypatch):
+    monkeypatch.setenv("AIREALCHECK_PAID_API_READ_TIMEOUT_SEC", "20")
+    monkeypatch.setenv("AIREALCHECK_HIVE_READ_TIMEOUT_SEC", "45")
+    monkeypatch.delenv("AIREALCHECK_PAID_API_CONNECT_TIMEOUT_SEC", raising=False)
+
+    assert provider_http.provider_timeouts("hive") == (8.0, 45.0)
+    assert provider_http.provider_timeouts("sightengine") == (8.0, 20.0)
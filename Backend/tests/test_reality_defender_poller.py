@@ -0,0 +1,191 @@
+import threading
+import time
+
+import pytest
+
+from Backend.engines import circuit_breaker, provider_http
+from Backend.engines import reality_defender_engine as rd_engine
+from Backend.engines.engine_cache import reset_engine_cache
+from Backend.engines.engine_executor import run_engine_calls
+from Backend.engines.job_progress import bind_job_progress
+from Backend.engines.reality_defender_poller import RealityDefenderPoller
+
+
+@pytest.fixture
+def fake_rd(monkeypatch, tmp_path, http_stub):
+    state = {"presign": 0, "uploads": 0, "polls": 0, "processing_polls": 2}
+
+    def presign(request):
+        state["presign"] += 1
+        request_id = f"req-{state['presign']}"
+        return 200, {"response": {"signedUrl": f"{request.base_url}/upload", "requestId": request_id}}
+
+    def upload(_request):
+        state["uploads"] += 1
+        return 200, {}
+
+    def poll(_request):
+        state["polls"] += 1
+        if state["polls"] <= state["processing_polls"]:
+            return 200, {"resultsSummary": {"status": "PROCESSING"}}
+        return 200, {"resultsSummary": {"status": "MANIPULATED", "metadata": {"finalScore": 87}}}
+
+    url = http_stub({"POST": presign, "PUT": upload, "GET": poll})
+    monkeypatch.setenv("AIREALCHECK_USE_PAID_APIS", "true")
+    monkeypatch.setenv("REALITY_DEFENDER_API_KEY", "test-key")
+    monkeypatch.setenv("REALITY_DEFENDER_BASE_URL", url)
+    monkeypatch.setenv("AIREALCHECK_RD_POLLER_PATH", str(tmp_path / "rd.sqlite3"))
+    monkeypatch.setenv("AIREALCHECK_RD_POLL_INITIAL_SEC", "0.05")
+    monkeypatch.setenv("AIREALCHECK_RD_POLL_MAX_SEC", "0.2")
+    rd_engine.reset_rd_poller()
+    provider_http.reset_sessions()
+    circuit_breaker.reset_breakers()
+    yield state
+    rd_engine.reset_rd_poller()
+    provider_http.reset_sessions()
+
+
+def _late_results():
+    """Job-Bindung, die nachgelieferte Engine-Ergebnisse sammelt."""
+    delivered = []
+    done = threading.Event()
+
+    def _patch(engine_name, result):
+        delivered.append((engine_name, result))
+        done.set()
+
+    bind_job_progress(None, _patch)
+    return delivered, done
+
+
+def test_placeholder_returns_at_once_and_late_result_reaches_job_and_cache(fake_rd, tmp_path, monkeypatch):
+    image_path = tmp_path / "image.jpg"
+    image_path.write_bytes(b"rd-test-image")
+    monkeypatch.setenv("AIREALCHECK_ENGINE_CACHE", "true")
+    monkeypatch.setenv("AIREALCHECK_ENGINE_CACHE_PATH", str(tmp_path / "engine_cache.sqlite3"))
+    reset_engine_cache()
+    calls = [("reality_defender", rd_engine.analyze_reality_defender, (str(image_path),))]
+    delivered, done = _late_results()
+    try:
+        first = run_engine_calls(calls)["reality_defender"]
+        assert first["status"] == "processing" and "pending_resumable" in first["signals"]
+        assert fake_rd["polls"] == 0
+        assert done.wait(5.0)
+    finally:
+        bind_job_progress(None)
+
+    engine_name, late = delivered[0]
+    assert engine_name == "reality_defender"
+    assert late["status"] == "ok" and late["ai_likelihood"] == pytest.approx(0.87)
+    assert fake_rd["presign"] == 1 and fake_rd["uploads"] == 1 and fake_rd["polls"] == 3
+
+    again = run_engine_calls(calls)["reality_defender"]
+    assert again["engine_cache"] == "hit" and again["ai_likelihood"] == pytest.approx(0.87)
+    assert fake_rd["presign"] == 1
+    reset_engine_cache()
+
+
+def test_result_finished_without_listener_is_handed_over_once(fake_rd, tmp_path):
+    image_path = tmp_path / "image.jpg"
+    image_path.write_bytes(b"rd-late-image")
+
+    first = rd_engine.analyze_reality_defender(str(image_path))
+    assert first["status"] == "processing"
+
+    poller = rd_engine.get_rd_poller()
+    for _ in range(100):
+        if poller.get("req-1")["status"] == "done":
+            break
+        time.sleep(0.05)
+    assert poller.get("req-1")["status"] == "done"
+
+    second = rd_engine.analyze_reality_defender(str(image_path))
+    assert second["ai_likelihood"] == pytest.approx(0.87)
+    assert "resumed" in second["signals"]
+    assert poller.get("req-1")["status"] == "delivered"
+
+    # Abgeholte Ergebnisse verwendet nur noch der Engine-Cache wieder, nicht der Poller.
+    third = rd_engine.analyze_reality_defender(str(image_path))
+    assert third["status"] == "processing"
+    assert fake_rd["presign"] == 2
+
+
+def test_pending_requests_resume_after_restart(fake_rd, tmp_path):
+    image_path = tmp_path / "image.jpg"
+    image_path.write_bytes(b"rd-resume-image")
+    digest = rd_engine.content_hash(str(image_path))
+    path = str(tmp_path / "rd.sqlite3")
+
+    # Worker A meldet den Request an und stirbt, bevor er pollt.
+    RealityDefenderPoller(path, rd_engine._fetch_result, initial_sec=0.05).submit("req-1", content_hash=digest)
+
+    delivered, done = _late_results()
+    try:
+        result = run_engine_calls([("reality_defender", rd_engine.analyze_reality_defender, (str(image_path),))])
+        assert result["reality_defender"]["status"] == "processing"
+        assert done.wait(5.0)
+    finally:
+        bind_job_progress(None)
+
+    late = delivered[0][1]
+    assert late["ai_likelihood"] == pytest.approx(0.87)
+    assert "resumed" in late["signals"]
+    assert fake_rd["presign"] == 0 and fake_rd["uploads"] == 0
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_poll_interval_backs_off_and_honors_retry_after(tmp_path):
+    clock = _Clock()
+    replies = [("pending", None, None), ("pending", None, None), ("retry", "error:429", 10.0), ("done", {"ok": 1}, None)]
+    poller = RealityDefenderPoller(
+        str(tmp_path / "rd.sqlite3"),
+        lambda _rid: replies.pop(0),
+        initial_sec=1.0,
+        max_sec=8.0,
+        factor=2.0,
+        clock=clock,
+    )
+    poller.submit("req-x")
+    delays = []
+    while poller.get("req-x")["status"] == "pending":
+        due = poller.get("req-x")["next_poll_at"]
+        delays.append(round(due - clock.now, 3))
+        clock.now = due
+        assert poller.poll_due() == 1
+
+    assert delays == [1.0, 2.0, 4.0, 10.0]
+    entry = poller.get("req-x")
+    assert entry["status"] == "done" and entry["result"] == {"ok": 1}
+    assert entry["polls"] == 4
+
+
+def test_prune_removes_delivered_failed_and_abandoned_requests(tmp_path):
+    clock = _Clock()
+    poller = RealityDefenderPoller(
+        str(tmp_path / "rd.sqlite3"),
+        lambda rid: ("failed", None, None) if rid == "bad" else ("done", {"rid": rid}, None),
+        initial_sec=1.0,
+        pending_ttl_sec=600.0,
+        delivered_grace_sec=60.0,
+        clock=clock,
+    )
+    for request_id in ("taken", "bad", "abandoned", "open"):
+        poller.submit(request_id, content_hash=request_id)
+    clock.now += 1.0
+    for request_id in ("taken", "bad", "abandoned"):
+        poller.poll_request(request_id)
+    assert poller.wait("taken", 0) == {"rid": "taken"}
+    assert poller.find("taken") is None and poller.find("abandoned")["status"] == "done"
+
+    clock.now += 61.0
+    assert poller.prune() == 2
+    clock.now += 600.0
+    assert poller.prune() == 1
+    assert [poller.get(rid) is not None for rid in ("taken", "bad", "abandoned", "open")] == [False, False, False, True]
@@ -0,0 +1,109 @@
+import multiprocessing
+import sqlite3
+import time
+
+from Backend.result_store import ResultStore, config_fingerprint
+
+
+def _writer(path, worker, count):
+    store = ResultStore(path)
+    for idx in range(count):
+        store.put(f"{worker}-{idx}", {"worker": worker, "idx": idx}, config_version="v1")
+
+
+def test_hit_miss_and_stale_version(tmp_path):
+    store = ResultStore(str(tmp_path / "cache.sqlite3"))
+    assert store.get("abc", config_version="v1") is None
+
+    store.put("abc", {"ai_likelihood": 0.7}, config_version="v1")
+    assert store.get("abc", config_version="v1") == {"ai_likelihood": 0.7}
+    # Neue Engine-/Gewichts-Konfiguration: alter Eintrag ist veraltet und wird entfernt.
+    assert store.get("abc", config_version="v2") is None
+    assert store.get("abc", config_version="v1") is None
+
+    stats = store.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 3
+    assert stats["stale_evictions"] == 1
+    assert stats["entries"] == 0
+
+
+def test_ttl_and_lru_eviction(tmp_path, monkeypatch):
+    store = ResultStore(str(tmp_path / "cache.sqlite3"), max_entries=2, touch_sec=0)
+    store.put("a", {"v": 1}, config_version="v1")
+    store.put("b", {"v": 2}, config_version="v1")
+    assert store.get("a", config_version="v1") == {"v": 1}
+    store.put("c", {"v": 3}, config_version="v1")
+
+    # "b" wurde am laengsten nicht gelesen.
+    assert store.get("b", config_version="v1") is None
+    assert store.get("a", config_version="v1") == {"v": 1}
+    assert store.stats()["lru_evictions"] == 1
+
+    monkeypatch.setenv("AIREALCHECK_RESULT_CACHE_TTL_SEC", "1")
+    ttl_store = ResultStore(str(tmp_path / "ttl.sqlite3"))
+    ttl_store.put("x", {"v": 1}, config_version="v1")
+    import Backend.result_store as result_store
+
+    real_time = result_store.time.time
+    monkeypatch.setattr(result_store.time, "time", lambda: real_time() + 5)
+    assert ttl_store.get("x", config_version="v1") is None
+    assert ttl_store.stats()["expired_evictions"] == 1
+
+
+def test_get_is_a_plain_read_and_counters_are_flushed_later(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    store = ResultStore(path)
+    store.put("abc", {"v": 1}, config_version="v1")
+
+    # Ein anderer Worker haelt die Schreibsperre: Treffer duerfen davon nicht blockiert werden.
+    writer = sqlite3.connect(path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+    started = time.time()
+    try:
+        assert store.get("abc", config_version="v1") == {"v": 1}
+        assert store.get("missing", config_version="v1") is None
+    finally:
+        writer.execute("ROLLBACK")
+        writer.close()
+    assert time.time() - started < 1.0
+
+    other = ResultStore(path)
+    assert store.stats()["hits"] == 1 and other.stats()["hits"] == 0
+    store.put("def", {"v": 2}, config_version="v1")
+    assert other.stats()["hits"] == 1 and other.stats()["misses"] == 1
+    store.get("def", config_version="v1")
+    store.close()
+    assert other.stats()["hits"] == 2
+
+
+def test_concurrent_writers_from_processes(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_writer, args=(path, worker, 25)) for worker in range(3)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join(60)
+        assert proc.exitcode == 0
+
+    store = ResultStore(path)
+    assert store.stats()["entries"] == 75
+    assert store.stats()["writes"] == 75
+    assert store.get("2-24", config_version="v1") == {"worker": 2, "idx": 24}
+
+
+def test_fingerprint_tracks_engine_env_and_weights(tmp_path):
+    weights = tmp_path / "xception.pth"
+    weights.write_bytes(b"a")
+    env = {
+        "AIREALCHECK_XCEPTION_WEIGHTS_PATH": str(weights),
+        "AIREALCHECK_ENGINE_TIMEOUT_SEC": "90",
+        "SIGHTENGINE_API_SECRET": "s",
+    }
+    base = config_fingerprint(environ=env)
+
+    assert config_fingerprint(environ={**env, "AIREALCHECK_ENGINE_TIMEOUT_SEC": "10"}) == base
+    assert config_fingerprint(environ={**env, "AIREALCHECK_USE_PAID_APIS": "true"}) != base
+    weights.write_bytes(b"bigger weights")
+    assert config_fingerprint(environ=env) != base
@@ -0,0 +1,94 @@
+import multiprocessing
+import threading
+import time
+
+from Backend.single_flight import SingleFlight
+
+
+def _slow_compute(counter_path):
+    with open(counter_path, "a", encoding="utf-8") as f:
+        f.write("x")
+    time.sleep(0.5)
+    return {"ai_likelihood": 0.42, "engines": ["a", "b"]}
+
+
+def _process_run(path, counter_path, queue):
+    flight = SingleFlight(path, poll_sec=0.05)
+    result, role = flight.run("image:abc:v1", lambda: _slow_compute(counter_path))
+    queue.put((role, result))
+
+
+def test_concurrent_threads_share_one_computation(tmp_path):
+    flight = SingleFlight(str(tmp_path / "flights.sqlite3"), poll_sec=0.05)
+    calls = []
+    outcomes = []
+    lock = threading.Lock()
+
+    def _compute():
+        calls.append(1)
+        time.sleep(0.3)
+        return {"score": 0.9}
+
+    def _worker():
+        result, role = flight.run("image:abc:v1", _compute)
+        with lock:
+            outcomes.append((role, result))
+
+    threads = [threading.Thread(target=_worker) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert len(calls) == 1
+    assert sorted(role for role, _ in outcomes) == ["follower"] * 4 + ["leader"]
+    assert all(result == {"score": 0.9} for _, result in outcomes)
+    # Jeder Wartende bekommt ein eigenes Objekt.
+    assert len({id(result) for _, result in outcomes}) == 5
+    assert flight._events == {}
+
+
+def test_followers_of_a_remote_leader_leave_no_events(tmp_path):
+    path = str(tmp_path / "flights.sqlite3")
+    remote = SingleFlight(path)
+    leader, token = remote._acquire("image:abc:v1")
+    assert leader
+
+    flight = SingleFlight(path, poll_sec=0.02, wait_sec=5)
+    threading.Timer(0.1, lambda: remote._publish("image:abc:v1", token, True, '{"score": 0.5}')).start()
+    result, role = flight.run("image:abc:v1", lambda: {"score": 0.0})
+
+    assert (role, result) == ("follower", {"score": 0.5})
+    assert flight._events == {} and remote._events == {}
+
+
+def test_processes_share_one_computation(tmp_path):
+    path = str(tmp_path / "flights.sqlite3")
+    counter = tmp_path / "count.txt"
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    procs = [ctx.Process(target=_process_run, args=(path, str(counter), queue)) for _ in range(3)]
+    for proc in procs:
+        proc.start()
+    results = [queue.get(timeout=60) for _ in procs]
+    for proc in procs:
+        proc.join(60)
+
+    assert counter.read_text() == "x"
+    assert sorted(role for role, _ in results) == ["follower", "follower", "leader"]
+    assert all(result["engines"] == ["a", "b"] for _, result in results)
+
+
+def test_expired_lease_of_dead_leader_falls_back(tmp_path):
+    path = str(tmp_path / "flights.sqlite3")
+    dead = SingleFlight(path, lease_sec=0.3)
+    leader, _token = dead._acquire("video:abc:v1")
+    assert leader
+
+    flight = SingleFlight(path, poll_sec=0.05, wait_sec=5)
+    start = time.time()
+    result, role = flight.run("video:abc:v1", lambda: {"ok": True})
+
+    assert role == "fallback"
+    assert result == {"ok": True}
+    assert time.time() - start < 2
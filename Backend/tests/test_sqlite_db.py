@@ -0,0 +1,28 @@
+from Backend.engines.reality_defender_poller import RealityDefenderPoller
+from Backend.jobs import JobQueue
+from Backend.result_store import ResultStore
+from Backend.single_flight import SingleFlight
+from Backend.sqlite_db import SqliteDatabase
+
+
+def test_sqlite_helper_is_shared_by_all_stores(tmp_path):
+    stores = [
+        ResultStore(str(tmp_path / "cache.sqlite3")),
+        JobQueue(str(tmp_path / "jobs.sqlite3")),
+        SingleFlight(str(tmp_path / "flight.sqlite3")),
+        RealityDefenderPoller(str(tmp_path / "rd.sqlite3"), lambda _rid: ("pending", None, None)),
+    ]
+    for store in stores:
+        assert isinstance(store._db, SqliteDatabase)
+        conn = store._connect()
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+
+    db = SqliteDatabase(str(tmp_path / "tx.sqlite3"), "CREATE TABLE IF NOT EXISTS t (v INTEGER);")
+    try:
+        with db.transaction() as conn:
+            conn.execute("INSERT INTO t (v) VALUES (1)")
+            raise RuntimeError("rollback")
+    except RuntimeError:
+        pass
+    assert db.connect().execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+
+import Backend.engines.sightengine_engine as sightengine_engine
+from Backend.engines.video_frame_detectors_engine import _safe_sightengine_result, _score_frames_concurrently
+
+
+class _StubState:
+    def __init__(self, delay):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.requests = 0
+
+
+def _make_route(state):
+    def check(_request):
+        with state.lock:
+            state.active += 1
+            state.requests += 1
+            state.max_active = max(state.max_active, state.active)
+        time.sleep(state.delay)
+        with state.lock:
+            state.active -= 1
+        return 200, {"status": "success", "type": {"ai_generated": 0.8}}
+
+    return check
+
+
+@pytest.fixture
+def stub_sightengine(monkeypatch, http_stub):
+    state = _StubState(delay=0.2)
+    url = http_stub({"POST": _make_route(state)})
+    monkeypatch.setattr(sightengine_engine, "_API_URL", f"{url}/1.0/check.json")
+    monkeypatch.setenv("AIREALCHECK_USE_PAID_APIS", "true")
+    monkeypatch.setenv("SIGHTENGINE_API_USER", "user")
+    monkeypatch.setenv("SIGHTENGINE_API_SECRET", "secret")
+    return state
+
+
+def _frame_infos(tmp_path, count):
+    infos = []
+    for idx in range(count):
+        path = tmp_path / f"frame-{idx:04d}.jpg"
+        path.write_bytes(b"\xff\xd8frame")
+        infos.append({"index": idx, "path": str(path)})
+    return infos
+
+
+def _job(infos, workers, budget_sec):
+    return {"sightengine": {"infos": infos, "fn": _safe_sightengine_result, "workers": workers, "budget_sec": budget_sec}}
+
+
+def test_frames_are_scored_concurrently_with_cap(stub_sightengine, tmp_path, monkeypatch):
+    monkeypatch.setenv("AIREALCHECK_VIDEO_EARLY_STOP", "false")
+    infos = _frame_infos(tmp_path, 8)
+
+    start = time.time()
+    outcomes = _score_frames_concurrently(_job(infos, 4, 10.0), trim_ratio=0.2)
+    elapsed = time.time() - start
+
+    states = [state for _, _, state in outcomes["sightengine"]]
+    assert states == ["done"] * 8
+    assert all(result["ai_likelihood"] == 0.8 for _, result, _ in outcomes["sightengine"])
+    assert 2 <= stub_sightengine.max_active <= 4
+    assert elapsed < 1.2
+
+
+def test_stable_aggregate_cancels_remaining_frames(stub_sightengine, tmp_path, monkeypatch):
+    monkeypatch.setenv("AIREALCHECK_VIDEO_EARLY_STOP", "true")
+    monkeypatch.setenv("AIREALCHECK_VIDEO_EARLY_STOP_MIN_FRAMES", "3")
+    stub_sightengine.delay = 0.05
+    infos = _frame_infos(tmp_path, 10)
+
+    outcomes = _score_frames_concurrently(_job(infos, 1, 10.0), trim_ratio=0.2)
+
+    states = [state for _, _, state in outcomes["sightengine"]]
+    # Der Worker kann den naechsten Frame schon begonnen haben, bevor abgebrochen wird.
+    assert states.count("done") in {3, 4}
+    assert states.count("early_stop") == 10 - states.count("done")
+    assert stub_sightengine.requests == states.count("done")
+
+
+def test_budget_marks_unfinished_frames(stub_sightengine, tmp_path, monkeypatch):
+    monkeypatch.setenv("AIREALCHECK_VIDEO_EARLY_STOP", "false")
+    stub_sightengine.delay = 0.6
+    infos = _frame_infos(tmp_path, 4)
+
+    start = time.time()
+    outcomes = _score_frames_concurrently(_job(infos, 2, 0.2), trim_ratio=0.2)
+    elapsed = time.time() - start
+
+    states = [state for _, _, state in outcomes["sightengine"]]
+    assert states.count("timeout") == 2
+    assert states.count("skipped") == 2
+    assert elapsed < 0.5
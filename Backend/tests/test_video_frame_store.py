@@ -0,0 +1,109 @@
+import os
+import stat
+import sys
+
+import cv2
+import numpy as np
+
+import Backend.engines.video_forensics_engine as video_forensics_engine
+from Backend.engines.video_forensics_engine import run_video_forensics
+from Backend.engines.video_temporal_engine import run_video_temporal
+from Backend.video_frame_store import VideoFrameStore, video_frame_store_scope
+
+
+def _fake_extract(calls, count=20):
+    def _extract(file_path, max_frames, scan_fps, timeout_sec, tmpdir=None):
+        calls.append((file_path, max_frames, scan_fps))
+        rng = np.random.default_rng(0)
+        items = []
+        for idx in range(min(count, max_frames)):
+            frame = rng.integers(0, 255, size=(64, 80, 3), dtype=np.uint8)
+            path = os.path.join(tmpdir, f"frame-{idx + 1:04d}.jpg")
+            cv2.imwrite(path, frame)
+            items.append({"frame": frame, "path": path})
+        return items, {"note": "ok", "method": "ffmpeg", "frames_extracted_count": len(items)}
+
+    return _extract
+
+
+def test_video_engines_share_one_decode(monkeypatch, tmp_path):
+    video = tmp_path / "clip.mp4"
+    video.write_bytes(b"\x00" * 64)
+    calls = []
+    monkeypatch.setenv("AIREALCHECK_VIDEO_FRAME_EXTRACT_MODE", "files")
+    monkeypatch.setattr(video_forensics_engine, "extract_video_frames", _fake_extract(calls))
+    monkeypatch.setattr(video_forensics_engine, "_ffmpeg_available", lambda *a, **k: True)
+    monkeypatch.setenv("AIREALCHECK_VIDEO_FACE_DETECT", "false")
+
+    with video_frame_store_scope(str(video)) as store:
+        forensics = run_video_forensics(str(video))
+        temporal = run_video_temporal(str(video))
+        frame_dir = os.path.dirname(store.paths[0])
+
+    assert len(calls) == 1
+    assert forensics["status"] == "ok"
+    assert "frames_extracted:20" in forensics["signals"]
+    assert temporal["engine"] == "video_temporal"
+    assert not os.path.exists(frame_dir)
+
+
+def test_sampling_policies_follow_store_rate(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setenv("AIREALCHECK_VIDEO_FRAME_EXTRACT_MODE", "files")
+    monkeypatch.setattr(video_forensics_engine, "extract_video_frames", _fake_extract(calls, count=30))
+    store = VideoFrameStore(str(tmp_path / "clip.mp4"), scan_fps=2.0, max_frames=300).decode()
+    try:
+        assert store.frames.shape == (30, 64, 80, 3)
+        assert store.resample_indices(2.0, 12) == list(range(12))
+        assert store.resample_indices(1.0, 5) == [0, 2, 4, 6, 8]
+        assert store.uniform_indices(3) == [0, 14, 29]
+        assert store.clip_indices(4, "center") == [13, 14, 15, 16]
+        assert store.clip_indices(40) == []
+        assert len(store.motion_indices(5)) == 5
+        assert np.shares_memory(store.item(3)["frame"], store.frames)
+    finally:
+        store.close()
+
+
+_FAKE_FFMPEG = """#!{python}
+import sys
+args = sys.argv[1:]
+vf = args[args.index("-vf") + 1]
+width, height = [int(v) for v in vf.split("scale=")[1].split(":")]
+count = int(args[args.index("-frames:v") + 1])
+for idx in range(min(count, 7)):
+    sys.stdout.buffer.write(bytes([idx * 30]) * (width * height * 3))
+"""
+
+
+def test_pipe_extraction_fills_array_without_frame_files(monkeypatch, tmp_path):
+    ffmpeg = tmp_path / "ffmpeg"
+    ffmpeg.write_text(_FAKE_FFMPEG.format(python=sys.executable))
+    ffmpeg.chmod(ffmpeg.stat().st_mode | stat.S_IEXEC)
+    video = tmp_path / "clip.mp4"
+    video.write_bytes(b"\x00" * 64)
+    monkeypatch.setattr(video_forensics_engine, "_ffmpeg_path", lambda: str(ffmpeg))
+    monkeypatch.setattr(
+        video_forensics_engine,
+        "_probe_video_geometry",
+        lambda *_a, **_k: {"width": 3840, "height": 2160, "duration": 2.0},
+    )
+
+    def _no_files(*_a, **_k):
+        raise AssertionError("file extraction must not run in pipe mode")
+
+    monkeypatch.setattr(video_forensics_engine, "extract_video_frames", _no_files)
+    monkeypatch.setenv("AIREALCHECK_VIDEO_STORE_MAX_WIDTH", "160")
+
+    store = VideoFrameStore(str(video), scan_fps=2.0, max_frames=50).decode()
+    try:
+        assert store.meta["method"] == "ffmpeg_pipe"
+        assert store.frames.shape == (7, 90, 160, 3)
+        assert int(store.frames[6, 0, 0, 0]) == 180
+        assert store.paths == [None] * 7
+        path = store.frame_path(2)
+        assert os.path.exists(path)
+        assert cv2.imread(path).shape == (90, 160, 3)
+    finally:
+        store.close()
+    assert not os.path.exists(path)
@@ -0,0 +1,132 @@
+import os
+import random
+
+import pytest
+from PIL import Image
+
+import Backend.deepfake_model as deepfake_model
+
+
+class _FakeDetector:
+    instances = 0
+
+    def __init__(self, weights_path=None):
+        _FakeDetector.instances += 1
+        self.weights_path = weights_path
+        self.model = None
+
+
+def _reset(monkeypatch):
+    _FakeDetector.instances = 0
+    monkeypatch.setattr(deepfake_model, "DeepFakeDetector", _FakeDetector)
+    deepfake_model.reset_detector()
+
+
+def test_detector_loaded_once_per_process(monkeypatch):
+    _reset(monkeypatch)
+    monkeypatch.delenv("AIREALCHECK_XCEPTION_WEIGHTS_PATH", raising=False)
+
+    first = deepfake_model.get_detector()
+    second = deepfake_model.get_detector()
+
+    assert first is second
+    assert _FakeDetector.instances == 1
+    status = deepfake_model.detector_status()
+    assert status["loaded"] is True
+    assert isinstance(status["load_ms"], int)
+
+
+def test_detector_reloads_when_weights_change(monkeypatch, tmp_path):
+    _reset(monkeypatch)
+    weights = tmp_path / "xception.pth"
+    weights.write_bytes(b"v1")
+    monkeypatch.setenv("AIREALCHECK_XCEPTION_WEIGHTS_PATH", str(weights))
+
+    first = deepfake_model.get_detector()
+    assert first.weights_path == str(weights)
+    assert deepfake_model.get_detector() is first
+
+    mtime = os.path.getmtime(weights)
+    weights.write_bytes(b"v2")
+    os.utime(weights, (mtime + 10, mtime + 10))
+
+    second = deepfake_model.get_detector()
+    assert second is not first
+    assert _FakeDetector.instances == 2
+
+
+def test_warm_detector_reports_failure(monkeypatch):
+    def _boom(weights_path=None):
+        raise RuntimeError("no weights")
+
+    monkeypatch.setattr(deepfake_model, "DeepFakeDetector", _boom)
+    deepfake_model.reset_detector()
+
+    assert deepfake_model.warm_detector() is False
+    assert "RuntimeError" in (deepfake_model.detector_status()["error"] or "")
+    deepfake_model.reset_detector()
+
+
+def _tiny_detector():
+    torch = pytest.importorskip("torch")
+    np = pytest.importorskip("numpy")
+
+    class _TinyNet(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            torch.manual_seed(0)
+            self.conv = torch.nn.Conv2d(3, 4, kernel_size=5, stride=4)
+            self.fc = torch.nn.Linear(4, 2)
+
+        def forward(self, x):
+            x = torch.relu(self.conv(x)).mean(dim=(2, 3))
+            return self.fc(x)
+
+    detector = object.__new__(deepfake_model.DeepFakeDetector)
+    detector.model = _TinyNet().eval()
+    detector.transform = lambda img: torch.from_numpy(
+        np.asarray(img, dtype=np.float32).transpose(2, 0, 1) / 127.5 - 1.0
+    )
+    return detector
+
+
+def test_predict_batch_matches_sequential(monkeypatch):
+    detector = _tiny_detector()
+    monkeypatch.setattr(deepfake_model, "torch", pytest.importorskip("torch"))
+    images = [
+        Image.new("RGB", (320, 260), (200, 30, 30)),
+        Image.effect_noise((300, 300), 40).convert("RGB"),
+        Image.new("RGB", (100, 120), (10, 220, 90)),
+    ]
+
+    rng = random.Random(42)
+    sequential = [detector.predict(img, rng=rng) for img in images]
+    rng = random.Random(42)
+    batched = detector.predict_batch(images, rng=rng, max_batch=4)
+
+    assert len(batched) == len(sequential)
+    for seq, bat in zip(sequential, batched):
+        assert bat["fake"] == seq["fake"]
+        assert bat["samples"] == seq["samples"]
+        assert abs(bat["variance"] - seq["variance"]) < 1e-5
+        assert abs(bat["range"] - seq["range"]) < 1e-5
+
+
+def test_mismatched_weights_fail_load_and_show_in_status(monkeypatch):
+    torch = pytest.importorskip("torch")
+    net = torch.nn.Linear(3, 2)
+    good = {f"module.{k}": v.clone() for k, v in net.state_dict().items()}
+    deepfake_model._load_checked_state(torch.nn.Linear(3, 2), good)
+
+    class _WrongCheckpoint:
+        def __init__(self, weights_path=None):
+            deepfake_model._load_checked_state(torch.nn.Linear(3, 2), {"head.weight": torch.zeros(2, 3)}, weights_path)
+
+    monkeypatch.setattr(deepfake_model, "DeepFakeDetector", _WrongCheckpoint)
+    deepfake_model.reset_detector()
+    with pytest.raises(RuntimeError, match="weights_mismatch"):
+        deepfake_model.get_detector()
+    status = deepfake_model.detector_status()
+    assert status["loaded"] is False
+    assert "weights_mismatch" in status["error"] and "missing=2" in status["error"]
+    deepfake_model.reset_detector()
@@ -0,0 +1,349 @@
+import contextlib
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+
+from Backend.audio_context import active_audio_context
+
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+
+def _env_float(names, default):
+    for name in names:
+        raw = os.getenv(name)
+        if raw is None or str(raw).strip() == "":
+            continue
+        try:
+            return float(raw)
+        except Exception:
+            continue
+    return default
+
+
+def store_scan_fps():
+    return max(0.0, _env_float(["AIREALCHECK_VIDEO_STORE_SCAN_FPS", "AIREALCHECK_VIDEO_SCAN_FPS"], 2.0))
+
+
+def store_max_frames():
+    return max(1, int(_env_float(["AIREALCHECK_VIDEO_STORE_MAX_FRAMES", "AIREALCHECK_VIDEO_MAX_SCAN_FRAMES"], 300)))
+
+
+def store_timeout_sec():
+    return max(1.0, _env_float(["AIREALCHECK_VIDEO_STORE_TIMEOUT_SEC", "AIREALCHECK_VIDEO_FRAME_TIMEOUT_SEC"], 25.0))
+
+
+def store_max_width():
+    """Obergrenze fuer die Frame-Breite im Pipe-Modus (0 = Originalbreite)."""
+    return max(0, int(_env_float(["AIREALCHECK_VIDEO_STORE_MAX_WIDTH"], 1920)))
+
+
+def extract_mode():
+    mode = (os.getenv("AIREALCHECK_VIDEO_FRAME_EXTRACT_MODE") or "pipe").strip().lower()
+    return "files" if mode in {"files", "file", "jpeg", "disk"} else "pipe"
+
+
+# Bei diesen Fehlern lohnt sich der Datei-Fallback nicht, er wuerde genauso scheitern.
+_HARD_EXTRACT_FAILURES = {"ffmpeg_not_installed", "file_missing", "file_size_0", "timeout"}
+
+
+def _log(message: str):
+    try:
+        print(f"[video_frame_store] {message}")
+    except Exception:
+        pass
+
+
+def uniform_positions(total, count):
+    if total <= 0 or count <= 0:
+        return []
+    if count == 1:
+        return [total // 2]
+    stride = (total - 1) / float(count - 1)
+    return sorted({int(round(i * stride)) for i in range(count)})
+
+
+def clip_window(total, count, strategy="center"):
+    """Zusammenhaengendes Fenster [start, start+count) oder None, wenn zu wenige Frames."""
+    if count <= 0 or total < count:
+        return None
+    if strategy == "start":
+        start = 0
+    elif strategy == "end":
+        start = max(0, total - count)
+    else:
+        start = max(0, (total - count) // 2)
+    return start, start + count
+
+
+def top_positions(scores, count):
+    if not scores or count <= 0:
+        return []
+    ranked = sorted(scores, key=lambda x: x[1], reverse=True)
+    return [pos for pos, _ in ranked[:count]]
+
+
+class VideoFrameStore:
+    """
+    Einmal pro Request dekodierte Frames eines Videos, die alle Video-Engines gemeinsam nutzen.
+    ffmpeg laeuft genau einmal mit der Store-Rate (AIREALCHECK_VIDEO_STORE_SCAN_FPS); die
+    Engines waehlen ihre Frames ueber resample_indices/uniform/scene/motion/clip aus.
+    frames ist ein (N, H, W, 3)-BGR-Array; gelieferte Frames sind Views und duerfen nicht
+    veraendert werden. Im Pipe-Modus (Default) landen keine Frames auf der Platte;
+    frame_path(idx) schreibt ein JPEG erst, wenn eine Engine wirklich eine Datei braucht.
+    """
+
+    def __init__(self, path: str, scan_fps=None, max_frames=None, timeout_sec=None):
+        self.path = path
+        self.scan_fps = float(scan_fps) if scan_fps is not None else store_scan_fps()
+        self.max_frames = int(max_frames) if max_frames is not None else store_max_frames()
+        self.timeout_sec = float(timeout_sec) if timeout_sec is not None else store_timeout_sec()
+        self.frames = None
+        self.paths = []
+        self.meta = {}
+        self._lock = threading.RLock()
+        self._decoded = False
+        self._tmpdir = None
+        self._small_gray = {}
+        self._hist = {}
+
+    def decode(self):
+        """Dekodiert das Video (nur beim ersten Aufruf) und liefert den Store zurueck."""
+        if self._decoded:
+            return self
+        with self._lock:
+            if self._decoded:
+                return self
+            # Lokaler Import: video_forensics_engine nutzt selbst den Store.
+            from Backend.engines.video_forensics_engine import (
+                extract_video_frame_array,
+                extract_video_frames,
+            )
+
+            # Offener Audio-Scope (Audio aus Video): Tonspur im selben ffmpeg-Lauf mitnehmen.
+            audio_context = active_audio_context(self.path)
+            audio_sink = None
+            if audio_context is not None and audio_context.wants_pcm():
+                audio_sink = audio_context.prime
+
+            frames, meta = None, {}
+            if extract_mode() == "pipe":
+                frames, meta = extract_video_frame_array(
+                    self.path,
+                    self.max_frames,
+                    self.scan_fps,
+                    self.timeout_sec,
+                    max_width=store_max_width(),
+                    audio_sink=audio_sink,
+                )
+            if frames is not None:
+                self.frames = frames
+                self.paths = [None] * len(frames)
+            elif (meta or {}).get("note") in _HARD_EXTRACT_FAILURES:
+                self._fill([])
+            else:
+                self._tmpdir = self._make_tmpdir()
+                items, meta = extract_video_frames(
+                    self.path,
+                    self.max_frames,
+                    self.scan_fps,
+                    self.timeout_sec,
+                    tmpdir=self._tmpdir,
+                )
+                self._fill(items)
+            self.meta = dict(meta or {})
+            self.meta["frames_extracted_count"] = int(self.meta.get("frames_extracted_count") or len(self))
+            self.meta["store_scan_fps"] = self.scan_fps
+            self._decoded = True
+            _log(
+                f"decoded frames={len(self)} fps={self.scan_fps:g} "
+                f"method={self.meta.get('method')} note={self.meta.get('note')} "
+                f"audio={str(bool(self.meta.get('audio_demuxed'))).lower()}"
+            )
+        return self
+
+    @staticmethod
+    def _make_tmpdir():
+        base_tmp = tempfile.gettempdir()
+        os.makedirs(base_tmp, exist_ok=True)
+        return tempfile.mkdtemp(prefix="airealcheck_frames_", dir=base_tmp)
+
+    def _fill(self, items):
+        items = [
+            item for item in (items or []) if isinstance(item, dict) and item.get("frame") is not None
+        ]
+        if not items:
+            self.frames = np.zeros((0, 0, 0, 3), dtype=np.uint8)
+            self.paths = []
+            return
+        first = items[0]["frame"]
+        height, width = first.shape[:2]
+        frames = np.empty((len(items), height, width, 3), dtype=np.uint8)
+        paths = []
+        for idx, item in enumerate(items):
+            frame = item.pop("frame")
+            if frame.shape[:2] != (height, width) and cv2 is not None:
+                frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+            frames[idx] = frame
+            paths.append(item.get("path"))
+        self.frames = frames
+        self.paths = paths
+
+    def __len__(self):
+        return 0 if self.frames is None else int(self.frames.shape[0])
+
+    def item(self, index):
+        return {"frame": self.frames[index], "path": self.paths[index], "index": int(index)}
+
+    def frame_path(self, index):
+        """Pfad eines JPEGs fuer Frame index; wird bei Bedarf einmalig geschrieben."""
+        path = self.paths[index]
+        if path and os.path.exists(path):
+            return path
+        with self._lock:
+            path = self.paths[index]
+            if path and os.path.exists(path):
+                return path
+            if self._tmpdir is None:
+                self._tmpdir = self._make_tmpdir()
+            path = os.path.join(self._tmpdir, f"frame-{int(index) + 1:04d}.jpg")
+            ok = cv2 is not None and cv2.imwrite(path, self.frames[index], [cv2.IMWRITE_JPEG_QUALITY, 95])
+            if not ok:
+                return None
+            self.paths[index] = path
+            return path
+
+    def items(self, indices=None):
+        if indices is None:
+            indices = range(len(self))
+        return [self.item(idx) for idx in indices if 0 <= idx < len(self)]
+
+    def resample_indices(self, fps=None, max_frames=None):
+        """Indizes, die einem eigenen ffmpeg-Lauf mit fps und -frames:v max_frames entsprechen."""
+        total = len(self)
+        limit = total if max_frames is None else max(0, int(max_frames))
+        if total == 0 or limit == 0:
+            return []
+        step = 1.0
+        if fps and fps > 0 and self.scan_fps > 0 and fps < self.scan_fps:
+            step = self.scan_fps / float(fps)
+        indices = []
+        pos = 0.0
+        while len(indices) < limit:
+            idx = int(round(pos))
+            if idx >= total:
+                break
+            if not indices or indices[-1] != idx:
+                indices.append(idx)
+            pos += step
+        return indices
+
+    def uniform_indices(self, count, indices=None):
+        indices = list(range(len(self))) if indices is None else list(indices)
+        return [indices[pos] for pos in uniform_positions(len(indices), count)]
+
+    def clip_indices(self, count, strategy="center", indices=None):
+        indices = list(range(len(self))) if indices is None else list(indices)
+        window = clip_window(len(indices), count, strategy)
+        if window is None:
+            return []
+        return indices[window[0] : window[1]]
+
+    def small_gray(self, index, max_width=320):
+        cached = self._small_gray.get(index)
+        if cached is not None:
+            return cached
+        gray = cv2.cvtColor(self.frames[index], cv2.COLOR_BGR2GRAY)
+        h, w = gray.shape[:2]
+        if w > max_width:
+            scale = max_width / float(w)
+            gray = cv2.resize(gray, (max_width, max(1, int(round(h * scale)))), interpolation=cv2.INTER_AREA)
+        self._small_gray[index] = gray
+        return gray
+
+    def _gray_hist(self, index):
+        cached = self._hist.get(index)
+        if cached is not None:
+            return cached
+        hist = cv2.calcHist([self.small_gray(index)], [0], None, [32], [0, 256])
+        cv2.normalize(hist, hist)
+        self._hist[index] = hist
+        return hist
+
+    def transition_scores(self, indices=None):
+        """
+        Bewegung (mittlere Graudifferenz) und Szenenwechsel (Chi^2 der Histogramme) zwischen
+        aufeinanderfolgenden Frames aus indices. Positionen beziehen sich auf indices.
+        """
+        indices = list(range(len(self))) if indices is None else list(indices)
+        motion, scene = [], []
+        if cv2 is None:
+            return motion, scene
+        for pos in range(1, len(indices)):
+            prev_idx, idx = indices[pos - 1], indices[pos]
+            diff = cv2.absdiff(self.small_gray(idx), self.small_gray(prev_idx))
+            motion.append((pos, float(np.mean(diff))))
+            scene.append(
+                (pos, float(cv2.compareHist(self._gray_hist(prev_idx), self._gray_hist(idx), cv2.HISTCMP_CHISQR)))
+            )
+        return motion, scene
+
+    def scene_indices(self, count, indices=None):
+        indices = list(range(len(self))) if indices is None else list(indices)
+        _, scene = self.transition_scores(indices)
+        return [indices[pos] for pos in top_positions(scene, count)]
+
+    def motion_indices(self, count, indices=None):
+        indices = list(range(len(self))) if indices is None else list(indices)
+        motion, _ = self.transition_scores(indices)
+        return [indices[pos] for pos in top_positions(motion, count)]
+
+    def close(self):
+        with self._lock:
+            tmpdir = self._tmpdir
+            self._tmpdir = None
+            self.frames = None
+            self.paths = []
+            self._small_gray = {}
+            self._hist = {}
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+_SCOPES_LOCK = threading.Lock()
+_SCOPES = {}
+
+
+def _scope_key(path: str) -> str:
+    return os.path.abspath(path or "")
+
+
+@contextlib.contextmanager
+def video_frame_store_scope(path: str):
+    """
+    Liefert den VideoFrameStore fuer path. Verschachtelte Scopes (Server + Engines, auch aus
+    verschiedenen Threads) teilen sich dieselbe Instanz; der letzte Scope raeumt die Frames weg.
+    """
+    key = _scope_key(path)
+    with _SCOPES_LOCK:
+        entry = _SCOPES.get(key)
+        if entry is None:
+            entry = [VideoFrameStore(path), 0]
+            _SCOPES[key] = entry
+        entry[1] += 1
+    try:
+        yield entry[0]
+    finally:
+        close_store = False
+        with _SCOPES_LOCK:
+            entry[1] -= 1
+            if entry[1] <= 0 and _SCOPES.get(key) is entry:
+                _SCOPES.pop(key, None)
+                close_store = True
+        if close_store:
+            entry[0].close()
@@ -0,0 +1,70 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from Backend.audio_frames import frame_matrix
+from Backend.engines.audio_prosody_engine import _estimate_pitch_acf, _estimate_pitch_batch
+
+
+def synthetic_voice(seconds, sample_rate=16000, seed=0):
+    """Gleitender Grundton (120-180 Hz) mit Oberton und Rauschen."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / float(sample_rate)
+    f0 = 150.0 + 30.0 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / float(sample_rate)
+    signal = 0.5 * np.sin(phase) + 0.15 * np.sin(2 * phase) + rng.normal(size=t.size) * 0.05
+    return signal.astype(np.float32)
+
+
+def run(seconds, sample_rate=16000, repeats=3):
+    samples = synthetic_voice(seconds, sample_rate)
+    frame_size = int(max(160, round(sample_rate * 0.04)))
+    hop = int(max(80, round(sample_rate * 0.01)))
+    frames = frame_matrix(samples, frame_size, hop)
+
+    loop_ms = batch_ms = float("inf")
+    for _ in range(max(1, repeats)):
+        started = time.perf_counter()
+        loop = [_estimate_pitch_acf(frame, sample_rate) for frame in frames]
+        loop_ms = min(loop_ms, (time.perf_counter() - started) * 1000.0)
+        started = time.perf_counter()
+        batch = _estimate_pitch_batch(frames, sample_rate)
+        batch_ms = min(batch_ms, (time.perf_counter() - started) * 1000.0)
+
+    loop = np.array([np.nan if v is None else v for v in loop], dtype=np.float64)
+    both = ~np.isnan(loop) & ~np.isnan(batch)
+    return {
+        "frames": int(frames.shape[0]),
+        "loop_ms": loop_ms,
+        "batch_ms": batch_ms,
+        "speedup": loop_ms / batch_ms if batch_ms > 0 else None,
+        "max_abs_diff_hz": float(np.max(np.abs(loop[both] - batch[both]))) if both.any() else None,
+        "mismatched_detections": int(np.sum(np.isnan(loop) != np.isnan(batch))),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark: per-frame vs. batched FFT pitch tracker.")
+    parser.add_argument("--seconds", type=float, nargs="+", default=[5.0, 30.0, 120.0])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    for seconds in args.seconds:
+        report = run(seconds, repeats=args.repeats)
+        print(
+            f"[bench_prosody_pitch] seconds={seconds:g} frames={report['frames']} "
+            f"loop_ms={report['loop_ms']:.1f} batch_ms={report['batch_ms']:.1f} "
+            f"speedup={report['speedup']:.1f}x max_abs_diff_hz={report['max_abs_diff_hz']} "
+            f"mismatched={report['mismatched_detections']}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,6 +2,21 @@ import argparse
 import os
 import sys
 import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from Backend.engines.clip_ann import (
+    ann_index_path,
+    build_ivf_index,
+    load_ivf_index,
+    measure_recall,
+    order_fingerprint,
+    save_ivf_index,
+)
+from Backend.engines.clip_quantized import open_quantized_embeddings, quantized_path, write_quantized_embeddings
 
 try:
     import torch
@@ -184,6 +199,97 @@ def build_embeddings(input_dir, output_path):
     print(f"[done] skipped: {skipped}")
 
 
+def build_ann_index(embeddings_path, n_lists=None, nprobe=8, recall_queries=200, recall_k=5):
+    """IVF-Index fuer eine vorhandene Embedding-Datei bauen und Recall gegen exakte Suche messen."""
+    if np is None:
+        raise RuntimeError("numpy_missing")
+    with np.load(embeddings_path) as data:
+        embeddings = np.asarray(data["embeddings"], dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    embeddings = embeddings / norms
+    count, dim = int(embeddings.shape[0]), int(embeddings.shape[1])
+
+    start = time.time()
+    index = build_ivf_index(embeddings, n_lists=n_lists)
+    index_path = ann_index_path(embeddings_path)
+    save_ivf_index(index_path, index, count, dim)
+    print(f"[ann] wrote {index_path} lists={index['centroids'].shape[0]} rows={count} in {time.time() - start:.1f}s")
+
+    ivf, order = load_ivf_index(index_path, count, dim)
+    ordered = embeddings[order]
+    rng = np.random.default_rng(0)
+    picks = rng.choice(count, size=min(count, max(1, int(recall_queries))), replace=False)
+    # Leicht verrauschte Korpuszeilen als Anfragen, damit nicht nur Selbsttreffer gezaehlt werden.
+    queries = ordered[picks] + rng.normal(0.0, 0.02, size=(len(picks), dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    report = measure_recall(ordered, ivf, queries, recall_k, nprobe)
+    print(
+        f"[ann] recall@{report['k']}={report['recall_at_k']:.3f} nprobe={report['nprobe']} "
+        f"exact_ms={report['exact_ms']:.3f} ann_ms={report['ann_ms']:.3f} queries={report['queries']}"
+    )
+    return report
+
+
+def build_quantized(embeddings_path, dtype="int8"):
+    """
+    .cemb-Datei (float16 oder int8 mit Skalen je Zeile) neben der Embedding-Datei schreiben.
+    Liegt ein passender IVF-Index daneben, werden die Zeilen gleich in Index-Reihenfolge abgelegt.
+    """
+    if np is None:
+        raise RuntimeError("numpy_missing")
+    with np.load(embeddings_path) as data:
+        embeddings = np.asarray(data["embeddings"], dtype=np.float32)
+        model_tag = str(data["model"]) if "model" in data.files else None
+    count, dim = int(embeddings.shape[0]), int(embeddings.shape[1])
+    ivf, order = load_ivf_index(ann_index_path(embeddings_path), count, dim)
+    ann_ordered = ivf is not None
+    fingerprint = None
+    if ann_ordered:
+        embeddings = embeddings[order]
+        fingerprint = order_fingerprint(order)
+
+    start = time.time()
+    out_path = quantized_path(embeddings_path)
+    write_quantized_embeddings(
+        out_path, embeddings, dtype=dtype, model=model_tag, ann_ordered=ann_ordered, ann_fingerprint=fingerprint
+    )
+    size_mb = os.path.getsize(out_path) / (1024 * 1024)
+    print(
+        f"[quantized] wrote {out_path} dtype={dtype} rows={count} dim={dim} "
+        f"ann_ordered={ann_ordered} size_mb={size_mb:.1f} in {time.time() - start:.1f}s"
+    )
+
+    # Genauigkeit gegen float32 pruefen (max. Abweichung der Similarities).
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    reference = embeddings / norms
+    quantized = open_quantized_embeddings(out_path)
+    rng = np.random.default_rng(0)
+    queries = reference[rng.choice(count, size=min(count, 32), replace=False)].T
+    max_err = float(np.max(np.abs(quantized.dot(queries) - reference.dot(queries))))
+    print(f"[quantized] max_similarity_error={max_err:.5f}")
+    return out_path
+
+
+def refresh_quantized(embeddings_path):
+    """
+    Nach einem neuen IVF-Index eine vorhandene .cemb im selben dtype neu schreiben, damit ihre
+    Zeilenreihenfolge wieder zum Index passt. Ist sie nicht lesbar, wird sie geloescht.
+    """
+    out_path = quantized_path(embeddings_path)
+    if not os.path.exists(out_path):
+        return None
+    try:
+        dtype = open_quantized_embeddings(out_path).dtype
+    except Exception as exc:
+        print(f"[quantized] removing unreadable {out_path}: {exc}")
+        os.remove(out_path)
+        return None
+    print(f"[quantized] rewriting {out_path} for the new ann index")
+    return build_quantized(embeddings_path, dtype=dtype)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Build CLIP embeddings for real images.")
     parser.add_argument(
@@ -196,10 +302,40 @@ def main():
         default=os.path.join("data", "clip_real_embeddings.npz"),
         help="Output .npz path.",
     )
+    parser.add_argument(
+        "--ann-lists",
+        type=int,
+        default=None,
+        help="Build an IVF index with this many lists next to the output (0 = sqrt(rows)).",
+    )
+    parser.add_argument("--ann-only", action="store_true", help="Only (re)build the IVF index for --output.")
+    parser.add_argument("--ann-nprobe", type=int, default=8, help="nprobe used for the recall report.")
+    parser.add_argument("--recall-queries", type=int, default=200, help="Queries for the recall report.")
+    parser.add_argument("--recall-k", type=int, default=5, help="k for recall@k (AIREALCHECK_CLIP_TOPK).")
+    parser.add_argument(
+        "--quantize",
+        choices=["float16", "int8"],
+        default=None,
+        help="Also write a memory-mapped .cemb file next to the output (after the IVF index, if any).",
+    )
+    parser.add_argument("--quantize-only", action="store_true", help="Only (re)write the .cemb file for --output.")
     args = parser.parse_args()
 
     try:
-        build_embeddings(args.input, args.output)
+        if not args.ann_only and not args.quantize_only:
+            build_embeddings(args.input, args.output)
+        if args.ann_only or (args.ann_lists is not None and not args.quantize_only):
+            build_ann_index(
+                args.output,
+                n_lists=args.ann_lists,
+                nprobe=args.ann_nprobe,
+                recall_queries=args.recall_queries,
+                recall_k=args.recall_k,
+            )
+            if not args.quantize:
+                refresh_quantized(args.output)
+        if args.quantize_only or args.quantize:
+            build_quantized(args.output, dtype=args.quantize or "int8")
     except Exception as exc:
         print(f"[error] {exc}")
         sys.exit(1)